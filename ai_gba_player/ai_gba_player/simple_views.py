@@ -331,6 +331,51 @@ def get_chat_messages(_request):
             'status': 'error'
         })
 
+
+def get_game_state(_request):
+    """Get the latest game state, including the classified screen type"""
+    try:
+        from dashboard.ai_game_service import get_ai_service
+        
+        service = get_ai_service()
+        if service and service.is_alive():
+            return JsonResponse({
+                'success': True,
+                'game_state': service.get_latest_game_state(),
+                'status': 'running'
+            })
+        else:
+            return JsonResponse({
+                'success': True,
+                'game_state': None,
+                'status': 'stopped'
+            })
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'game_state': None,
+            'status': 'error'
+        })
+
+def get_frame(request, frame_id, thumbnail=False):
+    """Serve a chat screenshot (or its thumbnail) by content hash; the content never changes"""
+    from dashboard.frame_assets import get_frame_asset_store
+    
+    etag = f'"{frame_id}-thumb"' if thumbnail else f'"{frame_id}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponse(status=304, headers=headers)
+    
+    store = get_frame_asset_store()
+    data = store.get_thumbnail(frame_id) if thumbnail else store.restore(frame_id)
+    if data is None:
+        return HttpResponse(status=404)
+    return HttpResponse(data, content_type='image/png', headers=headers)
+
 def launch_mgba_config(_request):
     """Launch mGBA with configured ROM"""
     try:
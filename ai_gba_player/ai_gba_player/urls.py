@@ -38,6 +38,9 @@ urlpatterns = [
     path('api/save-rom-config/', csrf_exempt(simple_views.save_rom_config), name='save_rom_config'),
     path('api/save-ai-config/', csrf_exempt(simple_views.save_ai_config), name='save_ai_config'),
     path('api/chat-messages/', csrf_exempt(simple_views.get_chat_messages), name='get_chat_messages'),
+    path('api/game-state/', csrf_exempt(simple_views.get_game_state), name='get_game_state'),
+    path('api/frames/<str:frame_id>/', simple_views.get_frame, name='get_frame'),
+    path('api/frames/<str:frame_id>/thumbnail/', simple_views.get_frame, {'thumbnail': True}, name='get_frame_thumbnail'),
     
     # Memory system configuration API endpoints
     path('api/memory-config/save/', csrf_exempt(simple_views.save_memory_config), name='save_memory_config'),
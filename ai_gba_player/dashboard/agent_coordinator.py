@@ -64,7 +64,10 @@ class AgentCoordinator:
     
     def set_communication_interfaces(self, chat_message_sender: Callable[[str, str], None], 
                                    screenshot_requester: Callable[[], str], 
-                                   button_sender: Callable[[list, Optional[list]], bool]):
+                                   button_sender: Callable[[list, Optional[list]], bool],
+                                   action_capturer: Optional[Callable[[list, Optional[list]], Optional[str]]] = None,
+                                   sequence_waiter: Optional[Callable[[list, Optional[list]], bool]] = None,
+                                   state_reader: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None):
         """Set communication interfaces for agents to interact with external systems"""
         if not self.agents_initialized:
             print("❌ AgentCoordinator: Cannot set interfaces - not initialized")
@@ -74,6 +77,12 @@ class AgentCoordinator:
         self.player_agent.set_chat_message_sender(chat_message_sender)
         self.player_agent.set_screenshot_requester(screenshot_requester)
         self.player_agent.set_button_sender(button_sender)
+        if action_capturer:
+            self.player_agent.set_action_capturer(action_capturer)
+        if sequence_waiter:
+            self.player_agent.set_sequence_waiter(sequence_waiter)
+        if state_reader:
+            self.player_agent.set_state_reader(state_reader)
         
         # Connect NarrationAgent to chat
         self.narration_agent.set_chat_message_sender(chat_message_sender)
@@ -12,8 +12,8 @@ import os
 import traceback
 from typing import Dict, Any, Optional
 from datetime import datetime
-import base64
 from pathlib import Path
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
 
 from core.logging_config import get_logger
 logger = get_logger(__name__)
@@ -26,6 +26,23 @@ from .player_agent import PlayerAgent
 from .narration_agent import NarrationAgent
 from .tts_service import TTSService
 from .agent_coordinator import AgentCoordinator
+from .frame_store import get_frame_store, frame_exists, TRANSFER_MODE_FILE, TRANSFER_MODES
+from .image_cache import get_enhanced_image_cache, frame_content_key
+from .frame_ring import get_frame_ring
+from .frame_assets import get_frame_asset_store
+from .screenshot_storage import (
+    ScreenshotStorage, resolve_screenshot_storage, prepare_screenshot_directory,
+    DEFAULT_SCREENSHOT_DIRECTORY, STORAGE_DISK, STORAGE_TMPFS
+)
+from .screen_classifier import get_screen_classifier
+from .pending_requests import PendingRequests
+from .mgba_protocol import (
+    MSG_HELLO, MSG_TEXT, MSG_FRAME, FRAMING_CAPABILITY, ACT_CAPTURE_CAPABILITY, SEQUENCE_DONE_CAPABILITY,
+    STATE_STREAM_CAPABILITY, SCREENSHOT_DIR_CAPABILITY, encode_hello
+)
+from .io_loop import IOLoop
+from .mgba_connection import MGBAConnection
+from .state_timeline import StateTimeline
 
 # Memory service will be imported when Django is ready
 MEMORY_SERVICE_AVAILABLE = False
@@ -35,12 +52,16 @@ _memory_service_functions = {}
 class AIGameService(threading.Thread):
     """Single-threaded service combining socket server + AI decisions"""
     
+    BUTTON_SEPARATION_FRAMES = 58  # Must match buttonSeparationFrames in emulator/script.lua
+    
     def __init__(self):
         super().__init__(daemon=True, name="AIGameService")
         
-        # Socket server for mGBA communication
+        # Socket server for mGBA communication (driven by a selectors event loop)
         self.socket = None
         self.client_socket = None
+        self.connection = None  # Active MGBAConnection
+        self.io_loop = IOLoop()
         self.running = False
         
         # Configuration
@@ -55,11 +76,14 @@ class AIGameService(threading.Thread):
         self.last_screenshot = None
         self.decision_count = 0
         
-        # Screenshot tracking with sorted map and storage optimization
-        self.screenshot_map = {}  # {filename: creation_time}
-        self.max_screenshots = 10  # Keep only 10 most recent screenshots
-        self.screenshot_counter = 0  # Sequential counter for registration order
-        self.screenshot_dir = Path("/Users/chengwan/Projects/pokemonAI/LLM-Pokemon-Red/data/screenshots")
+        # Screenshot tracking: ring of the most recent screenshots, shared with PlayerAgent
+        self.frame_ring = get_frame_ring()  # Keeps the 10 most recent; older files are deleted in the background
+        self.frame_assets = get_frame_asset_store()  # Chat screenshots by content hash, served by /api/frames/
+        self.screenshot_counter = 0  # Sequential counter for controlled filenames
+        # Disk, tmpfs or in-memory; the directory is prepared once mGBA is ready and the config is known
+        self.screenshot_storage = ScreenshotStorage(STORAGE_DISK, DEFAULT_SCREENSHOT_DIRECTORY)
+        self.screenshot_dir = self.screenshot_storage.directory
+        self._prepared_screenshot_dirs = set()
         self.current_screenshot_path = None
         
         # Protocol consistency tracking
@@ -68,8 +92,23 @@ class AIGameService(threading.Thread):
         self.next_screenshot_path = None  # Path where next screenshot will be saved
         self._initialize_screenshot_tracking()
         
-        # Message buffering for handling partial messages
-        self.message_buffer = ""
+        # Frame transfer: 'file' (PNG written by mGBA) or 'socket' (raw framebuffer over the socket)
+        self.frame_transfer_mode = TRANSFER_MODE_FILE
+        self.frame_store = get_frame_store()
+        
+        # Screenshot requests awaiting mGBA's screenshot_with_state, keyed by correlation id
+        # (carried in the framed protocol header; text-mode replies are matched in order)
+        self.pending_screenshots = PendingRequests()
+        self._request_lock = threading.Lock()
+        self._last_request_id = 0
+        
+        # Set when the Lua script can press buttons and capture in one command
+        self.act_capture_supported = False
+        
+        # Button sequence awaiting mGBA's sequence_done (only one runs at a time)
+        self.pending_sequences = PendingRequests(max_pending=1)
+        self.sequence_future = None
+        self.sequence_done_supported = False
         
         # Chat message storage (simple in-memory for now)
         self.chat_messages = []
@@ -112,6 +151,11 @@ class AIGameService(threading.Thread):
         self.position_history = []  # Last 10 positions
         self.movement_patterns = {}  # Track repeated movement attempts
         
+        # Frame-level state pushed by script.lua between screenshots
+        self.state_timeline = StateTimeline()
+        self.state_stream_supported = False
+        self._tracking_frames = (0, 0)  # Timeline frames at the previous and latest screenshot
+        
         # Dynamic address validation
         self.address_validation_failures = 0
         self.last_valid_data_time = None
@@ -163,79 +207,38 @@ class AIGameService(threading.Thread):
             self.memory_system = None
     
     def _initialize_screenshot_tracking(self):
-        """Initialize screenshot tracking with complete folder cleanup and controlled naming"""
-        try:
-            if not self.screenshot_dir.exists():
-                self.screenshot_dir.mkdir(parents=True, exist_ok=True)
-                logger.info(f" Created screenshot directory: {self.screenshot_dir}")
-                return
-            
-            # Perform complete cleanup of screenshot folder
-            logger.info(" Starting comprehensive screenshot folder cleanup...")
-            self._cleanup_all_screenshots()
-            
-            # Initialize clean state
-            self.screenshot_map = {}
-            self.screenshot_counter = 0
-            logger.info(f" Screenshot folder cleaned - ready for controlled naming")
-            
-        except Exception as e:
-            logger.error(f" Error initializing screenshot tracking: {e}")
-    
-    def _cleanup_all_screenshots(self):
-        """Remove all screenshots from the directory for a clean start"""
-        try:
-            removed_count = 0
-            
-            # Find all screenshot files (any format)
-            for pattern in ["*.png", "*.jpg", "*.jpeg"]:
-                screenshot_files = list(self.screenshot_dir.glob(pattern))
-                for file_path in screenshot_files:
-                    try:
-                        file_path.unlink()  # Delete the file
-                        logger.debug(f" Removed: {file_path.name}")
-                        removed_count += 1
-                    except Exception as e:
-                        logger.warning(f" Error removing {file_path.name}: {e}")
-            
-            logger.info(f" Complete cleanup: removed {removed_count} screenshot files")
-            
-        except Exception as e:
-            logger.error(f" Error during complete screenshot cleanup: {e}")
-    
-    def _cleanup_old_screenshots(self):
-        """Remove old screenshots, keeping only the most recent ones"""
-        try:
-            if len(self.screenshot_map) <= self.max_screenshots:
-                return
-            
-            # Sort by creation time (newest first)
-            sorted_screenshots = sorted(
-                self.screenshot_map.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
-            
-            # Keep only the newest screenshots
-            to_keep = sorted_screenshots[:self.max_screenshots]
-            to_remove = sorted_screenshots[self.max_screenshots:]
-            
-            # Remove old files
-            for file_path, _ in to_remove:
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        logger.debug(f" Removed old screenshot: {os.path.basename(file_path)}")
-                except Exception as e:
-                    logger.warning(f" Error removing {file_path}: {e}")
-            
-            # Update the map to only include kept files
-            self.screenshot_map = dict(to_keep)
-            
-            logger.info(f" Screenshot cleanup: kept {len(self.screenshot_map)}, removed {len(to_remove)}")
-            
-        except Exception as e:
-            logger.error(f" Error during screenshot cleanup: {e}")
+        """Initialize screenshot tracking state for controlled naming (no disk I/O)"""
+        self.frame_ring.clear()
+        self.screenshot_counter = 0
+    
+    def _configure_screenshot_storage(self, capabilities: list):
+        """Apply capture_system.screenshot_storage and point mGBA at the chosen directory"""
+        config = self._load_config() or {}
+        settings = config.get('capture_system', {}).get('screenshot_storage') or {}
+        storage = resolve_screenshot_storage(settings, self.frame_transfer_mode)
+        if storage.backend == STORAGE_TMPFS and SCREENSHOT_DIR_CAPABILITY not in capabilities:
+            logger.warning(" mGBA script cannot change its screenshot directory, storing screenshots on disk")
+            storage = resolve_screenshot_storage({**settings, 'backend': STORAGE_DISK}, self.frame_transfer_mode)
+        
+        self.screenshot_storage = storage
+        self.screenshot_dir = storage.directory
+        self.frame_ring.delete_evicted_files = storage.uses_files
+        logger.info(f" Screenshot storage: {storage.backend} ({storage.directory})")
+        
+        # Stale files are cleared once per directory; a reconnect keeps the current session's screenshots
+        if storage.uses_files and storage.directory not in self._prepared_screenshot_dirs:
+            try:
+                prepare_screenshot_directory(storage.directory)
+                self._prepared_screenshot_dirs.add(storage.directory)
+            except OSError as e:
+                logger.error(f" Error preparing screenshot directory {storage.directory}: {e}")
+        
+        # The script writes to its default directory unless told otherwise (it forgets on reconnect)
+        if SCREENSHOT_DIR_CAPABILITY in capabilities and storage.uses_files:
+            try:
+                self._send_to_mgba(f"set_screenshot_dir||{storage.directory}")
+            except ConnectionError as e:
+                logger.warning(f" Could not send screenshot directory to mGBA: {e}")
     
     def _cleanup_legacy_screenshots(self):
         """Remove old mixed-format screenshot files to prevent confusion"""
@@ -268,65 +271,27 @@ class AIGameService(threading.Thread):
         except Exception as e:
             logger.error(f" Error during legacy screenshot cleanup: {e}")
     
-    def _register_new_screenshot(self, screenshot_path: str):
-        """Register a new screenshot in the tracking map and clean up if needed"""
+    def _register_new_screenshot(self, screenshot_path: str, game_state: Dict[str, Any]):
+        """Register a new screenshot, with its game state, hash and screen type, as the newest ring entry"""
         try:
-            if os.path.exists(screenshot_path):
-                # Screenshot is already at the controlled path with controlled naming
-                creation_time = self.screenshot_counter  # Use counter for deterministic ordering
-                
-                # Debug: show what we're registering
-                logger.debug(f" Registering controlled screenshot:")
-                logger.debug(f"   Path: {screenshot_path}")
-                logger.debug(f"   Counter: {creation_time}")
-                logger.debug(f"   Map size before: {len(self.screenshot_map)}")
-                
-                self.screenshot_map[screenshot_path] = creation_time
-                
-                # Update current screenshot
-                self.current_screenshot_path = screenshot_path
-                
-                # Clean up old screenshots if we exceed the limit
-                if len(self.screenshot_map) > self.max_screenshots:
-                    logger.info(f" Triggering cleanup - {len(self.screenshot_map)} > {self.max_screenshots}")
-                    self._cleanup_old_screenshots()
-                
-                logger.debug(f" Registered: {os.path.basename(screenshot_path)} (total: {len(self.screenshot_map)})")
-                
-                return screenshot_path
-                
-        except Exception as e:
-            logger.error(f" Error registering screenshot: {e}")
-            return screenshot_path  # Return original path as fallback
+            content_hash = frame_content_key(screenshot_path)
+        except OSError as e:
+            logger.warning(f" Could not hash {os.path.basename(screenshot_path)}: {e}")
+            content_hash = None
+        entry = self.frame_ring.push(screenshot_path, game_state=game_state, content_hash=content_hash,
+                                     screen_type=game_state.get("screen_type"))
+        self.current_screenshot_path = screenshot_path
+        logger.debug(f" Registered: {os.path.basename(screenshot_path)} (#{entry.sequence}, total: {len(self.frame_ring)})")
+        return entry
     
     def _get_latest_screenshots(self) -> tuple[str, str]:
         """Get the two most recent screenshots for before/after comparison"""
-        try:
-            if len(self.screenshot_map) < 1:
-                return None, None
-            elif len(self.screenshot_map) == 1:
-                # Only one screenshot available - use it for both
-                latest_path = list(self.screenshot_map.keys())[0]
-                return latest_path, latest_path
-            
-            # Sort by creation time (newest first)
-            sorted_screenshots = sorted(
-                self.screenshot_map.items(),
-                key=lambda x: x[1], 
-                reverse=True
-            )
-            
-            # Get the two most recent
-            current_path = sorted_screenshots[0][0]    # Most recent (current)
-            previous_path = sorted_screenshots[1][0]   # Second most recent (previous)
-            
-            logger.debug(f" Screenshot pair - Previous: {os.path.basename(previous_path)}, Current: {os.path.basename(current_path)}")
-            
-            return previous_path, current_path
-            
-        except Exception as e:
-            logger.error(f" Error getting latest screenshots: {e}")
+        current = self.frame_ring.current()
+        if current is None:
             return None, None
+        previous = self.frame_ring.previous() or current  # Only one screenshot available - use it for both
+        logger.debug(f" Screenshot pair - Previous: {os.path.basename(previous.path)}, Current: {os.path.basename(current.path)}")
+        return previous.path, current.path
     
     def run(self):
         """Main thread execution - start socket server and handle connections"""
@@ -336,7 +301,7 @@ class AIGameService(threading.Thread):
         try:
             self._setup_socket_server()
             self._send_chat_message("system", "🔗 AI Service started - waiting for mGBA connection...")
-            self._accept_connections()
+            self.io_loop.run_forever()
         except Exception as e:
             logger.error(f" AI Game Service error: {e}")
             traceback.print_exc()
@@ -348,19 +313,9 @@ class AIGameService(threading.Thread):
         """Stop the AI Game Service"""
         logger.info(" Stopping AI Game Service...")
         self.running = False
-        self.mgba_connected = False
-        
-        if self.client_socket:
-            try:
-                self.client_socket.close()
-            except:
-                pass
         
-        if self.socket:
-            try:
-                self.socket.close()
-            except:
-                pass
+        # Sockets are closed by _cleanup on the loop thread once the loop exits
+        self.io_loop.stop()
         
         # Shutdown AgentCoordinator and its threads
         self.agent_coordinator.shutdown()
@@ -406,7 +361,9 @@ class AIGameService(threading.Thread):
                         'movement_multiplier': config.get('movement_multiplier', 0.8),
                         'interaction_multiplier': config.get('interaction_multiplier', 0.6),
                         'menu_multiplier': config.get('menu_multiplier', 0.4),
-                        'max_wait_time': config.get('max_wait_time', 10.0)
+                        'max_wait_time': config.get('max_wait_time', 10.0),
+                        'settle_frames': config.get('settle_frames', 30),
+                        'state_stream_frames': config.get('state_stream_frames', 1)
                     }
             except Exception as e:
                 logger.warning(f" Could not load timing config from file: {e}")
@@ -420,7 +377,9 @@ class AIGameService(threading.Thread):
             'movement_multiplier': 0.8,     # Extra seconds per movement action
             'interaction_multiplier': 0.6,  # Extra seconds per interaction  
             'menu_multiplier': 0.4,         # Extra seconds per menu action
-            'max_wait_time': 10.0           # Maximum wait time safety cap
+            'max_wait_time': 10.0,          # Maximum wait time safety cap
+            'settle_frames': 30,            # Frames mGBA waits after the last button before act_then_capture captures
+            'state_stream_frames': 1        # Frames between state telemetry samples (sent only on change)
         }
     
     def reload_timing_config(self):
@@ -547,100 +506,122 @@ class AIGameService(threading.Thread):
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.socket.bind((self.host, self.port))
-            self.socket.listen(1)
-            self.socket.settimeout(1.0)  # Non-blocking accept with timeout
+            self.socket.listen(5)
+            self.socket.setblocking(False)
+            self.io_loop.add_reader(self.socket, self._accept_connections)
             logger.info(f" Socket server listening on {self.host}:{self.port}")
         except Exception as e:
             raise Exception(f"Failed to setup socket server: {e}")
     
     def _accept_connections(self):
-        """Accept and handle mGBA connections"""
+        """Accept pending mGBA connections (called when the listening socket is readable)"""
         while self.running:
             try:
                 client_socket, client_address = self.socket.accept()
-                logger.info(f" mGBA connected from {client_address}")
-                
-                # Close any existing connection
-                if self.client_socket:
-                    try:
-                        self.client_socket.close()
-                    except:
-                        pass
-                
-                self.client_socket = client_socket
-                self.mgba_connected = True
-                self._send_chat_message("system", "🎮 mGBA connected successfully!")
-                
-                # Handle this connection
-                self._handle_mgba_connection()
-                
-            except socket.timeout:
-                # Normal timeout, continue loop
-                continue
+            except BlockingIOError:
+                return
             except Exception as e:
-                if self.running:
-                    logger.warning(f" Connection error: {e}")
-                    self._send_chat_message("system", f"⚠️ Connection error: {str(e)}")
+                logger.warning(f" Connection error: {e}")
+                self._send_chat_message("system", f"⚠️ Connection error: {str(e)}")
+                return
+            
+            logger.info(f" mGBA connected from {client_address}")
+            self._attach_connection(client_socket, client_address)
+    
+    def _attach_connection(self, client_socket: socket.socket, client_address) -> MGBAConnection:
+        """Register a new emulator connection with the event loop and make it active"""
+        # The service drives one emulator at a time - replace any existing connection
+        if self.connection:
+            self.connection.close()
+        
+        self.connection = MGBAConnection(
+            self.io_loop,
+            client_socket,
+            client_address,
+            on_message=self._handle_mgba_message,
+            on_close=self._handle_mgba_disconnect
+        )
+        self.client_socket = client_socket
+        self.mgba_connected = True
+        self._send_chat_message("system", "🎮 mGBA connected successfully!")
+        return self.connection
+    
+    def _handle_mgba_message(self, connection: MGBAConnection, message):
+        """Handle a decoded message from an emulator connection"""
+        if connection is not self.connection:
+            logger.debug(f" Ignoring message from inactive connection {connection.address}")
+            return
+        self._dispatch_protocol_message(message)
     
-    def _handle_mgba_connection(self):
-        """Handle communication with connected mGBA instance"""
+    def _handle_mgba_disconnect(self, connection: MGBAConnection):
+        """Reset connection state when an emulator disconnects"""
+        if connection is not self.connection:
+            return
+        self.connection = None
+        self.client_socket = None
+        self.mgba_connected = False
+        self.act_capture_supported = False
+        self.sequence_done_supported = False
+        self.state_stream_supported = False
+        self.pending_screenshots.cancel_all()
+        self.pending_sequences.cancel_all()
+        self._send_chat_message("system", "🔌 mGBA disconnected")
+    
+    def _dispatch_protocol_message(self, message):
+        """Route a decoded protocol message to its handler"""
+        if message.msg_type == MSG_FRAME:
+            self._handle_frame_data(message.text, message.payload)
+        elif message.msg_type == MSG_TEXT:
+            if message.text:
+                logger.debug(f" Received from mGBA: {message.text}")
+                self._process_mgba_message(message.text, request_id=message.request_id)
+        elif message.msg_type == MSG_HELLO:
+            logger.debug(f" Framed protocol hello from mGBA: version {message.text}")
+        else:
+            logger.warning(f" Unknown framed message type from mGBA: {message.msg_type}")
+    
+    def _handle_frame_data(self, meta: str, payload):
+        """Store a framebuffer streamed by mGBA under its controlled screenshot path"""
+        # meta format: filename||width||height||format
+        parts = meta.split("||")
+        if len(parts) < 4:
+            logger.warning(f" Invalid frame metadata: {meta}")
+            return
+        
+        filename = parts[0]
+        frame_path = str(self.screenshot_dir / filename)
         try:
-            self.client_socket.settimeout(0.1)  # Short timeout for non-blocking recv
-            
-            while self.running and self.mgba_connected:
-                try:
-                    data = self.client_socket.recv(1024).decode('utf-8')
-                    if not data:
-                        break
-                    
-                    # Add to message buffer
-                    self.message_buffer += data
-                    
-                    # Debug: Show if we received partial data
-                    if len(self.message_buffer) > 100 and '\n' not in self.message_buffer:
-                        logger.info(f" Buffering large message: {len(self.message_buffer)} chars")
-                    
-                    # Process complete messages (terminated by newlines)
-                    while '\n' in self.message_buffer:
-                        line, self.message_buffer = self.message_buffer.split('\n', 1)
-                        message = line.strip()
-                        
-                        if message:  # Only process non-empty messages
-                            logger.debug(f" Received from mGBA: {message}")
-                            self._process_mgba_message(message)
-                    
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    logger.warning(f" Error receiving data: {e}")
-                    break
-                    
-        except Exception as e:
-            logger.error(f" Connection handling error: {e}")
-        finally:
-            self.mgba_connected = False
-            self._send_chat_message("system", "🔌 mGBA disconnected")
-            if self.client_socket:
-                try:
-                    self.client_socket.close()
-                except:
-                    pass
-                self.client_socket = None
-    
-    def _process_mgba_message(self, message: str):
-        """Process messages received from mGBA Lua script"""
+            self.frame_store.put_frame(
+                frame_path,
+                int(parts[1]),
+                int(parts[2]),
+                payload,
+                pixel_format=parts[3]
+            )
+            logger.debug(f" Received in-band frame: {filename} ({len(payload)} bytes)")
+        except ValueError as e:
+            logger.warning(f" Discarding invalid frame {filename}: {e}")
+    
+    def _process_mgba_message(self, message: str, request_id: int = 0):
+        """Process messages received from mGBA Lua script (request_id is 0 for text-mode replies)"""
         try:
             if message.startswith("ready"):
-                self._handle_ready_message()
+                self._handle_ready_message(message)
             elif message.startswith("config_loaded"):
                 self._handle_config_loaded_message()
             elif message.startswith("config_error"):
                 self._handle_config_error_message(message)
+            elif message.startswith("screenshot_error"):
+                self._handle_screenshot_error(message, request_id)
+            elif message.startswith("sequence_done"):
+                self._handle_sequence_done(message)
+            elif message.startswith("st||"):
+                self._handle_state_delta(message)
             elif message.startswith("screenshot_with_state") or message.startswith("enhanced_screenshot_with_state"):
-                self._handle_screenshot_data(message)
-            elif "||" in message and len(message.split("||")) >= 6:
-                # This looks like screenshot data without the proper prefix (probably due to message splitting)
-                # Try to process it as screenshot_with_state
+                self._handle_screenshot_data(message, request_id)
+            elif not self._framing_active() and "||" in message and len(message.split("||")) >= 6:
+                # Line protocol only: screenshot data that lost its prefix to message splitting.
+                # Framed messages always arrive whole, so there a malformed one is never guessed at.
                 logger.debug(f" Attempting to process orphaned screenshot data: {message}")
                 self._handle_screenshot_data("screenshot_with_state||" + message)
             else:
@@ -653,9 +634,23 @@ class AIGameService(threading.Thread):
             logger.error(f" Error processing mGBA message: {e}")
             self._send_chat_message("system", f"❌ Error processing message: {str(e)}")
     
-    def _handle_ready_message(self):
+    def _framing_active(self) -> bool:
+        """True once both sides switched to the framed protocol"""
+        return bool(self.connection and self.connection.framing_active)
+    
+    def _handle_ready_message(self, message: str = "ready||true"):
         """Handle 'ready' message from mGBA"""
         logger.info(" mGBA is ready for gameplay")
+        self.frame_transfer_mode = self._load_frame_transfer_mode()
+        
+        # Switch to the framed protocol if the Lua script advertises it
+        capabilities = message.split("||")
+        if self.connection and FRAMING_CAPABILITY in capabilities and not self.connection.framing_active:
+            self._enable_framing()
+        self.act_capture_supported = ACT_CAPTURE_CAPABILITY in capabilities
+        self.sequence_done_supported = SEQUENCE_DONE_CAPABILITY in capabilities
+        self.state_stream_supported = STATE_STREAM_CAPABILITY in capabilities
+        self._configure_screenshot_storage(capabilities)
         
         # Only detect and configure game on first connection
         if not self.game_config_sent:
@@ -665,17 +660,87 @@ class AIGameService(threading.Thread):
         else:
             self._send_chat_message("system", "✅ mGBA ready - resuming gameplay")
             # Only request screenshot if game config was already sent and loaded
+            self._subscribe_state_stream()
             self._request_screenshot()
     
+    def _enable_framing(self):
+        """Send a framed hello; both sides use framed messages from then on"""
+        try:
+            self.connection.write(encode_hello())
+            self.connection.framing_active = True
+            logger.info(" Using framed socket protocol")
+        except Exception as e:
+            logger.warning(f" Could not enable framed protocol, staying on text: {e}")
+    
+    def _send_to_mgba(self, text: str, request_id: int = 0):
+        """Queue a 'type||fields' or button command for mGBA; safe to call from any thread.
+        
+        All commands share the connection's outbound queue, so writes from the
+        PlayerAgent and service threads never interleave.
+        """
+        connection = self.connection
+        if connection is None:
+            raise ConnectionError("mGBA not connected")
+        connection.send_text(text, request_id)
+    
+    def get_request_metrics(self) -> Dict[str, Any]:
+        """In-flight screenshot requests, outcomes and round-trip latency"""
+        return self.pending_screenshots.get_metrics()
+    
+    def get_outbound_metrics(self) -> Dict[str, Any]:
+        """Outbound command queue depth and write latency for the active connection"""
+        connection = self.connection
+        if connection is None:
+            return {}
+        return connection.get_metrics()
+    
+    def _load_frame_transfer_mode(self) -> str:
+        """Read the configured frame transfer mode ('file' or 'socket')"""
+        config = self._load_config() or {}
+        transfer_mode = config.get('capture_system', {}).get('transfer_mode', TRANSFER_MODE_FILE)
+        if transfer_mode not in TRANSFER_MODES:
+            logger.warning(f" Unknown frame transfer mode '{transfer_mode}', using '{TRANSFER_MODE_FILE}'")
+            transfer_mode = TRANSFER_MODE_FILE
+        logger.info(f" Frame transfer mode: {transfer_mode}")
+        return transfer_mode
+    
     def _handle_config_loaded_message(self):
         """Handle confirmation that Lua script loaded the game config"""
         logger.info(" Game configuration loaded by mGBA")
         self._send_chat_message("system", "✅ Game configuration loaded successfully")
         
         # Now that config is confirmed loaded, we can safely request screenshots
+        self._subscribe_state_stream()
         self._request_screenshot()
         self.game_config_sent = True
     
+    def _subscribe_state_stream(self):
+        """Ask script.lua to push state deltas every state_stream_frames frames"""
+        if not self.state_stream_supported:
+            return
+        interval = self.timing_config['state_stream_frames']
+        try:
+            self._send_to_mgba(f"subscribe_state||{interval}")
+            logger.debug(f" Subscribed to game state stream every {interval} frames")
+        except Exception as e:
+            logger.warning(f" Could not subscribe to state stream: {e}")
+    
+    def _handle_state_delta(self, message: str):
+        """Handle 'st||frame||x=..||y=..||d=..||m=..' telemetry; only changed fields are sent"""
+        parts = message.split("||")
+        try:
+            frame = int(parts[1])
+            fields = dict(part.split("=", 1) for part in parts[2:] if part)
+            self.state_timeline.apply_delta(
+                frame,
+                x=int(fields['x']) if 'x' in fields else None,
+                y=int(fields['y']) if 'y' in fields else None,
+                direction=self._normalize_direction(fields['d']) if 'd' in fields else None,
+                map_id=int(fields['m']) if 'm' in fields else None
+            )
+        except (IndexError, ValueError) as e:
+            logger.warning(f" Invalid state telemetry '{message}': {e}")
+    
     def _handle_config_error_message(self, message: str):
         """Handle config error from Lua script"""
         error_msg = message.replace("config_error||", "") if "||" in message else "Unknown config error"
@@ -771,9 +836,7 @@ class AIGameService(threading.Thread):
             
             # Send config command to Lua
             config_message = f"game_config||{lua_config}"
-            self.client_socket.settimeout(5.0)
-            self.client_socket.send(f"{config_message}\n".encode('utf-8'))
-            self.client_socket.settimeout(0.1)
+            self._send_to_mgba(config_message)
             
             logger.debug(" Game configuration sent to mGBA")
             self._send_chat_message("system", "📤 Game configuration sent to mGBA")
@@ -784,7 +847,7 @@ class AIGameService(threading.Thread):
             self._send_chat_message("system", f"❌ Failed to send game config: {str(e)}")
             return False
     
-    def _handle_screenshot_data(self, message: str):
+    def _handle_screenshot_data(self, message: str, request_id: int = 0):
         """Handle screenshot data from mGBA and process through AI"""
         try:
             # Parse different message formats:
@@ -793,6 +856,12 @@ class AIGameService(threading.Thread):
             parts = message.split("||")
             
             # Validate message format (allow 5+ parts for controlled naming, 6+ for legacy)
+            # Match the reply to the request that asked for it
+            request_key, request_path = self._match_screenshot_request(request_id)
+            if request_id and request_key is None:
+                logger.warning(f" Ignoring late screenshot reply for request {request_id}")
+                return
+            
             if len(parts) < 5:
                 logger.warning(f" Invalid screenshot data format: {message}")
                 logger.debug(f" Expected 5+ parts, got {len(parts)}: {parts}")
@@ -813,9 +882,12 @@ class AIGameService(threading.Thread):
                     direction = parts[1]
                     x_str, y_str, map_id_str = parts[2], parts[3], parts[4]
                     
-                    if self.next_screenshot_path:
-                        screenshot_path = self.next_screenshot_path
+                    if request_path:
+                        screenshot_path = request_path
                         logger.debug(" Using controlled screenshot format (path managed by AI service)")
+                    elif self.next_screenshot_path:
+                        screenshot_path = self.next_screenshot_path
+                        logger.debug(" Using controlled screenshot format (last requested path)")
                     else:
                         # For testing or when next_screenshot_path not set, generate a default
                         screenshot_path = f"/tmp/test_screenshot_{int(time.time())}.png"
@@ -869,15 +941,7 @@ class AIGameService(threading.Thread):
                     logger.warning(f" Invalid enhanced_screenshot_with_state format: {len(parts)} parts")
                     return
             elif message_type == "screenshot_error":
-                # Handle screenshot creation errors from mGBA
-                error_message = parts[1] if len(parts) > 1 else "Unknown error"
-                logger.error(f" Screenshot error from mGBA: {error_message}")
-                self._send_chat_message("system", f"❌ Screenshot failed: {error_message}")
-                
-                # Reset screenshot path and request a new screenshot after delay
-                self.next_screenshot_path = None
-                time.sleep(2)  # Wait 2 seconds before retry
-                self._request_screenshot()
+                self._handle_screenshot_error(message, request_id)
                 return
             else:
                 logger.warning(f" Unknown message format: {message_type} with {len(parts)} parts")
@@ -913,6 +977,14 @@ class AIGameService(threading.Thread):
             
             logger.debug(f" Processing {message_type}: {screenshot_path}")
             logger.info(f" Game state: Position({x}, {y}), Direction={direction}, Map={map_id}")
+            
+            # mGBA only reports state once the screenshot is complete - wake any waiter now
+            self.frame_store.mark_ready(screenshot_path)
+            game_state["screen_type"] = get_screen_classifier().classify(screenshot_path).label
+            self._register_new_screenshot(screenshot_path, game_state)
+            self._prefetch_enhanced_image(screenshot_path)
+            if request_key is not None:
+                self.pending_screenshots.complete(request_key, game_state)
             self._process_ai_decision(screenshot_path, game_state)
             
         except Exception as e:
@@ -920,6 +992,103 @@ class AIGameService(threading.Thread):
             logger.debug(f" Raw message: {message}")
             self._send_chat_message("system", f"❌ Screenshot processing error: {str(e)}")
     
+    def get_screenshot_game_state(self, screenshot_path: str) -> Optional[Dict[str, Any]]:
+        """Game state mGBA reported with a screenshot (for PlayerAgent)"""
+        entry = self.frame_ring.get(screenshot_path)
+        return entry.game_state if entry is not None else None
+    
+    def get_latest_game_state(self) -> Optional[Dict[str, Any]]:
+        """Game state (including screen_type) of the most recent screenshot"""
+        entry = self.frame_ring.current()
+        if entry is None or entry.game_state is None:
+            return None
+        return {**entry.game_state, "screenshot": os.path.basename(entry.path)}
+    
+    def _prefetch_enhanced_image(self, screenshot_path: str):
+        """Enhance and encode a new screenshot in the background so the next LLM call finds it cached"""
+        # Before the first LLM call the provider isn't known yet - assume the default encoder
+        encoder = self.llm_client.image_encoder if self.llm_client is not None else None
+        get_enhanced_image_cache().prefetch(screenshot_path, encoder)
+    
+    def _match_screenshot_request(self, request_id: int) -> tuple:
+        """Return (request_id, path) of the pending request a reply belongs to, or (None, None).
+        
+        Framed replies carry their request's correlation id. Text-mode replies
+        have none, but mGBA answers in order, so they belong to the oldest request.
+        """
+        if request_id:
+            path = self.pending_screenshots.context(request_id)
+            return (request_id, path) if path is not None else (None, None)
+        
+        oldest = self.pending_screenshots.oldest()
+        return oldest if oldest is not None else (None, None)
+    
+    def _handle_screenshot_error(self, message: str, request_id: int = 0):
+        """Handle screenshot creation errors from mGBA"""
+        parts = message.split("||")
+        error_message = parts[1] if len(parts) > 1 else "Unknown error"
+        logger.error(f" Screenshot error from mGBA: {error_message}")
+        self._send_chat_message("system", f"❌ Screenshot failed: {error_message}")
+        
+        # Wake whoever is waiting on this screenshot, then request a new one after delay
+        request_key, _ = self._match_screenshot_request(request_id)
+        if request_key is not None:
+            self.pending_screenshots.fail(request_key, RuntimeError(error_message))
+        self.next_screenshot_path = None
+        self.io_loop.call_later(2.0, self._request_screenshot)  # Retry after 2 seconds without blocking the loop
+    
+    def _handle_sequence_done(self, message: str):
+        """Handle 'sequence_done||startFrame||endFrame||buttonCount' sent when the last button is released"""
+        parts = message.split("||")
+        try:
+            start_frame, end_frame, button_count = int(parts[1]), int(parts[2]), int(parts[3])
+        except (IndexError, ValueError):
+            logger.warning(f" Invalid sequence_done message: {message}")
+            return
+        
+        logger.debug(f" Button sequence done at frame {end_frame} ({button_count} buttons, {end_frame - start_frame} frames)")
+        self.pending_sequences.complete("sequence", {
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "button_count": button_count
+        })
+    
+    def _wait_for_sequence_done(self, actions: list, durations: list = None) -> bool:
+        """Block until mGBA reports the last sent sequence finished, then wait the settle frames.
+        
+        Returns False if the Lua script cannot report completion, so the caller
+        falls back to the timing_config multiplier delay.
+        """
+        future = self.sequence_future
+        if not self.sequence_done_supported or future is None:
+            return False
+        if self.io_loop.in_loop_thread():
+            # Only the IO loop completes the future, so waiting here would never return
+            logger.warning(" sequence_done wait requested on the IO loop thread - using the fallback delay")
+            return False
+        
+        _, _, durations_to_use = self._build_button_command(actions, durations)
+        timeout = self._sequence_frames(durations_to_use) / 60.0 + 5.0
+        try:
+            result = future.result(timeout=timeout)
+            logger.debug(f" Sequence finished after {result['end_frame'] - result['start_frame']} frames")
+        except FutureTimeoutError:
+            logger.warning(f" No sequence_done from mGBA within {timeout:.1f}s")
+            return True  # Already waited longer than any fallback delay
+        except CancelledError:
+            logger.warning(" Sequence wait cancelled")
+            return True
+        
+        # Frame-based settle budget for the game to react to the last button
+        time.sleep(self.timing_config['settle_frames'] / 60.0)
+        return True
+    
+    def _sequence_frames(self, durations: list) -> int:
+        """Frames mGBA needs to play a sequence: hold durations plus the separation between buttons"""
+        if not durations:
+            return 0
+        return sum(durations) + self.BUTTON_SEPARATION_FRAMES * (len(durations) - 1)
+    
     def _process_ai_decision(self, screenshot_path: str, game_state: Dict[str, Any]):
         """Process screenshot through AI and send commands back to mGBA"""
         try:
@@ -938,35 +1107,12 @@ class AIGameService(threading.Thread):
             self.player_direction = new_direction
             self.map_id = new_map_id
             
-            # Get the previous screenshot (most recent in map) BEFORE registering the new one
-            previous_path = None
-            logger.debug(f" Getting previous screenshot:")
-            logger.debug(f"   Map size: {len(self.screenshot_map)}")
-            
-            if len(self.screenshot_map) > 0:
-                # Get the most recent screenshot as "previous"
-                sorted_screenshots = sorted(
-                    self.screenshot_map.items(),
-                    key=lambda x: x[1], 
-                    reverse=True
-                )
-                previous_path = sorted_screenshots[0][0]
-                logger.debug(f"   Most recent screenshot (will be 'previous'): {os.path.basename(previous_path)}")
-                logger.debug(f"   Creation time: {sorted_screenshots[0][1]}")
-            else:
-                logger.debug(f"   No previous screenshots available")
-            
-            # Now register the new screenshot as "current" and get normalized path
-            current_path = self._register_new_screenshot(screenshot_path) or screenshot_path
-            
-            # Debug logging for screenshot map state
-            logger.debug(f" Screenshot Map Debug:")
-            logger.debug(f"   Total screenshots tracked: {len(self.screenshot_map)}")
-            for filename, creation_time in sorted(self.screenshot_map.items(), key=lambda x: x[1], reverse=True):
-                logger.debug(f"   {os.path.basename(filename)} → {creation_time}")
-            logger.debug(f"   Previous: {os.path.basename(previous_path) if previous_path else 'None'}")
-            logger.debug(f"   Current: {os.path.basename(current_path) if current_path else 'None'}")
-            logger.debug(f"   Same file? {previous_path == current_path}")
+            # The screenshot was registered when mGBA reported it; the entry before it is "previous"
+            current_path = screenshot_path
+            previous_entry = self.frame_ring.previous_of(current_path)
+            previous_path = previous_entry.path if previous_entry is not None else None
+            logger.debug(f" Previous: {os.path.basename(previous_path) if previous_path else 'None'}, "
+                         f"Current: {os.path.basename(current_path)} ({len(self.frame_ring)} screenshots tracked)")
             
             # Display screenshots being sent to AI
             if previous_path and current_path and previous_path != current_path:
@@ -1002,7 +1148,10 @@ class AIGameService(threading.Thread):
                 self.agent_coordinator.set_communication_interfaces(
                     chat_message_sender=self._send_chat_message,
                     screenshot_requester=self._request_screenshot_from_mgba,
-                    button_sender=self._send_button_sequence
+                    button_sender=self._send_button_sequence,
+                    action_capturer=self._act_then_capture_from_mgba,
+                    sequence_waiter=self._wait_for_sequence_done,
+                    state_reader=self.get_screenshot_game_state
                 )
                 
                 # Connect agent communication
@@ -1117,16 +1266,14 @@ class AIGameService(threading.Thread):
     def _send_single_screenshot_message(self, screenshot_path: str, game_state: Dict[str, Any]):
         """Send single screenshot message for initial cycle"""
         try:
-            if os.path.exists(screenshot_path):
-                with open(screenshot_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                
+            frame_id = self._publish_screenshot_for_chat(screenshot_path)
+            if frame_id:
                 position_text = f"📍 Position: ({game_state['position']['x']}, {game_state['position']['y']}) facing {game_state['direction']}"
                 
                 self.message_counter += 1
                 message = {
                     "type": "screenshot",
-                    "image_data": f"data:image/png;base64,{image_data}",
+                    "frame_id": frame_id,
                     "game_state": f"📤 Screenshot sent to AI for analysis... {position_text}",
                     "timestamp": datetime.now().isoformat(),
                     "id": self.message_counter
@@ -1142,24 +1289,16 @@ class AIGameService(threading.Thread):
     def _send_screenshot_comparison_message(self, previous_path: str, current_path: str, game_state: Dict[str, Any]):
         """Send screenshot comparison message for subsequent cycles"""
         try:
-            previous_image_data = ""
-            current_image_data = ""
-            
-            if os.path.exists(previous_path):
-                with open(previous_path, 'rb') as f:
-                    previous_image_data = base64.b64encode(f.read()).decode('utf-8')
-                    
-            if os.path.exists(current_path):
-                with open(current_path, 'rb') as f:
-                    current_image_data = base64.b64encode(f.read()).decode('utf-8')
+            previous_frame_id = self._publish_screenshot_for_chat(previous_path)
+            current_frame_id = self._publish_screenshot_for_chat(current_path)
             
             position_text = f"📍 Position: ({game_state['position']['x']}, {game_state['position']['y']}) facing {game_state['direction']}"
             
             self.message_counter += 1
             message = {
                 "type": "screenshot_comparison",
-                "previous_image_data": f"data:image/png;base64,{previous_image_data}",
-                "current_image_data": f"data:image/png;base64,{current_image_data}",
+                "previous_frame_id": previous_frame_id,
+                "current_frame_id": current_frame_id,
                 "game_state": f"📤 Previous and current screenshots sent to AI for analysis... {position_text}",
                 "timestamp": datetime.now().isoformat(),
                 "id": self.message_counter
@@ -1181,7 +1320,7 @@ class AIGameService(threading.Thread):
                 self.llm_client = LLMClient(config)
             
             # Call LLM with both screenshots if previous exists
-            if previous_screenshot and os.path.exists(previous_screenshot):
+            if previous_screenshot and frame_exists(previous_screenshot):
                 return self.llm_client.analyze_game_state_with_comparison(
                     current_screenshot=current_screenshot,
                     previous_screenshot=previous_screenshot,
@@ -1247,53 +1386,137 @@ class AIGameService(threading.Thread):
                 "error": str(e)
             }
     
-    def _request_screenshot(self):
-        """Request a screenshot from mGBA with controlled filename"""
+    def _next_request_id(self) -> int:
+        """Allocate a non-zero 32-bit correlation id (0 means 'no id' on the wire)"""
+        with self._request_lock:
+            self._last_request_id = self._last_request_id % 0xFFFFFFFF + 1
+            return self._last_request_id
+    
+    def _request_screenshot(self, button_command: str = None) -> int:
+        """Request a screenshot from mGBA with controlled filename; returns its request id (0 on failure).
+        
+        With a button_command ("codes|durations") the buttons are sent in the same
+        act_then_capture message and mGBA captures once the sequence has settled.
+        Several requests may be outstanding; each reply is matched by its id.
+        """
         if not self.mgba_connected or not self.client_socket:
             logger.warning(" Cannot request screenshot: mGBA not connected")
-            return False
+            return 0
         
         # Generate controlled filename
-        self.screenshot_counter += 1
-        filename = f"screenshot_ai_{self.screenshot_counter:06d}.png"
-        self.next_screenshot_path = str(self.screenshot_dir / filename)
+        request_id = self._next_request_id()
+        with self._request_lock:
+            self.screenshot_counter += 1
+            filename = f"screenshot_ai_{self.screenshot_counter:06d}.png"
+        screenshot_path = str(self.screenshot_dir / filename)
+        self.next_screenshot_path = screenshot_path
+        self.pending_screenshots.register(request_id, screenshot_path)
+        
+        # Send filename instruction to mGBA (in-band frame or PNG on disk)
+        if button_command is not None:
+            capture = "file" if self.frame_transfer_mode == TRANSFER_MODE_FILE else "frame"
+            message = f"act_then_capture||{filename}||{self.timing_config['settle_frames']}||{capture}||{button_command}"
+        elif self.frame_transfer_mode == TRANSFER_MODE_FILE:
+            message = f"request_screenshot_to||{filename}"
+        else:
+            message = f"request_frame_to||{filename}"
         
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                self.client_socket.settimeout(5.0)  # 5 second timeout
-                # Send filename instruction to mGBA
-                message = f"request_screenshot_to||{filename}\n"
-                self.client_socket.send(message.encode('utf-8'))
-                self.client_socket.settimeout(0.1)  # Reset timeout
-                logger.debug(f" Requested screenshot from mGBA: {filename}")
-                return True
-            except socket.timeout:
-                logger.warning(f" Screenshot request timeout (attempt {attempt + 1}/{max_retries})")
-            except Exception as e:
-                logger.error(f" Error requesting screenshot (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)  # Wait before retry
+        try:
+            # Queued on the connection; the event loop writes it without blocking
+            self._send_to_mgba(message, request_id)
+            logger.debug(f" Requested screenshot from mGBA: {filename} (request {request_id})")
+            return request_id
+        except Exception as e:
+            logger.error(f" Error requesting screenshot: {e}")
         
-        logger.error(" Failed to request screenshot after all retries")
+        self.pending_screenshots.fail(request_id, ConnectionError("Screenshot request not sent"))
         self._send_chat_message("system", "❌ Failed to request screenshot - connection may be lost")
-        return False
+        return 0
     
-    def _request_screenshot_from_mgba(self) -> str:
+    def _request_screenshot_from_mgba(self, timeout: float = 5.0, button_command: str = None) -> str:
         """Request screenshot from mGBA and return the path (for PlayerAgent)"""
-        if self._request_screenshot():
-            # Wait for screenshot to be available
-            max_wait_time = 5.0
-            start_time = time.time()
-            while time.time() - start_time < max_wait_time:
-                if self.next_screenshot_path and os.path.exists(self.next_screenshot_path):
-                    return self.next_screenshot_path
-                time.sleep(0.1)
-            
-            logger.warning(" Screenshot requested but file not found")
+        request_id = self._request_screenshot(button_command)
+        if request_id:
+            screenshot_path = self.pending_screenshots.context(request_id)
+            try:
+                # Woken by _handle_screenshot_data as soon as mGBA reports this request's screenshot
+                self.pending_screenshots.wait(request_id, timeout)
+                return screenshot_path
+            except TimeoutError:
+                logger.warning(f" Screenshot requested but not received within {timeout}s")
+            except CancelledError:
+                logger.warning(" Screenshot request cancelled")
+            except Exception as e:
+                logger.warning(f" Screenshot request failed: {e}")
         
         return ""  # Return empty string on failure
     
+    def _act_then_capture_from_mgba(self, actions: list, durations: list = None) -> Optional[str]:
+        """Press buttons and return the screenshot mGBA takes once they have settled (for PlayerAgent).
+        
+        Returns None without sending anything if the Lua script does not support
+        act_then_capture, so the caller can fall back to send/sleep/request.
+        """
+        if not self.act_capture_supported:
+            return None
+        
+        command, valid_actions, durations_to_use = self._build_button_command(actions, durations)
+        if command is None:
+            logger.info(" No valid actions - capturing without pressing buttons")
+            return self._request_screenshot_from_mgba()
+        
+        # Time mGBA needs to play the sequence and settle, plus the usual screenshot timeout
+        timeout = (self._sequence_frames(durations_to_use) + self.timing_config['settle_frames']) / 60.0 + 5.0
+        
+        screenshot_path = self._request_screenshot_from_mgba(timeout, button_command=command)
+        if screenshot_path:
+            self._send_chat_message("system", f"✅ Sequence sent: {self._describe_button_sequence(valid_actions, durations_to_use)}")
+        return screenshot_path
+    
+    def _build_button_command(self, actions: list, durations: list = None) -> tuple:
+        """Return ("codes|durations", valid_actions, durations) for mGBA, or (None, [], []) if nothing can be pressed"""
+        # Convert action names to button codes
+        button_map = {
+            "A": "0", "B": "1", "SELECT": "2", "START": "3",
+            "RIGHT": "4", "LEFT": "5", "UP": "6", "DOWN": "7", "R": "8", "L": "9"
+        }
+        
+        # Validate actions
+        valid_actions = [action for action in actions if action in button_map]
+        if not valid_actions:
+            return None, [], []
+        
+        # Process durations
+        if durations:
+            # Validate and limit durations (1-180 frames at 60fps = 1-3 seconds)
+            processed_durations = []
+            for i, duration in enumerate(durations):
+                if i < len(valid_actions):
+                    validated_duration = max(1, min(180, int(duration)))
+                    processed_durations.append(validated_duration)
+                
+            # Pad with default duration (2 frames) if needed
+            while len(processed_durations) < len(valid_actions):
+                processed_durations.append(2)
+                
+            durations_to_use = processed_durations[:len(valid_actions)]
+        else:
+            # Use default duration for all actions
+            durations_to_use = [2] * len(valid_actions)
+        
+        # Format command as "button_codes|durations" for Lua script
+        button_codes_str = ",".join(button_map[action] for action in valid_actions)
+        durations_str = ",".join(map(str, durations_to_use))
+        return f"{button_codes_str}|{durations_str}", valid_actions, durations_to_use
+    
+    def _describe_button_sequence(self, actions: list, durations: list) -> str:
+        """User-friendly 'A (33ms) → UP (100ms)' description for chat"""
+        action_descriptions = []
+        for action, duration_frames in zip(actions, durations):
+            duration_ms = round(duration_frames * 16.67)  # Convert frames to milliseconds
+            action_descriptions.append(f"{action} ({duration_ms}ms)")
+        return " → ".join(action_descriptions)
+    
     def _send_button_sequence(self, actions: list, durations: list = None):
         """Send button sequence to mGBA with optional custom durations"""
         if not self.mgba_connected or not self.client_socket:
@@ -1301,73 +1524,32 @@ class AIGameService(threading.Thread):
             self._send_chat_message("system", "⚠️ Cannot send sequence: mGBA not connected")
             return False
         
+        self.sequence_future = None
+        
         try:
-            # Convert action names to button codes
-            button_map = {
-                "A": "0", "B": "1", "SELECT": "2", "START": "3",
-                "RIGHT": "4", "LEFT": "5", "UP": "6", "DOWN": "7", "R": "8", "L": "9"
-            }
-            
             # Check for empty actions list (error condition - don't press anything)
             if not actions:
                 logger.info(" Empty actions list - not pressing any buttons (error occurred)")
                 self._send_chat_message("system", "🛑 No button actions sent due to error")
                 return True  # Return success without sending buttons
             
-            # Validate actions
-            valid_actions = [action for action in actions if action in button_map]
-            if not valid_actions:
+            command, valid_actions, durations_to_use = self._build_button_command(actions, durations)
+            if command is None:
                 logger.warning(f" No valid actions in: {actions}")
                 logger.info(" Not pressing any buttons due to invalid action list")
                 self._send_chat_message("system", "🛑 No valid button actions - skipping button press")
                 return True  # Return success without sending buttons
             
-            # Process durations
-            if durations:
-                # Validate and limit durations (1-180 frames at 60fps = 1-3 seconds)
-                processed_durations = []
-                for i, duration in enumerate(durations):
-                    if i < len(valid_actions):
-                        validated_duration = max(1, min(180, int(duration)))
-                        processed_durations.append(validated_duration)
-                    
-                # Pad with default duration (2 frames) if needed
-                while len(processed_durations) < len(valid_actions):
-                    processed_durations.append(2)
-                    
-                durations_to_use = processed_durations[:len(valid_actions)]
-            else:
-                # Use default duration for all actions
-                durations_to_use = [2] * len(valid_actions)
-            
-            # Create button codes and durations
-            button_codes = [button_map[action] for action in valid_actions]
-            
-            # Format command as "button_codes|durations" for Lua script
-            button_codes_str = ",".join(button_codes)
-            durations_str = ",".join(map(str, durations_to_use))
-            command = f"{button_codes_str}|{durations_str}"
-            
-            # Send with timeout protection
-            self.client_socket.settimeout(5.0)  # 5 second timeout
-            self.client_socket.send(f"{command}\n".encode('utf-8'))
-            self.client_socket.settimeout(0.1)  # Reset to original timeout
-            
-            # Create user-friendly message
-            action_descriptions = []
-            for i, action in enumerate(valid_actions):
-                duration_frames = durations_to_use[i]
-                duration_ms = round(duration_frames * 16.67)  # Convert frames to milliseconds
-                action_descriptions.append(f"{action} ({duration_ms}ms)")
-            
-            sequence_description = " → ".join(action_descriptions)
-            self._send_chat_message("system", f"✅ Sequence sent: {sequence_description}")
+            # Registered before sending so a fast sequence_done cannot be missed
+            if self.sequence_done_supported:
+                self.sequence_future = self.pending_sequences.register("sequence")
+            
+            # Queued on the connection; the event loop writes it without blocking
+            self._send_to_mgba(command)
+            
+            self._send_chat_message("system", f"✅ Sequence sent: {self._describe_button_sequence(valid_actions, durations_to_use)}")
             return True
             
-        except socket.timeout:
-            logger.error(" Button sequence timeout")
-            self._send_chat_message("system", "❌ Sequence sending timed out")
-            return False
         except Exception as e:
             logger.error(f" Error sending button sequence: {e}")
             self._send_chat_message("system", f"❌ Error sending sequence: {str(e)}")
@@ -1400,17 +1582,15 @@ class AIGameService(threading.Thread):
     def _send_screenshot_message(self, screenshot_path: str, game_state: Dict[str, Any]):
         """Send screenshot as a sent message in chat"""
         try:
-            # Read and encode screenshot
-            if os.path.exists(screenshot_path):
-                with open(screenshot_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                
+            # Publish screenshot; the message only carries its frame id
+            frame_id = self._publish_screenshot_for_chat(screenshot_path)
+            if frame_id:
                 position_text = f"📍 Position: ({game_state['position']['x']}, {game_state['position']['y']}) facing {game_state['direction']}"
                 
                 self.message_counter += 1
                 message = {
                     "type": "screenshot",
-                    "image_data": f"data:image/png;base64,{image_data}",
+                    "frame_id": frame_id,
                     "game_state": position_text,
                     "timestamp": datetime.now().isoformat(),
                     "id": self.message_counter  # Add unique ID for tracking
@@ -1658,8 +1838,7 @@ class AIGameService(threading.Thread):
         self._send_button_commands([fallback_action])
         
         # Request new screenshot after fallback action
-        time.sleep(2)
-        self._request_screenshot()
+        self.io_loop.call_later(2.0, self._request_screenshot)
     
     def _wait_and_collect_narration(self, wait_time: float):
         """Wait for specified time - narration now handled autonomously by NarrationAgent"""
@@ -1838,6 +2017,35 @@ class AIGameService(threading.Thread):
             recent_positions = [(p['x'], p['y'], p['map_id']) for p in self.position_history[-3:]]
             if len(set(recent_positions)) == 1:  # All recent positions are the same
                 logger.warning(f" Movement stuck detected at position ({x}, {y}) on map {map_id}")
+        
+        # Remember the telemetry window between this screenshot and the previous one
+        latest = self.state_timeline.current()
+        if latest is not None:
+            self._tracking_frames = (self._tracking_frames[1], latest.frame)
+    
+    def _get_timeline_analysis_lines(self) -> list:
+        """Movement, map transitions and idle time from the state stream since the previous screenshot"""
+        latest = self.state_timeline.current()
+        if latest is None:
+            return []
+        
+        since_frame, until_frame = self._tracking_frames
+        steps = [s for s in self.state_timeline.position_changes_since(since_frame) if s.frame <= until_frame]
+        lines = []
+        if steps:
+            path = " → ".join(f"({s.x}, {s.y})" for s in steps[-6:])
+            lines.append(f"👣 Moved {len(steps)} tiles during the last actions: {path}")
+        elif since_frame:
+            lines.append("👣 No tile movement during the last actions")
+        
+        for frame, from_map, to_map in self.state_timeline.map_transitions_since(since_frame):
+            if frame <= until_frame:
+                lines.append(f"🚪 Entered map {to_map} from map {from_map} at frame {frame}")
+        
+        stationary_seconds = self.state_timeline.frames_stationary() / 60.0
+        if stationary_seconds >= 10:
+            lines.append(f"⚠️ Position unchanged for {stationary_seconds:.0f}s of game time")
+        return lines
     
     def _get_movement_analysis_text(self) -> str:
         """Generate movement analysis text for LLM context"""
@@ -1872,6 +2080,9 @@ class AIGameService(threading.Thread):
                 analysis.append("- You successfully entered a new area!")
                 analysis.append("- Update your notepad with this new location")
         
+        # Frame-level movement between the last two screenshots (state stream)
+        analysis.extend(self._get_timeline_analysis_lines())
+        
         # Position trend analysis
         if len(self.position_history) >= 5:
             recent_x = [p['x'] for p in self.position_history[-5:]]
@@ -1893,37 +2104,30 @@ class AIGameService(threading.Thread):
     
     
     
-    def _encode_screenshot_for_chat(self, screenshot_path: str) -> str:
-        """Encode screenshot as base64 for chat display"""
-        try:
-            if os.path.exists(screenshot_path):
-                with open(screenshot_path, 'rb') as f:
-                    image_data = f.read()
-                    encoded = base64.b64encode(image_data).decode('utf-8')
-                    return f"data:image/png;base64,{encoded}"
-            else:
+    def _publish_screenshot_for_chat(self, screenshot_path: Optional[str]) -> Optional[str]:
+        """Publish screenshot to the frame asset store and return its frame id for chat display"""
+        if not frame_exists(screenshot_path):
+            if screenshot_path:
                 logger.warning(f" Screenshot file not found: {screenshot_path}")
-                return ""
-        except Exception as e:
-            logger.warning(f" Error encoding screenshot: {e}")
-            return ""
+            return None
+        entry = self.frame_ring.get(screenshot_path)
+        return self.frame_assets.publish(screenshot_path, entry.content_hash if entry else None)
     
     def _cleanup(self):
         """Clean up resources"""
         self.running = False
-        self.mgba_connected = False
         
-        if self.client_socket:
-            try:
-                self.client_socket.close()
-            except:
-                pass
+        if self.connection:
+            self.connection.close()
         
         if self.socket:
             try:
+                self.io_loop.remove_reader(self.socket)
                 self.socket.close()
             except:
                 pass
+        
+        self.io_loop.close()
 
 
 # Import service manager for backward compatibility
@@ -0,0 +1,197 @@
+"""
+Images for the before/after comparison prompt.
+
+Sending two full upscaled frames doubles the upload and image-token cost of
+every comparison call, although usually only a small part of the screen
+changed.  Each provider can choose (``providers.<name>.comparison_images``)
+how the pair is sent ('full' unless configured, so the prompt payload only
+changes when a provider opts in):
+
+    mode                 'full'     previous and current frame, both complete
+                         'roi'      full current frame plus a crop of the
+                                    previous frame around the changed tiles
+                         'stitched' one side-by-side image (previous | current)
+    outline              outline the changed tiles on the previous-frame crop
+                         (and on both halves of a stitched image)
+    margin_tiles         8x8 tiles of context kept around the changed region
+    max_region_fraction  'roi' sends both full frames when more than this
+                         fraction of the screen changed
+
+The changed region is the bounding box of the tiles FrameChangeDetector would
+count as changed.  If nothing changed the whole previous frame is sent, like
+'full'.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.logging_config import get_logger
+from .frame_change import frame_tile_means, TILE_SIZE, NUMPY_AVAILABLE
+from .frame_store import open_frame_image
+from .image_encoding import ImageEncoder, EncodedImage
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+try:
+    import PIL.Image
+    import PIL.ImageDraw
+except ImportError:
+    pass
+
+COMPARISON_FULL = 'full'
+COMPARISON_ROI = 'roi'
+COMPARISON_STITCHED = 'stitched'
+COMPARISON_MODES = (COMPARISON_FULL, COMPARISON_ROI, COMPARISON_STITCHED)
+
+DEFAULT_COMPARISON_IMAGES = {
+    'mode': COMPARISON_FULL,
+    'outline': True,
+    'margin_tiles': 1,
+    'max_region_fraction': 0.6,
+    'tile_tolerance': 8.0,
+}
+
+OUTLINE_COLOUR = (255, 0, 255)   # Magenta never appears in the game palettes
+STITCH_GAP = 4
+
+
+def change_region(previous_path: str, current_path: str,
+                  tile_tolerance: float = 8.0) -> Optional[Tuple[int, int, int, int]]:
+    """(left, top, right, bottom) native-pixel box around the changed tiles, None if nothing changed.
+
+    Frames of different sizes count as changed everywhere (box of the current frame).
+    """
+    previous = frame_tile_means(previous_path)
+    current = frame_tile_means(current_path)
+    rows, cols = current.shape[:2]
+    if previous.shape != current.shape:
+        return (0, 0, cols * TILE_SIZE, rows * TILE_SIZE)
+
+    changed = (np.abs(current - previous) > tile_tolerance).any(axis=2)
+    changed_rows = np.flatnonzero(changed.any(axis=1))
+    if not changed_rows.size:
+        return None
+    changed_cols = np.flatnonzero(changed.any(axis=0))
+    return (int(changed_cols[0]) * TILE_SIZE, int(changed_rows[0]) * TILE_SIZE,
+            (int(changed_cols[-1]) + 1) * TILE_SIZE, (int(changed_rows[-1]) + 1) * TILE_SIZE)
+
+
+class ComparisonImages:
+    """Encoded images for one comparison prompt and the text explaining them"""
+
+    __slots__ = ('mode', 'images', 'description', 'region')
+
+    def __init__(self, mode: str, images: List[EncodedImage], description: str,
+                 region: Optional[Tuple[int, int, int, int]] = None):
+        self.mode = mode
+        self.images = images
+        self.description = description
+        self.region = region
+
+
+class ComparisonImageBuilder:
+    """Build the comparison prompt's images for one provider's encoder and settings"""
+
+    def __init__(self, encoder: ImageEncoder, mode: str = COMPARISON_ROI, outline: bool = True,
+                 margin_tiles: int = 1, max_region_fraction: float = 0.6, tile_tolerance: float = 8.0):
+        if mode not in COMPARISON_MODES:
+            logger.warning(f" Unknown comparison image mode '{mode}', using '{COMPARISON_FULL}'")
+            mode = COMPARISON_FULL
+        self.encoder = encoder
+        self.mode = mode
+        self.outline = outline
+        self.margin_tiles = margin_tiles
+        self.max_region_fraction = max_region_fraction
+        self.tile_tolerance = tile_tolerance
+
+    @classmethod
+    def from_config(cls, encoder: ImageEncoder, settings: Optional[Dict[str, Any]] = None) -> 'ComparisonImageBuilder':
+        """Build from ``providers.<name>.comparison_images`` settings"""
+        merged = {**DEFAULT_COMPARISON_IMAGES, **(settings or {})}
+        return cls(encoder, **{name: merged[name] for name in DEFAULT_COMPARISON_IMAGES})
+
+    def build(self, previous_path: str, current_path: str, image_cache) -> ComparisonImages:
+        """Images for a previous/current pair, reusing enhanced frames from the EnhancedImageCache"""
+        if self.mode == COMPARISON_FULL or not NUMPY_AVAILABLE:
+            return self._full(previous_path, current_path, image_cache)
+
+        try:
+            region = change_region(previous_path, current_path, self.tile_tolerance)
+        except Exception as e:
+            logger.debug(f" Could not compute change region: {e}")
+            return self._full(previous_path, current_path, image_cache)
+
+        if self.mode == COMPARISON_STITCHED:
+            return self._stitched(previous_path, current_path, region, image_cache)
+        return self._roi(previous_path, current_path, region, image_cache)
+
+    def _full(self, previous_path: str, current_path: str, image_cache) -> ComparisonImages:
+        images = [image_cache.get_encoded(path, self.encoder) for path in (previous_path, current_path)]
+        description = """PREVIOUS SCREENSHOT (before your last actions):
+[Image 1 shows the game state before your previous button sequence]
+
+CURRENT SCREENSHOT (after your last actions):
+[Image 2 shows the game state after your previous button sequence]"""
+        return ComparisonImages(COMPARISON_FULL, images, description)
+
+    def _roi(self, previous_path: str, current_path: str, region, image_cache) -> ComparisonImages:
+        native = open_frame_image(current_path).size
+        if region is None or self._area_fraction(region, native) > self.max_region_fraction:
+            return self._full(previous_path, current_path, image_cache)
+
+        previous = image_cache.get_image(previous_path, self.encoder)
+        scale = previous.width / native[0]
+        crop_box = self._with_margin(region, native)
+        crop = previous.crop(tuple(int(value * scale) for value in crop_box))
+        if self.outline:
+            offset = (region[0] - crop_box[0], region[1] - crop_box[1], region[2] - crop_box[0], region[3] - crop_box[1])
+            self._draw_outline(crop, tuple(int(value * scale) for value in offset), scale)
+
+        images = [self.encoder.encode(crop), image_cache.get_encoded(current_path, self.encoder)]
+        left, top, right, bottom = crop_box
+        description = f"""PREVIOUS SCREENSHOT, CHANGED AREA ONLY (before your last actions):
+[Image 1 is a crop of the previous screenshot covering x {left}-{right}, y {top}-{bottom} of the {native[0]}x{native[1]} screen{', with the changed tiles outlined in magenta' if self.outline else ''}. Everything outside this area looked the same as in image 2]
+
+CURRENT SCREENSHOT (after your last actions):
+[Image 2 shows the full game state after your previous button sequence]"""
+        return ComparisonImages(COMPARISON_ROI, images, description, region)
+
+    def _stitched(self, previous_path: str, current_path: str, region, image_cache) -> ComparisonImages:
+        previous = image_cache.get_image(previous_path, self.encoder)
+        current = image_cache.get_image(current_path, self.encoder)
+        stitched = PIL.Image.new('RGB', (previous.width + STITCH_GAP + current.width,
+                                         max(previous.height, current.height)), (0, 0, 0))
+        stitched.paste(previous.convert('RGB'), (0, 0))
+        stitched.paste(current.convert('RGB'), (previous.width + STITCH_GAP, 0))
+        if self.outline and region is not None:
+            native_width = open_frame_image(current_path).size[0]
+            scale = current.width / native_width
+            box = tuple(int(value * scale) for value in region)
+            self._draw_outline(stitched, box, scale)
+            shift = previous.width + STITCH_GAP
+            self._draw_outline(stitched, (box[0] + shift, box[1], box[2] + shift, box[3]), scale)
+
+        description = """PREVIOUS AND CURRENT SCREENSHOTS, SIDE BY SIDE:
+[The left half shows the game state before your previous button sequence, the right half after it"""
+        description += ", with the area that changed outlined in magenta]" if self.outline and region is not None else "]"
+        return ComparisonImages(COMPARISON_STITCHED, [self.encoder.encode(stitched)], description, region)
+
+    def _with_margin(self, region, native) -> Tuple[int, int, int, int]:
+        margin = self.margin_tiles * TILE_SIZE
+        left, top, right, bottom = region
+        return (max(0, left - margin), max(0, top - margin), min(native[0], right + margin), min(native[1], bottom + margin))
+
+    @staticmethod
+    def _area_fraction(region, native) -> float:
+        left, top, right, bottom = region
+        return (right - left) * (bottom - top) / (native[0] * native[1])
+
+    @staticmethod
+    def _draw_outline(image, box, scale: float):
+        width = max(1, int(scale))
+        left, top, right, bottom = box
+        PIL.ImageDraw.Draw(image).rectangle((left, top, right - 1, bottom - 1), outline=OUTLINE_COLOUR, width=width)
@@ -0,0 +1,166 @@
+"""
+Cache of LLM decisions for screens and positions that recur exactly.
+
+Dialogue pages, the same menu screen or the same tile facing the same wall
+come back again and again, and each time cost a full LLM call that ends in
+the same button press.  PlayerAgent consults this cache before calling the
+LLM.  A decision is keyed on:
+
+- the perceptual hash of the screen (``frame_change.perceptual_hash``)
+- map id, x/y position and facing direction from RAM
+- the prompt template version, so editing the template starts over
+- a hash of the decision context (memory, recent actions, failed attempts),
+  so a decision is only replayed when everything the LLM saw is the same
+
+Responses whose tool calls had side effects (e.g. discovering an objective)
+are never cached, since a hit would skip them.  The cache is off by default.
+
+Entries expire after ``ttl_seconds`` and the least recently used ones are
+dropped beyond ``max_entries``.  A decision whose actions leave both the
+screen and the RAM state unchanged is invalidated, so the agent asks the
+LLM again instead of repeating a move that goes nowhere.
+
+Settings live in ``capture_system.decision_cache``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_DECISION_CACHE = {
+    'enabled': False,
+    'max_entries': 256,
+    'ttl_seconds': 300,
+}
+
+DecisionKey = Tuple[str, Any, Any, Any, Any, str, str]
+
+
+def decision_key(frame_hash: Optional[str], game_state: Dict[str, Any], template_version: str,
+                 context_hash: str = '') -> Optional[DecisionKey]:
+    """Cache key for a decision, None without a frame hash"""
+    if not frame_hash:
+        return None
+    position = game_state.get('position') or {}
+    map_id = game_state.get('map_id', position.get('map_id'))
+    return (frame_hash, map_id, position.get('x', game_state.get('x')), position.get('y', game_state.get('y')),
+            game_state.get('direction'), template_version, context_hash)
+
+
+class CachedDecision:
+    """A decision stored for reuse"""
+
+    __slots__ = ('response', 'tokens', 'created_at', 'hits')
+
+    def __init__(self, response: Dict[str, Any], tokens: int):
+        self.response = response
+        self.tokens = tokens
+        self.created_at = time.monotonic()
+        self.hits = 0
+
+
+class DecisionCache:
+    """Thread-safe LRU of decisions with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[DecisionKey, CachedDecision]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.tokens_saved = 0
+
+    def configure(self, settings: Optional[Dict[str, Any]]):
+        settings = {**DEFAULT_DECISION_CACHE, **(settings or {})}
+        with self._lock:
+            self.max_entries = settings['max_entries']
+            self.ttl_seconds = settings['ttl_seconds']
+            self._evict()
+
+    def get(self, key: Optional[DecisionKey]) -> Optional[Dict[str, Any]]:
+        """Cached response for ``key`` (a copy), or None on a miss or expired entry"""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            self.tokens_saved += entry.tokens
+            return dict(entry.response)
+
+    def put(self, key: Optional[DecisionKey], response: Dict[str, Any], tokens: int = 0):
+        """Store a decision; ``tokens`` is what the LLM call cost and what each hit saves"""
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = CachedDecision(dict(response), tokens)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, key: Optional[DecisionKey]) -> bool:
+        """Drop a decision that did not work; True if it was cached"""
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries (caller holds the lock)"""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'tokens_saved': self.tokens_saved,
+            }
+
+
+# Global decision cache instance
+_decision_cache = None
+
+
+def get_decision_cache() -> DecisionCache:
+    """Get the global decision cache instance"""
+    global _decision_cache
+    if _decision_cache is None:
+        _decision_cache = DecisionCache()
+    return _decision_cache
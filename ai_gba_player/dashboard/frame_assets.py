@@ -0,0 +1,196 @@
+"""
+Content-addressed screenshots for the dashboard chat.
+
+Chat messages used to embed every screenshot as a base64 data URL, so the
+500-message buffer held hundreds of PNGs and ``/api/chat-messages/`` sent all
+of them again on every poll.  Messages now carry only a frame id, the content
+hash of the frame (the same ``frame_content_key`` the image cache uses), and
+the browser loads the image from ``/api/frames/<id>/`` (or
+``/api/frames/<id>/thumbnail/``).
+
+Because a frame id names exactly one image, responses can be cached by the
+browser forever (``Cache-Control: immutable`` plus an ETag), and identical
+frames - the same screen sent twice, or the previous frame of one comparison
+being the current frame of the last - are stored and downloaded once.
+
+The store keeps the PNG bytes independently of the FrameRing, which deletes
+files and in-memory frames after ten screenshots, so older chat messages keep
+their images.  It is bounded by frame count and total bytes; thumbnails are
+made on first request and dropped with their frame.
+
+A frame evicted from the store is restored on request from the FrameRing or
+from the session archive being written, if either still has it.  Otherwise
+(very old messages, or after a server restart) ``/api/frames/<id>/`` answers
+404 and the chat shows a "Screenshot expired" placeholder instead.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.logging_config import get_logger
+from .frame_store import read_frame_bytes
+from .image_cache import frame_content_key
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+THUMBNAIL_WIDTH = 120   # Half a GBA screen
+
+
+class FrameAssetStore:
+    """Thread-safe LRU of frame id -> PNG bytes, bounded by frame count and total size"""
+
+    def __init__(self, max_frames: int = 600, max_bytes: int = 64 * 1024 * 1024,
+                 thumbnail_width: int = THUMBNAIL_WIDTH):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.thumbnail_width = thumbnail_width
+        self._frames = OrderedDict()
+        self._thumbnails = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.published = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        self.restored = 0
+
+    def publish(self, path: str, content_hash: Optional[str] = None) -> Optional[str]:
+        """Store a screenshot and return its frame id, None if it cannot be read.
+
+        ``content_hash`` skips rehashing when the caller already has the
+        frame's ``frame_content_key`` (e.g. from its FrameRing entry).
+        """
+        try:
+            frame_id = content_hash or frame_content_key(path)
+        except OSError as e:
+            logger.warning(f" Could not hash {path}: {e}")
+            return None
+
+        with self._lock:
+            self.published += 1
+            if frame_id in self._frames:
+                self._frames.move_to_end(frame_id)
+                self.deduplicated += 1
+                return frame_id
+
+        try:
+            data = read_frame_bytes(path)
+        except OSError as e:
+            logger.warning(f" Could not read {path}: {e}")
+            return None
+        self.put(frame_id, data)
+        return frame_id
+
+    def put(self, frame_id: str, data: bytes):
+        """Store PNG bytes under ``frame_id``"""
+        with self._lock:
+            if frame_id in self._frames:
+                self._frames.move_to_end(frame_id)
+                return
+            self._frames[frame_id] = data
+            self._bytes += len(data)
+            while len(self._frames) > 1 and (len(self._frames) > self.max_frames or self._bytes > self.max_bytes):
+                evicted_id, evicted = self._frames.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._thumbnails.pop(evicted_id, None)
+                self.evictions += 1
+
+    def get(self, frame_id: str) -> Optional[bytes]:
+        with self._lock:
+            return self._frames.get(frame_id)
+
+    def restore(self, frame_id: str) -> Optional[bytes]:
+        """Frame bytes from the store, or else from the FrameRing or an open session archive"""
+        data = self.get(frame_id)
+        if data is not None:
+            return data
+        from .frame_ring import get_frame_ring
+        from .session_archive import find_archived_frame
+
+        for entry in get_frame_ring().entries():
+            if entry.content_hash == frame_id:
+                try:
+                    data = read_frame_bytes(entry.path)
+                except OSError:
+                    continue
+                break
+        if data is None:
+            data = find_archived_frame(frame_id)
+        if data is None:
+            return None
+        with self._lock:
+            self.restored += 1
+        self.put(frame_id, data)
+        return data
+
+    def get_thumbnail(self, frame_id: str) -> Optional[bytes]:
+        """Downscaled PNG of a frame, made on first request"""
+        with self._lock:
+            thumbnail = self._thumbnails.get(frame_id)
+        if thumbnail is not None:
+            return thumbnail
+        data = self.restore(frame_id)
+        if data is None:
+            return None
+        if not PIL_AVAILABLE:
+            return data
+
+        image = Image.open(io.BytesIO(data))
+        if image.width > self.thumbnail_width:
+            height = max(1, round(image.height * self.thumbnail_width / image.width))
+            image = image.resize((self.thumbnail_width, height), Image.NEAREST)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=True)
+        thumbnail = buffer.getvalue()
+
+        with self._lock:
+            if frame_id in self._frames:
+                self._thumbnails[frame_id] = thumbnail
+        return thumbnail
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._thumbnails.clear()
+            self._bytes = 0
+
+    def __contains__(self, frame_id: str) -> bool:
+        with self._lock:
+            return frame_id in self._frames
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'frames': len(self._frames),
+                'bytes': self._bytes,
+                'thumbnails': len(self._thumbnails),
+                'published': self.published,
+                'deduplicated': self.deduplicated,
+                'evictions': self.evictions,
+                'restored': self.restored,
+            }
+
+
+# Global frame asset store shared by AIGameService and the dashboard views
+_frame_asset_store = None
+
+
+def get_frame_asset_store() -> FrameAssetStore:
+    """Get the global frame asset store instance"""
+    global _frame_asset_store
+    if _frame_asset_store is None:
+        _frame_asset_store = FrameAssetStore()
+    return _frame_asset_store
@@ -0,0 +1,167 @@
+"""
+Cheap perceptual change detection between consecutive screenshots.
+
+Each frame is reduced to the mean colour of every 8x8 tile (the GBA's own tile
+size, so 30x20 tiles for a 240x160 screen).  Two frames differ in a tile when
+any channel's mean moves by more than ``tile_tolerance``; the frame counts as
+changed when more than ``change_threshold`` of its tiles differ (by default,
+any tile at all).  This ignores PNG re-encoding noise but catches a sprite
+taking a step, a menu cursor moving or a text box advancing, and costs well
+under a millisecond per frame.
+
+PlayerAgent registers every screenshot here and uses the result to decide
+whether a two-image comparison prompt is worth sending.  ``perceptual_hash``
+turns the same tile means into a key for recurring screens.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.logging_config import get_logger
+from .frame_store import get_frame_store, open_frame_image
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+TILE_SIZE = 8
+
+UNCHANGED_POLICY_SINGLE_IMAGE = 'single_image'
+UNCHANGED_POLICY_SKIP = 'skip'
+UNCHANGED_POLICIES = (UNCHANGED_POLICY_SINGLE_IMAGE, UNCHANGED_POLICY_SKIP)
+
+DEFAULT_FRAME_CHANGE_DETECTION = {
+    'enabled': True,
+    'tile_tolerance': 8.0,       # Max per-channel mean difference for a tile to count as unchanged
+    'change_threshold': 0.0,     # Fraction of tiles that may differ with the frame still counting as unchanged
+    'unchanged_policy': UNCHANGED_POLICY_SINGLE_IMAGE,  # When screen and RAM state are both unchanged
+    'max_skipped_cycles': 3,     # 'skip' policy: LLM calls skipped in a row before deciding anyway
+}
+
+
+def frame_tile_means(path: str):
+    """(rows, cols, 3) float32 array of per-tile mean colours, preferring the in-memory frame"""
+    frame = get_frame_store().get_frame(path)
+    if frame is not None and frame.pixel_format == 'rgb24':
+        pixels = np.frombuffer(frame.pixels, dtype=np.uint8).reshape(frame.height, frame.width, 3)
+    else:
+        pixels = np.asarray(open_frame_image(path).convert('RGB'), dtype=np.uint8)
+
+    rows, cols = pixels.shape[0] // TILE_SIZE, pixels.shape[1] // TILE_SIZE
+    tiles = pixels[:rows * TILE_SIZE, :cols * TILE_SIZE].reshape(rows, TILE_SIZE, cols, TILE_SIZE, 3)
+    return tiles.mean(axis=(1, 3), dtype=np.float32)
+
+
+def perceptual_hash(path: str, levels: int = 16) -> Optional[str]:
+    """Hash of the tile means quantized to ``levels`` steps: equal for screens that look the same"""
+    if not NUMPY_AVAILABLE:
+        return None
+    try:
+        means = frame_tile_means(path)
+    except Exception as e:
+        logger.debug(f" Could not compute perceptual hash for {os.path.basename(path)}: {e}")
+        return None
+    quantized = (means // (256 / levels)).astype(np.uint8)
+    return hashlib.blake2b(quantized.tobytes(), digest_size=16).hexdigest()
+
+
+def changed_region(differs) -> Optional[Tuple[int, int, int, int]]:
+    """Pixel bounding box (left, top, right, bottom) of the True tiles in a tile grid, None if there are none"""
+    tile_rows, tile_cols = np.nonzero(differs)
+    if not len(tile_rows):
+        return None
+    return (int(tile_cols.min()) * TILE_SIZE, int(tile_rows.min()) * TILE_SIZE,
+            (int(tile_cols.max()) + 1) * TILE_SIZE, (int(tile_rows.max()) + 1) * TILE_SIZE)
+
+
+class FrameChange:
+    """How much a frame differs from the one registered before it"""
+
+    __slots__ = ('changed_tiles', 'total_tiles', 'change_threshold', 'region')
+
+    def __init__(self, changed_tiles: int, total_tiles: int, change_threshold: float,
+                 region: Optional[Tuple[int, int, int, int]] = None):
+        self.changed_tiles = changed_tiles
+        self.total_tiles = total_tiles
+        self.change_threshold = change_threshold
+        self.region = region  # (left, top, right, bottom) pixel box of the changed tiles, None if none changed
+
+    @property
+    def changed_fraction(self) -> float:
+        return self.changed_tiles / self.total_tiles if self.total_tiles else 1.0
+
+    @property
+    def changed(self) -> bool:
+        return self.changed_fraction > self.change_threshold
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'changed': self.changed,
+            'changed_tiles': self.changed_tiles,
+            'total_tiles': self.total_tiles,
+            'changed_fraction': round(self.changed_fraction, 4),
+            'region': list(self.region) if self.region else None,
+        }
+
+
+class FrameChangeDetector:
+    """Tile-mean signatures of recent screenshots and the change signal for each"""
+
+    def __init__(self, tile_tolerance: float = 8.0, change_threshold: float = 0.0, max_frames: int = 10):
+        self.tile_tolerance = tile_tolerance
+        self.change_threshold = change_threshold
+        self.max_frames = max_frames
+        self._changes = OrderedDict()  # path -> FrameChange (None for the first frame)
+        self._last_signature = None
+        self._lock = threading.Lock()
+
+    def register(self, path: str) -> Optional[FrameChange]:
+        """Compare a new screenshot with the previously registered one and record the result"""
+        if not NUMPY_AVAILABLE:
+            return None
+        try:
+            signature = frame_tile_means(path)
+        except Exception as e:
+            logger.debug(f" Could not compute frame signature for {os.path.basename(path)}: {e}")
+            return None
+
+        with self._lock:
+            previous = self._last_signature
+            self._last_signature = signature
+            change = None
+            if previous is not None:
+                rows, cols = signature.shape[:2]
+                if previous.shape != signature.shape:
+                    change = FrameChange(rows * cols, rows * cols, self.change_threshold,
+                                         (0, 0, cols * TILE_SIZE, rows * TILE_SIZE))
+                else:
+                    differs = (np.abs(signature - previous) > self.tile_tolerance).any(axis=2)
+                    change = FrameChange(int(differs.sum()), differs.size, self.change_threshold,
+                                         changed_region(differs))
+            self._changes[path] = change
+            self._changes.move_to_end(path)
+            while len(self._changes) > self.max_frames:
+                self._changes.popitem(last=False)
+        return change
+
+    def get(self, path: str) -> Optional[FrameChange]:
+        """Change signal of a registered frame, or None if unknown"""
+        with self._lock:
+            return self._changes.get(path)
+
+    def is_unchanged(self, path: str) -> bool:
+        """True only when the frame is known to match the previous one"""
+        change = self.get(path)
+        return change is not None and not change.changed
+
+    def reset(self):
+        with self._lock:
+            self._changes.clear()
+            self._last_signature = None
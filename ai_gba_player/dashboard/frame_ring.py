@@ -0,0 +1,209 @@
+"""
+Ring buffer of the most recent screenshots.
+
+AIGameService and PlayerAgent both need "the current screenshot", "the one
+before it" and the game state that came with each.  Instead of each keeping a
+dict of path -> counter and sorting or scanning it on every decision, both
+share one fixed-size ring indexed by registration sequence:
+
+- current, previous and N-back entries are a single slot lookup
+- lookup by path goes through a path -> sequence index
+- each entry carries the path, the in-memory frame (if the frame was streamed
+  over the socket), the game state mGBA reported with it, a content hash, the
+  screen classifier's label and the FrameChange against the previous frame
+
+When an entry is overwritten its frame is dropped from the FrameStore and its
+file is deleted on a background thread, so eviction never blocks the decision
+path on disk I/O.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from core.logging_config import get_logger
+from .frame_store import get_frame_store, StoredFrame
+from .frame_change import FrameChange
+
+logger = get_logger(__name__)
+
+
+class FrameEntry:
+    """One registered screenshot and what is known about it"""
+
+    __slots__ = ('sequence', 'path', 'frame', 'game_state', 'content_hash', 'screen_type', 'change', 'registered_at')
+
+    def __init__(self, sequence: int, path: str, frame: Optional[StoredFrame] = None,
+                 game_state: Optional[Dict[str, Any]] = None, content_hash: Optional[str] = None,
+                 screen_type: Optional[str] = None, change: Optional[FrameChange] = None):
+        self.sequence = sequence
+        self.path = path
+        self.frame = frame
+        self.game_state = game_state
+        self.content_hash = content_hash
+        self.screen_type = screen_type
+        self.change = change
+        self.registered_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sequence': self.sequence,
+            'screenshot': os.path.basename(self.path),
+            'in_memory': self.frame is not None,
+            'game_state': self.game_state,
+            'content_hash': self.content_hash,
+            'screen_type': self.screen_type,
+            'change': self.change.to_dict() if self.change else None,
+        }
+
+
+class FrameRing:
+    """Thread-safe fixed-size ring of FrameEntry with O(1) access by age or path"""
+
+    def __init__(self, capacity: int = 10, delete_evicted_files: bool = True):
+        self.capacity = capacity
+        self.delete_evicted_files = delete_evicted_files
+        self._slots: List[Optional[FrameEntry]] = [None] * capacity
+        self._index: Dict[str, int] = {}  # path -> sequence
+        self._next_sequence = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+        # Metrics
+        self.evictions = 0
+        self.deleted_files = 0
+
+    def push(self, path: str, game_state: Optional[Dict[str, Any]] = None, content_hash: Optional[str] = None,
+             screen_type: Optional[str] = None, change: Optional[FrameChange] = None) -> FrameEntry:
+        """Register a screenshot as the newest entry.
+
+        Registering a path that is already in the ring only fills in the given
+        fields, so the service and PlayerAgent can both register the same frame.
+        """
+        with self._lock:
+            sequence = self._index.get(path)
+            if sequence is not None:
+                entry = self._slots[sequence % self.capacity]
+                if game_state is not None:
+                    entry.game_state = game_state
+                if content_hash is not None:
+                    entry.content_hash = content_hash
+                if screen_type is not None:
+                    entry.screen_type = screen_type
+                if change is not None:
+                    entry.change = change
+                return entry
+
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            slot = sequence % self.capacity
+            evicted = self._slots[slot]
+            if evicted is not None:
+                del self._index[evicted.path]
+                self.evictions += 1
+            entry = FrameEntry(sequence, path, get_frame_store().get_frame(path), game_state, content_hash, screen_type,
+                               change)
+            self._slots[slot] = entry
+            self._index[path] = sequence
+
+        if evicted is not None:
+            self._evict(evicted)
+        return entry
+
+    def get(self, path: str) -> Optional[FrameEntry]:
+        with self._lock:
+            sequence = self._index.get(path)
+            return None if sequence is None else self._slots[sequence % self.capacity]
+
+    def back(self, n: int) -> Optional[FrameEntry]:
+        """Entry registered ``n`` screenshots ago (0 = current), if still in the ring"""
+        with self._lock:
+            return self._entry(self._next_sequence - 1 - n)
+
+    def current(self) -> Optional[FrameEntry]:
+        return self.back(0)
+
+    def previous(self) -> Optional[FrameEntry]:
+        return self.back(1)
+
+    def previous_of(self, path: str) -> Optional[FrameEntry]:
+        """Entry registered just before ``path``, if both are in the ring"""
+        with self._lock:
+            sequence = self._index.get(path)
+            return None if sequence is None else self._entry(sequence - 1)
+
+    def entries(self) -> List[FrameEntry]:
+        """All entries, newest first"""
+        with self._lock:
+            return [entry for entry in (self._entry(self._next_sequence - 1 - n) for n in range(self.capacity))
+                    if entry is not None]
+
+    def _entry(self, sequence: int) -> Optional[FrameEntry]:
+        if sequence < 0 or sequence >= self._next_sequence or sequence < self._next_sequence - self.capacity:
+            return None
+        return self._slots[sequence % self.capacity]
+
+    def _evict(self, entry: FrameEntry):
+        get_frame_store().remove_frame(entry.path)
+        if not self.delete_evicted_files:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FrameCleanup")
+            executor = self._executor
+        executor.submit(self._delete_file, entry.path)
+
+    def _delete_file(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return  # Socket-mode frames never touch the disk
+        except OSError as e:
+            logger.warning(f" Error removing {path}: {e}")
+            return
+        with self._lock:
+            self.deleted_files += 1
+        logger.debug(f" Removed old screenshot: {os.path.basename(path)}")
+
+    def flush(self, timeout: float = 5.0):
+        """Wait for pending file deletions (for shutdown and tests)"""
+        with self._lock:
+            executor = self._executor
+        if executor is not None:
+            future: Future = executor.submit(lambda: None)
+            future.result(timeout=timeout)
+
+    def clear(self):
+        """Forget all entries without deleting their files"""
+        with self._lock:
+            self._slots = [None] * self.capacity
+            self._index.clear()
+            self._next_sequence = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'capacity': self.capacity,
+                'registered': self._next_sequence,
+                'evictions': self.evictions,
+                'deleted_files': self.deleted_files,
+            }
+
+
+# Global frame ring shared by AIGameService and PlayerAgent
+_frame_ring = None
+
+
+def get_frame_ring() -> FrameRing:
+    """Get the global frame ring instance"""
+    global _frame_ring
+    if _frame_ring is None:
+        _frame_ring = FrameRing()
+    return _frame_ring
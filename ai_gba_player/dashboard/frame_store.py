@@ -0,0 +1,160 @@
+"""
+In-memory frame store for screenshots streamed over the mGBA socket.
+
+When ``capture_system.transfer_mode`` is ``'socket'`` the Lua script sends the
+raw framebuffer over port 8888 instead of writing a PNG to disk.  Frames are
+kept here keyed by the same controlled path the file-based protocol uses, so
+the rest of the pipeline (LLMClient, PlayerAgent, chat messages) can keep
+passing screenshot paths around and transparently read from memory first and
+fall back to disk.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+from core.logging_config import get_logger
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+TRANSFER_MODE_FILE = 'file'
+TRANSFER_MODE_SOCKET = 'socket'
+TRANSFER_MODES = (TRANSFER_MODE_FILE, TRANSFER_MODE_SOCKET)
+
+# Pixel formats the Lua script can send, mapped to the PIL mode and bytes per pixel
+PIXEL_FORMATS = {
+    'rgb24': ('RGB', 3),
+}
+
+
+class StoredFrame:
+    """A single raw frame received from mGBA"""
+
+    __slots__ = ('width', 'height', 'pixel_format', 'pixels', '_png_bytes')
+
+    def __init__(self, width: int, height: int, pixel_format: str, pixels: bytes):
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.pixels = pixels
+        self._png_bytes = None
+
+    def to_image(self):
+        """Build a PIL image from the raw pixel buffer"""
+        mode, _ = PIXEL_FORMATS[self.pixel_format]
+        return Image.frombytes(mode, (self.width, self.height), self.pixels)
+
+    def to_png_bytes(self) -> bytes:
+        """PNG-encode the frame once and cache the result"""
+        if self._png_bytes is None:
+            buffer = io.BytesIO()
+            self.to_image().save(buffer, format='PNG')
+            self._png_bytes = buffer.getvalue()
+        return self._png_bytes
+
+
+class FrameStore:
+    """Thread-safe, bounded store of frames keyed by controlled screenshot path"""
+
+    def __init__(self, max_frames: int = 10):
+        self.max_frames = max_frames
+        self._frames = OrderedDict()
+        self._ready_paths = deque(maxlen=max_frames)  # On-disk screenshots mGBA confirmed as complete
+        self._lock = threading.Lock()
+
+    def put_frame(self, key: str, width: int, height: int, pixels: bytes,
+                  pixel_format: str = 'rgb24') -> StoredFrame:
+        """Store a raw frame, evicting the oldest frames beyond ``max_frames``"""
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pixel_format}")
+
+        _, bytes_per_pixel = PIXEL_FORMATS[pixel_format]
+        expected_size = width * height * bytes_per_pixel
+        if len(pixels) != expected_size:
+            raise ValueError(f"Frame size mismatch: got {len(pixels)} bytes, expected {expected_size}")
+
+        frame = StoredFrame(width, height, pixel_format, bytes(pixels))
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                evicted_key, _ = self._frames.popitem(last=False)
+                logger.debug(f" Evicted frame from memory: {os.path.basename(evicted_key)}")
+        return frame
+
+    def get_frame(self, key: str) -> Optional[StoredFrame]:
+        with self._lock:
+            return self._frames.get(key)
+
+    def has_frame(self, key: str) -> bool:
+        with self._lock:
+            return key in self._frames
+
+    def mark_ready(self, key: str):
+        """Record that mGBA reported this screenshot as fully written"""
+        with self._lock:
+            if key not in self._ready_paths:
+                self._ready_paths.append(key)
+
+    def is_ready(self, key: str) -> bool:
+        """True if the frame is in memory or mGBA confirmed the file on disk"""
+        with self._lock:
+            return key in self._frames or key in self._ready_paths
+
+    def remove_frame(self, key: str):
+        with self._lock:
+            self._frames.pop(key, None)
+            if key in self._ready_paths:
+                self._ready_paths.remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._ready_paths.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._frames)
+
+
+# Global frame store instance
+_frame_store = None
+
+
+def get_frame_store() -> FrameStore:
+    """Get the global frame store instance"""
+    global _frame_store
+    if _frame_store is None:
+        _frame_store = FrameStore()
+    return _frame_store
+
+
+def frame_exists(path: str) -> bool:
+    """Check whether a screenshot is available in memory or on disk"""
+    if not path:
+        return False
+    return get_frame_store().has_frame(path) or os.path.exists(path)
+
+
+def open_frame_image(path: str):
+    """Open a screenshot as a PIL image, preferring the in-memory frame"""
+    frame = get_frame_store().get_frame(path)
+    if frame is not None:
+        return frame.to_image()
+    return Image.open(path)
+
+
+def read_frame_bytes(path: str) -> bytes:
+    """Read a screenshot as PNG bytes, preferring the in-memory frame"""
+    frame = get_frame_store().get_frame(path)
+    if frame is not None:
+        return frame.to_png_bytes()
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,174 @@
+"""
+Cache of enhanced, encoded screenshots sent to vision models.
+
+Before a screenshot goes to an LLM it is upscaled and contrast/colour boosted
+(see image_enhancement), then encoded per provider (see image_encoding).  The
+comparison prompt sends both the previous and the current screenshot, and the
+previous one was already enhanced and encoded on the cycle before, so the
+result is kept here keyed by a hash of the frame content and the encoder
+settings.  Frames can also be enhanced eagerly on a background thread as soon
+as mGBA reports them, so the decision cycle usually finds both images ready.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+from core.logging_config import get_logger
+from .frame_store import get_frame_store, open_frame_image
+from .image_enhancement import get_frame_enhancer, PIL_AVAILABLE
+from .image_encoding import ImageEncoder, EncodedImage
+
+logger = get_logger(__name__)
+
+
+def enhance_for_llm(image_path: str, native: bool = False):
+    """Enhance a screenshot for better AI vision with the configured frame enhancer"""
+    try:
+        return get_frame_enhancer(native)(open_frame_image(image_path))
+    except Exception as e:
+        logger.warning(f" Image enhancement failed: {e}")
+        # Return original image if enhancement fails
+        return open_frame_image(image_path)
+
+
+def frame_content_key(path: str) -> str:
+    """Hash of a screenshot's content, preferring the in-memory frame over the file"""
+    frame = get_frame_store().get_frame(path)
+    digest = hashlib.blake2b(digest_size=16)
+    if frame is not None:
+        digest.update(f"{frame.width}x{frame.height}:{frame.pixel_format}:".encode('ascii'))
+        digest.update(frame.pixels)
+    else:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class EnhancedImageCache:
+    """Thread-safe LRU of (content hash, encoder settings) -> EncodedImage"""
+
+    def __init__(self, max_entries: int = 8, enhancer: Callable = enhance_for_llm):
+        self.max_entries = max_entries
+        self.enhancer = enhancer
+        self.default_encoder = ImageEncoder()
+        self._entries = OrderedDict()
+        self._images = OrderedDict()  # (content hash, native, enhance) -> enhanced PIL image, for crops
+        self._in_flight = {}  # content hash -> Future, so a prefetch and a caller never enhance twice
+        self._lock = threading.Lock()
+        self._executor = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.enhancements = 0
+
+    def get_encoded(self, path: str, encoder: Optional[ImageEncoder] = None) -> EncodedImage:
+        """Enhanced, encoded screenshot, enhancing it only if not cached for this encoder"""
+        encoder = encoder or self.default_encoder
+        key = (frame_content_key(path), encoder.cache_key)
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            image = self.get_image(path, encoder)
+            encoded = encoder.encode(image)
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = encoded
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._in_flight.pop(key, None)
+        future.set_result(encoded)
+        return encoded
+
+    def get_image(self, path: str, encoder: Optional[ImageEncoder] = None):
+        """Enhanced (unencoded) image as the encoder would see it; callers must not modify it"""
+        encoder = encoder or self.default_encoder
+        key = (frame_content_key(path), encoder.native, encoder.enhance)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+
+        image = self.enhancer(path, native=encoder.native) if encoder.enhance else open_frame_image(path)
+        with self._lock:
+            if encoder.enhance:
+                self.enhancements += 1
+            self._images[key] = image
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return image
+
+    def get_png(self, path: str) -> bytes:
+        """Enhanced PNG bytes at the enhancement scale"""
+        return self.get_encoded(path).data
+
+    def prefetch(self, path: str, encoder: Optional[ImageEncoder] = None) -> Optional[Future]:
+        """Enhance and encode a newly registered screenshot in the background"""
+        if not PIL_AVAILABLE:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ImageEnhance")
+            executor = self._executor
+        return executor.submit(self._prefetch, path, encoder)
+
+    def _prefetch(self, path: str, encoder: Optional[ImageEncoder]):
+        try:
+            self.get_encoded(path, encoder)
+        except Exception as e:
+            logger.debug(f" Eager enhancement failed for {path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._images.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'enhancements': self.enhancements,
+            }
+
+
+# Global enhanced image cache instance
+_enhanced_image_cache = None
+
+
+def get_enhanced_image_cache() -> EnhancedImageCache:
+    """Get the global enhanced image cache instance"""
+    global _enhanced_image_cache
+    if _enhanced_image_cache is None:
+        _enhanced_image_cache = EnhancedImageCache()
+    return _enhanced_image_cache
@@ -0,0 +1,198 @@
+"""
+Encoder stage for screenshots sent to LLM providers.
+
+Each provider can be configured (``providers.<name>.image_encoding``) to trade
+fidelity for upload size and image-token spend:
+
+    format            'png', 'webp' or 'jpeg'
+    resolution        'upscaled' (enhancement scale factor) or 'native' (240x160)
+    enhance           apply frame enhancement (contrast/saturation/brightness)
+    palette_colors    quantize PNGs to N colours (0 = full colour); GBA frames
+                      rarely use more than 256, so 256 is usually lossless
+    quality           JPEG/WebP quality (WebP 100 = lossless)
+    max_bytes         byte budget per image
+    max_image_tokens  image-token budget per image
+
+When an encoded image is over budget the encoder steps down: token budgets
+reduce the resolution by integer factors, byte budgets lower the quality
+(JPEG/WebP) or quantize to a palette (PNG).
+"""
+
+import base64
+import io
+import math
+import time
+from typing import Any, Dict, Optional
+
+from core.logging_config import get_logger
+logger = get_logger(__name__)
+
+try:
+    import PIL.Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+RESOLUTION_UPSCALED = 'upscaled'
+RESOLUTION_NATIVE = 'native'
+
+DEFAULT_IMAGE_ENCODING = {
+    'format': 'png',
+    'resolution': RESOLUTION_UPSCALED,
+    'enhance': True,
+    'palette_colors': 0,
+    'quality': 85,
+    'max_bytes': None,
+    'max_image_tokens': None,
+}
+
+# Per-provider defaults preserve what each provider was sent before the encoder stage
+PROVIDER_IMAGE_ENCODING_DEFAULTS = {
+    'google': {},
+    'openai': {'resolution': RESOLUTION_NATIVE, 'enhance': False},
+    'anthropic': {},
+}
+
+MIN_QUALITY = 40
+QUALITY_STEP = 15
+BUDGET_PALETTES = (256, 64)
+
+
+def estimate_image_tokens(provider: str, width: int, height: int) -> int:
+    """Approximate image-token cost of one image for a provider"""
+    if provider == 'openai':
+        # High detail: fit in 2048x2048, shortest side at most 768, then 512px tiles
+        if max(width, height) > 2048:
+            scale = 2048 / max(width, height)
+            width, height = width * scale, height * scale
+        if min(width, height) > 768:
+            scale = 768 / min(width, height)
+            width, height = width * scale, height * scale
+        tiles = math.ceil(width / 512) * math.ceil(height / 512)
+        return 85 + 170 * tiles
+    if provider == 'anthropic':
+        return math.ceil(width * height / 750)
+    # Gemini: small images are a flat 258 tokens, larger ones are tiled at 768x768
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+class EncodedImage:
+    """Encoded image bytes ready to attach to an LLM request"""
+
+    __slots__ = ('data', 'mime_type', 'width', 'height', 'tokens', 'encode_ms')
+
+    def __init__(self, data: bytes, mime_type: str, width: int, height: int, tokens: int, encode_ms: float):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+        self.tokens = tokens
+        self.encode_ms = encode_ms
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.data).decode('utf-8')
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.to_base64()}"
+
+
+class ImageEncoder:
+    """Encode enhanced screenshots according to one provider's settings and budgets"""
+
+    def __init__(self, provider: str = 'google', format: str = 'png', resolution: str = RESOLUTION_UPSCALED,
+                 enhance: bool = True, palette_colors: int = 0, quality: int = 85,
+                 max_bytes: Optional[int] = None, max_image_tokens: Optional[int] = None):
+        if format not in IMAGE_FORMATS:
+            logger.warning(f" Unknown image format '{format}', using 'png'")
+            format = 'png'
+        if resolution not in (RESOLUTION_UPSCALED, RESOLUTION_NATIVE):
+            logger.warning(f" Unknown image resolution '{resolution}', using '{RESOLUTION_UPSCALED}'")
+            resolution = RESOLUTION_UPSCALED
+        self.provider = provider
+        self.format = format
+        self.resolution = resolution
+        self.enhance = enhance
+        self.palette_colors = palette_colors
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.max_image_tokens = max_image_tokens
+
+    @classmethod
+    def from_config(cls, provider: str, settings: Optional[Dict[str, Any]] = None) -> 'ImageEncoder':
+        """Build an encoder from ``providers.<name>.image_encoding`` settings"""
+        merged = {**DEFAULT_IMAGE_ENCODING, **PROVIDER_IMAGE_ENCODING_DEFAULTS.get(provider, {}), **(settings or {})}
+        return cls(provider=provider, **{name: merged[name] for name in DEFAULT_IMAGE_ENCODING})
+
+    @property
+    def native(self) -> bool:
+        """Whether the enhancement stage should skip upscaling"""
+        return self.resolution == RESOLUTION_NATIVE
+
+    @property
+    def cache_key(self) -> tuple:
+        return (self.provider, self.format, self.resolution, self.enhance, self.palette_colors,
+                self.quality, self.max_bytes, self.max_image_tokens)
+
+    def encode(self, image) -> EncodedImage:
+        """Encode an image, stepping down resolution/quality until it fits the budgets"""
+        start = time.perf_counter()
+        image = self._fit_token_budget(image)
+        tokens = estimate_image_tokens(self.provider, image.width, image.height)
+
+        quality = self.quality
+        palette_colors = self.palette_colors
+        data = self._save(image, quality, palette_colors)
+        while self.max_bytes and len(data) > self.max_bytes:
+            if self.format == 'png':
+                smaller = [colors for colors in BUDGET_PALETTES if not palette_colors or colors < palette_colors]
+                if not smaller:
+                    break
+                palette_colors = smaller[0]
+            else:
+                if quality <= MIN_QUALITY:
+                    break
+                quality = max(MIN_QUALITY, quality - QUALITY_STEP)
+            data = self._save(image, quality, palette_colors)
+
+        if self.max_bytes and len(data) > self.max_bytes:
+            logger.warning(f" Encoded image is {len(data)} bytes, over the {self.max_bytes} byte budget")
+
+        encode_ms = (time.perf_counter() - start) * 1000
+        return EncodedImage(data, IMAGE_FORMATS[self.format][1], image.width, image.height, tokens, encode_ms)
+
+    def _fit_token_budget(self, image):
+        """Reduce the image by integer factors until its token estimate fits the budget"""
+        if not self.max_image_tokens:
+            return image
+        if estimate_image_tokens(self.provider, image.width, image.height) <= self.max_image_tokens:
+            return image
+        for factor in range(2, 9):
+            width, height = image.width // factor, image.height // factor
+            if estimate_image_tokens(self.provider, width, height) <= self.max_image_tokens:
+                return image.reduce(factor)
+        logger.warning(f" Image cannot fit the {self.max_image_tokens} image-token budget")
+        return image
+
+    def _save(self, image, quality: int, palette_colors: int) -> bytes:
+        pil_format = IMAGE_FORMATS[self.format][0]
+        buffer = io.BytesIO()
+        if image.mode not in ('RGB', 'L', 'P') or (self.format != 'png' and image.mode != 'RGB'):
+            image = image.convert('RGB')
+        if self.format == 'png':
+            if palette_colors and image.mode != 'P':
+                image = image.quantize(colors=palette_colors, method=PIL.Image.Quantize.FASTOCTREE)
+            image.save(buffer, format=pil_format)
+        elif self.format == 'webp':
+            image.save(buffer, format=pil_format, quality=quality, lossless=quality >= 100)
+        else:
+            # No chroma subsampling - it smears the hard colour edges of pixel art
+            image.save(buffer, format=pil_format, quality=quality, subsampling=0)
+        return buffer.getvalue()
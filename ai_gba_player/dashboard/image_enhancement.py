@@ -0,0 +1,190 @@
+"""
+Screenshot enhancement applied before frames are sent to vision models.
+
+Two backends share the same knobs (``capture_system.frame_enhancement``):
+
+``pil`` (default)
+    The original chain: LANCZOS upscale followed by separate PIL
+    ``ImageEnhance`` contrast, saturation and brightness passes.  Every pass
+    allocates a new full-size image.
+
+``numpy``
+    A fused path for GBA pixel art.  Contrast, saturation and brightness are
+    all affine in the input, so together they reduce to
+
+        out = K + A * luma + D * channel
+
+    which is precomputed as a single 256x256 lookup table indexed by
+    (luma, channel value).  The table is applied at the native 240x160
+    resolution and the result is upscaled with integer nearest-neighbour
+    (which keeps pixel edges sharp) directly into a reused output buffer.
+
+The numpy backend matches the PIL chain's colours except where the PIL chain
+clips an intermediate result, and uses nearest-neighbour instead of LANCZOS
+scaling, so it changes the images sent to the model and is opt-in.  It
+falls back to ``pil`` when NumPy is not installed.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from core.logging_config import get_logger
+logger = get_logger(__name__)
+
+try:
+    import PIL.Image
+    from PIL import ImageEnhance
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+ENHANCEMENT_BACKEND_PIL = 'pil'
+ENHANCEMENT_BACKEND_NUMPY = 'numpy'
+ENHANCEMENT_BACKENDS = (ENHANCEMENT_BACKEND_PIL, ENHANCEMENT_BACKEND_NUMPY)
+
+DEFAULT_FRAME_ENHANCEMENT = {
+    'backend': ENHANCEMENT_BACKEND_PIL,
+    'scale_factor': 3,
+    'contrast': 1.5,
+    'saturation': 1.8,
+    'brightness': 1.1,
+}
+
+
+def enhance_image_pil(image, scale_factor: float = 3, contrast: float = 1.5,
+                      saturation: float = 1.8, brightness: float = 1.1):
+    """Upscale and enhance an image with the PIL ImageEnhance chain"""
+    # Scale the image up for better detail recognition
+    scaled_size = (int(image.width * scale_factor), int(image.height * scale_factor))
+    enhanced_image = image.resize(scaled_size, PIL.Image.LANCZOS)
+
+    # Enhance contrast for better visibility
+    enhanced_image = ImageEnhance.Contrast(enhanced_image).enhance(contrast)
+
+    # Enhance color saturation for better color visibility
+    if enhanced_image.mode in ('RGB', 'RGBA'):
+        enhanced_image = ImageEnhance.Color(enhanced_image).enhance(saturation)
+
+    # Enhance brightness slightly
+    return ImageEnhance.Brightness(enhanced_image).enhance(brightness)
+
+
+class PixelArtEnhancer:
+    """Fused NumPy enhancement: one (luma, channel) lookup table plus integer upscaling"""
+
+    def __init__(self, scale_factor: float = 3, contrast: float = 1.5,
+                 saturation: float = 1.8, brightness: float = 1.1):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for the numpy enhancement backend")
+        self.scale_factor = max(1, int(round(scale_factor)))
+        self.contrast = contrast
+        self.saturation = saturation
+        self.brightness = brightness
+
+        # Per-channel term D * c and luma term A * l are fixed by the knobs;
+        # only the contrast pivot (mean luma) changes per frame
+        self._channel_term = np.arange(256, dtype=np.float32) * (brightness * contrast * saturation)
+        self._luma_term = np.arange(256, dtype=np.float32) * (brightness * contrast * (1.0 - saturation))
+        self._luts = {}  # mean luma -> flattened (luma * 256 + channel) -> uint8 table
+
+        self._buffer = None  # Reused full-size output buffer
+        self._lock = threading.Lock()
+
+    def _lut(self, mean: int):
+        lut = self._luts.get(mean)
+        if lut is None:
+            offset = self.brightness * mean * (1.0 - self.contrast)
+            table = offset + self._luma_term[:, None] + self._channel_term[None, :]
+            lut = np.clip(np.rint(table), 0, 255).astype(np.uint8).ravel()
+            self._luts[mean] = lut
+        return lut
+
+    def enhance_array(self, pixels):
+        """Enhance an (H, W, 3) uint8 array.
+
+        Returns a view of the internal output buffer, valid until the next call;
+        callers on other threads must hold ``self._lock``.
+        """
+        height, width, _ = pixels.shape
+        pixels = pixels.astype(np.uint32, copy=False)
+
+        # Same fixed-point luma as PIL's RGB -> L conversion
+        luma = (pixels[..., 0] * 19595 + pixels[..., 1] * 38470 + pixels[..., 2] * 7471 + 0x8000) >> 16
+        mean = int(luma.mean() + 0.5)
+
+        small = self._lut(mean)[(luma << 8)[..., None] + pixels]
+
+        scale = self.scale_factor
+        shape = (height * scale, width * scale, 3)
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        # Widen each row once, then copy it into the other (scale - 1) output rows
+        rows = self._buffer.reshape(height, scale, width * scale, 3)
+        rows[:, 0] = np.repeat(small, scale, axis=1)
+        rows[:, 1:] = rows[:, :1]
+        return self._buffer
+
+    def enhance(self, image):
+        """Enhance a PIL image, returning a new RGB image"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        pixels = np.asarray(image, dtype=np.uint8)
+        with self._lock:
+            output = self.enhance_array(pixels)
+            return PIL.Image.frombytes('RGB', (output.shape[1], output.shape[0]), output.tobytes())
+
+    def __call__(self, image):
+        return self.enhance(image)
+
+
+def create_frame_enhancer(settings: Optional[Dict[str, Any]] = None, native: bool = False) -> Callable:
+    """Build an image -> enhanced image callable from ``frame_enhancement`` settings.
+
+    ``native`` keeps the colour adjustments but skips upscaling.
+    """
+    settings = {**DEFAULT_FRAME_ENHANCEMENT, **(settings or {})}
+    if native:
+        settings['scale_factor'] = 1
+    backend = settings['backend']
+    if backend not in ENHANCEMENT_BACKENDS:
+        logger.warning(f" Unknown frame enhancement backend '{backend}', using '{ENHANCEMENT_BACKEND_PIL}'")
+        backend = ENHANCEMENT_BACKEND_PIL
+    if backend == ENHANCEMENT_BACKEND_NUMPY and not NUMPY_AVAILABLE:
+        logger.warning(" NumPy not installed, using the PIL frame enhancement backend")
+        backend = ENHANCEMENT_BACKEND_PIL
+
+    knobs = {name: settings[name] for name in ('scale_factor', 'contrast', 'saturation', 'brightness')}
+    if backend == ENHANCEMENT_BACKEND_NUMPY:
+        return PixelArtEnhancer(**knobs)
+    return lambda image: enhance_image_pil(image, **knobs)
+
+
+# Global frame enhancers (upscaled and native), selected from the frame_enhancement configuration
+_frame_enhancers = {}
+_frame_enhancement_settings = None
+
+
+def get_frame_enhancer(native: bool = False) -> Callable:
+    """Get the configured frame enhancer, creating the default if needed"""
+    enhancer = _frame_enhancers.get(native)
+    if enhancer is None:
+        enhancer = _frame_enhancers[native] = create_frame_enhancer(_frame_enhancement_settings, native)
+    return enhancer
+
+
+def configure_frame_enhancement(settings: Optional[Dict[str, Any]]) -> bool:
+    """Select the backend and knobs for the global enhancers; returns True if they changed"""
+    global _frame_enhancement_settings
+    settings = {**DEFAULT_FRAME_ENHANCEMENT, **(settings or {})}
+    if settings == _frame_enhancement_settings:
+        return False
+    _frame_enhancement_settings = settings
+    _frame_enhancers.clear()
+    logger.debug(f" Frame enhancement backend: {settings['backend']}")
+    return True
@@ -0,0 +1,195 @@
+"""
+Minimal selectors-based event loop for the mGBA socket server.
+
+AIGameService runs one IOLoop on its thread: the listening socket and every
+emulator connection are registered for readiness events, timers replace
+blocking ``time.sleep`` retries, and other threads (PlayerAgent, Django
+views) hand work to the loop through ``call_soon_threadsafe``, which wakes
+the selector immediately through a socketpair.
+"""
+
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from core.logging_config import get_logger
+logger = get_logger(__name__)
+
+
+class TimerHandle:
+    """Handle returned by ``call_later``; ``cancel()`` prevents the callback from running"""
+
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class IOLoop:
+    """Single-threaded readiness loop with timers and thread-safe callbacks"""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._readers = {}
+        self._writers = {}
+        self._timers = []
+        self._timer_sequence = itertools.count()
+        self._ready = deque()
+        self._ready_lock = threading.Lock()
+        self._running = False
+        self._thread_id = None
+
+        # Self-pipe used to interrupt select() from other threads
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ)
+
+    # Readiness callbacks
+
+    def add_reader(self, sock: socket.socket, callback: Callable[[], None]):
+        self._readers[sock.fileno()] = callback
+        self._update_registration(sock)
+
+    def remove_reader(self, sock: socket.socket):
+        self._readers.pop(sock.fileno(), None)
+        self._update_registration(sock)
+
+    def add_writer(self, sock: socket.socket, callback: Callable[[], None]):
+        self._writers[sock.fileno()] = callback
+        self._update_registration(sock)
+
+    def remove_writer(self, sock: socket.socket):
+        self._writers.pop(sock.fileno(), None)
+        self._update_registration(sock)
+
+    def _update_registration(self, sock: socket.socket):
+        fd = sock.fileno()
+        if fd < 0:
+            return
+        events = 0
+        if fd in self._readers:
+            events |= selectors.EVENT_READ
+        if fd in self._writers:
+            events |= selectors.EVENT_WRITE
+
+        try:
+            self._selector.get_key(fd)
+            registered = True
+        except KeyError:
+            registered = False
+
+        if events and registered:
+            self._selector.modify(fd, events)
+        elif events:
+            self._selector.register(fd, events)
+        elif registered:
+            self._selector.unregister(fd)
+
+    # Scheduling
+
+    def call_soon_threadsafe(self, callback: Callable, *args):
+        """Schedule ``callback(*args)`` on the loop thread from any thread"""
+        with self._ready_lock:
+            self._ready.append((callback, args))
+        if not self.in_loop_thread():
+            self._wakeup()
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        """Run ``callback(*args)`` on the loop thread after ``delay`` seconds"""
+        handle = TimerHandle(time.monotonic() + delay, callback, args)
+        if self.in_loop_thread():
+            heapq.heappush(self._timers, (handle.when, next(self._timer_sequence), handle))
+        else:
+            # Timer heap is only touched on the loop thread
+            self.call_soon_threadsafe(self._push_timer, handle)
+        return handle
+
+    def _push_timer(self, handle: TimerHandle):
+        heapq.heappush(self._timers, (handle.when, next(self._timer_sequence), handle))
+
+    def in_loop_thread(self) -> bool:
+        return self._thread_id == threading.get_ident()
+
+    def _wakeup(self):
+        try:
+            self._wakeup_writer.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Already pending or loop closed
+
+    # Running
+
+    def run_forever(self):
+        self._running = True
+        self._thread_id = threading.get_ident()
+        try:
+            while self._running:
+                self.run_once()
+        finally:
+            self._thread_id = None
+
+    def run_once(self, max_timeout: float = None):
+        """Wait for I/O or the next timer, then run everything that is due"""
+        timeout = max_timeout
+        with self._ready_lock:
+            has_ready = bool(self._ready)
+        if has_ready:
+            timeout = 0
+        elif self._timers:
+            until_next = max(0.0, self._timers[0][0] - time.monotonic())
+            timeout = until_next if timeout is None else min(timeout, until_next)
+
+        for key, mask in self._selector.select(timeout):
+            if key.fileobj is self._wakeup_reader:
+                self._drain_wakeup()
+                continue
+            fd = key.fd
+            if mask & selectors.EVENT_READ and fd in self._readers:
+                self._run_callback(self._readers[fd])
+            if mask & selectors.EVENT_WRITE and fd in self._writers:
+                self._run_callback(self._writers[fd])
+
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, handle = heapq.heappop(self._timers)
+            if not handle.cancelled:
+                self._run_callback(handle.callback, *handle.args)
+
+        with self._ready_lock:
+            ready, self._ready = self._ready, deque()
+        for callback, args in ready:
+            self._run_callback(callback, *args)
+
+    def _run_callback(self, callback: Callable, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f" Event loop callback {getattr(callback, '__name__', callback)} failed: {e}")
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def stop(self):
+        """Stop the loop; safe to call from any thread"""
+        self._running = False
+        self._wakeup()
+
+    def close(self):
+        self._selector.close()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
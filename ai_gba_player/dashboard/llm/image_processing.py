@@ -12,11 +12,13 @@ from typing import Optional
 
 try:
     import PIL.Image
-    import PIL.ImageEnhance
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
 
+from ..frame_store import get_frame_store, open_frame_image
+from ..image_enhancement import get_frame_enhancer
+
 
 class ImageProcessor:
     """
@@ -51,6 +53,9 @@ class ImageProcessor:
         min_file_size = 1000  # Minimum file size in bytes for valid screenshot
         
         while total_waited < max_wait_seconds:
+            if get_frame_store().is_ready(screenshot_path):
+                # Frames streamed over the socket or confirmed by mGBA are complete
+                return True
             if os.path.exists(screenshot_path):
                 try:
                     file_size = os.path.getsize(screenshot_path)
@@ -94,37 +99,13 @@ class ImageProcessor:
         
         try:
             # Load original image
-            original_image = PIL.Image.open(image_path)
+            original_image = open_frame_image(image_path)
             print(f"📸 Original image: {original_image.size[0]}x{original_image.size[1]}")
             
-            # Enhancement parameters optimized for retro game screenshots
-            scale_factor = 3.0
-            contrast_factor = 1.5
-            saturation_factor = 1.8
-            brightness_factor = 1.1
-            
-            # Scale up the image for better detail visibility
-            new_size = (
-                int(original_image.size[0] * scale_factor),
-                int(original_image.size[1] * scale_factor)
-            )
-            enhanced_image = original_image.resize(new_size, PIL.Image.LANCZOS)
-            
-            # Apply contrast enhancement
-            enhancer = PIL.ImageEnhance.Contrast(enhanced_image)
-            enhanced_image = enhancer.enhance(contrast_factor)
-            
-            # Apply saturation enhancement (for color images)
-            if enhanced_image.mode in ('RGB', 'RGBA'):
-                enhancer = PIL.ImageEnhance.Color(enhanced_image)
-                enhanced_image = enhancer.enhance(saturation_factor)
-            
-            # Apply brightness adjustment
-            enhancer = PIL.ImageEnhance.Brightness(enhanced_image)
-            enhanced_image = enhancer.enhance(brightness_factor)
+            # Same backend and knobs as LLMClient (capture_system.frame_enhancement)
+            enhanced_image = get_frame_enhancer()(original_image)
             
-            print(f"✨ Enhanced image: {enhanced_image.size[0]}x{enhanced_image.size[1]} "
-                  f"(scale: {scale_factor}x, contrast: {contrast_factor}x)")
+            print(f"✨ Enhanced image: {enhanced_image.size[0]}x{enhanced_image.size[1]}")
             
             return enhanced_image
             
@@ -132,7 +113,7 @@ class ImageProcessor:
             print(f"⚠️ Image enhancement failed: {e}")
             # Try to return original image as fallback
             try:
-                return PIL.Image.open(image_path)
+                return open_frame_image(image_path)
             except Exception as fallback_error:
                 print(f"❌ Could not load image: {fallback_error}")
                 raise fallback_error
@@ -0,0 +1,362 @@
+"""
+Deadlines, cancellation and latency statistics for LLM requests.
+
+``generate_content`` was called without any timeout, so one hung Gemini
+request could stall the autonomous loop forever.  Every provider request now
+runs through ``run_with_deadline``:
+
+- the request runs on its own daemon thread and the caller waits at most
+  until the deadline, or until the deadline is cancelled (e.g. autonomous
+  play stopped); an abandoned request never holds up the ones after it
+- the remaining time is also passed to the SDK as its own request timeout,
+  so an abandoned request ends on the provider side too
+- a Deadline can span several calls: PlayerAgent creates one per decision and
+  every retry only gets what is left of it
+
+Each call's latency and outcome (ok, timeout, cancelled, error) is recorded
+per provider and model in LLMCallStats, so timeouts can be sized from real
+latency distributions.
+
+``hedged_call`` races a backup request against a primary one that is slower
+than usual (see ``providers.<name>.hedging``): the first valid result wins
+and the other request is cancelled.  HedgeStats counts how often that
+happens and which side won.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+OUTCOME_OK = 'ok'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_CANCELLED = 'cancelled'
+OUTCOME_ERROR = 'error'
+
+DEFAULT_DECISION_DEADLINE_SECONDS = 120
+
+
+def _finite(seconds: float) -> Optional[float]:
+    """None (no limit) for a deadline that never expires"""
+    return None if seconds == float('inf') else seconds
+
+
+class LLMDeadlineError(TimeoutError):
+    """An LLM request did not finish before its deadline"""
+
+
+class LLMCancelledError(LLMDeadlineError):
+    """An LLM request was abandoned because its deadline was cancelled"""
+
+
+class Deadline:
+    """Point in time by which work must finish; cancelling it wakes everyone waiting on it"""
+
+    __slots__ = ('expires_at', 'parent', '_cancelled', '_waiters', '_lock')
+
+    def __init__(self, seconds: Optional[float] = None, parent: Optional['Deadline'] = None):
+        expires_at = time.monotonic() + seconds if seconds is not None else float('inf')
+        if parent is not None:
+            expires_at = min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+        self.parent = parent
+        self._cancelled = False
+        self._waiters = set()
+        self._lock = threading.Lock()
+
+    def child(self, seconds: Optional[float]) -> 'Deadline':
+        """Deadline for one step: at most ``seconds``, never past this one, cancelled with it"""
+        return Deadline(seconds, parent=self)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled or (self.parent is not None and self.parent.cancelled)
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            waiters = list(self._waiters)
+        for event in waiters:
+            event.set()
+
+    def wait(self, seconds: Optional[float] = None) -> bool:
+        """Sleep up to ``seconds`` (or until expiry); returns False if cancelled meanwhile"""
+        timeout = self.remaining() if seconds is None else min(seconds, self.remaining())
+        event = threading.Event()
+        self._add_waiter(event)
+        try:
+            if not self.cancelled:
+                event.wait(_finite(timeout))
+        finally:
+            self._remove_waiter(event)
+        return not self.cancelled
+
+    def _add_waiter(self, event: threading.Event):
+        with self._lock:
+            self._waiters.add(event)
+        if self.parent is not None:
+            self.parent._add_waiter(event)
+
+    def _remove_waiter(self, event: threading.Event):
+        with self._lock:
+            self._waiters.discard(event)
+        if self.parent is not None:
+            self.parent._remove_waiter(event)
+
+
+class LLMCallStats:
+    """Thread-safe per (provider, model) call counts, outcomes and recent latencies"""
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self._models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, elapsed: float, outcome: str):
+        with self._lock:
+            stats = self._models.get((provider, model))
+            if stats is None:
+                stats = {'calls': 0, OUTCOME_OK: 0, OUTCOME_TIMEOUT: 0, OUTCOME_CANCELLED: 0, OUTCOME_ERROR: 0,
+                         'latencies': deque(maxlen=self.max_samples)}
+                self._models[(provider, model)] = stats
+            stats['calls'] += 1
+            stats[outcome] += 1
+            # Abandoned calls count with the time they had run (a lower bound), so the slow
+            # tail does not drop out of the distribution once hedging cancels it
+            if outcome == OUTCOME_OK or (outcome in (OUTCOME_TIMEOUT, OUTCOME_CANCELLED) and elapsed > 0):
+                stats['latencies'].append(elapsed)
+
+    def percentile(self, provider: str, model: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Latency (seconds) at ``percentile`` (0-100), None with fewer than ``min_samples`` samples"""
+        with self._lock:
+            stats = self._models.get((provider, model))
+            samples = sorted(stats['latencies']) if stats else []
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._models)
+            counts = {key: {name: value for name, value in self._models[key].items() if name != 'latencies'}
+                      for key in keys}
+        metrics = {}
+        for provider, model in keys:
+            entry = counts[(provider, model)]
+            for percentile in (50, 90, 99):
+                latency = self.percentile(provider, model, percentile)
+                entry[f'p{percentile}_ms'] = round(latency * 1000, 1) if latency is not None else None
+            metrics.setdefault(provider, {})[model] = entry
+        return metrics
+
+
+HEDGE_PRIMARY = 'primary'
+HEDGE_BACKUP = 'backup'
+
+
+class HedgeStats:
+    """Thread-safe per route (primary -> backup) counts of hedged requests and their winners"""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, hedged: bool, winner: Optional[str]):
+        with self._lock:
+            stats = self._routes.setdefault(route, {'requests': 0, 'hedged': 0, 'primary_wins': 0,
+                                                    'backup_wins': 0, 'no_valid_result': 0})
+            stats['requests'] += 1
+            stats['hedged'] += int(hedged)
+            if winner is None:
+                stats['no_valid_result'] += 1
+            else:
+                stats[f'{winner}_wins'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: dict(stats) for route, stats in self._routes.items()}
+        for stats in routes.values():
+            stats['hedge_rate'] = round(stats['hedged'] / stats['requests'], 3)
+            stats['backup_win_rate'] = round(stats['backup_wins'] / stats['hedged'], 3) if stats['hedged'] else 0.0
+        return routes
+
+
+# Global call statistics shared by every LLMClient
+_call_stats = None
+_hedge_stats = None
+
+
+def get_llm_call_stats() -> LLMCallStats:
+    """Get the global LLM call statistics instance"""
+    global _call_stats
+    if _call_stats is None:
+        _call_stats = LLMCallStats()
+    return _call_stats
+
+
+def get_hedge_stats() -> HedgeStats:
+    """Get the global hedged request statistics instance"""
+    global _hedge_stats
+    if _hedge_stats is None:
+        _hedge_stats = HedgeStats()
+    return _hedge_stats
+
+
+# SDK exceptions raised when the request timeout passed to them expires
+SDK_TIMEOUT_ERRORS = ('DeadlineExceeded', 'APITimeoutError', 'ReadTimeout', 'ConnectTimeout')
+
+
+def _is_timeout(error: Exception) -> bool:
+    return isinstance(error, TimeoutError) or type(error).__name__ in SDK_TIMEOUT_ERRORS
+
+
+def run_with_deadline(request: Callable[[float], Any], deadline: Deadline, provider: str, model: str) -> Any:
+    """Run ``request(timeout_seconds)`` and return its result, or raise once ``deadline`` passes or is cancelled.
+
+    The request keeps running on its thread after a timeout or cancellation,
+    bounded by the timeout it was given; its result is dropped.  Each call
+    gets its own daemon thread rather than a pool slot, so abandoned requests
+    (twice as many with hedging) can never leave later ones queued until
+    their deadline passes without reaching the provider.
+    """
+    start = time.monotonic()
+    if deadline.cancelled:
+        get_llm_call_stats().record(provider, model, 0.0, OUTCOME_CANCELLED)
+        raise LLMCancelledError(f"{provider} {model} request cancelled")
+    timeout = deadline.remaining()
+    if timeout <= 0:
+        get_llm_call_stats().record(provider, model, 0.0, OUTCOME_TIMEOUT)
+        raise LLMDeadlineError(f"{provider} {model} request timed out: no time left before the deadline")
+
+    done = threading.Event()
+    wake = threading.Event()   # Set when the request finishes or the deadline is cancelled
+    outcome: Dict[str, Any] = {}
+
+    def run():
+        try:
+            outcome['result'] = request(_finite(timeout))
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+            wake.set()
+
+    threading.Thread(target=run, daemon=True, name=f"LLMCall-{provider}").start()
+    deadline._add_waiter(wake)
+    try:
+        wake.wait(_finite(timeout))
+    finally:
+        deadline._remove_waiter(wake)
+    elapsed = time.monotonic() - start
+
+    if not done.is_set():
+        if deadline.cancelled:
+            get_llm_call_stats().record(provider, model, elapsed, OUTCOME_CANCELLED)
+            raise LLMCancelledError(f"{provider} {model} request cancelled after {elapsed:.1f}s")
+        get_llm_call_stats().record(provider, model, elapsed, OUTCOME_TIMEOUT)
+        logger.warning(f" {provider} {model} request timed out after {elapsed:.1f}s")
+        raise LLMDeadlineError(f"{provider} {model} request timed out after {elapsed:.1f}s")
+
+    if 'error' in outcome:
+        e = outcome['error']
+        if _is_timeout(e):
+            # The SDK's own request timeout fired just before ours
+            get_llm_call_stats().record(provider, model, elapsed, OUTCOME_TIMEOUT)
+            raise LLMDeadlineError(f"{provider} {model} request timed out after {elapsed:.1f}s: {e}") from e
+        get_llm_call_stats().record(provider, model, elapsed, OUTCOME_ERROR)
+        raise e
+    get_llm_call_stats().record(provider, model, elapsed, OUTCOME_OK)
+    return outcome['result']
+
+
+_hedge_leg = threading.local()
+
+
+def in_hedge_leg() -> bool:
+    """True on a thread running one side of a hedged request (which must not hedge again)"""
+    return getattr(_hedge_leg, 'active', False)
+
+
+def hedged_call(primary: Callable[[Deadline], Any], backup: Callable[[Deadline], Any], delay: float,
+                deadline: Optional[Deadline], is_valid: Callable[[Any], bool], route: str) -> Tuple[Any, Optional[str], bool]:
+    """Run ``primary(deadline)``; if it has not answered after ``delay`` seconds, race ``backup(deadline)``.
+
+    The first valid result wins and the other side's deadline is cancelled.
+    A primary that fails before the delay is returned as is (retrying is the
+    caller's job).  Returns (result, winner or None, whether a backup was sent).
+    """
+    parent = deadline or Deadline()
+    results = queue.Queue()
+    legs: Dict[str, Deadline] = {}
+
+    def run(name: str, request: Callable[[Deadline], Any], leg_deadline: Deadline):
+        _hedge_leg.active = True
+        try:
+            result = request(leg_deadline)
+        except Exception as e:
+            logger.warning(f" Hedged {name} request failed ({route}): {e}")
+            result = None
+        results.put((name, result))
+
+    def launch(name: str, request: Callable[[Deadline], Any]):
+        legs[name] = parent.child(None)
+        threading.Thread(target=run, args=(name, request, legs[name]), daemon=True,
+                         name=f"LLMHedge-{name}").start()
+
+    start = time.monotonic()
+    launch(HEDGE_PRIMARY, primary)
+    outcomes: Dict[str, Any] = {}
+    winner = None
+    waiting_to_hedge = True
+    while len(outcomes) < len(legs):
+        # Each side is bounded by its own request timeout, so waiting for it always ends
+        wait = max(0.0, start + delay - time.monotonic()) if waiting_to_hedge else None
+        try:
+            name, result = results.get(timeout=wait)
+        except queue.Empty:
+            waiting_to_hedge = False
+            if parent.cancelled or parent.expired:
+                continue
+            logger.info(f" Primary request slower than {delay:.1f}s, sending backup request ({route})")
+            launch(HEDGE_BACKUP, backup)
+            continue
+        outcomes[name] = result
+        if is_valid(result):
+            winner = name
+            break
+        if HEDGE_BACKUP not in legs:
+            break
+
+    for name, leg_deadline in legs.items():
+        if name != winner and name not in outcomes:
+            leg_deadline.cancel()
+
+    hedged = HEDGE_BACKUP in legs
+    get_hedge_stats().record(route, hedged, winner)
+    if winner is not None:
+        if hedged:
+            logger.info(f" Hedged request won by {winner} after {time.monotonic() - start:.1f}s ({route})")
+        return outcomes[winner], winner, hedged
+    result = outcomes.get(HEDGE_PRIMARY)
+    return (result if result is not None else outcomes.get(HEDGE_BACKUP)), None, hedged
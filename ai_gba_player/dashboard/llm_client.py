@@ -4,21 +4,34 @@ Handles API calls to different LLM providers with error handling and timeouts.
 """
 
 import os
-import base64
-from typing import Dict, Any
+import hashlib
+from typing import Dict, Any, List, Optional
 import json
+import time
 import traceback
 from datetime import datetime
 from pathlib import Path
 import PIL.Image
-from PIL import ImageEnhance
 
 from core.logging_config import get_logger
+from .frame_store import get_frame_store, frame_exists
+from .image_cache import get_enhanced_image_cache, enhance_for_llm
+from .image_enhancement import configure_frame_enhancement
+from .image_encoding import ImageEncoder, EncodedImage
+from .comparison_images import ComparisonImageBuilder, ComparisonImages
+from .provider_sessions import get_provider_session
+from .llm_calls import (
+    Deadline, LLMDeadlineError, LLMCancelledError, run_with_deadline, hedged_call, in_hedge_leg,
+    get_llm_call_stats, HEDGE_BACKUP
+)
 logger = get_logger(__name__)
 
 # Memory service will be imported when Django is ready
 MEMORY_SERVICE_AVAILABLE = False
 
+# Providers with single-image and comparison decision calls (and so usable as a hedging backup)
+DECISION_PROVIDERS = ('google', 'openai')
+
 
 class LLMClient:
     """Client for making LLM API calls with robust error handling"""
@@ -29,7 +42,20 @@ class LLMClient:
         provider_mapping = {'gemini': 'google', 'google': 'google', 'openai': 'openai', 'anthropic': 'anthropic'}
         self.provider = provider_mapping.get(config.get('llm_provider', 'google'), 'google')
         self.providers_config = config.get('providers', {})
-        self.timeout = config.get('llm_timeout_seconds', 30)
+        self.timeout = config.get('llm_timeout_seconds', 30)  # Per request; callers may pass a tighter Deadline
+        
+        # Frame enhancement backend and knobs; cached images made with old settings are stale
+        if configure_frame_enhancement(config.get('capture_system', {}).get('frame_enhancement')):
+            get_enhanced_image_cache().clear()
+        
+        # Image format, resolution and byte/token budgets for this provider
+        self.image_encoder = ImageEncoder.from_config(
+            self.provider, self.providers_config.get(self.provider, {}).get('image_encoding'))
+        self.last_image_payload = {}
+        
+        # How the previous/current pair is sent in comparison prompts (full, roi crop or stitched)
+        self.comparison_builder = ComparisonImageBuilder.from_config(
+            self.image_encoder, self.providers_config.get(self.provider, {}).get('comparison_images'))
         
         # Notepad and memory paths
         self.notepad_path = Path("/Users/chengwan/Projects/pokemonAI/LLM-Pokemon-Red/data/notepad.txt")
@@ -48,6 +74,10 @@ class LLMClient:
         self.session_id = None
         self.conversation_history = []
         
+        # Clients for other models/providers (hedging backup, routed model tiers), created on first use
+        self._variants = {}
+        self._unavailable_backups = set()
+        
         # Initialize provider-specific clients
         self._init_clients()
     
@@ -71,29 +101,18 @@ class LLMClient:
             self.memory_system = None
     
     def _init_clients(self):
-        """Initialize LLM provider clients"""
-        try:
-            if self.provider == 'google':
-                import google.generativeai as genai
-                api_key = self.providers_config.get('google', {}).get('api_key', '')
-                if api_key:
-                    genai.configure(api_key=api_key)
-                    self.google_client = genai
-                else:
-                    self.google_client = None
-                    logger.warning(" Google API key not configured")
-            
-            if self.provider == 'openai':
-                from openai import OpenAI
-                api_key = self.providers_config.get('openai', {}).get('api_key', '')
-                if api_key:
-                    self.openai_client = OpenAI(api_key=api_key)
-                else:
-                    self.openai_client = None
-                    logger.warning(" OpenAI API key not configured")
-                    
-        except ImportError as e:
-            logger.warning(f" LLM provider import error: {e}")
+        """Attach to the shared provider session (SDK client, model handles, pooled connections)"""
+        self.provider_session = get_provider_session(self.provider, self.providers_config.get(self.provider, {}))
+        
+        if self.provider == 'google':
+            self.google_client = self.provider_session.client
+            if not self.google_client:
+                logger.warning(" Google API key not configured")
+        
+        if self.provider == 'openai':
+            self.openai_client = self.provider_session.client
+            if not self.openai_client:
+                logger.warning(" OpenAI API key not configured")
     
     def reset_session(self):
         """Reset the LLM session by clearing conversation history and reinitializing clients"""
@@ -125,7 +144,7 @@ class LLMClient:
             except Exception as e:
                 logger.warning(f" Memory system reset error: {e}")
         
-        # Reinitialize LLM clients to ensure fresh state
+        # Reattach to the provider session (rebuilt only if the provider settings changed)
         self._init_clients()
         
         logger.info(" LLM session reset completed - fresh start!")
@@ -148,6 +167,11 @@ class LLMClient:
             logger.error(f" Error loading prompt template: {e}")
             self.prompt_template = "You are an AI playing Pokémon. Look at the screenshot and choose a button to press.\n\n{spatial_context}\n\n{recent_actions}\n\n{notepad_content}"
     
+    def prompt_template_version(self) -> str:
+        """Short hash of the current prompt template (reloaded if the file changed)"""
+        self._load_prompt_template()
+        return hashlib.blake2b(self.prompt_template.encode('utf-8'), digest_size=8).hexdigest()
+    
     def _wait_for_screenshot(self, screenshot_path: str, max_wait_seconds: int = 5, check_interval: float = 0.2) -> bool:
         """
         Wait for a screenshot file to be available and have reasonable size.
@@ -165,9 +189,16 @@ class LLMClient:
         total_waited = 0.0
         min_file_size = 1000  # Minimum reasonable size for a screenshot
         
+        # Frames streamed over the socket or confirmed by mGBA need no polling
+        if get_frame_store().is_ready(screenshot_path):
+            logger.debug(f" Screenshot already confirmed: {os.path.basename(screenshot_path)}")
+            return True
+        
         logger.debug(f" Waiting for screenshot: {os.path.basename(screenshot_path)}")
         
         while total_waited < max_wait_seconds:
+            if get_frame_store().is_ready(screenshot_path):
+                return True
             if os.path.exists(screenshot_path):
                 try:
                     file_size = os.path.getsize(screenshot_path)
@@ -188,7 +219,8 @@ class LLMClient:
         logger.warning(f" Screenshot not ready after {max_wait_seconds}s: {os.path.basename(screenshot_path)}")
         return False
     
-    def analyze_game_state(self, screenshot_path: str, game_state: Dict[str, Any], recent_actions_text: str = "", before_after_analysis: str = "") -> Dict[str, Any]:
+    def analyze_game_state(self, screenshot_path: str, game_state: Dict[str, Any], recent_actions_text: str = "", before_after_analysis: str = "",
+                           deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Analyze game state and return AI decision with enhanced processing
         
@@ -200,6 +232,11 @@ class LLMClient:
                 "error": "error message if failed"
             }
         """
+        hedging = self._hedging_settings()
+        if hedging:
+            return self._hedged(hedging, deadline, lambda client, leg_deadline: client.analyze_game_state(
+                screenshot_path, game_state, recent_actions_text, before_after_analysis, deadline=leg_deadline))
+        
         try:
             # Wait for screenshot to be available with retry logic
             if not self._wait_for_screenshot(screenshot_path, max_wait_seconds=5):
@@ -216,9 +253,9 @@ class LLMClient:
             
             # Call appropriate LLM provider
             if self.provider == 'google':
-                return self._call_google_api(screenshot_path, context)
+                return self._call_google_api(screenshot_path, context, deadline)
             elif self.provider == 'openai':
-                return self._call_openai_api(screenshot_path, context)
+                return self._call_openai_api(screenshot_path, context, deadline)
             else:
                 return self._fallback_response()
                 
@@ -234,7 +271,8 @@ class LLMClient:
             }
     
     def analyze_game_state_with_comparison(self, current_screenshot: str, previous_screenshot: str, 
-                                         game_state: Dict[str, Any], recent_actions_text: str = "") -> Dict[str, Any]:
+                                         game_state: Dict[str, Any], recent_actions_text: str = "",
+                                         deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Analyze game state with previous screenshot comparison - LLM does the analysis
         
@@ -246,6 +284,11 @@ class LLMClient:
                 "error": "error message if failed"
             }
         """
+        hedging = self._hedging_settings()
+        if hedging:
+            return self._hedged(hedging, deadline, lambda client, leg_deadline: client.analyze_game_state_with_comparison(
+                current_screenshot, previous_screenshot, game_state, recent_actions_text, deadline=leg_deadline))
+        
         try:
             # Wait for current screenshot to be available with retry logic
             if not self._wait_for_screenshot(current_screenshot, max_wait_seconds=5):
@@ -258,19 +301,19 @@ class LLMClient:
                 }
             
             # Check if previous screenshot exists (no wait needed for previous screenshot)
-            if not os.path.exists(previous_screenshot):
+            if not frame_exists(previous_screenshot):
                 # Fallback to single screenshot analysis
                 logger.debug(f" Previous screenshot not found, falling back to single screenshot analysis")
-                return self.analyze_game_state(current_screenshot, game_state, recent_actions_text)
+                return self.analyze_game_state(current_screenshot, game_state, recent_actions_text, deadline=deadline)
             
             # Create enhanced game context for comparison
             context = self._create_comparison_context(game_state, recent_actions_text)
             
             # Call appropriate LLM provider with both images
             if self.provider == 'google':
-                return self._call_google_api_with_comparison(previous_screenshot, current_screenshot, context)
+                return self._call_google_api_with_comparison(previous_screenshot, current_screenshot, context, deadline)
             elif self.provider == 'openai':
-                return self._call_openai_api_with_comparison(previous_screenshot, current_screenshot, context)
+                return self._call_openai_api_with_comparison(previous_screenshot, current_screenshot, context, deadline)
             else:
                 return self._fallback_response( "Unsupported provider for comparison")
                 
@@ -335,48 +378,24 @@ Map ID: {map_id}
             # Return minimal context if template has issues
             return f"Compare these two screenshots and choose your next action.\n\nPosition: ({x}, {y}) facing {direction}"
     
-    def _call_google_api_with_comparison(self, previous_screenshot: str, current_screenshot: str, context: str) -> Dict[str, Any]:
+    def _call_google_api_with_comparison(self, previous_screenshot: str, current_screenshot: str, context: str,
+                                         deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Call Google Gemini API with two screenshots for comparison"""
         try:
             if not self.google_client:
                 return self._fallback_response( "Google client not initialized")
             
-            # Load and enhance both images
-            previous_image = self._enhance_image(previous_screenshot)
-            current_image = self._enhance_image(current_screenshot)
-            
-            # Convert enhanced PIL images to bytes
-            import io
-            
-            prev_bytes = io.BytesIO()
-            previous_image.save(prev_bytes, format='PNG')
-            prev_data = prev_bytes.getvalue()
+            # Encoded images - full frames come from the cache, crops/stitches are built per pair
+            comparison = self._build_comparison_images(previous_screenshot, current_screenshot)
             
-            curr_bytes = io.BytesIO()
-            current_image.save(curr_bytes, format='PNG')
-            curr_data = curr_bytes.getvalue()
-            
-            # Create model
-            model_name = self.providers_config.get('google', {}).get('model_name', 'gemini-2.0-flash-exp')
-            model = self.google_client.GenerativeModel(model_name)
+            # Session-cached model with the tools already bound
+            model = self._google_model()
             
             # Create image parts
-            previous_image_part = {
-                'mime_type': 'image/png',
-                'data': prev_data
-            }
-            
-            current_image_part = {
-                'mime_type': 'image/png', 
-                'data': curr_data
-            }
+            image_parts = [{'mime_type': image.mime_type, 'data': image.data} for image in comparison.images]
             
             # Enhanced prompt for comparison analysis
-            prompt = """PREVIOUS SCREENSHOT (before your last actions):
-[Image 1 shows the game state before your previous button sequence]
-
-CURRENT SCREENSHOT (after your last actions):  
-[Image 2 shows the game state after your previous button sequence]
+            prompt = comparison.description + """
 
 """ + context + """
 
@@ -387,15 +406,15 @@ CURRENT SCREENSHOT (after your last actions):
 4. Use press_button_sequence tool for your next actions
 """
             
-            # Define tools (same as single screenshot method)
-            tools = self._get_google_tools()
-            
             # Generate response with both images
             print(f"🌐 Sending comparison request to Google Gemini API...")
-            response = model.generate_content(
-                [prompt, previous_image_part, current_image_part],
-                tools=tools,
-                generation_config={'temperature': 0.7}
+            response = self.call_with_deadline(
+                lambda timeout: model.generate_content(
+                    [prompt, *image_parts],
+                    generation_config={'temperature': 0.7},
+                    request_options={'timeout': timeout}
+                ),
+                deadline
             )
             print(f"📡 Received comparison response from Google Gemini API")
             
@@ -614,11 +633,100 @@ CURRENT SCREENSHOT (after your last actions):
             
             return response_dict
                 
+        except LLMDeadlineError as e:
+            return self._deadline_response(e)
         except Exception as e:
             logger.error(f" Google API comparison error: {e}")
             traceback.print_exc()
             return self._fallback_response( f"Google API error: {str(e)}")
     
+    def _model_name(self) -> str:
+        """Configured model of the active provider"""
+        default = {'google': 'gemini-2.0-flash-exp', 'openai': 'gpt-4o'}.get(self.provider, '')
+        return self.providers_config.get(self.provider, {}).get('model_name', default)
+    
+    def call_with_deadline(self, request, deadline: Optional[Deadline] = None, model_name: Optional[str] = None):
+        """Run ``request(timeout)`` within llm_timeout_seconds and whatever is left of ``deadline``"""
+        call_deadline = deadline.child(self.timeout) if deadline else Deadline(self.timeout)
+        return run_with_deadline(request, call_deadline, self.provider, model_name or self._model_name())
+    
+    def _hedging_settings(self) -> Optional[Dict[str, Any]]:
+        """Hedging settings of the active provider, None if disabled (or already inside a hedged request)"""
+        settings = self.providers_config.get(self.provider, {}).get('hedging') or {}
+        if not settings.get('enabled') or in_hedge_leg():
+            return None
+        return settings
+    
+    def variant(self, provider: Optional[str] = None, model: Optional[str] = None) -> 'LLMClient':
+        """Client sharing this configuration but using another provider and/or model (this client if neither differs)"""
+        provider = provider or self.provider
+        model = model or ''
+        if provider == self.provider and model in ('', self._model_name()):
+            return self
+        client = self._variants.get((provider, model))
+        if client is None:
+            providers = dict(self.providers_config)
+            if model:
+                providers[provider] = {**providers.get(provider, {}), 'model_name': model}
+            client = LLMClient({**self.config, 'llm_provider': provider, 'providers': providers})
+            self._variants[(provider, model)] = client
+        return client
+    
+    def _backup_client(self, settings: Dict[str, Any]) -> 'LLMClient':
+        """Client for the backup provider/model of hedged requests.
+
+        A backup provider that cannot make decision calls, or has no API key,
+        is replaced by a second request to this provider's model.
+        """
+        provider = settings.get('backup_provider') or self.provider
+        if provider == self.provider:
+            return self.variant(provider, settings.get('backup_model'))
+        if provider in DECISION_PROVIDERS:
+            backup = self.variant(provider, settings.get('backup_model'))
+            if backup.provider_session.client is not None:
+                return backup
+        if provider not in self._unavailable_backups:
+            self._unavailable_backups.add(provider)
+            logger.warning(f" Hedging backup provider {provider} is unavailable - hedging with {self.provider} instead")
+        return self
+    
+    def _hedge_delay(self, settings: Dict[str, Any]) -> float:
+        """How long the primary request may run before a backup is sent: its observed latency percentile"""
+        observed = get_llm_call_stats().percentile(self.provider, self._model_name(), settings.get('percentile', 90),
+                                                   settings.get('min_samples', 20))
+        return observed if observed is not None else settings.get('initial_delay_seconds', 10)
+    
+    def _hedged(self, settings: Dict[str, Any], deadline: Optional[Deadline], analyze) -> Dict[str, Any]:
+        """Run ``analyze(client, deadline)`` on this client, racing the backup client once it is slow"""
+        backup = self._backup_client(settings)
+        route = f"{self.provider}/{self._model_name()} -> {backup.provider}/{backup._model_name()}"
+        result, winner, hedged = hedged_call(
+            lambda leg_deadline: analyze(self, leg_deadline),
+            lambda leg_deadline: analyze(backup, leg_deadline),
+            self._hedge_delay(settings), deadline,
+            lambda response: bool(response and response.get('success') and response.get('actions')),
+            route)
+        if result is None:
+            return self._fallback_response(f"Hedged request failed ({route})")
+        if hedged:
+            result['hedge_winner'] = winner
+            if winner == HEDGE_BACKUP:
+                self.last_image_payload = backup.last_image_payload
+        return result
+    
+    def _deadline_response(self, error: LLMDeadlineError) -> Dict[str, Any]:
+        """Error response for a request that timed out or was cancelled"""
+        logger.warning(f" {error}")
+        response = self._fallback_response(str(error))
+        response["timed_out"] = not isinstance(error, LLMCancelledError)
+        response["cancelled"] = isinstance(error, LLMCancelledError)
+        return response
+    
+    def _google_model(self):
+        """Gemini model for game decisions, built once per provider session"""
+        tools = self.provider_session.cached('google_tools', self._get_google_tools)
+        return self.provider_session.google_model(self._model_name(), tools=tools)
+    
     def _get_google_tools(self):
         """Get Google API tools definition"""
         return [
@@ -782,29 +890,22 @@ Map ID: {map_id}
         
         return spatial_context
     
-    def _call_google_api(self, screenshot_path: str, context: str) -> Dict[str, Any]:
+    def _call_google_api(self, screenshot_path: str, context: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Call Google Gemini API"""
         try:
             if not self.google_client:
                 return self._fallback_response( "Google client not initialized")
             
-            # Load and enhance image
-            enhanced_image = self._enhance_image(screenshot_path)
-            
-            # Convert enhanced PIL image to bytes
-            import io
-            img_bytes = io.BytesIO()
-            enhanced_image.save(img_bytes, format='PNG')
-            image_data = img_bytes.getvalue()
+            # Load encoded image (cached across decision cycles)
+            encoded_image, = self._encode_images(screenshot_path)
             
-            # Create model
-            model_name = self.providers_config.get('google', {}).get('model_name', 'gemini-2.0-flash-exp')
-            model = self.google_client.GenerativeModel(model_name)
+            # Session-cached model with the tools already bound
+            model = self._google_model()
             
             # Create image part
             image_part = {
-                'mime_type': 'image/png',
-                'data': image_data
+                'mime_type': encoded_image.mime_type,
+                'data': encoded_image.data
             }
             
             # Enhanced prompt with tool definition
@@ -825,15 +926,15 @@ Duration is in frames (60fps). Default=2 frames if not specified.
             estimated_tokens = prompt_words * 1.3  # Rough estimation: 1 token ≈ 0.75 words
             logger.debug(f" Prompt Stats: {prompt_chars} chars, {prompt_words} words, ~{estimated_tokens:.0f} tokens (estimated)")
 
-            # Define tools (including both press_button and update_notepad)
-            tools = self._get_google_tools()
-            
             # Generate response
             print(f"🌐 Sending request to Google Gemini API...")
-            response = model.generate_content(
-                [prompt, image_part],
-                tools=tools,
-                generation_config={'temperature': 0.7}
+            response = self.call_with_deadline(
+                lambda timeout: model.generate_content(
+                    [prompt, image_part],
+                    generation_config={'temperature': 0.7},
+                    request_options={'timeout': timeout}
+                ),
+                deadline
             )
             print(f"📡 Received response from Google Gemini API")
             
@@ -1063,21 +1164,22 @@ Duration is in frames (60fps). Default=2 frames if not specified.
             
             return response_dict
             
+        except LLMDeadlineError as e:
+            return self._deadline_response(e)
         except Exception as e:
             logger.error(f" Google API error: {e}")
             import traceback
             logger.debug(f" Full error details: {traceback.format_exc()}")
             return self._fallback_response( str(e))
     
-    def _call_openai_api(self, screenshot_path: str, context: str) -> Dict[str, Any]:
+    def _call_openai_api(self, screenshot_path: str, context: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Call OpenAI API"""
         try:
             if not self.openai_client:
                 return self._fallback_response( "OpenAI client not initialized")
             
             # Encode image
-            with open(screenshot_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
+            encoded_image, = self._encode_images(screenshot_path)
             
             # Create messages
             messages = [
@@ -1087,168 +1189,218 @@ Duration is in frames (60fps). Default=2 frames if not specified.
                         {"type": "text", "text": context},
                         {
                             "type": "image_url",
-                            "image_url": {"url": f"data:image/png;base64,{image_data}"}
+                            "image_url": {"url": encoded_image.to_data_url()}
                         }
                     ]
                 }
             ]
             
-            # Define tools
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "press_button_sequence",
-                        "description": "Press a sequence of buttons on the Game Boy emulator with optional custom durations",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "actions": {
-                                    "type": "array",
-                                    "items": {
-                                        "type": "string",
-                                        "enum": ["A", "B", "SELECT", "START", "RIGHT", "LEFT", "UP", "DOWN", "R", "L"]
-                                    },
-                                    "description": "Array of buttons to press in sequence"
-                                },
-                                "durations": {
-                                    "type": "array",
-                                    "items": {
-                                        "type": "integer"
-                                    },
-                                    "description": "Optional array of durations (in frames, 60fps) for each button. Default is 2 frames if not specified."
-                                }
-                            },
-                            "required": ["actions"]
-                        }
-                    }
-                },
+            return self._parse_openai_response(self._openai_completion(messages, deadline))
+            
+        except LLMDeadlineError as e:
+            return self._deadline_response(e)
+        except Exception as e:
+            logger.error(f" OpenAI API error: {e}")
+            return self._fallback_response( str(e))
+    
+    def _call_openai_api_with_comparison(self, previous_screenshot: str, current_screenshot: str, context: str,
+                                         deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Call OpenAI API with two screenshots for comparison"""
+        try:
+            if not self.openai_client:
+                return self._fallback_response( "OpenAI client not initialized")
+            
+            # Encoded images in this provider's comparison mode
+            comparison = self._build_comparison_images(previous_screenshot, current_screenshot)
+            
+            prompt = comparison.description + """
+
+""" + context + """
+
+**IMPORTANT**: 
+1. Compare the two screenshots to see what changed
+2. Follow the 5-step Response Format (Analyze → Describe → Learn → Plan → Execute)
+3. Include comparison analysis in your reasoning
+4. Use press_button_sequence tool for your next actions
+"""
+            messages = [
                 {
-                    "type": "function",
-                    "function": {
-                        "name": "discover_objective",
-                        "description": "Discover and add a new objective to the memory system when you identify something important you need to do",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "description": {
-                                    "type": "string",
-                                    "description": "Clear description of the objective (e.g., 'set the clock', 'find Pokemon Center', 'defeat gym leader')"
-                                },
-                                "priority": {
-                                    "type": "integer",
-                                    "description": "Priority level 1-10 (1=low, 5=normal, 8=high, 10=critical)",
-                                    "minimum": 1,
-                                    "maximum": 10
-                                },
-                                "category": {
-                                    "type": "string",
-                                    "description": "Category: 'main' (story/gym), 'collection' (catch Pokemon), 'exploration' (discover areas), 'general' (other)",
-                                    "enum": ["main", "collection", "exploration", "general"]
-                                }
-                            },
-                            "required": ["description"]
-                        }
-                    }
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt}] + [
+                        {"type": "image_url", "image_url": {"url": image.to_data_url()}}
+                        for image in comparison.images
+                    ]
                 }
             ]
             
-            # Get model name
-            model_name = self.providers_config.get('openai', {}).get('model_name', 'gpt-4o')
+            return self._parse_openai_response(self._openai_completion(messages, deadline))
             
-            # Make API call
-            response = self.openai_client.chat.completions.create(
+        except LLMDeadlineError as e:
+            return self._deadline_response(e)
+        except Exception as e:
+            logger.error(f" OpenAI comparison API error: {e}")
+            return self._fallback_response( str(e))
+    
+    def _openai_completion(self, messages: List[Dict[str, Any]], deadline: Optional[Deadline] = None):
+        """Chat completion with the game tools, bounded by ``deadline``"""
+        model_name = self._model_name()
+        tools = self._openai_tools()
+        return self.call_with_deadline(
+            lambda timeout: self.openai_client.chat.completions.create(
                 model=model_name,
                 messages=messages,
                 tools=tools,
-                timeout=self.timeout
-            )
-            
-            # Parse response
-            message = response.choices[0].message
-            response_text = message.content or "AI analyzed the game state."
-            actions = ["A"]  # Default
-            durations = []  # Default durations
-            
-            if message.tool_calls:
-                for tool_call in message.tool_calls:
-                    if tool_call.function.name == "press_button_sequence":
-                        logger.debug(f" OpenAI tool call: press_button_sequence")
-                        args = json.loads(tool_call.function.arguments)
-                        logger.debug(f" Args: {args}")
-                        if 'actions' in args:
-                            actions = args['actions']
-                            logger.info(f" Extracted actions: {actions}")
-                            
-                            # Extract durations if provided
-                            if 'durations' in args:
-                                durations = args['durations']
-                                logger.info(f" Extracted durations: {durations}")
-                            else:
-                                durations = []
+                timeout=timeout
+            ),
+            deadline
+        )
+    
+    def _openai_tools(self) -> List[Dict[str, Any]]:
+        """press_button_sequence and discover_objective declarations for OpenAI requests"""
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": "press_button_sequence",
+                    "description": "Press a sequence of buttons on the Game Boy emulator with optional custom durations",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "actions": {
+                                "type": "array",
+                                "items": {
+                                    "type": "string",
+                                    "enum": ["A", "B", "SELECT", "START", "RIGHT", "LEFT", "UP", "DOWN", "R", "L"]
+                                },
+                                "description": "Array of buttons to press in sequence"
+                            },
+                            "durations": {
+                                "type": "array",
+                                "items": {
+                                    "type": "integer"
+                                },
+                                "description": "Optional array of durations (in frames, 60fps) for each button. Default is 2 frames if not specified."
+                            }
+                        },
+                        "required": ["actions"]
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "discover_objective",
+                    "description": "Discover and add a new objective to the memory system when you identify something important you need to do",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "description": {
+                                "type": "string",
+                                "description": "Clear description of the objective (e.g., 'set the clock', 'find Pokemon Center', 'defeat gym leader')"
+                            },
+                            "priority": {
+                                "type": "integer",
+                                "description": "Priority level 1-10 (1=low, 5=normal, 8=high, 10=critical)",
+                                "minimum": 1,
+                                "maximum": 10
+                            },
+                            "category": {
+                                "type": "string",
+                                "description": "Category: 'main' (story/gym), 'collection' (catch Pokemon), 'exploration' (discover areas), 'general' (other)",
+                                "enum": ["main", "collection", "exploration", "general"]
+                            }
+                        },
+                        "required": ["description"]
+                    }
+                }
+            }
+        ]
+    
+    def _parse_openai_response(self, response) -> Dict[str, Any]:
+        """Text, actions and durations from an OpenAI chat completion"""
+        message = response.choices[0].message
+        response_text = message.content or "AI analyzed the game state."
+        actions = ["A"]  # Default
+        durations = []  # Default durations
+        
+        if message.tool_calls:
+            for tool_call in message.tool_calls:
+                if tool_call.function.name == "press_button_sequence":
+                    logger.debug(f" OpenAI tool call: press_button_sequence")
+                    args = json.loads(tool_call.function.arguments)
+                    logger.debug(f" Args: {args}")
+                    if 'actions' in args:
+                        actions = args['actions']
+                        logger.info(f" Extracted actions: {actions}")
+                        
+                        # Extract durations if provided
+                        if 'durations' in args:
+                            durations = args['durations']
+                            logger.info(f" Extracted durations: {durations}")
                         else:
-                            logger.warning(f" No 'actions' parameter found: {args}")
-                    # Legacy support
-                    elif tool_call.function.name == "press_button":
-                        logger.debug(f" OpenAI legacy tool call: press_button")
-                        args = json.loads(tool_call.function.arguments)
-                        logger.debug(f" Args: {args}")
-                        if 'button' in args:
-                            button = str(args['button'])
-                            actions = [button]
-                            durations = []
-                            logger.info(f" Extracted legacy button: {button}")
-                        elif 'actions' in args:
-                            actions = args['actions']
                             durations = []
-                            logger.info(f" Extracted legacy actions: {actions}")
-                        else:
-                            logger.warning(f" No 'button' or 'actions' parameter found: {args}")
-            else:
-                logger.warning(f" No tool calls found, using default: {actions}")
-            
-            return {
-                "text": response_text,
-                "actions": actions,
-                "durations": durations,
-                "success": True,
-                "error": None
-            }
-            
-        except Exception as e:
-            logger.error(f" OpenAI API error: {e}")
-            return self._fallback_response( str(e))
+                    else:
+                        logger.warning(f" No 'actions' parameter found: {args}")
+                # Legacy support
+                elif tool_call.function.name == "press_button":
+                    logger.debug(f" OpenAI legacy tool call: press_button")
+                    args = json.loads(tool_call.function.arguments)
+                    logger.debug(f" Args: {args}")
+                    if 'button' in args:
+                        button = str(args['button'])
+                        actions = [button]
+                        durations = []
+                        logger.info(f" Extracted legacy button: {button}")
+                    elif 'actions' in args:
+                        actions = args['actions']
+                        durations = []
+                        logger.info(f" Extracted legacy actions: {actions}")
+                    else:
+                        logger.warning(f" No 'button' or 'actions' parameter found: {args}")
+        else:
+            logger.warning(f" No tool calls found, using default: {actions}")
+        
+        return {
+            "text": response_text,
+            "actions": actions,
+            "durations": durations,
+            "success": True,
+            "error": None
+        }
+    
+    def _encode_images(self, *screenshot_paths: str) -> List[EncodedImage]:
+        """Enhance and encode screenshots for this provider, logging bytes, tokens and encode time"""
+        start = time.perf_counter()
+        image_cache = get_enhanced_image_cache()
+        images = [image_cache.get_encoded(path, self.image_encoder) for path in screenshot_paths]
+        self._record_image_payload(images, (time.perf_counter() - start) * 1000)
+        return images
+    
+    def _build_comparison_images(self, previous_screenshot: str, current_screenshot: str) -> ComparisonImages:
+        """Images and their description for a comparison prompt, in this provider's comparison mode"""
+        start = time.perf_counter()
+        comparison = self.comparison_builder.build(previous_screenshot, current_screenshot, get_enhanced_image_cache())
+        self._record_image_payload(comparison.images, (time.perf_counter() - start) * 1000, comparison.mode)
+        return comparison
+    
+    def _record_image_payload(self, images: List[EncodedImage], elapsed_ms: float, comparison_mode: str = None):
+        """Log and remember the bytes, tokens and encode time of the images about to be sent"""
+        self.last_image_payload = {
+            'images': len(images),
+            'comparison_mode': comparison_mode,
+            'format': self.image_encoder.format,
+            'bytes': sum(len(image.data) for image in images),
+            'image_tokens': sum(image.tokens for image in images),
+            'encode_ms': elapsed_ms,
+        }
+        sizes = ", ".join(f"{image.width}x{image.height} {len(image.data)}B" for image in images)
+        logger.info(f" Image payload: {self.last_image_payload['bytes']} bytes, "
+                    f"~{self.last_image_payload['image_tokens']} image tokens ({sizes}), "
+                    f"{self.image_encoder.format} encoded in {elapsed_ms:.1f}ms")
     
     def _enhance_image(self, image_path: str) -> PIL.Image.Image:
         """Enhance image for better AI vision based on example.py"""
-        try:
-            # Load the original image
-            original_image = PIL.Image.open(image_path)
-            
-            # Scale the image to 3x its original size for better detail recognition
-            scale_factor = 3
-            scaled_width = original_image.width * scale_factor
-            scaled_height = original_image.height * scale_factor
-            scaled_image = original_image.resize((scaled_width, scaled_height), PIL.Image.LANCZOS)
-            
-            # Enhance contrast for better visibility
-            contrast_enhancer = ImageEnhance.Contrast(scaled_image)
-            contrast_image = contrast_enhancer.enhance(1.5)  # Increase contrast by 50%
-            
-            # Enhance color saturation for better color visibility
-            saturation_enhancer = ImageEnhance.Color(contrast_image)
-            enhanced_image = saturation_enhancer.enhance(1.8)  # Increase saturation by 80%
-            
-            # Optionally enhance brightness slightly
-            brightness_enhancer = ImageEnhance.Brightness(enhanced_image)
-            final_image = brightness_enhancer.enhance(1.1)  # Increase brightness by 10%
-            
-            return final_image
-            
-        except Exception as e:
-            logger.warning(f" Image enhancement failed: {e}")
-            # Return original image if enhancement fails
-            return PIL.Image.open(image_path)
+        return enhance_for_llm(image_path)
     
     def _get_map_name(self, map_id: int) -> str:
         """Get map name from ID, with fallback for unknown maps"""
@@ -0,0 +1,140 @@
+"""
+A single non-blocking emulator connection driven by the service IOLoop.
+
+Each connection owns its protocol decoder and outbound queue.  Reads happen
+on the loop thread when the socket is readable; writes may be queued from
+any thread and are flushed by the loop without ever blocking it.
+"""
+
+import socket
+from typing import Callable, Dict, Any
+
+from core.logging_config import get_logger
+from .io_loop import IOLoop
+from .mgba_protocol import MessageDecoder, ProtocolError, encode_text
+from .outbound_queue import OutboundQueue
+logger = get_logger(__name__)
+
+
+class MGBAConnection:
+    """Non-blocking connection to one mGBA instance"""
+
+    def __init__(self, loop: IOLoop, sock: socket.socket, address,
+                 on_message: Callable, on_close: Callable):
+        self.loop = loop
+        self.sock = sock
+        self.address = address
+        self.decoder = MessageDecoder()
+        self.framing_active = False  # True once both sides agreed on the framed protocol
+        self.closed = False
+
+        self._on_message = on_message
+        self._on_close = on_close
+        self.outbound = OutboundQueue()
+        self._writer_registered = False
+
+        self.sock.setblocking(False)
+        self.loop.add_reader(self.sock, self._on_readable)
+
+    # Reading
+
+    def _on_readable(self):
+        """Drain everything the socket has buffered and dispatch complete messages"""
+        while not self.closed:
+            try:
+                nbytes = self.sock.recv_into(self.decoder.get_buffer())
+            except BlockingIOError:
+                break
+            except OSError as e:
+                logger.warning(f" Error receiving data: {e}")
+                self.close()
+                return
+
+            if not nbytes:
+                self.close()
+                return
+
+            self.decoder.buffer_updated(nbytes)
+            try:
+                for message in self.decoder.messages():
+                    self._on_message(self, message)
+            except ProtocolError as e:
+                logger.error(f" Protocol error from mGBA: {e}")
+                self.close()
+                return
+
+    # Writing
+
+    def send_text(self, text: str, request_id: int = 0):
+        """Queue a 'type||fields' message using the negotiated encoding"""
+        if self.framing_active:
+            self.write(encode_text(text, request_id))
+        else:
+            self.write(f"{text}\n".encode('utf-8'))
+
+    def write(self, data: bytes):
+        """Queue raw bytes for sending; safe to call from any thread.
+
+        Producer threads block while the queue is above its high-water mark
+        (raising OutboundQueueFull if mGBA stops draining). The loop thread
+        never blocks on its own queue.
+        """
+        if self.closed:
+            raise ConnectionError("mGBA connection closed")
+        in_loop = self.loop.in_loop_thread()
+        self.outbound.put(data, block=not in_loop)
+        if in_loop:
+            self._flush()
+        else:
+            self.loop.call_soon_threadsafe(self._flush)
+
+    def pending_bytes(self) -> int:
+        return self.outbound.queued_bytes
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self.outbound.get_metrics()
+
+    def _flush(self):
+        """Write coalesced batches until the socket would block; wait for writability for the rest"""
+        while not self.closed:
+            pending = self.outbound.next_write()
+            if pending is None:
+                break
+            try:
+                sent = self.sock.send(pending)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                logger.warning(f" Error sending to mGBA: {e}")
+                self.close()
+                return
+            finally:
+                pending.release()
+            self.outbound.consume(sent)
+
+        if self.closed:
+            return
+        if self.outbound.queued_bytes and not self._writer_registered:
+            self.loop.add_writer(self.sock, self._flush)
+            self._writer_registered = True
+        elif not self.outbound.queued_bytes and self._writer_registered:
+            self.loop.remove_writer(self.sock)
+            self._writer_registered = False
+
+    # Lifecycle
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.outbound.close()
+        try:
+            self.loop.remove_reader(self.sock)
+            self.loop.remove_writer(self.sock)
+        except (ValueError, KeyError, OSError):
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self._on_close(self)
@@ -0,0 +1,214 @@
+"""
+Framed socket protocol shared by AIGameService and emulator/script.lua.
+
+Every framed message starts with a fixed 12-byte header:
+
+    magic (u8, 0xFB) | version (u8) | type (u8) | reserved (u8) | request_id (u32) | length (u32)
+
+followed by ``length`` payload bytes.  All integers are big-endian.  0xFB can
+never start a UTF-8 text line, so framed messages and the legacy
+newline-terminated text protocol can be told apart from the first byte and
+both are accepted on the same connection.  See docs/SOCKET_PROTOCOL.md.
+
+The decoder follows the ``asyncio.BufferedProtocol`` shape: callers receive
+directly into ``get_buffer()`` (e.g. with ``socket.recv_into``), report the
+byte count through ``buffer_updated()`` and then drain ``messages()``.  Large
+payloads are received in place and handed out as memoryviews, so frames are
+parsed in a single pass without intermediate copies.
+"""
+
+import struct
+from typing import Iterator, Optional
+
+PROTOCOL_MAGIC = 0xFB
+PROTOCOL_VERSION = 1
+
+HEADER_FORMAT = '>BBBxII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+
+# Message types
+MSG_HELLO = 0   # Capability negotiation, payload is the protocol version as text
+MSG_TEXT = 1    # Payload is a UTF-8 'type||field||...' message
+MSG_FRAME = 2   # Payload is 'filename||width||height||format\n' followed by raw pixels
+
+# Capabilities advertised by script.lua in its 'ready' message
+FRAMING_CAPABILITY = f"framing={PROTOCOL_VERSION}"
+ACT_CAPTURE_CAPABILITY = "act_capture=1"  # Understands 'act_then_capture||...'
+SEQUENCE_DONE_CAPABILITY = "sequence_done=1"  # Sends 'sequence_done||startFrame||endFrame||buttonCount'
+STATE_STREAM_CAPABILITY = "state_stream=1"  # Pushes 'st||frame||key=value...' deltas after 'subscribe_state||N'
+SCREENSHOT_DIR_CAPABILITY = "screenshot_dir=1"  # Writes screenshots to the directory given by 'set_screenshot_dir||path'
+
+
+class ProtocolError(Exception):
+    """Raised when the peer sends a malformed framed message"""
+    pass
+
+
+class Message:
+    """A decoded protocol message.
+
+    ``payload`` is a memoryview into the decoder buffer and is only valid until
+    the next ``get_buffer()`` call; copy it if it needs to outlive that.
+    """
+
+    __slots__ = ('msg_type', 'request_id', 'text', 'payload', 'framed')
+
+    def __init__(self, msg_type: int, request_id: int = 0, text: str = "",
+                 payload: Optional[memoryview] = None, framed: bool = True):
+        self.msg_type = msg_type
+        self.request_id = request_id
+        self.text = text
+        self.payload = payload
+        self.framed = framed
+
+    def __repr__(self):
+        size = len(self.payload) if self.payload is not None else 0
+        return f"Message(type={self.msg_type}, request_id={self.request_id}, text={self.text[:40]!r}, payload={size} bytes)"
+
+
+def encode_message(msg_type: int, payload: bytes = b"", request_id: int = 0) -> bytes:
+    """Encode a framed message"""
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        raise ProtocolError(f"Payload too large: {len(payload)} bytes")
+    return struct.pack(HEADER_FORMAT, PROTOCOL_MAGIC, PROTOCOL_VERSION, msg_type, request_id, len(payload)) + payload
+
+
+def encode_text(text: str, request_id: int = 0) -> bytes:
+    """Encode a 'type||fields' message as a framed TEXT message"""
+    return encode_message(MSG_TEXT, text.encode('utf-8'), request_id)
+
+
+def encode_hello() -> bytes:
+    return encode_message(MSG_HELLO, str(PROTOCOL_VERSION).encode('utf-8'))
+
+
+class MessageDecoder:
+    """Incremental decoder for framed and legacy text messages"""
+
+    def __init__(self, initial_size: int = 65536):
+        self._buffer = bytearray(initial_size)
+        self._read_pos = 0
+        self._write_pos = 0
+        self._scan_pos = 0      # Where the next newline search resumes for text lines
+        self._raw_meta = None   # Legacy 'frame_data' header waiting for its raw payload
+        self._raw_length = 0
+
+    def get_buffer(self, min_size: int = 4096) -> memoryview:
+        """Return a writable view of at least ``min_size`` free bytes"""
+        needed = max(min_size, self._pending_size() - self._buffered())
+        if len(self._buffer) - self._write_pos < needed:
+            self._make_room(needed)
+        return memoryview(self._buffer)[self._write_pos:]
+
+    def buffer_updated(self, nbytes: int):
+        """Record that ``nbytes`` were written into the last buffer"""
+        self._write_pos += nbytes
+
+    def feed(self, data: bytes):
+        """Copy ``data`` into the buffer (for callers without recv_into)"""
+        view = self.get_buffer(len(data))
+        view[:len(data)] = data
+        self.buffer_updated(len(data))
+
+    def messages(self) -> Iterator[Message]:
+        """Yield every complete message currently buffered"""
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+            yield message
+
+    def _buffered(self) -> int:
+        return self._write_pos - self._read_pos
+
+    def _pending_size(self) -> int:
+        """Total size of the partially received message, if known"""
+        if self._raw_meta is not None:
+            return self._raw_length
+        if self._buffered() >= HEADER_SIZE and self._buffer[self._read_pos] == PROTOCOL_MAGIC:
+            _, _, _, _, length = struct.unpack_from(HEADER_FORMAT, self._buffer, self._read_pos)
+            return HEADER_SIZE + length
+        return 0
+
+    def _make_room(self, needed: int):
+        """Compact unread bytes to the front, growing the buffer only if required"""
+        unread = self._buffered()
+        if len(self._buffer) >= unread + needed:
+            self._buffer[:unread] = self._buffer[self._read_pos:self._write_pos]
+        else:
+            new_buffer = bytearray(max(len(self._buffer) * 2, unread + needed))
+            new_buffer[:unread] = self._buffer[self._read_pos:self._write_pos]
+            self._buffer = new_buffer
+        self._scan_pos -= self._read_pos
+        self._read_pos = 0
+        self._write_pos = unread
+
+    def _next_message(self) -> Optional[Message]:
+        if self._raw_meta is not None:
+            return self._next_raw_payload()
+        if self._buffered() == 0:
+            return None
+        if self._buffer[self._read_pos] == PROTOCOL_MAGIC:
+            return self._next_framed()
+        return self._next_text_line()
+
+    def _next_framed(self) -> Optional[Message]:
+        if self._buffered() < HEADER_SIZE:
+            return None
+
+        _, version, msg_type, request_id, length = struct.unpack_from(HEADER_FORMAT, self._buffer, self._read_pos)
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"Unsupported protocol version: {version}")
+        if length > MAX_PAYLOAD_SIZE:
+            raise ProtocolError(f"Payload too large: {length} bytes")
+        if self._buffered() < HEADER_SIZE + length:
+            return None
+
+        start = self._read_pos + HEADER_SIZE
+        end = start + length
+        self._read_pos = self._scan_pos = end
+        payload = memoryview(self._buffer)[start:end]
+
+        if msg_type == MSG_FRAME:
+            meta, pixels = self._split_frame_payload(payload)
+            return Message(MSG_FRAME, request_id, meta, pixels)
+        return Message(msg_type, request_id, bytes(payload).decode('utf-8', errors='replace'))
+
+    def _next_text_line(self) -> Optional[Message]:
+        newline_index = self._buffer.find(b'\n', max(self._scan_pos, self._read_pos), self._write_pos)
+        if newline_index == -1:
+            self._scan_pos = self._write_pos
+            return None
+
+        line = bytes(self._buffer[self._read_pos:newline_index]).decode('utf-8', errors='replace').strip()
+        self._read_pos = self._scan_pos = newline_index + 1
+
+        if line.startswith("frame_data||"):
+            # Legacy in-band frame: 'frame_data||filename||width||height||format||length' + raw bytes
+            meta, _, length = line[len("frame_data||"):].rpartition("||")
+            try:
+                self._raw_length = int(length)
+            except ValueError:
+                raise ProtocolError(f"Invalid frame_data header: {line}")
+            self._raw_meta = meta
+            return self._next_raw_payload()
+
+        return Message(MSG_TEXT, 0, line, framed=False)
+
+    def _next_raw_payload(self) -> Optional[Message]:
+        if self._buffered() < self._raw_length:
+            return None
+        start = self._read_pos
+        self._read_pos = self._scan_pos = start + self._raw_length
+        meta, self._raw_meta = self._raw_meta, None
+        return Message(MSG_FRAME, 0, meta, memoryview(self._buffer)[start:self._read_pos], framed=False)
+
+    @staticmethod
+    def _split_frame_payload(payload: memoryview):
+        """Split a FRAME payload into its metadata line and pixel view"""
+        head = bytes(payload[:256])
+        newline_index = head.find(b'\n')
+        if newline_index == -1:
+            raise ProtocolError("FRAME payload missing metadata line")
+        return head[:newline_index].decode('utf-8', errors='replace'), payload[newline_index + 1:]
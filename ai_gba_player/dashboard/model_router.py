@@ -0,0 +1,131 @@
+"""
+Per-cycle choice between a fast and a strong model.
+
+Every decision used the single configured ``model_name``, even on screens
+where the answer is nearly always "press A to advance the text".  With
+``providers.<name>.model_routing`` enabled, PlayerAgent picks a tier before
+each LLM call:
+
+``fast``
+    ``fast_model`` for screens listed in ``fast_screens`` (by default
+    dialogue, menus and transitions, as labelled by the screen classifier).
+``strong``
+    The provider's ``model_name`` for everything else (overworld navigation,
+    battles, unclassified screens), and for any screen once
+    ``PlayerAgent.consecutive_errors`` reaches ``escalate_after_errors``.
+
+ModelTierStats records latency, estimated tokens and success of every routed
+decision per tier, so the policy can be tuned from real numbers.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .screen_classifier import SCREEN_DIALOGUE, SCREEN_MENU, SCREEN_TRANSITION
+
+TIER_FAST = 'fast'
+TIER_STRONG = 'strong'
+
+DEFAULT_MODEL_ROUTING = {
+    'enabled': False,
+    'fast_model': '',
+    'fast_screens': [SCREEN_DIALOGUE, SCREEN_MENU, SCREEN_TRANSITION],
+    'escalate_after_errors': 2,
+}
+
+
+class ModelRoute:
+    """Tier and model chosen for one decision, and why"""
+
+    __slots__ = ('tier', 'model', 'reason')
+
+    def __init__(self, tier: str, model: str, reason: str):
+        self.tier = tier
+        self.model = model
+        self.reason = reason
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'tier': self.tier, 'model': self.model, 'reason': self.reason}
+
+
+class ModelRouter:
+    """Routes decisions to the fast or strong model by screen type and recent errors"""
+
+    def __init__(self, strong_model: str, fast_model: str = '', fast_screens: Optional[List[str]] = None,
+                 escalate_after_errors: int = 2, enabled: bool = False):
+        self.strong_model = strong_model
+        self.fast_model = fast_model
+        self.fast_screens = set(fast_screens if fast_screens is not None else DEFAULT_MODEL_ROUTING['fast_screens'])
+        self.escalate_after_errors = escalate_after_errors
+        self.enabled = enabled and bool(fast_model)
+
+    @classmethod
+    def from_config(cls, strong_model: str, settings: Optional[Dict[str, Any]] = None) -> 'ModelRouter':
+        """Build a router from ``providers.<name>.model_routing`` settings"""
+        merged = {**DEFAULT_MODEL_ROUTING, **(settings or {})}
+        return cls(strong_model=strong_model, **{name: merged[name] for name in DEFAULT_MODEL_ROUTING})
+
+    def route(self, screen_type: Optional[str], consecutive_errors: int = 0) -> ModelRoute:
+        if not self.enabled:
+            return ModelRoute(TIER_STRONG, self.strong_model, 'routing disabled')
+        if consecutive_errors >= self.escalate_after_errors:
+            return ModelRoute(TIER_STRONG, self.strong_model, f'{consecutive_errors} consecutive errors')
+        if screen_type in self.fast_screens:
+            return ModelRoute(TIER_FAST, self.fast_model, f'{screen_type} screen')
+        return ModelRoute(TIER_STRONG, self.strong_model, f'{screen_type or "unknown"} screen')
+
+
+class ModelTierStats:
+    """Thread-safe per tier decision counts, success rate, latency and token estimates"""
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: ModelRoute, elapsed: float, tokens: int, success: bool):
+        with self._lock:
+            stats = self._tiers.get(route.tier)
+            if stats is None:
+                stats = {'decisions': 0, 'successes': 0, 'tokens': 0, 'models': {},
+                         'latencies': deque(maxlen=self.max_samples)}
+                self._tiers[route.tier] = stats
+            stats['decisions'] += 1
+            stats['successes'] += int(success)
+            stats['tokens'] += tokens
+            stats['models'][route.model] = stats['models'].get(route.model, 0) + 1
+            stats['latencies'].append(elapsed)
+
+    def clear(self):
+        with self._lock:
+            self._tiers.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {}
+        with self._lock:
+            for tier, stats in self._tiers.items():
+                latencies = sorted(stats['latencies'])
+                metrics[tier] = {
+                    'decisions': stats['decisions'],
+                    'successes': stats['successes'],
+                    'success_rate': round(stats['successes'] / stats['decisions'], 3),
+                    'models': dict(stats['models']),
+                    'tokens': stats['tokens'],
+                    'avg_tokens': round(stats['tokens'] / stats['decisions'], 1),
+                    'avg_latency_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+                    'p90_latency_ms': round(latencies[int(0.9 * (len(latencies) - 1))] * 1000, 1),
+                }
+        return metrics
+
+
+# Global per-tier statistics
+_tier_stats = None
+
+
+def get_model_tier_stats() -> ModelTierStats:
+    """Get the global model tier statistics instance"""
+    global _tier_stats
+    if _tier_stats is None:
+        _tier_stats = ModelTierStats()
+    return _tier_stats
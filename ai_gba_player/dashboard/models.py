@@ -390,12 +390,42 @@ class Configuration(models.Model):
                 'google': {
                     'api_key': '',
                     'model_name': 'gemini-2.5-pro',
-                    'max_tokens': 65536
+                    'max_tokens': 65536,
+                    'decision_deadline_seconds': 120,  # Whole decision, retries included; each request is also capped by llm_timeout_seconds
+                    'hedging': {
+                        'enabled': False,  # Race a backup request when the primary one is slower than usual
+                        'percentile': 90,  # Send the backup after this percentile of the model's observed latency
+                        'min_samples': 20,  # Latency samples needed before the percentile is used
+                        'initial_delay_seconds': 10,  # Delay until then
+                        'backup_provider': 'openai',  # First valid press_button_sequence wins, the other is cancelled
+                        'backup_model': ''  # Empty = the backup provider's model_name
+                    },
+                    'model_routing': {
+                        'enabled': False,  # Opt-in; model_name stays the strong model for navigation and battles
+                        'fast_model': 'gemini-2.5-flash',  # Cheaper, faster model for the screens below
+                        'fast_screens': ['dialogue', 'menu', 'transition'],
+                        'escalate_after_errors': 2  # Back to the strong model after this many failed decisions in a row
+                    },
+                    'image_encoding': {
+                        'format': 'png',  # 'png', 'webp' or 'jpeg'
+                        'resolution': 'upscaled',  # 'upscaled' or 'native'
+                        'palette_colors': 0,  # Quantize PNGs to N colours (0 = full colour)
+                        'quality': 85,  # JPEG/WebP quality
+                        'max_bytes': None,  # Per-image byte budget
+                        'max_image_tokens': None  # Per-image token budget
+                    },
+                    'comparison_images': {
+                        'mode': 'full',  # 'full', or opt-in 'roi' (crop of the changed area) / 'stitched'
+                        'outline': True,  # Outline the changed tiles
+                        'margin_tiles': 1,  # 8x8 tiles of context around the changed area
+                        'max_region_fraction': 0.6  # Send full frames when more of the screen changed
+                    }
                 },
                 'openai': {
                     'api_key': '',
                     'model_name': 'gpt-4',
-                    'max_tokens': 1024
+                    'max_tokens': 1024,
+                    'decision_deadline_seconds': 120
                 },
                 'anthropic': {
                     'api_key': '',
@@ -420,12 +450,36 @@ class Configuration(models.Model):
                 'screen_capture_method': 'auto',
                 'capture_region': None,
                 'capture_fps': 30,
+                'transfer_mode': 'file',  # 'file' (PNG on disk) or 'socket' (raw framebuffer in-band)
+                'screenshot_storage': {
+                    'backend': 'disk',  # 'disk', 'tmpfs' (/dev/shm) or 'memory' (socket transfer only, no files)
+                    'disk_dir': '',  # Empty: data/screenshots in the project root
+                    'tmpfs_dir': '/dev/shm/ai_gba_player/screenshots'
+                },
                 'frame_enhancement': {
+                    'backend': 'pil',  # 'pil' (LANCZOS + ImageEnhance chain) or opt-in 'numpy' (fused lookup table, nearest-neighbour: faster, sharper pixel edges)
                     'scale_factor': 3,
                     'contrast': 1.5,
                     'saturation': 1.8,
                     'brightness': 1.1
                 },
+                'session_archive': {
+                    'enabled': False,  # One append-only file per run: deduplicated frames, states, responses, timings
+                    'directory': '',  # Empty: data/sessions in the project root
+                    'max_sessions': 20  # Older archives are deleted when a run starts
+                },
+                'frame_change_detection': {
+                    'enabled': True,
+                    'tile_tolerance': 8.0,  # Max per-channel mean difference for an 8x8 tile to count as unchanged
+                    'change_threshold': 0.0,  # Fraction of tiles that may differ with the screen still counting as unchanged
+                    'unchanged_policy': 'single_image',  # 'single_image' or 'skip' when screen and RAM state are unchanged
+                    'max_skipped_cycles': 3
+                },
+                'decision_cache': {
+                    'enabled': False,  # Opt-in; reuse decisions for recurring screens (perceptual hash + map, x/y, direction, prompt and context)
+                    'max_entries': 256,
+                    'ttl_seconds': 300  # Decisions that leave screen and position unchanged are dropped early
+                },
                 'video_analysis': {
                     'frame_sampling': 'keyframes',
                     'max_analysis_frames': 5,
@@ -406,26 +406,33 @@ class NarrationAgent:
     def _call_text_llm(self, prompt: str) -> str:
         """Call LLM provider with text-only prompt"""
         if self.llm_client.provider == 'google':
-            import google.generativeai as genai
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.8,  # Creative but not too random
-                    max_output_tokens=300,  # Keep narration concise
-                    top_p=0.9
-                )
+            # Model handle shared through the provider session, built once with its generation config
+            model = self.llm_client.provider_session.google_model(
+                'gemini-2.0-flash-exp',
+                generation_config={
+                    'temperature': 0.8,  # Creative but not too random
+                    'max_output_tokens': 300,  # Keep narration concise
+                    'top_p': 0.9
+                }
+            )
+            response = self.llm_client.call_with_deadline(
+                lambda timeout: model.generate_content(prompt, request_options={'timeout': timeout}),
+                model_name='gemini-2.0-flash-exp'
             )
             return response.text if response and response.text else ""
         
         elif self.llm_client.provider == 'openai':
-            response = self.llm_client.openai_client.chat.completions.create(
-                model="gpt-4o-mini",  # Use mini for cost-effective narration
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=300
+            response = self.llm_client.call_with_deadline(
+                lambda timeout: self.llm_client.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",  # Use mini for cost-effective narration
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=300,
+                    timeout=timeout
+                ),
+                model_name="gpt-4o-mini"
             )
             return response.choices[0].message.content if response.choices else ""
         
@@ -0,0 +1,147 @@
+"""
+Outbound message queue for an emulator connection.
+
+All commands for mGBA (button sequences from the PlayerAgent thread,
+screenshot requests and game_config from the service thread) go through one
+queue per connection, drained only by the event loop:
+
+- writes keep ``sendall`` semantics: a partially sent batch is resumed from
+  its offset, never dropped or interleaved with other messages
+- adjacent queued messages are coalesced into a single ``send`` syscall
+- producers block once ``high_water`` bytes are queued and resume when the
+  emulator drains below ``low_water`` (backpressure)
+- queue depth and enqueue-to-written latency are tracked for metrics
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class OutboundQueueFull(Exception):
+    """Raised when the emulator stops draining and the queue stays above its high-water mark"""
+    pass
+
+
+class OutboundQueue:
+    """Thread-safe byte queue with coalescing, backpressure and latency metrics"""
+
+    def __init__(self, high_water: int = 64 * 1024, low_water: int = 16 * 1024,
+                 max_batch_bytes: int = 64 * 1024, latency_window: int = 100):
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_batch_bytes = max_batch_bytes
+
+        self._chunks = deque()        # (data, enqueue_time) waiting to be batched
+        self._queued_bytes = 0        # Bytes in _chunks plus the unsent part of the current batch
+        self._batch = None            # memoryview of the batch being written
+        self._batch_offset = 0
+        self._batch_times = []        # Enqueue times of the messages in the current batch
+        self._closed = False
+
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+
+        # Metrics
+        self._latencies = deque(maxlen=latency_window)
+        self.messages_written = 0
+        self.bytes_written = 0
+        self.write_syscalls = 0
+        self.max_depth = 0
+        self.backpressure_waits = 0
+
+    def put(self, data: bytes, block: bool = True, timeout: Optional[float] = 5.0):
+        """Queue one message, waiting for the writer to drain if the queue is full"""
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("Outbound queue closed")
+
+            if block and self._queued_bytes >= self.high_water:
+                self.backpressure_waits += 1
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self._queued_bytes > self.low_water and not self._closed:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise OutboundQueueFull(f"mGBA not draining commands ({self._queued_bytes} bytes queued)")
+                    self._drained.wait(remaining)
+                if self._closed:
+                    raise ConnectionError("Outbound queue closed")
+
+            self._chunks.append((bytes(data), time.monotonic()))
+            self._queued_bytes += len(data)
+            self.max_depth = max(self.max_depth, len(self._chunks))
+
+    def next_write(self) -> Optional[memoryview]:
+        """Return the unsent bytes of the current batch, coalescing queued messages into a new batch if needed"""
+        with self._lock:
+            if self._batch is None:
+                if not self._chunks:
+                    return None
+                parts = []
+                size = 0
+                # Always take at least one message, then coalesce up to max_batch_bytes
+                while self._chunks and (not parts or size + len(self._chunks[0][0]) <= self.max_batch_bytes):
+                    data, enqueued_at = self._chunks.popleft()
+                    parts.append(data)
+                    self._batch_times.append(enqueued_at)
+                    size += len(data)
+                self._batch = memoryview(b"".join(parts))
+                self._batch_offset = 0
+            return self._batch[self._batch_offset:]
+
+    def consume(self, nbytes: int):
+        """Record that ``nbytes`` of the current batch were written"""
+        with self._lock:
+            self.write_syscalls += 1
+            self.bytes_written += nbytes
+            self._batch_offset += nbytes
+            self._queued_bytes -= nbytes
+
+            if self._batch is not None and self._batch_offset >= len(self._batch):
+                now = time.monotonic()
+                for enqueued_at in self._batch_times:
+                    self._latencies.append(now - enqueued_at)
+                self.messages_written += len(self._batch_times)
+                self._batch = None
+                self._batch_times = []
+
+            if self._queued_bytes <= self.low_water:
+                self._drained.notify_all()
+
+    def close(self):
+        """Drop queued data and release any blocked producers"""
+        with self._lock:
+            self._closed = True
+            self._chunks.clear()
+            self._batch = None
+            self._batch_times = []
+            self._queued_bytes = 0
+            self._drained.notify_all()
+
+    @property
+    def queued_bytes(self) -> int:
+        with self._lock:
+            return self._queued_bytes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._chunks) + (1 if self._batch is not None else 0)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, throughput and write latency (seconds) for the service metrics"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            depth = len(self._chunks) + (len(self._batch_times) if self._batch is not None else 0)
+            return {
+                'queue_depth': depth,
+                'queued_bytes': self._queued_bytes,
+                'max_queue_depth': self.max_depth,
+                'messages_written': self.messages_written,
+                'bytes_written': self.bytes_written,
+                'write_syscalls': self.write_syscalls,
+                'backpressure_waits': self.backpressure_waits,
+                'write_latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+                'write_latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                'write_latency_max': latencies[-1] if latencies else 0.0,
+            }
@@ -0,0 +1,176 @@
+"""
+Registry of in-flight requests to mGBA.
+
+The service thread registers a future when it asks mGBA for something (e.g. a
+screenshot) and completes it when the matching response is parsed.  Other
+threads such as the PlayerAgent block on the future instead of polling the
+filesystem, so they wake up as soon as the response arrives.
+
+Requests are keyed by the correlation id carried in the framed protocol
+header, so several can be outstanding at once and a late reply is matched to
+the request that caused it.  Round-trip latency, timeouts and cancellations
+are recorded for the service metrics.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from core.logging_config import get_logger
+logger = get_logger(__name__)
+
+
+class _PendingEntry:
+    """A registered request: its future, caller context and send time"""
+
+    __slots__ = ('future', 'context', 'sent_at')
+
+    def __init__(self, context: Any):
+        self.future = Future()
+        self.context = context
+        self.sent_at = time.monotonic()
+
+
+class PendingRequests:
+    """Thread-safe map of request key -> Future"""
+
+    def __init__(self, max_pending: int = 32, latency_window: int = 100):
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        # Recently resolved requests, so a waiter that arrives after the reply still gets it
+        self._resolved = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._latencies = deque(maxlen=latency_window)
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def register(self, key: Hashable, context: Any = None) -> Future:
+        """Register a new pending request, replacing any previous one with the same key"""
+        entry = _PendingEntry(context)
+        stale = []
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            if previous is not None:
+                stale.append(previous)
+            self._resolved.pop(key, None)
+            self._pending[key] = entry
+            # Drop the oldest requests nobody completed (e.g. lost responses)
+            while len(self._pending) > self.max_pending:
+                _, oldest = self._pending.popitem(last=False)
+                stale.append(oldest)
+            self.cancelled += len(stale)
+        for old in stale:
+            old.future.cancel()
+        return entry.future
+
+    def get(self, key: Hashable) -> Optional[Future]:
+        with self._lock:
+            entry = self._pending.get(key)
+        return entry.future if entry is not None else None
+
+    def context(self, key: Hashable) -> Any:
+        """Context passed to ``register`` for a pending or recently resolved request"""
+        with self._lock:
+            entry = self._pending.get(key) or self._resolved.get(key)
+        return entry.context if entry is not None else None
+
+    def oldest(self) -> Optional[Tuple[Hashable, Any]]:
+        """(key, context) of the oldest outstanding request, for peers that reply in order without ids"""
+        with self._lock:
+            for key, entry in self._pending.items():
+                return key, entry.context
+        return None
+
+    def complete(self, key: Hashable, result: Any = None) -> bool:
+        """Resolve a pending request; returns False if nothing was waiting for it"""
+        entry = self._resolve(key)
+        if entry is None or entry.future.done():
+            return False
+        with self._lock:
+            self.completed += 1
+            self._latencies.append(time.monotonic() - entry.sent_at)
+        entry.future.set_result(result)
+        return True
+
+    def fail(self, key: Hashable, error: Exception) -> bool:
+        """Fail a pending request so its waiter wakes up immediately"""
+        entry = self._resolve(key)
+        if entry is None or entry.future.done():
+            return False
+        with self._lock:
+            self.failed += 1
+        entry.future.set_exception(error)
+        return True
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancel one pending request, e.g. when its caller gives up"""
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                self.cancelled += 1
+        return entry is not None and entry.future.cancel()
+
+    def wait(self, key: Hashable, timeout: float) -> Any:
+        """Block until the request completes.
+
+        Raises TimeoutError, CancelledError or the error passed to ``fail``.
+        """
+        with self._lock:
+            entry = self._pending.get(key) or self._resolved.get(key)
+        if entry is None:
+            raise KeyError(key)
+        try:
+            return entry.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+                    self.timeouts += 1
+            entry.future.cancel()
+            raise TimeoutError(f"No response for {key} after {timeout}s")
+
+    def cancel_all(self):
+        """Cancel every pending request, e.g. when mGBA disconnects"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self.cancelled += len(pending)
+        for entry in pending:
+            entry.future.cancel()
+        if pending:
+            logger.debug(f" Cancelled {len(pending)} pending mGBA requests")
+
+    def _resolve(self, key: Hashable) -> Optional[_PendingEntry]:
+        """Move a request from pending to the recently-resolved cache"""
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                self._resolved[key] = entry
+                while len(self._resolved) > self.max_pending:
+                    self._resolved.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """In-flight count, outcomes and round-trip latency (seconds)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'in_flight': len(self._pending),
+                'completed': self.completed,
+                'failed': self.failed,
+                'timeouts': self.timeouts,
+                'cancelled': self.cancelled,
+                'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+                'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                'latency_max': latencies[-1] if latencies else 0.0,
+            }
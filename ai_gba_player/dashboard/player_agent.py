@@ -13,6 +13,16 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple, Callable
 from .llm_client import LLMClient
 from .models import Configuration
+from .frame_store import frame_exists
+from .frame_ring import get_frame_ring
+from .session_archive import open_session_archive, context_hash
+from .llm_calls import Deadline, DEFAULT_DECISION_DEADLINE_SECONDS
+from .decision_cache import get_decision_cache, decision_key, DEFAULT_DECISION_CACHE
+from .model_router import ModelRouter, ModelRoute, get_model_tier_stats
+from .frame_change import (
+    FrameChangeDetector, DEFAULT_FRAME_CHANGE_DETECTION, UNCHANGED_POLICIES,
+    UNCHANGED_POLICY_SINGLE_IMAGE, UNCHANGED_POLICY_SKIP, perceptual_hash
+)
 
 
 class PlayerResponse:
@@ -66,6 +76,7 @@ class PlayerAgent:
         self.retry_backoff_delay = 2.0  # seconds between retries
         self.consecutive_errors = 0
         self.success_rate_tracking = {'successes': 0, 'failures': 0}
+        self.current_deadline = None  # Deadline of the decision in progress, cancelled on stop
         
         # Memory system integration
         self.memory_system = None
@@ -91,16 +102,37 @@ class PlayerAgent:
         self.autonomous_thread = None
         self.running = False
         
-        # Screenshot tracking and management
-        self.screenshot_map = {}  # {filename: creation_time}
-        self.screenshot_counter = 0
+        # Screenshot tracking: ring shared with AIGameService, which registers frames as mGBA reports them
+        self.frame_ring = get_frame_ring()
         self.current_screenshot_path = None
         
+        # Frame-change signal for each registered screenshot
+        self.frame_change_settings = dict(DEFAULT_FRAME_CHANGE_DETECTION)
+        self.frame_change_detector = FrameChangeDetector()
+        self.skipped_unchanged_cycles = 0
+        
+        # Decisions reused for recurring screens and positions (capture_system.decision_cache)
+        self.decision_cache = get_decision_cache()
+        self.decision_cache_settings = dict(DEFAULT_DECISION_CACHE)
+        self.last_decision_key = None  # Key of the decision being acted on, checked once its actions settle
+        self.last_response_side_effects = False  # Last LLM response made tool calls that must not be skipped
+        
+        # Model tier used for the last decision (providers.<name>.model_routing)
+        self.last_model_route = None
+        self.last_decision_client = None
+        
+        # Per-run archive of frames, states and responses (capture_system.session_archive)
+        self.session_archive = None
+        self.last_context_hash = None
+        
         # Communication interfaces
         self.narration_queue = None  # Queue for sending responses to NarrationAgent
         self.chat_message_sender = None  # Callback for sending messages to frontend
         self.screenshot_requester = None  # Callback for requesting screenshots from mGBA
         self.button_sender = None  # Callback for sending button commands to mGBA
+        self.action_capturer = None  # Optional callback: press buttons and return the settled screenshot
+        self.sequence_waiter = None  # Optional callback: wait for mGBA's sequence_done
+        self.state_reader = None  # Optional callback: game state mGBA reported with a screenshot
         
         # Game cycle management
         self.decision_count = 0
@@ -135,6 +167,21 @@ class PlayerAgent:
         self.button_sender = button_sender
         print("🎮 PlayerAgent connected to button sender")
     
+    def set_action_capturer(self, action_capturer: Callable[[List[str], Optional[List[int]]], Optional[str]]):
+        """Set callback that presses buttons and returns the screenshot mGBA takes once they settle"""
+        self.action_capturer = action_capturer
+        print("🎮 PlayerAgent connected to act-then-capture")
+    
+    def set_sequence_waiter(self, sequence_waiter: Callable[[List[str], Optional[List[int]]], bool]):
+        """Set callback that blocks until mGBA reports the button sequence finished"""
+        self.sequence_waiter = sequence_waiter
+        print("🎮 PlayerAgent connected to sequence_done notifications")
+    
+    def set_state_reader(self, state_reader: Callable[[str], Optional[Dict[str, Any]]]):
+        """Set callback that returns the game state mGBA reported with a screenshot"""
+        self.state_reader = state_reader
+        print("🎮 PlayerAgent connected to screenshot game state")
+    
     def start_autonomous_play(self, initial_screenshot: str, initial_game_state: Dict[str, Any]):
         """Start autonomous gameplay in a separate thread"""
         if self.autonomous_mode:
@@ -148,6 +195,12 @@ class PlayerAgent:
         self.autonomous_mode = True
         self.running = True
         self.current_screenshot_path = initial_screenshot
+        config = self._load_config()
+        self._configure_frame_change_detection(config)
+        self._configure_decision_cache(config)
+        self.session_archive = open_session_archive(
+            ((config or {}).get('capture_system') or {}).get('session_archive'),
+            metadata={'llm_provider': (config or {}).get('llm_provider'), 'game': (config or {}).get('game')})
         
         # Register initial screenshot
         self._register_screenshot(initial_screenshot)
@@ -170,6 +223,10 @@ class PlayerAgent:
         self.running = False
         self.autonomous_mode = False
         
+        # Abandon an in-flight LLM request instead of waiting for it
+        if self.current_deadline:
+            self.current_deadline.cancel()
+        
         if self.autonomous_thread and self.autonomous_thread.is_alive():
             self.autonomous_thread.join(timeout=5.0)
         
@@ -179,6 +236,7 @@ class PlayerAgent:
         """Main autonomous game loop - runs in separate thread"""
         current_screenshot = initial_screenshot
         current_game_state = initial_game_state.copy()
+        previous_game_state = None
         
         try:
             # Send initial screenshot message
@@ -191,6 +249,19 @@ class PlayerAgent:
                     # Get previous screenshot for comparison
                     previous_screenshot = self._get_previous_screenshot_path(current_screenshot)
                     
+                    # Screen and RAM state both unchanged - the 'skip' policy waits instead of calling the LLM
+                    if previous_screenshot and self._should_skip_unchanged_cycle(current_screenshot, previous_game_state, current_game_state):
+                        print(f"⏭️ PlayerAgent: Screen and game state unchanged - skipping LLM call ({self.skipped_unchanged_cycles}/{self.frame_change_settings['max_skipped_cycles']})")
+                        config = self._load_config()
+                        time.sleep(config.get('decision_cooldown', 3) if config else 3)
+                        next_screenshot = self._request_next_screenshot() if self.running else None
+                        if next_screenshot:
+                            current_screenshot = next_screenshot
+                            self._register_screenshot(current_screenshot)
+                            previous_game_state = current_game_state
+                            current_game_state = self._read_game_state(current_screenshot, current_game_state)
+                        continue
+                    
                     # Send screenshot messages to frontend
                     if previous_screenshot and previous_screenshot != current_screenshot:
                         self._send_screenshot_comparison_message(previous_screenshot, current_screenshot, current_game_state)
@@ -198,9 +269,12 @@ class PlayerAgent:
                         self._send_single_screenshot_message(current_screenshot, current_game_state)
                     
                     # Make AI decision
+                    decision_start = time.time()
                     player_response = self._make_autonomous_decision(
                         current_screenshot, current_game_state, previous_screenshot
                     )
+                    decision_time = time.time() - decision_start
+                    decided_screenshot, decided_game_state = current_screenshot, current_game_state
                     
                     # Update session context with decision outcome
                     self._update_session_context(player_response, current_game_state)
@@ -223,19 +297,30 @@ class PlayerAgent:
                             print("⚠️ PlayerAgent: Narration queue full - dropping narration request")
                     
                     # Execute actions if any
+                    actions_start = time.time()
+                    next_screenshot = None
                     if player_response.actions and player_response.success:
-                        self._execute_actions(player_response.actions, player_response.durations)
+                        # mGBA captures once the sequence has settled, no guessed delay needed
+                        next_screenshot = self._execute_actions_and_capture(player_response.actions, player_response.durations)
                         
-                        # Wait for game to process actions
-                        action_delay = self._calculate_action_delay(player_response.actions, player_response.durations)
-                        time.sleep(action_delay)
+                        if next_screenshot is None:
+                            self._execute_actions(player_response.actions, player_response.durations)
+                            
+                            # Wait for game to process actions (guessed delay only if mGBA cannot report it)
+                            if not self._wait_for_actions(player_response.actions, player_response.durations):
+                                action_delay = self._calculate_action_delay(player_response.actions, player_response.durations)
+                                time.sleep(action_delay)
                     
                     # Request next screenshot for next cycle
                     if self.running:  # Check if we're still running
-                        next_screenshot = self._request_next_screenshot()
+                        if not next_screenshot:
+                            next_screenshot = self._request_next_screenshot()
                         if next_screenshot:
                             current_screenshot = next_screenshot
                             self._register_screenshot(current_screenshot)
+                            previous_game_state = current_game_state
+                            current_game_state = self._read_game_state(current_screenshot, current_game_state)
+                            self._invalidate_ineffective_decision(current_screenshot, current_game_state)
                     
                     # Performance tracking
                     cycle_time = time.time() - cycle_start
@@ -243,6 +328,12 @@ class PlayerAgent:
                     if len(self.cycle_times) > self.max_cycle_history:
                         self.cycle_times = self.cycle_times[-self.max_cycle_history:]
                     
+                    self._archive_cycle(decided_screenshot, previous_screenshot, decided_game_state, player_response, {
+                        'decision_ms': round(decision_time * 1000, 1),
+                        'actions_ms': round((time.time() - actions_start) * 1000, 1),
+                        'cycle_ms': round(cycle_time * 1000, 1),
+                    })
+                    
                     self.decision_count += 1
                     print(f"🎯 PlayerAgent cycle #{self.decision_count} completed in {cycle_time:.2f}s")
                     
@@ -266,6 +357,9 @@ class PlayerAgent:
             self._send_chat_message("system", f"⚠️ PlayerAgent autonomous loop failed: {str(e)}")
         
         finally:
+            if self.session_archive:
+                self.session_archive.close()
+                self.session_archive = None
             print("🎮 PlayerAgent autonomous loop ended")
     
     def analyze_and_decide(self, screenshot_path: str, game_state: Dict[str, Any], 
@@ -284,25 +378,69 @@ class PlayerAgent:
                 )
             self.initialize_llm(config)
         
+        self.last_model_route = None
+        self.last_decision_client = None
+        
+        # Same screen, position and prompt template as an earlier decision - reuse it
+        key = self._decision_cache_key(screenshot_path, game_state, enhanced_context)
+        cached = self.decision_cache.get(key)
+        if cached is not None:
+            print(f"♻️ PlayerAgent: Reusing cached decision {cached.get('actions')} for {os.path.basename(screenshot_path)}")
+            self.last_decision_key = key
+            return PlayerResponse(**cached)
+        
+        # Fast model for simple screens, strong model otherwise or after repeated failures
+        llm_client, route = self._route_model(game_state)
+        
         # Call AI with retry logic for better error handling
-        return self._call_ai_with_retry(
+        self.last_response_side_effects = False
+        decision_start = time.time()
+        response = self._call_ai_with_retry(
             current_screenshot=screenshot_path,
             previous_screenshot=previous_screenshot,
             game_state=game_state,
-            enhanced_context=enhanced_context
+            enhanced_context=enhanced_context,
+            llm_client=llm_client
         )
+        tokens = self._estimate_decision_tokens(enhanced_context, llm_client)
+        get_model_tier_stats().record(route, time.time() - decision_start, tokens, response.success)
+        
+        self.last_decision_key = None
+        if key is not None and response.success and response.actions and not self.last_response_side_effects:
+            self.decision_cache.put(key, response.to_dict(), tokens)
+            self.last_decision_key = key
+        return response
+    
+    def _route_model(self, game_state: Dict[str, Any]) -> Tuple[LLMClient, ModelRoute]:
+        """LLM client and model tier for this decision (providers.<name>.model_routing)"""
+        provider_settings = self.llm_client.providers_config.get(self.llm_client.provider) or {}
+        router = ModelRouter.from_config(self.llm_client._model_name(), provider_settings.get('model_routing'))
+        route = router.route((game_state or {}).get('screen_type'), self.consecutive_errors)
+        if router.enabled:
+            print(f"🧭 PlayerAgent: {route.tier} model {route.model} ({route.reason})")
+        self.last_model_route = route
+        self.last_decision_client = self.llm_client.variant(model=route.model)
+        return self.last_decision_client, route
     
     def _call_ai_with_retry(self, current_screenshot: str, previous_screenshot: Optional[str], 
-                           game_state: Dict[str, Any], enhanced_context: str) -> PlayerResponse:
-        """Call AI API with intelligent retry logic for error handling"""
+                           game_state: Dict[str, Any], enhanced_context: str,
+                           llm_client: Optional[LLMClient] = None) -> PlayerResponse:
+        """Call AI API with intelligent retry logic for error handling.
+        
+        All attempts share one decision deadline: each retry only gets the time left of it.
+        """
         
         # Store screenshots for potential retry
         screenshot_pair = (previous_screenshot, current_screenshot)
         config = self._load_config()
+        deadline = self._decision_deadline(config)
+        self.current_deadline = deadline
         
         for attempt in range(self.max_retry_attempts + 1):  # +1 for initial attempt
+            if deadline.cancelled or deadline.expired:
+                return self._deadline_exceeded_response(deadline, attempt)
             try:
-                print(f"🤖 PlayerAgent API Call (attempt {attempt + 1}/{self.max_retry_attempts + 1})")
+                print(f"🤖 PlayerAgent API Call (attempt {attempt + 1}/{self.max_retry_attempts + 1}, {deadline.remaining():.0f}s left)")
                 
                 # Make the actual AI API call
                 ai_response = self._call_ai_api_with_comparison(
@@ -310,7 +448,9 @@ class PlayerAgent:
                     previous_screenshot=previous_screenshot,
                     game_state=game_state,
                     config=config,
-                    enhanced_context=enhanced_context
+                    enhanced_context=enhanced_context,
+                    deadline=deadline,
+                    llm_client=llm_client
                 )
                 
                 # Check if response is successful
@@ -341,13 +481,13 @@ class PlayerAgent:
                     error = Exception(f"LLM error response: {error_text}")
                 
                 # Check if we should retry this error
-                if attempt < self.max_retry_attempts and self._should_retry_error(error):
+                if attempt < self.max_retry_attempts and self._should_retry_error(error) and not (ai_response or {}).get("cancelled"):
                     self._record_ai_failure(error, current_screenshot, game_state)
                     retry_delay = self._calculate_retry_delay()
                     print(f"🔄 PlayerAgent error on attempt {attempt + 1} - retrying with same screenshots after {retry_delay:.1f}s")
                     print(f"📸 Reusing: {os.path.basename(previous_screenshot or 'None')} vs {os.path.basename(current_screenshot)}")
                     
-                    time.sleep(retry_delay)
+                    deadline.wait(retry_delay)
                     continue  # Retry with same screenshots
                 else:
                     # Max retries reached or non-retryable error
@@ -367,7 +507,7 @@ class PlayerAgent:
                     retry_delay = self._calculate_retry_delay()
                     print(f"🔄 PlayerAgent exception on attempt {attempt + 1} - retrying after {retry_delay:.1f}s: {e}")
                     
-                    time.sleep(retry_delay)
+                    deadline.wait(retry_delay)
                     continue  # Retry with same screenshots
                 else:
                     # Max retries reached or non-retryable error
@@ -387,20 +527,44 @@ class PlayerAgent:
             actions=[]
         )
     
+    def _decision_deadline(self, config: Optional[Dict[str, Any]]) -> Deadline:
+        """Deadline for one decision, all retries included (providers.<name>.decision_deadline_seconds)"""
+        provider = self.llm_client.provider if self.llm_client else (config or {}).get('llm_provider', 'google')
+        provider_settings = ((config or {}).get('providers') or {}).get(provider) or {}
+        return Deadline(provider_settings.get('decision_deadline_seconds', DEFAULT_DECISION_DEADLINE_SECONDS))
+    
+    def _deadline_exceeded_response(self, deadline: Deadline, attempts: int) -> PlayerResponse:
+        """Error response once the decision deadline passed or was cancelled"""
+        reason = "cancelled" if deadline.cancelled else "deadline exceeded"
+        print(f"⏱️ PlayerAgent decision {reason} after {attempts} attempt(s)")
+        return PlayerResponse(
+            success=False,
+            text=f"AI decision {reason}",
+            error=f"Decision {reason}",
+            actions=[]
+        )
+    
     def _call_ai_api_with_comparison(self, current_screenshot: str, previous_screenshot: Optional[str], 
                                     game_state: Dict[str, Any], config: Dict[str, Any], 
-                                    enhanced_context: str) -> Dict[str, Any]:
+                                    enhanced_context: str, deadline: Optional[Deadline] = None,
+                                    llm_client: Optional[LLMClient] = None) -> Dict[str, Any]:
         """Make API call with comparison logic"""
-        if previous_screenshot and os.path.exists(previous_screenshot) and os.path.exists(current_screenshot):
+        llm_client = llm_client or self.llm_client
+        if previous_screenshot and self.frame_change_detector.is_unchanged(current_screenshot):
+            # Identical screens - a second image costs tokens but adds no information
+            print(f"📤 PlayerAgent: Screen unchanged, sending single screenshot: {os.path.basename(current_screenshot)}")
+            enhanced_context += "\n\n## 🖼️ Screen:\nThe screen did not change after your last actions - they may have been blocked or ignored."
+            return llm_client.analyze_game_state(current_screenshot, game_state, enhanced_context, deadline=deadline)
+        elif previous_screenshot and frame_exists(previous_screenshot) and frame_exists(current_screenshot):
             # Use comparison analysis
             print(f"📤 PlayerAgent: Sending screenshot comparison: {os.path.basename(previous_screenshot)} vs {os.path.basename(current_screenshot)}")
-            return self.llm_client.analyze_game_state_with_comparison(
-                current_screenshot, previous_screenshot, game_state, enhanced_context
+            return llm_client.analyze_game_state_with_comparison(
+                current_screenshot, previous_screenshot, game_state, enhanced_context, deadline=deadline
             )
         else:
             # Use single screenshot analysis  
             print(f"📤 PlayerAgent: Sending single screenshot: {os.path.basename(current_screenshot)}")
-            return self.llm_client.analyze_game_state(current_screenshot, game_state, enhanced_context)
+            return llm_client.analyze_game_state(current_screenshot, game_state, enhanced_context, deadline=deadline)
     
     def _convert_to_structured_response(self, ai_response: Dict[str, Any], game_state: Dict[str, Any]) -> PlayerResponse:
         """Convert LLM response to structured PlayerResponse"""
@@ -417,8 +581,10 @@ class PlayerAgent:
         emotional_context = ai_response.get("emotional_context", self._infer_emotional_context(text))
         
         # Process objective discovery if present
-        if "objective_discovery" in ai_response and self.memory_system:
-            self._process_objective_discovery(ai_response["objective_discovery"], game_state)
+        if "objective_discovery" in ai_response:
+            self.last_response_side_effects = True  # A cached replay would skip it
+            if self.memory_system:
+                self._process_objective_discovery(ai_response["objective_discovery"], game_state)
         
         return PlayerResponse(
             success=ai_response.get("success", True),
@@ -467,6 +633,13 @@ class PlayerAgent:
     
     def _infer_situation_from_state(self, game_state: Dict[str, Any]) -> str:
         """Infer current game situation from state"""
+        # The pixel classifier's label is more reliable than guessing from the map
+        screen_type = game_state.get('screen_type')
+        if screen_type == 'overworld':
+            return "exploration"
+        elif screen_type in ('battle', 'dialogue', 'menu'):
+            return screen_type
+        
         # Basic situation inference - can be enhanced with game-specific logic
         map_id = game_state.get('map_id', 0)
         
@@ -579,8 +752,10 @@ class PlayerAgent:
         # Reset autonomous state
         self.decision_count = 0
         self.cycle_times = []
-        self.screenshot_map = {}
-        self.screenshot_counter = 0
+        self.frame_change_detector.reset()
+        self.skipped_unchanged_cycles = 0
+        self.decision_cache.clear()
+        self.last_decision_key = None
         
         print("🔄 PlayerAgent session reset with enhanced context")
     
@@ -609,6 +784,7 @@ class PlayerAgent:
         
         # Track token usage for optimization insights
         self._track_token_usage(enhanced_context)
+        self.last_context_hash = context_hash(enhanced_context)
         
         # Use existing analyze_and_decide logic with optimized context
         return self.analyze_and_decide(
@@ -618,6 +794,34 @@ class PlayerAgent:
             enhanced_context=enhanced_context
         )
     
+    def _archive_cycle(self, screenshot_path: str, previous_screenshot: Optional[str], game_state: Dict[str, Any],
+                       player_response: PlayerResponse, timings: Dict[str, float]):
+        """Append a decision cycle, and any frames not archived yet, to the session archive"""
+        if not self.session_archive:
+            return
+        try:
+            entry = self.frame_ring.get(screenshot_path)
+            frame_id = self.session_archive.add_frame(screenshot_path, entry.content_hash if entry else None)
+            previous_frame_id = None
+            if previous_screenshot:
+                previous_entry = self.frame_ring.get(previous_screenshot)
+                previous_frame_id = self.session_archive.add_frame(
+                    previous_screenshot, previous_entry.content_hash if previous_entry else None)
+            self.session_archive.record_cycle({
+                'decision': self.decision_count + 1,
+                'timestamp': time.time(),
+                'frame_id': frame_id,
+                'previous_frame_id': previous_frame_id,
+                'game_state': game_state,
+                'context_hash': self.last_context_hash,
+                'response': player_response.to_dict(),
+                'image_payload': getattr(self.last_decision_client or self.llm_client, 'last_image_payload', None),
+                'model_route': self.last_model_route.to_dict() if self.last_model_route else None,
+                'timings': timings,
+            })
+        except Exception as e:
+            print(f"⚠️ PlayerAgent: Error archiving cycle: {e}")
+    
     def _get_situational_memory_context(self, game_state: Dict[str, Any]) -> str:
         """Get memory context filtered by current situation for more relevant decisions"""
         current_situation = self._classify_current_situation(game_state)
@@ -717,6 +921,11 @@ class PlayerAgent:
         if self.consecutive_errors > 0:
             context_parts.append(f"⚠️ Errors: {self.consecutive_errors}")
         
+        # Screen type from the local pixel classifier
+        screen_type = game_state.get("screen_type")
+        if screen_type and screen_type != "unknown":
+            context_parts.append(f"Screen: {screen_type}")
+        
         # Location-specific failures (high priority when relevant)
         current_location = self._get_current_location_key(game_state)
         if current_location in self.session_context["failed_attempts"]:
@@ -811,6 +1020,36 @@ class PlayerAgent:
         except Exception as e:
             print(f"❌ PlayerAgent: Error executing actions: {e}")
     
+    def _execute_actions_and_capture(self, actions: List[str], durations: Optional[List[int]] = None) -> Optional[str]:
+        """Press buttons and get the follow-up screenshot in one round trip.
+        
+        Returns None if act-then-capture is unavailable (nothing was sent) and
+        "" if it was sent but no screenshot arrived.
+        """
+        if not self.action_capturer:
+            return None
+        
+        try:
+            screenshot_path = self.action_capturer(actions, durations)
+            if screenshot_path is not None:
+                print(f"🎮 PlayerAgent: Executed {len(actions)} actions and captured "
+                      f"{os.path.basename(screenshot_path) if screenshot_path else 'None'}")
+            return screenshot_path
+        except Exception as e:
+            print(f"❌ PlayerAgent: Error executing actions: {e}")
+            return ""
+    
+    def _wait_for_actions(self, actions: List[str], durations: Optional[List[int]] = None) -> bool:
+        """Wait for mGBA's sequence_done; returns False if no notification is available"""
+        if not self.sequence_waiter:
+            return False
+        
+        try:
+            return self.sequence_waiter(actions, durations)
+        except Exception as e:
+            print(f"❌ PlayerAgent: Error waiting for sequence: {e}")
+            return False
+    
     def _calculate_action_delay(self, actions: List[str], durations: Optional[List[int]] = None) -> float:
         """Calculate how long to wait for actions to complete"""
         if not actions:
@@ -844,38 +1083,106 @@ class PlayerAgent:
             return None
     
     def _register_screenshot(self, screenshot_path: str):
-        """Register screenshot in tracking map"""
-        if not screenshot_path or not os.path.exists(screenshot_path):
+        """Register screenshot in the frame ring (a no-op if the service already registered it)"""
+        if not screenshot_path or not frame_exists(screenshot_path):
             return
         
         filename = os.path.basename(screenshot_path)
-        self.screenshot_counter += 1
-        self.screenshot_map[filename] = self.screenshot_counter
-        
-        # Keep only recent screenshots for comparison
-        if len(self.screenshot_map) > 10 and self.screenshot_map:
-            # Remove oldest screenshot
-            oldest_file = min(self.screenshot_map.keys(), key=lambda k: self.screenshot_map[k])
-            del self.screenshot_map[oldest_file]
-        
-        print(f"📸 PlayerAgent: Registered screenshot {filename} (#{self.screenshot_counter})")
+        entry = self.frame_ring.push(screenshot_path)
+        print(f"📸 PlayerAgent: Registered screenshot {filename} (#{entry.sequence})")
+        
+        if self.frame_change_settings['enabled']:
+            change = self.frame_change_detector.register(screenshot_path)
+            if change is not None:
+                # On the ring entry too, for the chat, dashboard and session archive
+                self.frame_ring.push(screenshot_path, change=change)
+                print(f"🖼️ PlayerAgent: {filename} {'changed' if change.changed else 'unchanged'} "
+                      f"({change.changed_tiles}/{change.total_tiles} tiles)")
+    
+    def _configure_frame_change_detection(self, config: Optional[Dict[str, Any]]):
+        """Apply capture_system.frame_change_detection settings from the configuration"""
+        capture_system = (config or {}).get('capture_system') or {}
+        settings = {**DEFAULT_FRAME_CHANGE_DETECTION, **(capture_system.get('frame_change_detection') or {})}
+        if settings['unchanged_policy'] not in UNCHANGED_POLICIES:
+            print(f"⚠️ PlayerAgent: Unknown unchanged_policy '{settings['unchanged_policy']}', using '{UNCHANGED_POLICY_SINGLE_IMAGE}'")
+            settings['unchanged_policy'] = UNCHANGED_POLICY_SINGLE_IMAGE
+        self.frame_change_settings = settings
+        self.frame_change_detector.tile_tolerance = settings['tile_tolerance']
+        self.frame_change_detector.change_threshold = settings['change_threshold']
+        self.skipped_unchanged_cycles = 0
+    
+    def _configure_decision_cache(self, config: Optional[Dict[str, Any]]):
+        """Apply capture_system.decision_cache settings from the configuration"""
+        capture_system = (config or {}).get('capture_system') or {}
+        self.decision_cache_settings = {**DEFAULT_DECISION_CACHE, **(capture_system.get('decision_cache') or {})}
+        self.decision_cache.configure(self.decision_cache_settings)
+    
+    def _decision_cache_key(self, screenshot_path: str, game_state: Dict[str, Any], enhanced_context: str = ""):
+        """Decision cache key for a screen, game state and decision context, None if the cache is disabled"""
+        if not self.decision_cache_settings['enabled'] or not self.llm_client:
+            return None
+        return decision_key(perceptual_hash(screenshot_path), game_state or {},
+                            self.llm_client.prompt_template_version(), context_hash(enhanced_context))
+    
+    def _estimate_decision_tokens(self, enhanced_context: str, llm_client: Optional[LLMClient] = None) -> int:
+        """Rough token cost of the LLM call just made: prompt text (4 chars per token) plus images"""
+        llm_client = llm_client or self.llm_client
+        prompt_chars = len(getattr(llm_client, 'prompt_template', '') or '') + len(enhanced_context)
+        image_payload = getattr(llm_client, 'last_image_payload', None) or {}
+        return prompt_chars // 4 + image_payload.get('image_tokens', 0)
+    
+    def _invalidate_ineffective_decision(self, screenshot_path: str, game_state: Dict[str, Any]):
+        """Drop the decision just acted on from the cache if it left screen and RAM state as they were"""
+        key, self.last_decision_key = self.last_decision_key, None
+        if key is None:
+            return
+        # Compare screen, position and template only - the context always moves on by the next cycle
+        current = self._decision_cache_key(screenshot_path, game_state)
+        if current is not None and current[:-1] == key[:-1] and self.decision_cache.invalidate(key):
+            print("🗑️ PlayerAgent: Decision changed neither screen nor position - dropped from decision cache")
+    
+    def _should_skip_unchanged_cycle(self, screenshot_path: str, previous_game_state: Optional[Dict[str, Any]],
+                                     game_state: Dict[str, Any]) -> bool:
+        """True if the 'skip' policy applies: same screen and RAM state, and not skipped too often in a row"""
+        settings = self.frame_change_settings
+        if not settings['enabled'] or settings['unchanged_policy'] != UNCHANGED_POLICY_SKIP:
+            return False
+        if not (self.frame_change_detector.is_unchanged(screenshot_path)
+                and self._same_game_state(previous_game_state, game_state)):
+            self.skipped_unchanged_cycles = 0
+            return False
+        if self.skipped_unchanged_cycles >= settings['max_skipped_cycles']:
+            # Decide anyway so a screen that only changes on input doesn't stall the agent
+            self.skipped_unchanged_cycles = 0
+            return False
+        self.skipped_unchanged_cycles += 1
+        return True
+    
+    def _same_game_state(self, previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> bool:
+        """Compare the RAM-derived position, direction and map of two game states"""
+        if not previous or not current:
+            return False
+        return all(previous.get(key) == current.get(key) for key in ('position', 'direction', 'map_id'))
+    
+    def _read_game_state(self, screenshot_path: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
+        """Game state mGBA reported with a screenshot, or ``fallback`` if unavailable"""
+        if self.state_reader:
+            try:
+                game_state = self.state_reader(screenshot_path)
+                if game_state:
+                    return game_state
+            except Exception as e:
+                print(f"⚠️ PlayerAgent: Error reading game state: {e}")
+        return fallback
     
     def _get_previous_screenshot_path(self, current_path: str) -> Optional[str]:
         """Get previous screenshot path for comparison"""
         if not current_path:
             return None
         
-        current_filename = os.path.basename(current_path)
-        current_counter = self.screenshot_map.get(current_filename, 0)
-        
-        # Find previous screenshot
-        previous_counter = current_counter - 1
-        for filename, counter in self.screenshot_map.items():
-            if counter == previous_counter:
-                previous_path = os.path.join(os.path.dirname(current_path), filename)
-                if os.path.exists(previous_path):
-                    return previous_path
-        
+        previous = self.frame_ring.previous_of(current_path)
+        if previous is not None and frame_exists(previous.path):
+            return previous.path
         return None
     
     def _send_chat_message(self, message_type: str, content: str):
@@ -985,6 +1292,14 @@ class PlayerAgent:
     
     def _classify_current_situation(self, game_state: Dict[str, Any]) -> str:
         """Classify current game situation for pattern matching"""
+        screen_type = game_state.get("screen_type")
+        if screen_type == "battle":
+            return "battle_situation"
+        elif screen_type == "dialogue":
+            return "dialogue"
+        elif screen_type == "menu":
+            return "menu_navigation"
+        
         # Basic situation classification - can be enhanced with more game-specific logic
         map_id = game_state.get("map_id", 0)
         
@@ -0,0 +1,149 @@
+"""
+Long-lived LLM provider sessions.
+
+Every Gemini call used to build a new ``GenerativeModel`` and a fresh set of
+tool declaration protos, the narration agent built yet another model per
+narration, and PlayerAgent and NarrationAgent each owned an LLMClient with
+its own OpenAI client and connection pool.
+
+A ProviderSession holds, per provider:
+
+- the configured SDK client (the ``google.generativeai`` module, or one
+  ``OpenAI`` client whose HTTP pool keeps connections alive between calls)
+- model handles, built once per (model, tools, generation config)
+- any other per-session objects, e.g. tool declarations, via ``cached()``
+
+Sessions are shared process-wide through ``get_provider_session()`` and are
+keyed by a hash of the provider's connection settings (``api_key`` and the
+other ``CONNECTION_SETTINGS`` of ``providers.<name>``), so changing the API
+key starts a new session while every LLMClient on the same account reuses
+the same one.  The model is not part of the key: clients for different
+models (``LLMClient.variant()``) share the session and its model handles.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+# Provider settings that change how the SDK client connects
+CONNECTION_SETTINGS = ('api_key', 'base_url', 'organization')
+
+
+def settings_version(settings: Optional[Dict[str, Any]]) -> str:
+    """Hash of a provider's connection settings; a new hash means a new session"""
+    connection = {key: value for key, value in (settings or {}).items() if key in CONNECTION_SETTINGS}
+    encoded = json.dumps(connection, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class ProviderSession:
+    """SDK client and reusable model handles for one provider and settings version"""
+
+    def __init__(self, provider: str, settings: Dict[str, Any], client: Any, version: str = ''):
+        self.provider = provider
+        self.settings = settings
+        self.client = client
+        self.version = version or settings_version(settings)
+        self._cache: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.models_built = 0
+        self.cache_hits = 0
+
+    def cached(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """Object built once per session by ``factory`` (tool declarations, models, ...)"""
+        with self._lock:
+            if key in self._cache:
+                self.cache_hits += 1
+                return self._cache[key]
+        value = factory()
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    def google_model(self, model_name: str, tools: Any = None,
+                     generation_config: Optional[Dict[str, Any]] = None):
+        """Gemini model handle with tools and generation config bound at construction.
+
+        ``tools`` should itself come from ``cached()`` so the same declarations
+        map to the same model.
+        """
+        key = ('model', model_name, id(tools) if tools is not None else None,
+               json.dumps(generation_config, sort_keys=True) if generation_config else None)
+
+        def build():
+            with self._lock:
+                self.models_built += 1
+            logger.debug(f" Building {model_name} model handle for {self.provider} session {self.version}")
+            return self.client.GenerativeModel(model_name, tools=tools, generation_config=generation_config)
+
+        return self.cached(key, build)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'provider': self.provider,
+                'version': self.version,
+                'cached_objects': len(self._cache),
+                'models_built': self.models_built,
+                'cache_hits': self.cache_hits,
+            }
+
+
+def _connect(provider: str, settings: Dict[str, Any]) -> Any:
+    """Configured SDK client for a provider, None if it has no API key"""
+    api_key = settings.get('api_key', '')
+    if not api_key:
+        return None
+    if provider == 'google':
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        return genai
+    if provider == 'openai':
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, base_url=settings.get('base_url') or None,
+                      organization=settings.get('organization') or None)
+    return None
+
+
+# Global provider sessions shared by every LLMClient (PlayerAgent, NarrationAgent, AIGameService)
+_sessions: Dict[str, ProviderSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_provider_session(provider: str, settings: Optional[Dict[str, Any]] = None) -> ProviderSession:
+    """Session for ``provider``, rebuilt only when its connection settings changed"""
+    settings = settings or {}
+    version = settings_version(settings)
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is not None and session.version == version:
+            return session
+
+        try:
+            client = _connect(provider, settings)
+        except ImportError as e:
+            logger.warning(f" LLM provider import error: {e}")
+            client = None
+        session = ProviderSession(provider, settings, client, version)
+        _sessions[provider] = session
+        logger.info(f" Started {provider} provider session {version}")
+        return session
+
+
+def clear_provider_sessions():
+    """Drop all sessions so the next call reconnects (session reset, tests)"""
+    with _sessions_lock:
+        _sessions.clear()
+
+
+def get_provider_session_metrics() -> Dict[str, Any]:
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return {session.provider: session.get_metrics() for session in sessions}
@@ -0,0 +1,216 @@
+"""
+Fast local classification of what kind of screen a frame shows.
+
+Runs on every captured frame before prompting, CPU-only, in a few
+milliseconds.  Instead of learned models it matches the fixed UI elements
+Pokemon-style games draw over the scene:
+
+``battle``
+    Thin horizontal HP bars (green, yellow or red runs a few pixels tall).
+``menu``
+    A bordered box against the right edge of the screen (start menu, yes/no
+    prompts, bag and party lists) with a light interior.
+``dialogue``
+    A bordered box across the bottom of the screen with a light interior.
+``transition``
+    A nearly uniform frame (fade to black or white, warp, battle intro).
+``overworld``
+    None of the above.
+
+Geometry is relative to the frame size and the colour predicates live in
+``SCREEN_TEMPLATES``, so the same detectors work for GB-sized frames and can
+be tuned per game.
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+from core.logging_config import get_logger
+from .frame_store import get_frame_store, open_frame_image
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SCREEN_OVERWORLD = 'overworld'
+SCREEN_DIALOGUE = 'dialogue'
+SCREEN_BATTLE = 'battle'
+SCREEN_MENU = 'menu'
+SCREEN_TRANSITION = 'transition'
+SCREEN_UNKNOWN = 'unknown'
+SCREEN_TYPES = (SCREEN_OVERWORLD, SCREEN_DIALOGUE, SCREEN_BATTLE, SCREEN_MENU, SCREEN_TRANSITION, SCREEN_UNKNOWN)
+
+SCREEN_TEMPLATES = {
+    # Pixel differences (summed over RGB) that count as a UI border edge
+    'edge_strength': 60,
+    # Box interiors: min channel at least this bright, covering at least this fraction
+    'light_level': 200,
+    'light_fraction': 0.5,
+    # Dialogue box: top border somewhere in this band of rows, spanning this much of the width
+    'dialogue_rows': (0.6, 0.85),
+    'dialogue_border_width': 0.85,
+    # Menu box: left border somewhere in this band of columns, spanning this band of rows
+    'menu_columns': (0.4, 0.95),
+    'menu_rows': (0.05, 0.4),
+    'menu_border_height': 0.9,
+    # HP bars: (min, max) per channel of the fill colours, max bar thickness and min bar length
+    'hp_colours': (
+        ((0, 150, 100), (160, 255, 200)),   # Green
+        ((200, 180, 0), (255, 255, 90)),    # Yellow
+        ((200, 40, 20), (255, 130, 100)),   # Red
+    ),
+    'hp_bar_max_thickness': 4,
+    'hp_bar_min_length': 0.1,
+    # Uniform frames: max standard deviation of all pixel values
+    'transition_std': 6.0,
+}
+
+
+class ScreenClassification:
+    """Label for one frame plus the measurements that produced it"""
+
+    __slots__ = ('label', 'features')
+
+    def __init__(self, label: str, features: Optional[Dict[str, Any]] = None):
+        self.label = label
+        self.features = features or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'label': self.label, 'features': self.features}
+
+
+class ScreenClassifier:
+    """Template-matching classifier for overworld / dialogue / battle / menu screens"""
+
+    def __init__(self, templates: Optional[Dict[str, Any]] = None):
+        self.templates = {**SCREEN_TEMPLATES, **(templates or {})}
+
+    def classify(self, path: str) -> ScreenClassification:
+        """Classify a screenshot by path, preferring the in-memory frame"""
+        if not NUMPY_AVAILABLE:
+            return ScreenClassification(SCREEN_UNKNOWN)
+        try:
+            frame = get_frame_store().get_frame(path)
+            if frame is not None and frame.pixel_format == 'rgb24':
+                pixels = np.frombuffer(frame.pixels, dtype=np.uint8).reshape(frame.height, frame.width, 3)
+            else:
+                pixels = np.asarray(open_frame_image(path).convert('RGB'), dtype=np.uint8)
+        except Exception as e:
+            logger.debug(f" Could not load {os.path.basename(path)} for screen classification: {e}")
+            return ScreenClassification(SCREEN_UNKNOWN)
+        return self.classify_pixels(pixels)
+
+    def classify_pixels(self, pixels) -> ScreenClassification:
+        """Classify an (H, W, 3) uint8 frame"""
+        features = {'std': round(float(pixels.std()), 2)}
+        if features['std'] <= self.templates['transition_std']:
+            return ScreenClassification(SCREEN_TRANSITION, features)
+
+        features['hp_bars'] = self._count_hp_bars(pixels)
+        if features['hp_bars']:
+            return ScreenClassification(SCREEN_BATTLE, features)
+
+        # Shared by the box detectors: box interiors are light, box borders are strong edges
+        light = pixels.min(axis=2) >= self.templates['light_level']
+        signed = pixels.astype(np.int16)
+
+        features['menu_box'] = self._has_menu_box(signed, light)
+        if features['menu_box']:
+            return ScreenClassification(SCREEN_MENU, features)
+
+        features['dialogue_box'] = self._has_dialogue_box(signed, light)
+        if features['dialogue_box']:
+            return ScreenClassification(SCREEN_DIALOGUE, features)
+
+        return ScreenClassification(SCREEN_OVERWORLD, features)
+
+    def _has_dialogue_box(self, pixels, light) -> bool:
+        """Horizontal border across the lower screen with a light box below it"""
+        height, width, _ = pixels.shape
+        first, last = (int(height * fraction) for fraction in self.templates['dialogue_rows'])
+        # Edge between each row and the row above it, per column
+        edges = np.abs(pixels[first:last] - pixels[first - 1:last - 1]).sum(axis=2) > self.templates['edge_strength']
+        border_rows = first + np.flatnonzero(edges.mean(axis=1) >= self.templates['dialogue_border_width'])
+        if not border_rows.size:
+            return False
+
+        # Light pixels in the box from each candidate border down to the bottom margin
+        margin = width // 10
+        light_per_row = light[:height - 4, margin:width - margin].sum(axis=1)
+        light_below = np.cumsum(light_per_row[::-1])[::-1]
+        for top in border_rows:
+            rows = height - 4 - (top + 4)
+            if rows > 0 and light_below[top + 4] / (rows * (width - 2 * margin)) >= self.templates['light_fraction']:
+                return True
+        return False
+
+    def _has_menu_box(self, pixels, light) -> bool:
+        """Vertical border in the right half of the screen with a light box to its right"""
+        height, width, _ = pixels.shape
+        first, last = (int(width * fraction) for fraction in self.templates['menu_columns'])
+        top, bottom = (int(height * fraction) for fraction in self.templates['menu_rows'])
+        edges = np.abs(pixels[top:bottom, first:last] - pixels[top:bottom, first - 1:last - 1]).sum(axis=2) > self.templates['edge_strength']
+        border_columns = first + np.flatnonzero(edges.mean(axis=0) >= self.templates['menu_border_height'])
+        if not border_columns.size:
+            return False
+
+        # Light pixels in the box from each candidate border to the right margin
+        light_per_column = light[top:bottom, :width - 4].sum(axis=0)
+        light_right = np.cumsum(light_per_column[::-1])[::-1]
+        for left in border_columns:
+            columns = width - 4 - (left + 4)
+            if columns >= 8 and light_right[left + 4] / (columns * (bottom - top)) >= self.templates['light_fraction']:
+                return True
+        return False
+
+    def _count_hp_bars(self, pixels) -> int:
+        """Thin horizontal runs of HP-bar colour; thick areas of the same colour (grass) are ignored"""
+        height, width, _ = pixels.shape
+        channels = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+        mask = np.zeros((height, width), dtype=bool)
+        for low, high in self.templates['hp_colours']:
+            colour = np.ones((height, width), dtype=bool)
+            for channel, channel_low, channel_high in zip(channels, low, high):
+                if channel_low > 0:
+                    colour &= channel >= channel_low
+                if channel_high < 255:
+                    colour &= channel <= channel_high
+            mask |= colour
+
+        # Keep pixels whose column has no bar colour a few rows above and below (bars are thin)
+        reach = self.templates['hp_bar_max_thickness']
+        above = np.zeros_like(mask)
+        below = np.zeros_like(mask)
+        above[reach:] = mask[:-reach]
+        below[:-reach] = mask[reach:]
+        thin = mask & ~above & ~below
+
+        min_length = int(width * self.templates['hp_bar_min_length'])
+        bars = 0
+        last_bar_row = None
+        for row in np.nonzero(thin.sum(axis=1) >= min_length)[0]:
+            # Longest run of consecutive bar pixels in this row
+            padded = np.concatenate(([0], thin[row].astype(np.int8), [0]))
+            changes = np.flatnonzero(np.diff(padded))
+            if int((changes[1::2] - changes[::2]).max()) < min_length:
+                continue
+            # Adjacent rows belong to the same multi-row bar
+            if last_bar_row is None or row - last_bar_row > 1:
+                bars += 1
+            last_bar_row = row
+        return bars
+
+
+_screen_classifier = None
+
+
+def get_screen_classifier() -> ScreenClassifier:
+    """Get the global screen classifier"""
+    global _screen_classifier
+    if _screen_classifier is None:
+        _screen_classifier = ScreenClassifier()
+    return _screen_classifier
@@ -0,0 +1,142 @@
+"""
+Where controlled screenshots live.
+
+``capture_system.screenshot_storage.backend`` selects one of:
+
+``disk``
+    PNGs in ``disk_dir`` (by default ``data/screenshots`` in the project root,
+    where script.lua writes unless told otherwise).
+``tmpfs``
+    PNGs in ``tmpfs_dir`` under ``/dev/shm``, so frame I/O never touches a
+    spinning or network disk.  Needs a script.lua that understands
+    ``set_screenshot_dir``; falls back to ``disk`` where ``/dev/shm`` is missing.
+``memory``
+    No files at all.  Only possible with ``transfer_mode: 'socket'``, where
+    frames arrive in-band and live in the FrameStore; the directory is then
+    only used to build the path keys.  With file transfer it falls back to
+    ``tmpfs``.
+
+Stale screenshots from a previous run are moved aside with a single rename
+and deleted on a background thread, so startup time does not depend on how
+many files were left behind.
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.logging_config import get_logger
+from .frame_store import TRANSFER_MODE_SOCKET
+
+logger = get_logger(__name__)
+
+STORAGE_DISK = 'disk'
+STORAGE_TMPFS = 'tmpfs'
+STORAGE_MEMORY = 'memory'
+STORAGE_BACKENDS = (STORAGE_DISK, STORAGE_TMPFS, STORAGE_MEMORY)
+
+TMPFS_ROOT = '/dev/shm'
+SCREENSHOT_PATTERNS = ("*.png", "*.jpg", "*.jpeg")
+
+DEFAULT_SCREENSHOT_DIRECTORY = Path(__file__).resolve().parents[2] / 'data' / 'screenshots'
+
+DEFAULT_SCREENSHOT_STORAGE = {
+    'backend': STORAGE_DISK,
+    'disk_dir': '',   # Empty: DEFAULT_SCREENSHOT_DIRECTORY
+    'tmpfs_dir': '/dev/shm/ai_gba_player/screenshots',
+}
+
+
+class ScreenshotStorage:
+    """Resolved storage backend and the directory screenshot paths are built from"""
+
+    __slots__ = ('backend', 'directory')
+
+    def __init__(self, backend: str, directory: Path):
+        self.backend = backend
+        self.directory = Path(directory)
+
+    @property
+    def uses_files(self) -> bool:
+        return self.backend != STORAGE_MEMORY
+
+    def __eq__(self, other):
+        return isinstance(other, ScreenshotStorage) and (self.backend, self.directory) == (other.backend, other.directory)
+
+    def __repr__(self):
+        return f"ScreenshotStorage({self.backend!r}, {str(self.directory)!r})"
+
+
+def resolve_screenshot_storage(settings: Optional[Dict[str, Any]], transfer_mode: str) -> ScreenshotStorage:
+    """Pick the backend from ``capture_system.screenshot_storage``, falling back where it cannot work"""
+    settings = {**DEFAULT_SCREENSHOT_STORAGE, **(settings or {})}
+    backend = settings['backend']
+    if backend not in STORAGE_BACKENDS:
+        logger.warning(f" Unknown screenshot storage backend '{backend}', using '{STORAGE_DISK}'")
+        backend = STORAGE_DISK
+
+    if backend == STORAGE_MEMORY and transfer_mode != TRANSFER_MODE_SOCKET:
+        logger.warning(f" In-memory screenshot storage needs socket frame transfer, using '{STORAGE_TMPFS}'")
+        backend = STORAGE_TMPFS
+    if backend == STORAGE_TMPFS and not os.path.isdir(TMPFS_ROOT):
+        logger.warning(f" {TMPFS_ROOT} not available, storing screenshots on disk")
+        backend = STORAGE_DISK
+
+    directory = settings['tmpfs_dir'] if backend == STORAGE_TMPFS else settings['disk_dir'] or DEFAULT_SCREENSHOT_DIRECTORY
+    return ScreenshotStorage(backend, Path(directory))
+
+
+def prepare_screenshot_directory(directory: Path) -> Optional[threading.Thread]:
+    """Make ``directory`` exist and be empty of screenshots; stale files are deleted in the background.
+
+    Returns the cleanup thread, or None when there was nothing to clean.
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        logger.info(f" Created screenshot directory: {directory}")
+        return None
+
+    # One rename moves every stale file out of the way; new screenshots reuse the same names
+    stale = directory.with_name(f".{directory.name}.stale-{time.time_ns()}")
+    try:
+        directory.rename(stale)
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logger.warning(f" Could not move stale screenshots aside ({e}), deleting them in place")
+        _delete_screenshots(directory)
+        return None
+
+    thread = threading.Thread(target=_cleanup_stale_directory, args=(stale, directory),
+                              daemon=True, name="ScreenshotCleanup")
+    thread.start()
+    return thread
+
+
+def _delete_screenshots(directory: Path) -> int:
+    removed_count = 0
+    for pattern in SCREENSHOT_PATTERNS:
+        for file_path in directory.glob(pattern):
+            try:
+                file_path.unlink()
+                removed_count += 1
+            except OSError as e:
+                logger.warning(f" Error removing {file_path.name}: {e}")
+    return removed_count
+
+
+def _cleanup_stale_directory(stale: Path, directory: Path):
+    """Delete stale screenshots, move anything else back and drop the stale directory"""
+    try:
+        removed_count = _delete_screenshots(stale)
+        for leftover in stale.iterdir():
+            target = directory / leftover.name
+            if not target.exists():
+                shutil.move(str(leftover), str(target))
+        shutil.rmtree(stale, ignore_errors=True)
+        logger.info(f" Background cleanup: removed {removed_count} stale screenshot files")
+    except Exception as e:
+        logger.error(f" Error during background screenshot cleanup: {e}")
@@ -10,6 +10,13 @@ from typing import Optional
 from threading import Lock
 
 from .ai_game_service import AIGameService
+from .image_cache import get_enhanced_image_cache
+from .frame_ring import get_frame_ring
+from .frame_assets import get_frame_asset_store
+from .provider_sessions import get_provider_session_metrics
+from .llm_calls import get_llm_call_stats, get_hedge_stats
+from .decision_cache import get_decision_cache
+from .model_router import get_model_tier_stats
 
 
 class AIGameServiceManager:
@@ -224,6 +231,43 @@ class AIGameServiceManager:
             'uptime_seconds': (time.time() - getattr(service, 'start_time', time.time()))
         }
         
+        # Outbound command queue (depth, backpressure, write latency)
+        if hasattr(service, 'get_outbound_metrics'):
+            metrics['outbound_queue'] = service.get_outbound_metrics()
+        
+        # Outstanding mGBA requests (in flight, timeouts, round-trip latency)
+        if hasattr(service, 'get_request_metrics'):
+            metrics['mgba_requests'] = service.get_request_metrics()
+        
+        # Recent screenshot ring (entries, evictions, files deleted in the background)
+        metrics['frame_ring'] = get_frame_ring().get_metrics()
+        
+        # Chat screenshots served by content hash (frames, bytes, deduplicated publishes)
+        metrics['frame_assets'] = get_frame_asset_store().get_metrics()
+        
+        # Shared LLM provider sessions (model handles built, reused)
+        metrics['provider_sessions'] = get_provider_session_metrics()
+        
+        # LLM calls per provider and model (outcomes incl. timeouts, latency percentiles)
+        metrics['llm_calls'] = get_llm_call_stats().get_metrics()
+        
+        # Hedged requests per route (hedge rate, primary/backup wins)
+        metrics['llm_hedging'] = get_hedge_stats().get_metrics()
+        
+        # Decisions reused for recurring screens (hit rate, tokens saved)
+        metrics['decision_cache'] = get_decision_cache().get_metrics()
+        
+        # Decisions per model tier (latency, estimated tokens, success rate)
+        metrics['model_tiers'] = get_model_tier_stats().get_metrics()
+        
+        # Enhanced screenshot cache shared across decision cycles
+        metrics['image_cache'] = get_enhanced_image_cache().get_metrics()
+        
+        # Bytes, image tokens and encode time of the last LLM request's images
+        llm_client = getattr(service, 'llm_client', None)
+        if llm_client is not None:
+            metrics['llm_image_payload'] = getattr(llm_client, 'last_image_payload', {})
+        
         return metrics
 
 
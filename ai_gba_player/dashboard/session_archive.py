@@ -0,0 +1,317 @@
+"""
+Append-only archive of one autonomous play session.
+
+Screenshots are deleted ten captures later and game states, prompts and
+responses only reach the logs, so a run cannot be inspected or replayed once
+it is over.  With ``capture_system.session_archive.enabled`` (off by default)
+every run writes one file to ``directory`` (``data/sessions`` in the project
+root unless set) holding:
+
+- each distinct frame once (PNG bytes keyed by content hash, so a screen that
+  does not change costs nothing after the first cycle)
+- one record per decision cycle: frame ids, game state, a hash of the prompt
+  context, the LLM response, image payload and timings
+
+File layout (all integers little-endian)::
+
+    b'GBASESS\\x01'
+    record*         kind (1 byte) + payload length (uint32) + payload
+                    b'M' metadata JSON, b'F' frame id (32 ascii bytes) + PNG,
+                    b'C' cycle JSON, b'I' index JSON
+    footer          index record offset (uint64) + b'GBAINDEX'
+
+The index record and footer are written on close.  A file without them (the
+run crashed, or is still being written) is still readable: the reader
+rebuilds the index by scanning the records and ignores a truncated last one.
+
+Only the newest ``max_sessions`` archives in the directory are kept; older
+ones are deleted when a new run starts.
+
+SessionArchiveReader gives random access to cycles and frames by offset and
+streams cycles in order with ``replay()``.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from core.logging_config import get_logger
+from .frame_store import read_frame_bytes
+from .image_cache import frame_content_key
+from .frame_assets import get_frame_asset_store
+
+logger = get_logger(__name__)
+
+MAGIC = b'GBASESS\x01'
+INDEX_MAGIC = b'GBAINDEX'
+ARCHIVE_SUFFIX = '.gbasession'
+
+RECORD_METADATA = b'M'
+RECORD_FRAME = b'F'
+RECORD_CYCLE = b'C'
+RECORD_INDEX = b'I'
+
+RECORD_HEADER = struct.Struct('<cI')
+FOOTER = struct.Struct('<Q8s')
+FRAME_ID_LENGTH = 32   # hex frame_content_key
+
+DEFAULT_SESSION_DIRECTORY = Path(__file__).resolve().parents[2] / 'data' / 'sessions'
+
+DEFAULT_SESSION_ARCHIVE = {
+    'enabled': False,
+    'directory': '',   # Empty: DEFAULT_SESSION_DIRECTORY
+    'max_sessions': 20,
+}
+
+
+def context_hash(context: str) -> str:
+    """Short hash identifying the prompt context of a cycle"""
+    return hashlib.blake2b(context.encode('utf-8'), digest_size=8).hexdigest()
+
+
+# Archives still being written, so evicted chat frames can be read back from them
+_open_archives = weakref.WeakSet()
+
+
+class SessionArchive:
+    """Writer for one session archive file; thread-safe, records are flushed as they are written"""
+
+    def __init__(self, path: Path, metadata: Optional[Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'xb')
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._frame_offsets: Dict[str, int] = {}
+        self._cycle_offsets: List[int] = []
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.deduplicated_frames = 0
+
+        self._write(RECORD_METADATA, json.dumps({'started_at': datetime.now().isoformat(), **(metadata or {})},
+                                                default=str).encode('utf-8'))
+        self._file.flush()
+        _open_archives.add(self)
+
+    def add_frame(self, path: str, content_hash: Optional[str] = None) -> Optional[str]:
+        """Store a screenshot unless an identical frame is already archived; returns its frame id"""
+        try:
+            frame_id = content_hash or frame_content_key(path)
+        except OSError as e:
+            logger.warning(f" Could not hash {path}: {e}")
+            return None
+
+        with self._lock:
+            if frame_id in self._frame_offsets:
+                self.deduplicated_frames += 1
+                return frame_id
+
+        # Chat messages usually published the frame already, so its PNG needs no re-encoding
+        data = get_frame_asset_store().get(frame_id)
+        if data is None:
+            try:
+                data = read_frame_bytes(path)
+            except OSError as e:
+                logger.warning(f" Could not read {path}: {e}")
+                return None
+
+        with self._lock:
+            if self._file is not None and frame_id not in self._frame_offsets:
+                self._frame_offsets[frame_id] = self._write(RECORD_FRAME, frame_id.encode('ascii') + data)
+        return frame_id
+
+    def record_cycle(self, cycle: Dict[str, Any]) -> Optional[int]:
+        """Append one decision cycle; returns its index in the archive"""
+        payload = json.dumps(cycle, default=str).encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                return None
+            self._cycle_offsets.append(self._write(RECORD_CYCLE, payload))
+            self._file.flush()
+            return len(self._cycle_offsets) - 1
+
+    def read_frame(self, frame_id: str) -> Optional[bytes]:
+        """PNG bytes of a frame already written to this archive"""
+        with self._lock:
+            offset = self._frame_offsets.get(frame_id)
+            if offset is None or self._file is None:
+                return None
+            self._file.flush()
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            _, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            return f.read(length)[FRAME_ID_LENGTH:]
+
+    def close(self):
+        """Write the offset index and footer and close the file"""
+        _open_archives.discard(self)
+        with self._lock:
+            if self._file is None:
+                return
+            index = json.dumps({'frames': self._frame_offsets, 'cycles': self._cycle_offsets}).encode('utf-8')
+            index_offset = self._write(RECORD_INDEX, index)
+            self._file.write(FOOTER.pack(index_offset, INDEX_MAGIC))
+            self._file.close()
+            self._file = None
+        logger.info(f" Session archive closed: {self.path.name} "
+                    f"({len(self._cycle_offsets)} cycles, {len(self._frame_offsets)} frames, {self._offset} bytes)")
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def _write(self, kind: bytes, payload: bytes) -> int:
+        """Append a record (caller holds the lock) and return its offset"""
+        offset = self._offset
+        self._file.write(RECORD_HEADER.pack(kind, len(payload)))
+        self._file.write(payload)
+        self._offset += RECORD_HEADER.size + len(payload)
+        return offset
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'cycles': len(self._cycle_offsets),
+                'frames': len(self._frame_offsets),
+                'deduplicated_frames': self.deduplicated_frames,
+                'bytes': self._offset,
+            }
+
+
+def find_archived_frame(frame_id: str) -> Optional[bytes]:
+    """PNG bytes of a frame from any archive still being written"""
+    for archive in list(_open_archives):
+        data = archive.read_frame(frame_id)
+        if data is not None:
+            return data
+    return None
+
+
+def open_session_archive(settings: Optional[Dict[str, Any]] = None,
+                         metadata: Optional[Dict[str, Any]] = None) -> Optional[SessionArchive]:
+    """Start a new archive from ``capture_system.session_archive`` settings; None if disabled or not writable"""
+    settings = {**DEFAULT_SESSION_ARCHIVE, **(settings or {})}
+    if not settings['enabled']:
+        return None
+    directory = Path(settings['directory'] or DEFAULT_SESSION_DIRECTORY)
+    path = directory / f"session_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}{ARCHIVE_SUFFIX}"
+    try:
+        archive = SessionArchive(path, metadata)
+    except OSError as e:
+        logger.warning(f" Could not create session archive {path}: {e}")
+        return None
+    logger.info(f" Recording session to {path}")
+    prune_session_archives(directory, settings['max_sessions'], keep=path)
+    return archive
+
+
+def prune_session_archives(directory: Path, max_sessions: int, keep: Optional[Path] = None) -> int:
+    """Delete all but the newest ``max_sessions`` archives in ``directory``; returns how many were deleted"""
+    if not max_sessions or max_sessions <= 0:
+        return 0
+    archives = sorted((p for p in Path(directory).glob(f'*{ARCHIVE_SUFFIX}') if p != keep),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    deleted = 0
+    for old in archives[max_sessions - (1 if keep else 0):]:
+        try:
+            old.unlink()
+            deleted += 1
+        except OSError as e:
+            logger.warning(f" Could not delete old session archive {old}: {e}")
+    if deleted:
+        logger.info(f" Deleted {deleted} old session archive(s) from {directory}")
+    return deleted
+
+
+class SessionArchiveReader:
+    """Random access and streaming replay of a session archive"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a session archive")
+        self._lock = threading.Lock()
+        self.metadata: Dict[str, Any] = {}
+        self.frame_offsets: Dict[str, int] = {}
+        self.cycle_offsets: List[int] = []
+        self.complete = self._load_index()
+
+    def _load_index(self) -> bool:
+        """Read the index named by the footer, or rebuild it by scanning; True if the footer was found"""
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= len(MAGIC) + FOOTER.size:
+            self._file.seek(size - FOOTER.size)
+            index_offset, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if magic == INDEX_MAGIC:
+                kind, index = self._read_record(index_offset)
+                if kind == RECORD_INDEX:
+                    index = json.loads(index)
+                    self.frame_offsets = index['frames']
+                    self.cycle_offsets = index['cycles']
+                    kind, metadata = self._read_record(len(MAGIC))
+                    self.metadata = json.loads(metadata) if kind == RECORD_METADATA else {}
+                    return True
+
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= size:
+            self._file.seek(offset)
+            kind, length = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            if offset + RECORD_HEADER.size + length > size:
+                break   # Truncated by a crash mid-write
+            if kind == RECORD_FRAME:
+                self.frame_offsets[self._file.read(FRAME_ID_LENGTH).decode('ascii')] = offset
+            elif kind == RECORD_CYCLE:
+                self.cycle_offsets.append(offset)
+            elif kind == RECORD_METADATA:
+                self.metadata = json.loads(self._file.read(length))
+            offset += RECORD_HEADER.size + length
+        return False
+
+    def _read_record(self, offset: int):
+        with self._lock:
+            self._file.seek(offset)
+            kind, length = RECORD_HEADER.unpack(self._file.read(RECORD_HEADER.size))
+            return kind, self._file.read(length)
+
+    def __len__(self):
+        return len(self.cycle_offsets)
+
+    def cycle(self, index: int) -> Dict[str, Any]:
+        """Cycle record by position in the session"""
+        kind, payload = self._read_record(self.cycle_offsets[index])
+        return json.loads(payload)
+
+    def frame(self, frame_id: str) -> Optional[bytes]:
+        """PNG bytes of an archived frame"""
+        offset = self.frame_offsets.get(frame_id)
+        if offset is None:
+            return None
+        kind, payload = self._read_record(offset)
+        return payload[FRAME_ID_LENGTH:]
+
+    def replay(self, start: int = 0, with_frames: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream cycles in order; ``with_frames`` adds the current frame's PNG as ``frame``"""
+        for index in range(start, len(self.cycle_offsets)):
+            cycle = self.cycle(index)
+            if with_frames:
+                cycle['frame'] = self.frame(cycle.get('frame_id'))
+            yield cycle
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,123 @@
+"""
+Rolling timeline of game state pushed by script.lua.
+
+With the state stream enabled (``subscribe_state||N``), mGBA sends only the
+fields that changed since its previous sample, tagged with the emulator frame:
+
+    st||1234||x=12||y=7
+    st||1250||m=3||d=UP
+
+The timeline rebuilds full samples from those deltas so movement, stuck
+detection and map transitions can be analysed at frame granularity between
+screenshots, without extra requests to the emulator.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class StateSample:
+    """Full game state at one emulator frame"""
+
+    __slots__ = ('frame', 'x', 'y', 'direction', 'map_id', 'received_at')
+
+    def __init__(self, frame: int, x: int, y: int, direction: str, map_id: int):
+        self.frame = frame
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.map_id = map_id
+        self.received_at = time.time()
+
+    @property
+    def position(self) -> Tuple[int, int, int]:
+        return (self.x, self.y, self.map_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'frame': self.frame,
+            'position': {'x': self.x, 'y': self.y},
+            'direction': self.direction,
+            'map_id': self.map_id,
+        }
+
+
+class StateTimeline:
+    """Thread-safe ring of StateSamples rebuilt from delta-encoded telemetry"""
+
+    def __init__(self, max_samples: int = 3600):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def apply_delta(self, frame: int, x: Optional[int] = None, y: Optional[int] = None,
+                    direction: Optional[str] = None, map_id: Optional[int] = None) -> StateSample:
+        """Merge changed fields into the latest state and append the resulting sample"""
+        with self._lock:
+            previous = self._samples[-1] if self._samples else None
+            if previous is not None and frame < previous.frame:
+                # Emulator reset or savestate load - old frame numbers no longer apply
+                self._samples.clear()
+                previous = None
+
+            sample = StateSample(
+                frame,
+                x if x is not None else (previous.x if previous else 0),
+                y if y is not None else (previous.y if previous else 0),
+                direction if direction is not None else (previous.direction if previous else "UNKNOWN"),
+                map_id if map_id is not None else (previous.map_id if previous else 0),
+            )
+            self._samples.append(sample)
+            return sample
+
+    def current(self) -> Optional[StateSample]:
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def samples_since(self, frame: int) -> List[StateSample]:
+        """Samples newer than ``frame``, oldest first"""
+        with self._lock:
+            return [sample for sample in self._samples if sample.frame > frame]
+
+    def position_changes_since(self, frame: int) -> List[StateSample]:
+        """Samples since ``frame`` where x, y or map changed (direction-only turns excluded)"""
+        with self._lock:
+            changes = []
+            previous = None
+            for sample in self._samples:
+                if sample.frame > frame and previous is not None and sample.position != previous.position:
+                    changes.append(sample)
+                previous = sample
+            return changes
+
+    def map_transitions_since(self, frame: int) -> List[Tuple[int, int, int]]:
+        """(frame, from_map, to_map) for every map change since ``frame``"""
+        with self._lock:
+            transitions = []
+            previous = None
+            for sample in self._samples:
+                if sample.frame > frame and previous is not None and sample.map_id != previous.map_id:
+                    transitions.append((sample.frame, previous.map_id, sample.map_id))
+                previous = sample
+            return transitions
+
+    def frames_stationary(self) -> int:
+        """Frames between the last position change and the latest sample"""
+        with self._lock:
+            if not self._samples:
+                return 0
+            latest = self._samples[-1]
+            for sample in reversed(self._samples):
+                if sample.position != latest.position:
+                    break
+                since = sample.frame
+            return latest.frame - since
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
@@ -75,11 +75,31 @@ function pollForMessages() {
 }
 
 
+// Screenshots are served by content hash, so the browser caches each frame once
+function frameUrl(frameId, thumbnail = false) {
+    return thumbnail ? `/api/frames/${frameId}/thumbnail/` : `/api/frames/${frameId}/`;
+}
+
+function frameImage(frameId, className, alt, thumbnail = false) {
+    if (!frameId) {
+        return `<div class="${className} frame-missing">No screenshot</div>`;
+    }
+    return `<a href="${frameUrl(frameId)}" target="_blank"><img src="${frameUrl(frameId, thumbnail)}" class="${className}" alt="${alt}" loading="lazy" onerror="frameExpired(this)"></a>`;
+}
+
+// Frames that left the server's store and FrameRing (old messages, server restart) answer 404
+function frameExpired(img) {
+    const placeholder = document.createElement('div');
+    placeholder.className = `${img.className} frame-missing`;
+    placeholder.textContent = 'Screenshot expired';
+    img.parentElement.replaceWith(placeholder);
+}
+
 function displayMessage(message) {
     if (message.type === 'system') {
         addSystemMessage(message.content, message.timestamp);
     } else if (message.type === 'screenshot') {
-        addScreenshotMessage(message.image_data, message.game_state, message.timestamp);
+        addScreenshotMessage(message.frame_id, message.game_state, message.timestamp);
     } else if (message.type === 'screenshot_comparison') {
         addScreenshotComparisonMessage(message);
     } else if (message.type === 'ai_response') {
@@ -90,7 +110,7 @@ function displayMessage(message) {
     }
 }
 
-function addScreenshotMessage(imageData, gameState, timestamp = null) {
+function addScreenshotMessage(frameId, gameState, timestamp = null) {
     const messagesContainer = document.getElementById('chat-messages');
     const messageDiv = document.createElement('div');
     messageDiv.className = 'message message-sent';
@@ -100,7 +120,7 @@ function addScreenshotMessage(imageData, gameState, timestamp = null) {
     messageDiv.innerHTML = `
         <div class="message-bubble">
             <div style="font-weight: 500; margin-bottom: 4px;">📤 Screenshot Sent to AI</div>
-            <img src="${imageData}" class="message-image" alt="Game screenshot">
+            ${frameImage(frameId, 'message-image', 'Game screenshot')}
             <div style="font-size: 12px; margin-top: 8px; color: #6b7280;">${gameState}</div>
         </div>
         <div class="message-timestamp">${timeStr}</div>
@@ -352,11 +372,11 @@ function addScreenshotComparisonMessage(message) {
                 <div class="before-after-container">
                     <div class="screenshot-side">
                         <label>PREVIOUS:</label>
-                        <img src="${message.previous_image_data}" class="comparison-image" alt="Previous screenshot">
+                        ${frameImage(message.previous_frame_id, 'comparison-image', 'Previous screenshot', true)}
                     </div>
                     <div class="screenshot-side">
                         <label>CURRENT:</label>
-                        <img src="${message.current_image_data}" class="comparison-image" alt="Current screenshot">
+                        ${frameImage(message.current_frame_id, 'comparison-image', 'Current screenshot', true)}
                     </div>
                 </div>
             </div>
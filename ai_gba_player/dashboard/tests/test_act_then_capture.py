@@ -0,0 +1,82 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+import threading
+import time
+
+from dashboard.frame_store import get_frame_store
+from dashboard.ai_game_service import AIGameService
+from dashboard.player_agent import PlayerAgent
+
+
+class ActThenCaptureTest(TestCase):
+    """Test buttons and the follow-up screenshot are requested in one command"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.service._attach_connection(service_side, 'test')
+        self.service._process_ai_decision = MagicMock()
+        self.service._send_chat_message = MagicMock()
+        self.service.game_config_sent = True
+        self.service._load_frame_transfer_mode = MagicMock(return_value='file')
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def test_capability_from_ready(self):
+        """Test act_capture=1 in the ready message enables the combined command"""
+        self.service._handle_ready_message("ready||true||act_capture=1")
+        self.assertTrue(self.service.act_capture_supported)
+
+        self.service._handle_ready_message("ready||true")
+        self.assertFalse(self.service.act_capture_supported)
+
+    def test_combined_command_waits_for_settled_screenshot(self):
+        """Test one message carries buttons, settle frames and filename, and the reply wakes the caller"""
+        self.service.act_capture_supported = True
+
+        def respond():
+            self.service.io_loop.run_once(0.5)
+            command = self.mgba.recv(4096)
+            self.sent = command
+            self.service._handle_screenshot_data("screenshot_with_state||UP||4||5||1")
+
+        thread = threading.Thread(target=respond)
+        thread.start()
+        start = time.time()
+        path = self.service._act_then_capture_from_mgba(["UP", "A"], [10, 2])
+        thread.join()
+
+        self.assertTrue(path.endswith("screenshot_ai_000001.png"))
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(
+            self.sent,
+            b"act_then_capture||screenshot_ai_000001.png||30||file||6,0|10,2\n"
+        )
+
+    def test_unsupported_script_sends_nothing(self):
+        """Test older Lua scripts fall back to the caller's send/sleep/request path"""
+        self.assertIsNone(self.service._act_then_capture_from_mgba(["A"]))
+        self.service.io_loop.run_once(0)
+        self.mgba.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            self.mgba.recv(4096)
+
+
+class PlayerAgentActThenCaptureTest(TestCase):
+    """Test PlayerAgent uses act-then-capture when available"""
+
+    def test_no_capturer(self):
+        """Test None is returned so the agent falls back to separate commands"""
+        agent = PlayerAgent()
+        self.assertIsNone(agent._execute_actions_and_capture(["A"], [2]))
+
+    def test_capturer_result_returned(self):
+        """Test the captured screenshot path is returned"""
+        agent = PlayerAgent()
+        agent.set_action_capturer(MagicMock(return_value="/tmp/screenshot_ai_000002.png"))
+        self.assertEqual(agent._execute_actions_and_capture(["A"], [2]), "/tmp/screenshot_ai_000002.png")
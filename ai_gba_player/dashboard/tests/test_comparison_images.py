@@ -0,0 +1,123 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import io
+
+import numpy as np
+from PIL import Image
+
+from dashboard.frame_store import get_frame_store
+from dashboard.comparison_images import ComparisonImageBuilder, change_region
+from dashboard.image_cache import EnhancedImageCache
+from dashboard.image_encoding import ImageEncoder
+from dashboard.llm_client import LLMClient
+from dashboard.provider_sessions import ProviderSession
+
+
+def make_screen(seed=0):
+    """240x160 frame of 8x8 tiles from a small palette"""
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (16, 3), dtype=np.uint8)
+    tiles = rng.integers(0, 16, (20, 30))
+    return palette[np.kron(tiles, np.ones((8, 8), dtype=int))]
+
+
+def put_screen(path, pixels):
+    get_frame_store().put_frame(path, 240, 160, np.ascontiguousarray(pixels, dtype=np.uint8).tobytes())
+
+
+def upscale(path, native=False):
+    image = Image.fromarray(np.frombuffer(get_frame_store().get_frame(path).pixels, dtype=np.uint8).reshape(160, 240, 3))
+    return image if native else image.resize((720, 480), Image.NEAREST)
+
+
+class ComparisonImagesTest(TestCase):
+    """Test the comparison prompt's previous/current images"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        screen = make_screen()
+        moved = screen.copy()
+        moved[72:88, 112:128] = 255 - moved[72:88, 112:128]
+        put_screen('/tmp/screenshot_ai_000001.png', screen)
+        put_screen('/tmp/screenshot_ai_000002.png', moved)
+        self.cache = EnhancedImageCache(enhancer=MagicMock(side_effect=upscale))
+
+    def test_change_region(self):
+        self.assertEqual(change_region('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png'),
+                         (112, 72, 128, 88))
+        self.assertIsNone(change_region('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000001.png'))
+
+    def test_roi_crops_previous_frame(self):
+        builder = ComparisonImageBuilder(ImageEncoder(), mode='roi')
+        comparison = builder.build('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', self.cache)
+
+        crop, current = comparison.images
+        # 2x2 changed tiles plus one tile of margin on each side, at the 3x enhancement scale
+        self.assertEqual((crop.width, crop.height), (32 * 3, 32 * 3))
+        self.assertEqual((current.width, current.height), (720, 480))
+        self.assertIn("x 104-136, y 64-96", comparison.description)
+
+    def test_roi_outline(self):
+        builder = ComparisonImageBuilder(ImageEncoder(), mode='roi', outline=True)
+        crop = builder.build('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', self.cache).images[0]
+        pixels = np.asarray(Image.open(io.BytesIO(crop.data)).convert('RGB'))
+        # Changed tiles start one tile (24 enhanced pixels) into the crop
+        np.testing.assert_array_equal(pixels[24, 24:72], [[255, 0, 255]] * 48)
+
+    def test_large_change_sends_full_frames(self):
+        put_screen('/tmp/screenshot_ai_000003.png', make_screen(seed=1))
+        builder = ComparisonImageBuilder(ImageEncoder(), mode='roi')
+        comparison = builder.build('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000003.png', self.cache)
+        self.assertEqual(comparison.mode, 'full')
+        self.assertEqual([(image.width, image.height) for image in comparison.images], [(720, 480)] * 2)
+
+    def test_stitched(self):
+        builder = ComparisonImageBuilder(ImageEncoder(), mode='stitched')
+        comparison = builder.build('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', self.cache)
+        image, = comparison.images
+        self.assertEqual((image.width, image.height), (720 * 2 + 4, 480))
+
+    def test_frames_enhanced_once(self):
+        """Test cropping reuses the enhanced frame the cache already holds"""
+        self.cache.get_encoded('/tmp/screenshot_ai_000001.png')
+        builder = ComparisonImageBuilder(ImageEncoder(), mode='roi')
+        builder.build('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', self.cache)
+        self.assertEqual(self.cache.enhancer.call_count, 2)
+
+
+class LLMClientComparisonImagesTest(TestCase):
+    """Test the Gemini comparison call sends the images of the configured mode"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        screen = make_screen()
+        moved = screen.copy()
+        moved[0:8, 0:8] = 255 - moved[0:8, 0:8]
+        put_screen('/tmp/screenshot_ai_000001.png', screen)
+        put_screen('/tmp/screenshot_ai_000002.png', moved)
+
+    def _sent_parts(self, mode):
+        client = LLMClient({'llm_provider': 'google', 'providers': {
+            'google': {'api_key': 'test', 'comparison_images': {'mode': mode}}}})
+        client.provider_session = ProviderSession('google', {}, MagicMock())
+        client.google_client = client.provider_session.client
+        generate = client.google_client.GenerativeModel.return_value.generate_content
+        generate.side_effect = RuntimeError("offline")
+        with patch('dashboard.llm_client.get_enhanced_image_cache', return_value=EnhancedImageCache()):
+            client._call_google_api_with_comparison('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', "")
+        self.assertEqual(client.last_image_payload['comparison_mode'], mode)
+        return generate.call_args[0][0]
+
+    def test_roi_payload_smaller(self):
+        full = self._sent_parts('full')
+        roi = self._sent_parts('roi')
+        self.assertEqual(len(full), len(roi))
+        self.assertLess(len(roi[1]['data']), len(full[1]['data']))
+        self.assertIn("CHANGED AREA ONLY", roi[0])
+
+    def test_full_by_default(self):
+        self.assertEqual(ComparisonImageBuilder.from_config(ImageEncoder()).mode, 'full')
+        self.assertEqual(LLMClient({'llm_provider': 'google'}).comparison_builder.mode, 'full')
+
+    def test_stitched_single_image(self):
+        self.assertEqual(len(self._sent_parts('stitched')), 2)
@@ -0,0 +1,148 @@
+from django.test import TestCase
+from unittest.mock import MagicMock
+import time
+
+import numpy as np
+
+from dashboard.frame_store import get_frame_store
+from dashboard.frame_change import perceptual_hash
+from dashboard.decision_cache import DecisionCache, decision_key, get_decision_cache
+from dashboard.player_agent import PlayerAgent, PlayerResponse
+
+
+def put_screen(path, value):
+    get_frame_store().put_frame(path, 240, 160, np.full((160, 240, 3), value, dtype=np.uint8).tobytes())
+
+
+GAME_STATE = {'position': {'x': 5, 'y': 7}, 'direction': 'UP', 'map_id': 3}
+
+
+class DecisionCacheTest(TestCase):
+    """Test the bounded, expiring decision cache"""
+
+    def setUp(self):
+        self.cache = DecisionCache(max_entries=2, ttl_seconds=60)
+
+    def test_hit_saves_tokens(self):
+        self.cache.put('a', {'actions': ['A']}, tokens=500)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a')['actions'], ['A'])
+        metrics = self.cache.get_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses'], metrics['hit_rate'], metrics['tokens_saved']),
+                         (1, 1, 0.5, 500))
+
+    def test_ttl(self):
+        self.cache.ttl_seconds = 0.05
+        self.cache.put('a', {'actions': ['A']})
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get_metrics()['expired'], 1)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.put('a', {'actions': ['A']})
+        self.cache.put('b', {'actions': ['B']})
+        self.cache.get('a')
+        self.cache.put('c', {'actions': ['C']})
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get_metrics()['evictions'], 1)
+
+    def test_invalidate(self):
+        self.cache.put('a', {'actions': ['A']})
+        self.assertTrue(self.cache.invalidate('a'))
+        self.assertFalse(self.cache.invalidate('a'))
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_key(self):
+        self.assertIsNone(decision_key(None, GAME_STATE, 'v1'))
+        self.assertEqual(decision_key('f', GAME_STATE, 'v1', 'c'), ('f', 3, 5, 7, 'UP', 'v1', 'c'))
+        self.assertEqual(decision_key('f', {'x': 5, 'y': 7, 'direction': 'UP', 'map_id': 3}, 'v1'),
+                         ('f', 3, 5, 7, 'UP', 'v1', ''))
+
+    def test_perceptual_hash(self):
+        get_frame_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 100)
+        put_screen('/tmp/screenshot_ai_000002.png', 102)
+        put_screen('/tmp/screenshot_ai_000003.png', 200)
+        self.assertEqual(perceptual_hash('/tmp/screenshot_ai_000001.png'), perceptual_hash('/tmp/screenshot_ai_000002.png'))
+        self.assertNotEqual(perceptual_hash('/tmp/screenshot_ai_000001.png'), perceptual_hash('/tmp/screenshot_ai_000003.png'))
+
+
+class PlayerAgentDecisionCacheTest(TestCase):
+    """Test PlayerAgent reuses decisions and drops ones that change nothing"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 100)
+        put_screen('/tmp/screenshot_ai_000002.png', 200)
+        get_decision_cache().clear()
+        self.agent = PlayerAgent()
+        self.agent.llm_client = MagicMock(prompt_template='x' * 400, last_image_payload={'image_tokens': 258},
+                                          provider='google', providers_config={})
+        self.agent.llm_client.variant.return_value = self.agent.llm_client
+        self.agent.llm_client.prompt_template_version.return_value = 'v1'
+        self.agent._call_ai_with_retry = MagicMock(return_value=PlayerResponse(actions=['A'], text="Talk"))
+        self.agent._configure_decision_cache({'capture_system': {'decision_cache': {'enabled': True}}})
+
+    def tearDown(self):
+        get_decision_cache().clear()
+
+    def _decide(self, path='/tmp/screenshot_ai_000001.png', game_state=GAME_STATE, context=""):
+        return self.agent.analyze_and_decide(path, game_state, enhanced_context=context)
+
+    def test_recurring_state_reuses_decision(self):
+        tokens_saved = get_decision_cache().get_metrics()['tokens_saved']
+        self._decide()
+        response = self._decide()
+        self.assertEqual(response.actions, ['A'])
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 1)
+        self.assertEqual(get_decision_cache().get_metrics()['tokens_saved'] - tokens_saved, 100 + 258)
+
+    def test_different_state_or_template_misses(self):
+        self._decide()
+        self._decide(game_state={**GAME_STATE, 'direction': 'DOWN'})
+        self._decide(path='/tmp/screenshot_ai_000002.png')
+        self.agent.llm_client.prompt_template_version.return_value = 'v2'
+        self._decide()
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 4)
+
+    def test_different_context_misses(self):
+        self._decide(context="## 🧠 Memory:\nDoor is locked")
+        self._decide(context="## 🧠 Memory:\nDoor is open")
+        self._decide(context="## 🧠 Memory:\nDoor is open")
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 2)
+
+    def test_side_effect_response_not_cached(self):
+        self.agent.memory_system = None
+        self.agent._call_ai_with_retry.side_effect = lambda **kwargs: self.agent._convert_to_structured_response(
+            {'success': True, 'actions': ['A'], 'text': "New goal", 'objective_discovery': {'description': 'x'}}, GAME_STATE)
+        self._decide()
+        self._decide()
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 2)
+        self.assertEqual(len(get_decision_cache()), 0)
+
+    def test_disabled_by_default(self):
+        self.assertFalse(PlayerAgent().decision_cache_settings['enabled'])
+
+    def test_failed_decision_not_cached(self):
+        self.agent._call_ai_with_retry.return_value = PlayerResponse(success=False, text="error")
+        self._decide()
+        self.assertEqual(len(get_decision_cache()), 0)
+
+    def test_ineffective_decision_invalidated(self):
+        self._decide()
+        self.agent._invalidate_ineffective_decision('/tmp/screenshot_ai_000001.png', GAME_STATE)
+        self.assertEqual(len(get_decision_cache()), 0)
+        self._decide()
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 2)
+
+    def test_effective_decision_kept(self):
+        self._decide()
+        self.agent._invalidate_ineffective_decision('/tmp/screenshot_ai_000002.png', GAME_STATE)
+        self.assertEqual(len(get_decision_cache()), 1)
+
+    def test_disabled(self):
+        self.agent._configure_decision_cache({'capture_system': {'decision_cache': {'enabled': False}}})
+        self._decide()
+        self._decide()
+        self.assertEqual(self.agent._call_ai_with_retry.call_count, 2)
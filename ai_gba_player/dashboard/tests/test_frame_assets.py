@@ -0,0 +1,153 @@
+from django.test import TestCase, Client
+import io
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from dashboard.frame_store import get_frame_store
+from dashboard.frame_assets import FrameAssetStore, get_frame_asset_store
+from dashboard.frame_ring import get_frame_ring
+from dashboard.session_archive import SessionArchive
+from dashboard.ai_game_service import AIGameService
+
+
+def put_screen(path, value):
+    get_frame_store().put_frame(path, 240, 160, np.full((160, 240, 3), value, dtype=np.uint8).tobytes())
+
+
+class FrameAssetStoreTest(TestCase):
+    """Test chat screenshots are stored once per content hash"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 10)
+        put_screen('/tmp/screenshot_ai_000002.png', 10)
+        put_screen('/tmp/screenshot_ai_000003.png', 200)
+        self.store = FrameAssetStore()
+
+    def test_identical_frames_share_id(self):
+        first = self.store.publish('/tmp/screenshot_ai_000001.png')
+        self.assertEqual(self.store.publish('/tmp/screenshot_ai_000002.png'), first)
+        self.assertNotEqual(self.store.publish('/tmp/screenshot_ai_000003.png'), first)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.get_metrics()['deduplicated'], 1)
+
+    def test_frames_outlive_frame_store(self):
+        frame_id = self.store.publish('/tmp/screenshot_ai_000001.png')
+        get_frame_store().clear()
+        image = Image.open(io.BytesIO(self.store.get(frame_id)))
+        self.assertEqual(image.size, (240, 160))
+
+    def test_thumbnail(self):
+        frame_id = self.store.publish('/tmp/screenshot_ai_000001.png')
+        thumbnail = Image.open(io.BytesIO(self.store.get_thumbnail(frame_id)))
+        self.assertEqual(thumbnail.size, (120, 80))
+        self.assertIs(self.store.get_thumbnail(frame_id), self.store.get_thumbnail(frame_id))
+
+    def test_bounded_by_count(self):
+        store = FrameAssetStore(max_frames=1)
+        first = store.publish('/tmp/screenshot_ai_000001.png')
+        store.get_thumbnail(first)
+        store.publish('/tmp/screenshot_ai_000003.png')
+        self.assertIsNone(store.get(first))
+        self.assertIsNone(store.get_thumbnail(first))
+        self.assertEqual(store.get_metrics()['evictions'], 1)
+
+    def test_missing_frame(self):
+        self.assertIsNone(self.store.publish('/tmp/does_not_exist.png'))
+
+    def test_evicted_frame_restored_from_ring(self):
+        get_frame_ring().clear()
+        store = FrameAssetStore(max_frames=1)
+        first = store.publish('/tmp/screenshot_ai_000001.png')
+        store.publish('/tmp/screenshot_ai_000003.png')
+        self.assertIsNone(store.restore(first))
+        get_frame_ring().push('/tmp/screenshot_ai_000001.png', content_hash=first)
+        self.assertEqual(Image.open(io.BytesIO(store.restore(first))).size, (240, 160))
+        self.assertEqual(Image.open(io.BytesIO(store.get_thumbnail(first))).size, (120, 80))
+        self.assertEqual(store.get_metrics()['restored'], 1)
+        get_frame_ring().clear()
+
+    def test_evicted_frame_restored_from_open_archive(self):
+        get_frame_ring().clear()
+        directory = tempfile.mkdtemp()
+        archive = SessionArchive(os.path.join(directory, 'session.gbasession'))
+        try:
+            frame_id = archive.add_frame('/tmp/screenshot_ai_000001.png')
+            self.assertEqual(Image.open(io.BytesIO(self.store.restore(frame_id))).size, (240, 160))
+            self.assertIn(frame_id, self.store)
+            archive.close()
+            self.store.clear()
+            self.assertIsNone(self.store.restore(frame_id))
+        finally:
+            archive.close()
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class FrameViewTest(TestCase):
+    """Test /api/frames/ serves immutable, ETag-validated images"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_asset_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 10)
+        self.frame_id = get_frame_asset_store().publish('/tmp/screenshot_ai_000001.png')
+        self.client = Client()
+
+    def test_serves_frame(self):
+        response = self.client.get(f'/api/frames/{self.frame_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{self.frame_id}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_serves_thumbnail(self):
+        response = self.client.get(f'/api/frames/{self.frame_id}/thumbnail/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (120, 80))
+
+    def test_not_modified(self):
+        response = self.client.get(f'/api/frames/{self.frame_id}/', HTTP_IF_NONE_MATCH=f'"{self.frame_id}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_unknown_frame(self):
+        self.assertEqual(self.client.get('/api/frames/0123456789abcdef/').status_code, 404)
+
+    def test_evicted_frame(self):
+        get_frame_ring().clear()
+        get_frame_asset_store().clear()
+        self.assertEqual(self.client.get(f'/api/frames/{self.frame_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/frames/{self.frame_id}/thumbnail/').status_code, 404)
+        get_frame_ring().push('/tmp/screenshot_ai_000001.png', content_hash=self.frame_id)
+        self.assertEqual(self.client.get(f'/api/frames/{self.frame_id}/thumbnail/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/frames/{self.frame_id}/').status_code, 200)
+        get_frame_ring().clear()
+
+
+class ChatScreenshotMessageTest(TestCase):
+    """Test chat messages carry frame ids instead of embedded images"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_asset_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 10)
+        put_screen('/tmp/screenshot_ai_000002.png', 200)
+        self.service = AIGameService()
+        self.game_state = {'position': {'x': 1, 'y': 2}, 'direction': 'UP'}
+
+    def test_comparison_message(self):
+        self.service._send_screenshot_comparison_message('/tmp/screenshot_ai_000001.png',
+                                                         '/tmp/screenshot_ai_000002.png', self.game_state)
+        message = self.service.chat_messages[-1]
+        self.assertNotIn('previous_image_data', message)
+        self.assertIsNotNone(get_frame_asset_store().get(message['previous_frame_id']))
+        self.assertIsNotNone(get_frame_asset_store().get(message['current_frame_id']))
+        self.assertLess(len(str(message)), 1000)
+
+    def test_single_message(self):
+        self.service._send_single_screenshot_message('/tmp/screenshot_ai_000001.png', self.game_state)
+        self.assertIn(self.service.chat_messages[-1]['frame_id'], get_frame_asset_store())
@@ -0,0 +1,130 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from dashboard.frame_store import get_frame_store
+from dashboard.frame_change import FrameChangeDetector
+from dashboard.frame_ring import get_frame_ring
+from dashboard.player_agent import PlayerAgent
+
+
+def make_screen(seed=0):
+    """240x160 frame of 8x8 tiles from a small palette"""
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (16, 3), dtype=np.uint8)
+    tiles = rng.integers(0, 16, (20, 30))
+    return palette[np.kron(tiles, np.ones((8, 8), dtype=int))]
+
+
+def put_screen(path, pixels):
+    get_frame_store().put_frame(path, 240, 160, np.ascontiguousarray(pixels, dtype=np.uint8).tobytes())
+
+
+class FrameChangeDetectorTest(TestCase):
+    """Test the tile-mean perceptual diff between consecutive screenshots"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.detector = FrameChangeDetector()
+
+    def test_first_frame_has_no_signal(self):
+        put_screen('/tmp/screenshot_ai_000001.png', make_screen())
+        self.assertIsNone(self.detector.register('/tmp/screenshot_ai_000001.png'))
+        self.assertFalse(self.detector.is_unchanged('/tmp/screenshot_ai_000001.png'))
+
+    def test_identical_and_noisy_frames_unchanged(self):
+        """Test re-encoding noise below the tile tolerance does not count as a change"""
+        screen = make_screen()
+        noisy = np.clip(screen.astype(int) + 2, 0, 255)
+        put_screen('/tmp/screenshot_ai_000001.png', screen)
+        put_screen('/tmp/screenshot_ai_000002.png', noisy)
+        self.detector.register('/tmp/screenshot_ai_000001.png')
+
+        change = self.detector.register('/tmp/screenshot_ai_000002.png')
+        self.assertEqual(change.changed_tiles, 0)
+        self.assertIsNone(change.region)
+        self.assertTrue(self.detector.is_unchanged('/tmp/screenshot_ai_000002.png'))
+
+    def test_sprite_step_detected(self):
+        """Test a few changed tiles (e.g. the player moving) mark the frame as changed"""
+        screen = make_screen()
+        moved = screen.copy()
+        moved[72:88, 112:128] = 255 - moved[72:88, 112:128]
+        put_screen('/tmp/screenshot_ai_000001.png', screen)
+        put_screen('/tmp/screenshot_ai_000002.png', moved)
+        self.detector.register('/tmp/screenshot_ai_000001.png')
+
+        change = self.detector.register('/tmp/screenshot_ai_000002.png')
+        self.assertEqual((change.changed_tiles, change.total_tiles), (4, 600))
+        self.assertTrue(change.changed)
+        self.assertEqual(change.region, (112, 72, 128, 88))
+        self.assertEqual(change.to_dict()['region'], [112, 72, 128, 88])
+
+
+class PlayerAgentFrameChangeTest(TestCase):
+    """Test PlayerAgent picks the prompt from the frame-change signal"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_ring().clear()
+        self.agent = PlayerAgent()
+        self.agent.llm_client = MagicMock()
+        put_screen('/tmp/screenshot_ai_000001.png', make_screen())
+
+    def test_unchanged_frame_sends_single_image(self):
+        put_screen('/tmp/screenshot_ai_000002.png', make_screen())
+        self.agent._register_screenshot('/tmp/screenshot_ai_000001.png')
+        self.agent._register_screenshot('/tmp/screenshot_ai_000002.png')
+
+        self.agent._call_ai_api_with_comparison('/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png', {}, {}, "")
+        self.agent.llm_client.analyze_game_state_with_comparison.assert_not_called()
+        context = self.agent.llm_client.analyze_game_state.call_args[0][2]
+        self.assertIn("screen did not change", context)
+
+    def test_changed_frame_sends_comparison(self):
+        put_screen('/tmp/screenshot_ai_000002.png', make_screen(seed=1))
+        self.agent._register_screenshot('/tmp/screenshot_ai_000001.png')
+        self.agent._register_screenshot('/tmp/screenshot_ai_000002.png')
+
+        self.agent._call_ai_api_with_comparison('/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png', {}, {}, "")
+        self.agent.llm_client.analyze_game_state_with_comparison.assert_called_once()
+
+    def test_change_signal_on_ring_entry(self):
+        moved = make_screen()
+        moved[72:88, 112:128] = 255 - moved[72:88, 112:128]
+        put_screen('/tmp/screenshot_ai_000002.png', moved)
+        self.agent._register_screenshot('/tmp/screenshot_ai_000001.png')
+        self.agent._register_screenshot('/tmp/screenshot_ai_000002.png')
+
+        entry = self.agent.frame_ring.get('/tmp/screenshot_ai_000002.png')
+        self.assertTrue(entry.change.changed)
+        self.assertEqual(entry.to_dict()['change']['region'], [112, 72, 128, 88])
+        self.assertIsNone(self.agent.frame_ring.get('/tmp/screenshot_ai_000001.png').change)
+
+    def test_skip_policy(self):
+        """Test the skip policy needs both screen and RAM state unchanged, and is bounded"""
+        self.agent._configure_frame_change_detection(
+            {'capture_system': {'frame_change_detection': {'unchanged_policy': 'skip', 'max_skipped_cycles': 2}}})
+        put_screen('/tmp/screenshot_ai_000002.png', make_screen())
+        self.agent._register_screenshot('/tmp/screenshot_ai_000001.png')
+        self.agent._register_screenshot('/tmp/screenshot_ai_000002.png')
+        state = {'position': {'x': 1, 'y': 2}, 'direction': 'UP', 'map_id': 3}
+        moved = {'position': {'x': 1, 'y': 3}, 'direction': 'UP', 'map_id': 3}
+
+        self.assertFalse(self.agent._should_skip_unchanged_cycle('/tmp/screenshot_ai_000002.png', state, moved))
+        skips = [self.agent._should_skip_unchanged_cycle('/tmp/screenshot_ai_000002.png', state, dict(state))
+                 for _ in range(3)]
+        self.assertEqual(skips, [True, True, False])
+
+    def test_default_policy_never_skips(self):
+        put_screen('/tmp/screenshot_ai_000002.png', make_screen())
+        self.agent._register_screenshot('/tmp/screenshot_ai_000001.png')
+        self.agent._register_screenshot('/tmp/screenshot_ai_000002.png')
+        state = {'position': {'x': 1, 'y': 2}, 'direction': 'UP', 'map_id': 3}
+        self.assertFalse(self.agent._should_skip_unchanged_cycle('/tmp/screenshot_ai_000002.png', state, state))
+
+    def test_state_reader(self):
+        self.assertEqual(self.agent._read_game_state('/tmp/a.png', {'map_id': 1}), {'map_id': 1})
+        self.agent.set_state_reader(MagicMock(return_value={'map_id': 2}))
+        self.assertEqual(self.agent._read_game_state('/tmp/a.png', {'map_id': 1}), {'map_id': 2})
@@ -0,0 +1,78 @@
+from django.test import TestCase
+import os
+import tempfile
+
+from dashboard.frame_store import get_frame_store
+from dashboard.frame_ring import FrameRing
+from dashboard.player_agent import PlayerAgent
+
+
+class FrameRingTest(TestCase):
+    """Test the shared ring of recent screenshots"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.ring = FrameRing(capacity=3)
+
+    def test_current_previous_and_back(self):
+        for index in range(1, 5):
+            self.ring.push(f'/tmp/screenshot_ai_00000{index}.png', game_state={'map_id': index})
+
+        self.assertEqual(self.ring.current().path, '/tmp/screenshot_ai_000004.png')
+        self.assertEqual(self.ring.previous().game_state, {'map_id': 3})
+        self.assertEqual(self.ring.back(2).path, '/tmp/screenshot_ai_000002.png')
+        self.assertIsNone(self.ring.back(3))
+        self.assertEqual([entry.sequence for entry in self.ring.entries()], [3, 2, 1])
+
+    def test_lookup_by_path(self):
+        self.ring.push('/tmp/screenshot_ai_000001.png')
+        self.ring.push('/tmp/screenshot_ai_000002.png')
+        self.assertEqual(self.ring.previous_of('/tmp/screenshot_ai_000002.png').path, '/tmp/screenshot_ai_000001.png')
+        self.assertIsNone(self.ring.previous_of('/tmp/screenshot_ai_000001.png'))
+        self.assertIsNone(self.ring.get('/tmp/unknown.png'))
+
+    def test_second_push_updates_entry(self):
+        """Test the service and PlayerAgent registering the same frame share one entry"""
+        first = self.ring.push('/tmp/screenshot_ai_000001.png', game_state={'map_id': 1}, screen_type='dialogue')
+        second = self.ring.push('/tmp/screenshot_ai_000001.png', content_hash='abc')
+        self.assertIs(first, second)
+        self.assertEqual((second.game_state, second.screen_type, second.content_hash), ({'map_id': 1}, 'dialogue', 'abc'))
+        self.assertEqual(len(self.ring), 1)
+
+    def test_entry_keeps_in_memory_frame(self):
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 1, 1, b'\x01\x02\x03')
+        self.assertEqual(self.ring.push('/tmp/screenshot_ai_000001.png').frame.pixels, b'\x01\x02\x03')
+
+    def test_eviction_deletes_files_in_background(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f'screenshot_ai_00000{index}.png') for index in range(1, 5)]
+            for path in paths:
+                open(path, 'wb').close()
+                self.ring.push(path)
+            self.ring.flush()
+
+            self.assertEqual([os.path.exists(path) for path in paths], [False, True, True, True])
+            self.assertIsNone(self.ring.get(paths[0]))
+        self.assertEqual(self.ring.get_metrics()['deleted_files'], 1)
+
+    def test_eviction_drops_in_memory_frame(self):
+        for index in range(1, 5):
+            get_frame_store().put_frame(f'/tmp/screenshot_ai_00000{index}.png', 1, 1, b'\x00\x00\x00')
+            self.ring.push(f'/tmp/screenshot_ai_00000{index}.png')
+        self.assertFalse(get_frame_store().has_frame('/tmp/screenshot_ai_000001.png'))
+        self.assertTrue(get_frame_store().has_frame('/tmp/screenshot_ai_000002.png'))
+
+
+class PlayerAgentFrameRingTest(TestCase):
+    """Test PlayerAgent finds the previous screenshot through the ring"""
+
+    def test_previous_screenshot(self):
+        get_frame_store().clear()
+        agent = PlayerAgent()
+        agent.frame_ring = FrameRing()
+        for index in (1, 2):
+            get_frame_store().put_frame(f'/tmp/screenshot_ai_00000{index}.png', 1, 1, b'\x00\x00\x00')
+            agent._register_screenshot(f'/tmp/screenshot_ai_00000{index}.png')
+
+        self.assertEqual(agent._get_previous_screenshot_path('/tmp/screenshot_ai_000002.png'), '/tmp/screenshot_ai_000001.png')
+        self.assertIsNone(agent._get_previous_screenshot_path('/tmp/screenshot_ai_000001.png'))
@@ -0,0 +1,129 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import os
+import socket
+import tempfile
+
+from dashboard.frame_store import (
+    FrameStore, get_frame_store, frame_exists, open_frame_image, read_frame_bytes
+)
+from dashboard.ai_game_service import AIGameService
+
+
+def make_pixels(width=4, height=2, value=0x40):
+    return bytes([value]) * (width * height * 3)
+
+
+class FrameStoreTest(TestCase):
+    """Test the in-memory frame store used for socket frame transfer"""
+
+    def setUp(self):
+        get_frame_store().clear()
+
+    def test_put_and_get_frame(self):
+        """Test frames are stored and returned by key"""
+        store = FrameStore()
+        store.put_frame('/tmp/screenshot_ai_000001.png', 4, 2, make_pixels())
+
+        frame = store.get_frame('/tmp/screenshot_ai_000001.png')
+        self.assertIsNotNone(frame)
+        self.assertEqual((frame.width, frame.height), (4, 2))
+        self.assertTrue(store.has_frame('/tmp/screenshot_ai_000001.png'))
+
+    def test_size_mismatch_rejected(self):
+        """Test truncated payloads are rejected"""
+        store = FrameStore()
+        with self.assertRaises(ValueError):
+            store.put_frame('frame', 4, 2, b'\x00' * 5)
+
+    def test_unknown_pixel_format_rejected(self):
+        """Test unsupported pixel formats are rejected"""
+        store = FrameStore()
+        with self.assertRaises(ValueError):
+            store.put_frame('frame', 4, 2, make_pixels(), pixel_format='bgr565')
+
+    def test_oldest_frames_evicted(self):
+        """Test store stays bounded at max_frames"""
+        store = FrameStore(max_frames=2)
+        for i in range(3):
+            store.put_frame(f'frame_{i}', 4, 2, make_pixels())
+
+        self.assertEqual(len(store), 2)
+        self.assertFalse(store.has_frame('frame_0'))
+        self.assertTrue(store.has_frame('frame_2'))
+
+    def test_png_roundtrip(self):
+        """Test in-memory frames are readable as PIL images and PNG bytes"""
+        get_frame_store().put_frame('/virtual/frame.png', 4, 2, make_pixels(value=0x80))
+
+        image = open_frame_image('/virtual/frame.png')
+        self.assertEqual(image.size, (4, 2))
+        self.assertEqual(image.getpixel((0, 0)), (0x80, 0x80, 0x80))
+        self.assertTrue(read_frame_bytes('/virtual/frame.png').startswith(b'\x89PNG'))
+        self.assertTrue(frame_exists('/virtual/frame.png'))
+
+    def test_falls_back_to_disk(self):
+        """Test helpers read files from disk when no frame is in memory"""
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
+            f.write(b'png-bytes')
+            path = f.name
+        try:
+            self.assertTrue(frame_exists(path))
+            self.assertEqual(read_frame_bytes(path), b'png-bytes')
+        finally:
+            os.remove(path)
+        self.assertFalse(frame_exists(path))
+
+
+class InBandFrameProtocolTest(TestCase):
+    """Test AIGameService parsing of frame_data headers and raw payloads"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.service = AIGameService()
+        self.service._process_mgba_message = MagicMock()
+        service_side, self.mgba = socket.socketpair()
+        self.service._attach_connection(service_side, 'test')
+        self.mgba.settimeout(1.0)
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def _receive(self, data):
+        self.mgba.sendall(data)
+        self.service.io_loop.run_once(0.5)
+
+    def test_frame_payload_split_across_reads(self):
+        """Test a frame and the following text message survive arbitrary chunking"""
+        pixels = make_pixels()
+        stream = (
+            f"frame_data||screenshot_ai_000001.png||4||2||rgb24||{len(pixels)}\n".encode('utf-8')
+            + pixels
+            + b"screenshot_with_state||DOWN||5||6||1\n"
+        )
+
+        for i in range(0, len(stream), 7):
+            self._receive(stream[i:i + 7])
+
+        frame_path = str(self.service.screenshot_dir / 'screenshot_ai_000001.png')
+        self.assertTrue(get_frame_store().has_frame(frame_path))
+        self.service._process_mgba_message.assert_called_once_with("screenshot_with_state||DOWN||5||6||1", request_id=0)
+
+    def test_payload_containing_newlines(self):
+        """Test newline bytes inside pixel data are not treated as message boundaries"""
+        pixels = make_pixels(value=0x0A)
+        self._receive(f"frame_data||f.png||4||2||rgb24||{len(pixels)}\n".encode('utf-8') + pixels)
+
+        self.assertTrue(get_frame_store().has_frame(str(self.service.screenshot_dir / 'f.png')))
+        self.service._process_mgba_message.assert_not_called()
+
+    def test_socket_mode_requests_in_band_frame(self):
+        """Test socket transfer mode sends request_frame_to instead of request_screenshot_to"""
+        self.service.frame_transfer_mode = 'socket'
+
+        self.service._request_screenshot()
+        self.service.io_loop.run_once(0)
+
+        sent = self.mgba.recv(1024).decode('utf-8')
+        self.assertTrue(sent.startswith("request_frame_to||screenshot_ai_"))
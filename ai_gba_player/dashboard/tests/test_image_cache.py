@@ -0,0 +1,105 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+from PIL import Image
+
+from dashboard.frame_store import get_frame_store
+from dashboard.image_cache import EnhancedImageCache, frame_content_key
+from dashboard.llm_client import LLMClient
+from dashboard.provider_sessions import ProviderSession
+
+
+def make_pixels(width=4, height=2, value=0x40):
+    return bytes([value]) * (width * height * 3)
+
+
+class EnhancedImageCacheTest(TestCase):
+    """Test enhanced screenshots are encoded once and reused across decision cycles"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.enhancer = MagicMock(side_effect=lambda path, native=False: Image.new('RGB', (12, 6)))
+        self.cache = EnhancedImageCache(max_entries=2, enhancer=self.enhancer)
+
+    def test_second_lookup_is_cached(self):
+        """Test the previous frame is not enhanced again on the next cycle"""
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 4, 2, make_pixels())
+
+        first = self.cache.get_png('/tmp/screenshot_ai_000001.png')
+        second = self.cache.get_png('/tmp/screenshot_ai_000001.png')
+
+        self.assertTrue(first.startswith(b'\x89PNG'))
+        self.assertIs(first, second)
+        self.assertEqual(self.enhancer.call_count, 1)
+        self.assertEqual(self.cache.get_metrics()['hits'], 1)
+
+    def test_keyed_by_content(self):
+        """Test identical frames under different paths share one entry"""
+        store = get_frame_store()
+        store.put_frame('/tmp/screenshot_ai_000001.png', 4, 2, make_pixels())
+        store.put_frame('/tmp/screenshot_ai_000002.png', 4, 2, make_pixels())
+        store.put_frame('/tmp/screenshot_ai_000003.png', 4, 2, make_pixels(value=0x80))
+
+        for index in (1, 2, 3):
+            self.cache.get_png(f'/tmp/screenshot_ai_00000{index}.png')
+        self.assertEqual(self.enhancer.call_count, 2)
+
+    def test_file_frames_hashed_from_disk(self):
+        """Test screenshots on disk are keyed by their file content"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'screenshot.png')
+            Image.new('RGB', (4, 2)).save(path)
+            self.assertEqual(frame_content_key(path), frame_content_key(path))
+            self.cache.get_png(path)
+            self.cache.get_png(path)
+        self.assertEqual(self.enhancer.call_count, 1)
+
+    def test_bounded(self):
+        store = get_frame_store()
+        for index in range(3):
+            store.put_frame(f'/tmp/screenshot_ai_00000{index}.png', 4, 2, make_pixels(value=index))
+            self.cache.get_png(f'/tmp/screenshot_ai_00000{index}.png')
+        self.assertEqual(len(self.cache), 2)
+
+    def test_prefetch_populates_cache(self):
+        """Test eager enhancement means the decision cycle only hits the cache"""
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 4, 2, make_pixels())
+        self.cache.prefetch('/tmp/screenshot_ai_000001.png').result(timeout=5)
+
+        self.cache.get_png('/tmp/screenshot_ai_000001.png')
+        self.assertEqual(self.enhancer.call_count, 1)
+        self.assertEqual(self.cache.get_metrics()['hits'], 1)
+
+    def test_enhancement_failure_not_cached(self):
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 4, 2, make_pixels())
+        self.enhancer.side_effect = [OSError("boom"), Image.new('RGB', (12, 6))]
+
+        with self.assertRaises(OSError):
+            self.cache.get_png('/tmp/screenshot_ai_000001.png')
+        self.assertTrue(self.cache.get_png('/tmp/screenshot_ai_000001.png').startswith(b'\x89PNG'))
+
+
+class LLMClientImageCacheTest(TestCase):
+    """Test the Gemini comparison call pays for at most one new enhancement"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.cache = EnhancedImageCache()
+        self.client = LLMClient({'llm_provider': 'google', 'providers': {'google': {'api_key': 'test'}}})
+        self.client.provider_session = ProviderSession('google', {}, MagicMock())
+        self.client.google_client = self.client.provider_session.client
+        self.client.google_client.GenerativeModel.return_value.generate_content.side_effect = RuntimeError("offline")
+
+    def test_previous_frame_reused(self):
+        store = get_frame_store()
+        for index in (1, 2, 3):
+            store.put_frame(f'/tmp/screenshot_ai_00000{index}.png', 4, 2, make_pixels(value=index))
+
+        with patch('dashboard.llm_client.get_enhanced_image_cache', return_value=self.cache), \
+             patch.object(self.cache, 'enhancer', wraps=self.cache.enhancer) as enhancer:
+            self.client._call_google_api_with_comparison('/tmp/screenshot_ai_000001.png', '/tmp/screenshot_ai_000002.png', "")
+            self.assertEqual(enhancer.call_count, 2)
+            self.client._call_google_api_with_comparison('/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000003.png', "")
+            self.assertEqual(enhancer.call_count, 3)
@@ -0,0 +1,117 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import io
+
+import numpy as np
+from PIL import Image
+
+from dashboard.frame_store import get_frame_store
+from dashboard.image_cache import EnhancedImageCache
+from dashboard.image_encoding import ImageEncoder, estimate_image_tokens
+from dashboard.llm_client import LLMClient
+
+
+def make_frame(width=240, height=160, colours=16, seed=0):
+    """Pixel-art-like frame: 8x8 tiles from a small palette"""
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (colours, 3), dtype=np.uint8)
+    tiles = rng.integers(0, colours, (height // 8, width // 8))
+    return Image.fromarray(palette[np.kron(tiles, np.ones((8, 8), dtype=int))])
+
+
+class ImageEncoderTest(TestCase):
+    """Test the per-provider image encoder stage"""
+
+    def test_formats(self):
+        """Test each format produces decodable bytes with the matching MIME type"""
+        image = make_frame()
+        for name, mime_type, pil_format in (('png', 'image/png', 'PNG'), ('webp', 'image/webp', 'WEBP'),
+                                            ('jpeg', 'image/jpeg', 'JPEG')):
+            encoded = ImageEncoder(format=name).encode(image)
+            self.assertEqual(encoded.mime_type, mime_type)
+            self.assertEqual(Image.open(io.BytesIO(encoded.data)).format, pil_format)
+            self.assertTrue(encoded.to_data_url().startswith(f"data:{mime_type};base64,"))
+
+    def test_palette_png_is_lossless_for_pixel_art(self):
+        """Test a 256-colour palette keeps every pixel of a frame with few colours"""
+        image = make_frame()
+        encoded = ImageEncoder(palette_colors=256).encode(image)
+        decoded = Image.open(io.BytesIO(encoded.data)).convert('RGB')
+        np.testing.assert_array_equal(np.asarray(decoded), np.asarray(image))
+
+    def test_token_budget_reduces_resolution(self):
+        """Test an upscaled frame over the token budget is reduced by an integer factor"""
+        image = make_frame().resize((720, 480), Image.NEAREST)
+        encoded = ImageEncoder(provider='anthropic', max_image_tokens=60).encode(image)
+
+        self.assertEqual((encoded.width, encoded.height), (240, 160))
+        self.assertLessEqual(encoded.tokens, 60)
+
+    def test_byte_budget_lowers_quality(self):
+        image = make_frame(colours=200)
+        full = ImageEncoder(format='jpeg', quality=95).encode(image)
+        budgeted = ImageEncoder(format='jpeg', quality=95, max_bytes=len(full.data) - 1).encode(image)
+        self.assertLess(len(budgeted.data), len(full.data))
+
+    def test_token_estimates(self):
+        self.assertEqual(estimate_image_tokens('google', 240, 160), 258)
+        self.assertEqual(estimate_image_tokens('openai', 720, 480), 85 + 170 * 2)
+        self.assertEqual(estimate_image_tokens('anthropic', 720, 480), 461)
+
+    def test_provider_defaults(self):
+        """Test OpenAI keeps getting the unenhanced native frame unless configured otherwise"""
+        openai = ImageEncoder.from_config('openai')
+        self.assertTrue(openai.native)
+        self.assertFalse(openai.enhance)
+
+        google = ImageEncoder.from_config('google', {'format': 'webp'})
+        self.assertFalse(google.native)
+        self.assertEqual(google.format, 'webp')
+
+
+class EncodedImageCacheTest(TestCase):
+    """Test the cache stores one entry per frame and encoder"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 8, 8, make_frame(8, 8).tobytes())
+        self.enhancer = MagicMock(side_effect=lambda path, native=False: make_frame(8 if native else 24, 8 if native else 24))
+        self.cache = EnhancedImageCache(enhancer=self.enhancer)
+
+    def test_native_resolution_skips_upscale(self):
+        encoded = self.cache.get_encoded('/tmp/screenshot_ai_000001.png', ImageEncoder(resolution='native'))
+        self.enhancer.assert_called_once_with('/tmp/screenshot_ai_000001.png', native=True)
+        self.assertEqual((encoded.width, encoded.height), (8, 8))
+
+    def test_unenhanced_frame(self):
+        encoded = self.cache.get_encoded('/tmp/screenshot_ai_000001.png', ImageEncoder(enhance=False))
+        self.enhancer.assert_not_called()
+        self.assertEqual((encoded.width, encoded.height), (8, 8))
+
+    def test_encoders_cached_separately(self):
+        """Test each encoder gets its own entry while the enhanced frame is shared"""
+        png = self.cache.get_encoded('/tmp/screenshot_ai_000001.png', ImageEncoder(format='png'))
+        webp = self.cache.get_encoded('/tmp/screenshot_ai_000001.png', ImageEncoder(format='webp'))
+        self.assertIs(self.cache.get_encoded('/tmp/screenshot_ai_000001.png', ImageEncoder(format='webp')), webp)
+        self.assertNotEqual(png.mime_type, webp.mime_type)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.enhancer.call_count, 1)
+
+
+class LLMClientImagePayloadTest(TestCase):
+    """Test LLMClient encodes images with its provider's settings and records the payload"""
+
+    def test_payload_recorded(self):
+        get_frame_store().clear()
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 8, 8, make_frame(8, 8).tobytes())
+        client = LLMClient({
+            'llm_provider': 'openai',
+            'providers': {'openai': {'api_key': 'test', 'image_encoding': {'format': 'jpeg', 'quality': 70}}}
+        })
+
+        with patch('dashboard.llm_client.get_enhanced_image_cache', return_value=EnhancedImageCache()):
+            image, = client._encode_images('/tmp/screenshot_ai_000001.png')
+
+        self.assertEqual(image.mime_type, 'image/jpeg')
+        self.assertEqual(client.last_image_payload['bytes'], len(image.data))
+        self.assertEqual(client.last_image_payload['image_tokens'], 85 + 170)
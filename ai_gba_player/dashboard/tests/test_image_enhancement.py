@@ -0,0 +1,83 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from dashboard import image_enhancement
+from dashboard.image_enhancement import (
+    PixelArtEnhancer, create_frame_enhancer, configure_frame_enhancement, enhance_image_pil
+)
+
+
+def make_frame(width=16, height=8, seed=0):
+    """Pixel-art-like frame: 4x4 tiles from a small palette of mid-range colours"""
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(64, 192, (8, 3), dtype=np.uint8)
+    tiles = rng.integers(0, 8, (height // 4, width // 4))
+    return Image.fromarray(palette[np.kron(tiles, np.ones((4, 4), dtype=int))])
+
+
+class PixelArtEnhancerTest(TestCase):
+    """Test the fused NumPy enhancement path"""
+
+    def test_nearest_neighbour_upscale(self):
+        """Test every source pixel becomes a solid scale x scale block"""
+        image = make_frame()
+        output = np.asarray(PixelArtEnhancer(scale_factor=3, contrast=1.0, saturation=1.0, brightness=1.0)(image))
+
+        self.assertEqual(output.shape, (24, 48, 3))
+        np.testing.assert_array_equal(output, np.repeat(np.repeat(np.asarray(image), 3, 0), 3, 1))
+
+    def test_matches_pil_colour_chain(self):
+        """Test the lookup table matches PIL's contrast/saturation/brightness passes when nothing clips"""
+        image = make_frame()
+        knobs = {'contrast': 1.2, 'saturation': 1.1, 'brightness': 1.05}
+
+        output = np.asarray(PixelArtEnhancer(scale_factor=1, **knobs)(image)).astype(int)
+        expected = ImageEnhance.Contrast(image).enhance(knobs['contrast'])
+        expected = ImageEnhance.Color(expected).enhance(knobs['saturation'])
+        expected = ImageEnhance.Brightness(expected).enhance(knobs['brightness'])
+
+        self.assertLessEqual(np.abs(output - np.asarray(expected).astype(int)).max(), 2)
+
+    def test_output_buffer_reused(self):
+        """Test the full-size buffer is allocated once and returned images don't alias it"""
+        enhancer = PixelArtEnhancer()
+        first = enhancer(make_frame(seed=1))
+        buffer = enhancer._buffer
+        second = enhancer(make_frame(seed=2))
+
+        self.assertIs(enhancer._buffer, buffer)
+        self.assertNotEqual(first.tobytes(), second.tobytes())
+
+    def test_non_rgb_input(self):
+        output = PixelArtEnhancer()(make_frame().convert('RGBA'))
+        self.assertEqual((output.mode, output.size), ('RGB', (48, 24)))
+
+
+class FrameEnhancerConfigTest(TestCase):
+    """Test the enhancement backend is selected from frame_enhancement settings"""
+
+    def tearDown(self):
+        configure_frame_enhancement(None)
+
+    def test_backend_selection(self):
+        self.assertNotIsInstance(create_frame_enhancer(), PixelArtEnhancer)
+        self.assertIsInstance(create_frame_enhancer({'backend': 'numpy'}), PixelArtEnhancer)
+        self.assertNotIsInstance(create_frame_enhancer({'backend': 'pil'}), PixelArtEnhancer)
+        self.assertNotIsInstance(create_frame_enhancer({'backend': 'bogus'}), PixelArtEnhancer)
+
+    def test_pil_backend_uses_knobs(self):
+        output = create_frame_enhancer({'backend': 'pil', 'scale_factor': 2})(make_frame())
+        self.assertEqual(output.size, enhance_image_pil(make_frame(), scale_factor=2).size)
+
+    def test_falls_back_without_numpy(self):
+        with patch.object(image_enhancement, 'NUMPY_AVAILABLE', False):
+            self.assertNotIsInstance(create_frame_enhancer({'backend': 'numpy'}), PixelArtEnhancer)
+
+    def test_configure_reports_changes(self):
+        configure_frame_enhancement({'backend': 'pil'})
+        self.assertFalse(configure_frame_enhancement({'backend': 'pil'}))
+        self.assertTrue(configure_frame_enhancement({'backend': 'numpy'}))
+        self.assertIsInstance(image_enhancement.get_frame_enhancer(), PixelArtEnhancer)
@@ -0,0 +1,116 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+import threading
+import time
+
+from dashboard.io_loop import IOLoop
+from dashboard.ai_game_service import AIGameService
+
+
+class IOLoopTest(TestCase):
+    """Test the selectors-based event loop"""
+
+    def setUp(self):
+        self.loop = IOLoop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_timers_run_in_order(self):
+        """Test call_later callbacks fire in deadline order"""
+        calls = []
+        self.loop.call_later(0.02, calls.append, 'second')
+        self.loop.call_later(0.0, calls.append, 'first')
+
+        deadline = time.time() + 1.0
+        while len(calls) < 2 and time.time() < deadline:
+            self.loop.run_once(0.05)
+        self.assertEqual(calls, ['first', 'second'])
+
+    def test_cancelled_timer_does_not_run(self):
+        """Test cancelled timers are skipped"""
+        calls = []
+        handle = self.loop.call_later(0.0, calls.append, 'x')
+        handle.cancel()
+        self.loop.run_once(0.01)
+        self.loop.run_once(0.01)
+        self.assertEqual(calls, [])
+
+    def test_reader_callback(self):
+        """Test readable sockets invoke their reader"""
+        a, b = socket.socketpair()
+        a.setblocking(False)
+        received = []
+        self.loop.add_reader(a, lambda: received.append(a.recv(10)))
+
+        b.sendall(b'ping')
+        self.loop.run_once(0.5)
+
+        self.assertEqual(received, [b'ping'])
+        self.loop.remove_reader(a)
+        a.close()
+        b.close()
+
+    def test_call_soon_threadsafe_wakes_loop(self):
+        """Test a callback from another thread interrupts a long select()"""
+        calls = []
+        thread = threading.Thread(target=self.loop.run_forever)
+        thread.start()
+        try:
+            time.sleep(0.05)
+            start = time.time()
+            done = threading.Event()
+            self.loop.call_soon_threadsafe(lambda: (calls.append('ran'), done.set()))
+            self.assertTrue(done.wait(1.0))
+            self.assertLess(time.time() - start, 0.5)
+        finally:
+            self.loop.stop()
+            thread.join(1.0)
+        self.assertEqual(calls, ['ran'])
+        self.assertFalse(thread.is_alive())
+
+
+class AIGameServiceEventLoopTest(TestCase):
+    """Test AIGameService accepts and talks to mGBA through the event loop"""
+
+    def test_connect_send_and_disconnect(self):
+        """Test a full connection lifecycle against a running service thread"""
+        service = AIGameService()
+        service.port = 0
+        service._send_chat_message = MagicMock()
+        service._setup_socket_server = self._wrap_setup(service)
+        service.start()
+        self.assertTrue(self.listening.wait(2.0))
+
+        mgba = socket.create_connection(('127.0.0.1', self.port), timeout=2.0)
+        try:
+            deadline = time.time() + 2.0
+            while not service.mgba_connected and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(service.mgba_connected)
+
+            # Sent from this (non-loop) thread, written by the loop
+            service._send_to_mgba("6|2")
+            self.assertEqual(mgba.recv(100), b"6|2\n")
+
+            mgba.close()
+            deadline = time.time() + 2.0
+            while service.mgba_connected and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(service.mgba_connected)
+        finally:
+            service.agent_coordinator.shutdown = MagicMock()
+            service.stop()
+            service.join(2.0)
+        self.assertFalse(service.is_alive())
+
+    def _wrap_setup(self, service):
+        self.listening = threading.Event()
+        original = service._setup_socket_server
+
+        def setup():
+            original()
+            self.port = service.socket.getsockname()[1]
+            self.listening.set()
+        return setup
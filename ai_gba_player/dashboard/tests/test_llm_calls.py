@@ -0,0 +1,381 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import threading
+import time
+
+import numpy as np
+
+from dashboard.frame_store import get_frame_store
+from dashboard.llm_calls import (
+    Deadline, LLMDeadlineError, LLMCancelledError, run_with_deadline, get_llm_call_stats,
+    hedged_call, get_hedge_stats, in_hedge_leg
+)
+from dashboard.llm_client import LLMClient
+from dashboard.provider_sessions import ProviderSession, clear_provider_sessions
+from dashboard.player_agent import PlayerAgent
+
+
+class DeadlineExceeded(Exception):
+    """Stands in for google.api_core.exceptions.DeadlineExceeded"""
+
+
+class DeadlineTest(TestCase):
+    """Test deadlines, child deadlines and cancellation"""
+
+    def test_child_capped_by_parent(self):
+        parent = Deadline(1.0)
+        self.assertLessEqual(parent.child(30).remaining(), 1.0)
+        self.assertLessEqual(parent.child(0.1).remaining(), 0.1)
+
+    def test_cancel_propagates_and_wakes(self):
+        parent = Deadline(30)
+        child = parent.child(30)
+        threading.Timer(0.05, parent.cancel).start()
+        start = time.monotonic()
+        self.assertFalse(child.wait(5))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(child.cancelled)
+
+    def test_no_limit(self):
+        self.assertFalse(Deadline().expired)
+        self.assertTrue(Deadline().wait(0.01))
+
+
+class RunWithDeadlineTest(TestCase):
+    """Test requests are bounded by their deadline and counted per provider and model"""
+
+    def setUp(self):
+        get_llm_call_stats().clear()
+
+    def test_result(self):
+        self.assertEqual(run_with_deadline(lambda timeout: timeout > 0, Deadline(5), 'google', 'm'), True)
+        self.assertEqual(get_llm_call_stats().get_metrics()['google']['m']['ok'], 1)
+
+    def test_timeout(self):
+        release = threading.Event()
+        start = time.monotonic()
+        with self.assertRaises(LLMDeadlineError):
+            run_with_deadline(lambda timeout: release.wait(5), Deadline(0.1), 'google', 'm')
+        release.set()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(get_llm_call_stats().get_metrics()['google']['m']['timeout'], 1)
+
+    def test_cancel(self):
+        deadline = Deadline(30)
+        release = threading.Event()
+        threading.Timer(0.05, deadline.cancel).start()
+        with self.assertRaises(LLMCancelledError):
+            run_with_deadline(lambda timeout: release.wait(5), deadline, 'openai', 'm')
+        release.set()
+        self.assertEqual(get_llm_call_stats().get_metrics()['openai']['m']['cancelled'], 1)
+
+    def test_abandoned_requests_do_not_block_later_ones(self):
+        release = threading.Event()
+        for _ in range(12):
+            with self.assertRaises(LLMDeadlineError):
+                run_with_deadline(lambda timeout: release.wait(5), Deadline(0.01), 'google', 'm')
+        try:
+            self.assertEqual(run_with_deadline(lambda timeout: 'ok', Deadline(1), 'google', 'm'), 'ok')
+        finally:
+            release.set()
+
+    def test_sdk_timeout_counts_as_timeout(self):
+        def request(timeout):
+            raise DeadlineExceeded("504 Deadline Exceeded")
+        with self.assertRaises(LLMDeadlineError):
+            run_with_deadline(request, Deadline(5), 'google', 'm')
+        self.assertEqual(get_llm_call_stats().get_metrics()['google']['m']['timeout'], 1)
+
+    def test_errors_pass_through(self):
+        def request(timeout):
+            raise ValueError("bad request")
+        with self.assertRaises(ValueError):
+            run_with_deadline(request, Deadline(5), 'google', 'm')
+        self.assertEqual(get_llm_call_stats().get_metrics()['google']['m']['error'], 1)
+
+    def test_percentiles(self):
+        stats = get_llm_call_stats()
+        for latency in range(1, 101):
+            stats.record('google', 'm', latency / 100, 'ok')
+        self.assertAlmostEqual(stats.percentile('google', 'm', 90), 0.9, places=2)
+        self.assertEqual(stats.get_metrics()['google']['m']['p50_ms'], 510.0)
+
+
+class LLMClientDeadlineTest(TestCase):
+    """Test a hung Gemini request returns a timed-out response instead of blocking"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 240, 160,
+                                    np.zeros((160, 240, 3), dtype=np.uint8).tobytes())
+        get_llm_call_stats().clear()
+        self.release = threading.Event()
+        self.client = LLMClient({'llm_provider': 'google', 'llm_timeout_seconds': 0.2,
+                                 'providers': {'google': {'api_key': 'test', 'model_name': 'gemini-test'}}})
+        self.client.provider_session = ProviderSession('google', {}, MagicMock())
+        self.client.google_client = self.client.provider_session.client
+        self.generate = self.client.google_client.GenerativeModel.return_value.generate_content
+        self.generate.side_effect = lambda *args, **kwargs: self.release.wait(5)
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_request_timeout(self):
+        start = time.monotonic()
+        response = self.client._call_google_api('/tmp/screenshot_ai_000001.png', "")
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertFalse(response['success'])
+        self.assertTrue(response['timed_out'])
+        self.assertLessEqual(self.generate.call_args.kwargs['request_options']['timeout'], 0.2)
+        self.assertEqual(get_llm_call_stats().get_metrics()['google']['gemini-test']['timeout'], 1)
+
+    def test_decision_deadline_tighter_than_timeout(self):
+        self.client.timeout = 30
+        response = self.client._call_google_api('/tmp/screenshot_ai_000001.png', "", Deadline(0.1))
+        self.assertTrue(response['timed_out'])
+        self.assertLessEqual(self.generate.call_args.kwargs['request_options']['timeout'], 0.1)
+
+
+class LLMClientOpenAIDeadlineTest(TestCase):
+    """Test OpenAI single and comparison requests run under the decision deadline"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        for number, value in ((1, 0), (2, 200)):
+            get_frame_store().put_frame(f'/tmp/screenshot_ai_00000{number}.png', 240, 160,
+                                        np.full((160, 240, 3), value, dtype=np.uint8).tobytes())
+        get_llm_call_stats().clear()
+        self.release = threading.Event()
+        self.client = LLMClient({'llm_provider': 'openai', 'llm_timeout_seconds': 30,
+                                 'providers': {'openai': {'api_key': 'test', 'model_name': 'gpt-test'}}})
+        self.client.provider_session = ProviderSession('openai', {}, MagicMock())
+        self.client.openai_client = self.client.provider_session.client
+        self.create = self.client.openai_client.chat.completions.create
+        self.create.side_effect = lambda **kwargs: self.release.wait(5)
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_single_image_deadline(self):
+        response = self.client._call_openai_api('/tmp/screenshot_ai_000001.png', "", Deadline(0.1))
+        self.assertTrue(response['timed_out'])
+        self.assertLessEqual(self.create.call_args.kwargs['timeout'], 0.1)
+
+    def test_comparison_deadline(self):
+        start = time.monotonic()
+        response = self.client.analyze_game_state_with_comparison(
+            '/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png', {}, deadline=Deadline(0.1))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertTrue(response['timed_out'])
+        self.assertLessEqual(self.create.call_args.kwargs['timeout'], 0.1)
+        self.assertEqual(get_llm_call_stats().get_metrics()['openai']['gpt-test']['timeout'], 1)
+
+    def test_comparison_response(self):
+        tool_call = MagicMock()
+        tool_call.function.name = 'press_button_sequence'
+        tool_call.function.arguments = '{"actions": ["UP", "A"]}'
+        self.create.side_effect = None
+        self.create.return_value.choices[0].message.content = "Moved up"
+        self.create.return_value.choices[0].message.tool_calls = [tool_call]
+        response = self.client.analyze_game_state_with_comparison(
+            '/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png', {})
+        self.assertEqual((response['success'], response['actions'], response['text']), (True, ['UP', 'A'], "Moved up"))
+        content = self.create.call_args.kwargs['messages'][0]['content']
+        self.assertEqual(content[0]['type'], 'text')
+        self.assertTrue(all(part['image_url']['url'].startswith('data:image/') for part in content[1:]))
+
+
+class PlayerAgentDeadlineTest(TestCase):
+    """Test retries share one decision deadline"""
+
+    def setUp(self):
+        self.agent = PlayerAgent()
+        self.agent.retry_backoff_delay = 0.05
+        self.deadlines = []
+
+        def timed_out(**kwargs):
+            self.deadlines.append(kwargs['deadline'].remaining())
+            time.sleep(0.1)
+            return {"success": False, "text": "", "error": "google gemini-test request timed out", "timed_out": True}
+        self.agent._call_ai_api_with_comparison = timed_out
+
+    def _decide(self, deadline_seconds):
+        config = {'llm_provider': 'google', 'providers': {'google': {'decision_deadline_seconds': deadline_seconds}}}
+        with patch.object(self.agent, '_load_config', return_value=config):
+            return self.agent._call_ai_with_retry('/tmp/screenshot_ai_000002.png', None, {}, "")
+
+    def test_retries_get_remaining_time(self):
+        response = self._decide(10)
+        self.assertFalse(response.success)
+        self.assertEqual(len(self.deadlines), self.agent.max_retry_attempts + 1)
+        self.assertEqual(self.deadlines, sorted(self.deadlines, reverse=True))
+
+    def test_stops_when_deadline_passes(self):
+        response = self._decide(0.15)
+        self.assertLess(len(self.deadlines), self.agent.max_retry_attempts + 1)
+        self.assertIn("deadline exceeded", response.text)
+
+    def test_stop_cancels_decision(self):
+        self.agent.autonomous_mode = True
+        threading.Timer(0.05, self.agent.stop_autonomous_play).start()
+        self.agent.retry_backoff_delay = 5
+        start = time.monotonic()
+        response = self._decide(30)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertIn("cancelled", response.text)
+
+
+def has_actions(response):
+    return bool(response and response.get('actions'))
+
+
+class HedgedCallTest(TestCase):
+    """Test a slow primary request is raced by a backup and the loser cancelled"""
+
+    def setUp(self):
+        get_hedge_stats().clear()
+        self.cancelled = []
+
+    def _slow(self, name, seconds, response):
+        def request(deadline):
+            if not deadline.wait(seconds):
+                self.cancelled.append(name)
+                return {'actions': [], 'cancelled': True}
+            return response
+        return request
+
+    def test_fast_primary_not_hedged(self):
+        result, winner, hedged = hedged_call(lambda d: {'actions': ['A']}, self._slow('backup', 0, {'actions': ['B']}),
+                                             1.0, None, has_actions, 'route')
+        self.assertEqual((result['actions'], winner, hedged), (['A'], 'primary', False))
+
+    def test_backup_wins_and_primary_cancelled(self):
+        start = time.monotonic()
+        result, winner, hedged = hedged_call(self._slow('primary', 5, {'actions': ['A']}),
+                                             lambda d: {'actions': ['B']}, 0.05, Deadline(10), has_actions, 'route')
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual((result['actions'], winner, hedged), (['B'], 'backup', True))
+        time.sleep(0.1)
+        self.assertEqual(self.cancelled, ['primary'])
+
+    def test_primary_wins_after_hedge(self):
+        result, winner, hedged = hedged_call(self._slow('primary', 0.1, {'actions': ['A']}),
+                                             self._slow('backup', 5, {'actions': ['B']}), 0.02, None, has_actions, 'route')
+        self.assertEqual((result['actions'], winner, hedged), (['A'], 'primary', True))
+        time.sleep(0.1)
+        self.assertEqual(self.cancelled, ['backup'])
+
+    def test_invalid_backup_ignored(self):
+        result, winner, hedged = hedged_call(self._slow('primary', 0.1, {'actions': ['A']}),
+                                             lambda d: {'actions': [], 'error': 'no function call'},
+                                             0.02, None, has_actions, 'route')
+        self.assertEqual((result['actions'], winner), (['A'], 'primary'))
+
+    def test_primary_failure_not_hedged(self):
+        backup = MagicMock()
+        result, winner, hedged = hedged_call(lambda d: {'actions': [], 'error': 'bad'}, backup,
+                                             0.05, None, has_actions, 'route')
+        self.assertEqual((result['error'], winner, hedged), ('bad', None, False))
+        time.sleep(0.1)
+        backup.assert_not_called()
+
+    def test_stats(self):
+        hedged_call(lambda d: {'actions': ['A']}, lambda d: {'actions': ['B']}, 1.0, None, has_actions, 'route')
+        hedged_call(self._slow('primary', 5, {'actions': ['A']}), lambda d: {'actions': ['B']},
+                    0.02, None, has_actions, 'route')
+        metrics = get_hedge_stats().get_metrics()['route']
+        self.assertEqual((metrics['requests'], metrics['hedged'], metrics['backup_wins']), (2, 1, 1))
+        self.assertEqual((metrics['hedge_rate'], metrics['backup_win_rate']), (0.5, 1.0))
+
+
+class LLMClientHedgingTest(TestCase):
+    """Test LLMClient hedges a slow Gemini decision with a backup model"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 240, 160,
+                                    np.zeros((160, 240, 3), dtype=np.uint8).tobytes())
+        get_llm_call_stats().clear()
+        get_hedge_stats().clear()
+        hedging = {'enabled': True, 'min_samples': 1000, 'initial_delay_seconds': 0.05,
+                   'backup_provider': 'google', 'backup_model': 'gemini-fast'}
+        self.client = LLMClient({'llm_provider': 'google', 'providers': {
+            'google': {'api_key': '', 'model_name': 'gemini-slow', 'hedging': hedging}}})
+        self.calls = []
+
+    def _call_google_api(self, client, screenshot_path, context, deadline=None):
+        self.calls.append((client._model_name(), in_hedge_leg()))
+        if client._model_name() == 'gemini-slow' and not deadline.wait(5):
+            return {'success': False, 'actions': [], 'cancelled': True}
+        return {'success': True, 'actions': [client._model_name()], 'text': ''}
+
+    def test_backup_model_wins(self):
+        with patch.object(LLMClient, '_call_google_api', autospec=True, side_effect=self._call_google_api):
+            response = self.client.analyze_game_state('/tmp/screenshot_ai_000001.png', {})
+        self.assertEqual(response['actions'], ['gemini-fast'])
+        self.assertEqual(response['hedge_winner'], 'backup')
+        self.assertEqual(sorted(self.calls), [('gemini-fast', True), ('gemini-slow', True)])
+        self.assertEqual(get_hedge_stats().get_metrics()['google/gemini-slow -> google/gemini-fast']['backup_wins'], 1)
+
+    def test_delay_from_observed_latency(self):
+        for _ in range(20):
+            get_llm_call_stats().record('google', 'gemini-slow', 2.0, 'ok')
+        settings = {'percentile': 90, 'min_samples': 20, 'initial_delay_seconds': 10}
+        self.assertEqual(self.client._hedge_delay(settings), 2.0)
+        self.assertEqual(self.client._hedge_delay({**settings, 'min_samples': 50}), 10)
+
+    def test_unavailable_backup_provider(self):
+        self.assertIs(self.client._backup_client({'backup_provider': 'anthropic', 'backup_model': 'claude'}), self.client)
+        clear_provider_sessions()
+        self.assertIs(self.client._backup_client({'backup_provider': 'openai'}), self.client)
+        clear_provider_sessions()
+
+    def test_disabled(self):
+        self.client.providers_config['google']['hedging']['enabled'] = False
+        with patch.object(LLMClient, '_call_google_api', autospec=True,
+                          return_value={'success': True, 'actions': ['A']}):
+            response = self.client.analyze_game_state('/tmp/screenshot_ai_000001.png', {})
+        self.assertNotIn('hedge_winner', response)
+
+
+class CrossProviderHedgingTest(TestCase):
+    """Test a slow Gemini comparison decision is hedged with an OpenAI backup"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        for number, value in ((1, 0), (2, 200)):
+            get_frame_store().put_frame(f'/tmp/screenshot_ai_00000{number}.png', 240, 160,
+                                        np.full((160, 240, 3), value, dtype=np.uint8).tobytes())
+        get_llm_call_stats().clear()
+        get_hedge_stats().clear()
+        clear_provider_sessions()
+        self.connect = patch('dashboard.provider_sessions._connect', side_effect=lambda provider, settings: MagicMock())
+        self.connect.start()
+        hedging = {'enabled': True, 'min_samples': 1000, 'initial_delay_seconds': 0.05, 'backup_provider': 'openai'}
+        self.client = LLMClient({'llm_provider': 'google', 'providers': {
+            'google': {'api_key': 'g', 'model_name': 'gemini-slow', 'hedging': hedging},
+            'openai': {'api_key': 'o', 'model_name': 'gpt-backup'}}})
+
+    def tearDown(self):
+        self.connect.stop()
+        clear_provider_sessions()
+
+    def test_openai_backup_wins_comparison(self):
+        backup = self.client._backup_client(self.client.providers_config['google']['hedging'])
+        self.assertEqual((backup.provider, backup._model_name()), ('openai', 'gpt-backup'))
+        tool_call = MagicMock()
+        tool_call.function.name = 'press_button_sequence'
+        tool_call.function.arguments = '{"actions": ["LEFT"]}'
+        message = backup.openai_client.chat.completions.create.return_value.choices[0].message
+        message.content, message.tool_calls = "Backup decision", [tool_call]
+
+        def slow_google(client, previous_screenshot, current_screenshot, context, deadline=None):
+            deadline.wait(5)
+            return {'success': False, 'actions': [], 'cancelled': True}
+
+        with patch.object(LLMClient, '_call_google_api_with_comparison', autospec=True, side_effect=slow_google):
+            response = self.client.analyze_game_state_with_comparison(
+                '/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png', {})
+        self.assertEqual((response['actions'], response['hedge_winner']), (['LEFT'], 'backup'))
+        self.assertLessEqual(backup.openai_client.chat.completions.create.call_args.kwargs['timeout'], 30)
+        self.assertEqual(get_hedge_stats().get_metrics()['google/gemini-slow -> openai/gpt-backup']['backup_wins'], 1)
@@ -194,7 +194,7 @@ class LLMClientTest(TestCase):
         )
         
         self.assertTrue(result['success'])
-        mock_single_analysis.assert_called_once_with('/test/current.png', game_state, '')
+        mock_single_analysis.assert_called_once_with('/test/current.png', game_state, '', deadline=None)
     
     def test_create_game_context(self):
         """Test game context creation for prompts"""
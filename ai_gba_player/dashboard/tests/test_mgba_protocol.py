@@ -0,0 +1,141 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+import struct
+
+from dashboard.mgba_protocol import (
+    MessageDecoder, ProtocolError, encode_message, encode_text, encode_hello,
+    MSG_HELLO, MSG_TEXT, MSG_FRAME, HEADER_SIZE, PROTOCOL_MAGIC
+)
+from dashboard.ai_game_service import AIGameService
+
+
+def decode_all(decoder, data, chunk_size=None):
+    """Feed data in chunks and collect (type, request_id, text, payload bytes) tuples"""
+    results = []
+    chunk_size = chunk_size or len(data) or 1
+    for i in range(0, len(data), chunk_size):
+        decoder.feed(data[i:i + chunk_size])
+        for message in decoder.messages():
+            payload = bytes(message.payload) if message.payload is not None else None
+            results.append((message.msg_type, message.request_id, message.text, payload, message.framed))
+    return results
+
+
+class MessageDecoderTest(TestCase):
+    """Test framed/text decoding of the mGBA socket protocol"""
+
+    def test_header_layout(self):
+        """Test the header is 12 bytes and starts with the magic byte"""
+        data = encode_message(MSG_TEXT, b'abc', request_id=7)
+        self.assertEqual(len(data), HEADER_SIZE + 3)
+        self.assertEqual(data[0], PROTOCOL_MAGIC)
+        self.assertEqual(struct.unpack('>I', data[4:8])[0], 7)
+
+    def test_framed_text_message(self):
+        """Test framed TEXT messages decode to their text and request id"""
+        results = decode_all(MessageDecoder(), encode_text("config_loaded||true", request_id=3))
+        self.assertEqual(results, [(MSG_TEXT, 3, "config_loaded||true", None, True)])
+
+    def test_legacy_text_lines(self):
+        """Test plain newline-terminated messages are still accepted"""
+        results = decode_all(MessageDecoder(), b"ready||true\nconfig_loaded||true\n", chunk_size=3)
+        self.assertEqual([r[2] for r in results], ["ready||true", "config_loaded||true"])
+        self.assertFalse(results[0][4])
+
+    def test_mixed_stream_byte_by_byte(self):
+        """Test framed and text messages interleave correctly under 1-byte reads"""
+        pixels = bytes(range(256)) * 3
+        stream = (
+            b"ready||true||framing=1\n"
+            + encode_hello()
+            + encode_message(MSG_FRAME, b"a.png||16||16||rgb24\n" + pixels, request_id=9)
+            + encode_text("screenshot_with_state||UP||1||2||3")
+        )
+        results = decode_all(MessageDecoder(initial_size=16), stream, chunk_size=1)
+
+        self.assertEqual([r[0] for r in results], [MSG_TEXT, MSG_HELLO, MSG_FRAME, MSG_TEXT])
+        self.assertEqual(results[2][1], 9)
+        self.assertEqual(results[2][2], "a.png||16||16||rgb24")
+        self.assertEqual(results[2][3], pixels)
+        self.assertEqual(results[3][2], "screenshot_with_state||UP||1||2||3")
+
+    def test_large_frame_received_in_place(self):
+        """Test the buffer grows to hold a whole frame so recv_into can fill it directly"""
+        pixels = b'\x01' * (240 * 160 * 3)
+        frame = encode_message(MSG_FRAME, b"f.png||240||160||rgb24\n" + pixels)
+        decoder = MessageDecoder(initial_size=1024)
+
+        decoder.feed(frame[:HEADER_SIZE])
+        self.assertGreaterEqual(len(decoder.get_buffer()), len(frame) - HEADER_SIZE)
+
+        decoder.feed(frame[HEADER_SIZE:])
+        messages = list(decoder.messages())
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(len(messages[0].payload), len(pixels))
+
+    def test_legacy_frame_data(self):
+        """Test the text-mode frame_data header plus raw payload"""
+        pixels = b'\n' * 12
+        results = decode_all(MessageDecoder(), b"frame_data||f.png||2||2||rgb24||12\n" + pixels + b"ready||true\n", chunk_size=5)
+        self.assertEqual(results[0][:4], (MSG_FRAME, 0, "f.png||2||2||rgb24", pixels))
+        self.assertEqual(results[1][2], "ready||true")
+
+    def test_unsupported_version(self):
+        """Test frames with an unknown version raise ProtocolError"""
+        data = bytearray(encode_text("ready||true"))
+        data[1] = 99
+        decoder = MessageDecoder()
+        decoder.feed(bytes(data))
+        with self.assertRaises(ProtocolError):
+            list(decoder.messages())
+
+
+class FramingNegotiationTest(TestCase):
+    """Test AIGameService switches to framed messages when mGBA advertises support"""
+
+    def setUp(self):
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.service._attach_connection(service_side, 'test')
+        self.mgba.settimeout(1.0)
+        self.service.game_config_sent = True
+        self.service._load_frame_transfer_mode = MagicMock(return_value='file')
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def test_framing_enabled_on_capability(self):
+        """Test a framed hello is sent and later commands are framed"""
+        self.mgba.sendall(b"ready||true||framing=1\n")
+        self.service.io_loop.run_once(0.5)
+        self.service.io_loop.run_once(0)
+
+        self.assertTrue(self.service.connection.framing_active)
+        results = decode_all(MessageDecoder(), self.mgba.recv(4096))
+        self.assertEqual(results[0][0], MSG_HELLO)
+        self.assertEqual(results[1][0], MSG_TEXT)
+        self.assertTrue(results[1][2].startswith("request_screenshot_to||"))
+
+    def test_text_protocol_without_capability(self):
+        """Test older Lua scripts keep receiving newline-terminated text"""
+        self.service._handle_ready_message("ready||true")
+        self.service.io_loop.run_once(0)
+
+        self.assertFalse(self.service.connection.framing_active)
+        sent = self.mgba.recv(4096)
+        self.assertTrue(sent.startswith(b"request_screenshot_to||"))
+        self.assertTrue(sent.endswith(b"\n"))
+
+    def test_orphaned_fields_only_guessed_on_line_protocol(self):
+        """Test prefix-less '||' data is only treated as a split screenshot reply without framing"""
+        orphan = "a||b||c||d||e||f"
+        with patch.object(self.service, '_handle_screenshot_data') as handle:
+            self.service._process_mgba_message(orphan)
+            handle.assert_called_once_with("screenshot_with_state||" + orphan)
+
+            handle.reset_mock()
+            self.service.connection.framing_active = True
+            self.service._process_mgba_message(orphan, request_id=7)
+            handle.assert_not_called()
@@ -0,0 +1,90 @@
+from django.test import TestCase
+from unittest.mock import MagicMock
+
+from dashboard.model_router import ModelRouter, ModelRoute, ModelTierStats, get_model_tier_stats, TIER_FAST, TIER_STRONG
+from dashboard.llm_client import LLMClient
+from dashboard.models import Configuration
+from dashboard.player_agent import PlayerAgent, PlayerResponse
+
+
+ROUTING = {'enabled': True, 'fast_model': 'gemini-fast', 'escalate_after_errors': 2}
+
+
+class ModelRouterTest(TestCase):
+    """Test the fast/strong tier policy"""
+
+    def setUp(self):
+        self.router = ModelRouter.from_config('gemini-strong', ROUTING)
+
+    def test_simple_screens_use_fast_model(self):
+        for screen_type in ('dialogue', 'menu', 'transition'):
+            route = self.router.route(screen_type)
+            self.assertEqual((route.tier, route.model), (TIER_FAST, 'gemini-fast'))
+
+    def test_navigation_and_battles_use_strong_model(self):
+        for screen_type in ('overworld', 'battle', 'unknown', None):
+            route = self.router.route(screen_type)
+            self.assertEqual((route.tier, route.model), (TIER_STRONG, 'gemini-strong'))
+
+    def test_escalates_after_errors(self):
+        self.assertEqual(self.router.route('dialogue', consecutive_errors=1).tier, TIER_FAST)
+        route = self.router.route('dialogue', consecutive_errors=2)
+        self.assertEqual((route.tier, route.reason), (TIER_STRONG, '2 consecutive errors'))
+
+    def test_disabled(self):
+        self.assertEqual(ModelRouter.from_config('gemini-strong').route('dialogue').tier, TIER_STRONG)
+        self.assertFalse(ModelRouter.from_config('gemini-strong', {'enabled': True, 'fast_model': ''}).enabled)
+
+    def test_opt_in_by_default(self):
+        google = Configuration.get_default_config()['providers']['google']
+        router = ModelRouter.from_config(google['model_name'], google['model_routing'])
+        self.assertFalse(router.enabled)
+        self.assertEqual(router.route('dialogue').model, google['model_name'])
+
+    def test_custom_fast_screens(self):
+        router = ModelRouter.from_config('gemini-strong', {**ROUTING, 'fast_screens': ['battle']})
+        self.assertEqual(router.route('battle').tier, TIER_FAST)
+        self.assertEqual(router.route('dialogue').tier, TIER_STRONG)
+
+
+class ModelTierStatsTest(TestCase):
+    """Test per-tier latency, token and success metrics"""
+
+    def test_metrics(self):
+        stats = ModelTierStats()
+        fast = ModelRoute(TIER_FAST, 'gemini-fast', 'dialogue screen')
+        stats.record(fast, 1.0, 1000, True)
+        stats.record(fast, 3.0, 2000, False)
+        metrics = stats.get_metrics()[TIER_FAST]
+        self.assertEqual((metrics['decisions'], metrics['success_rate'], metrics['avg_tokens']), (2, 0.5, 1500.0))
+        self.assertEqual((metrics['avg_latency_ms'], metrics['models']), (2000.0, {'gemini-fast': 2}))
+
+
+class PlayerAgentRoutingTest(TestCase):
+    """Test PlayerAgent sends each decision to its tier's model"""
+
+    def setUp(self):
+        get_model_tier_stats().clear()
+        self.agent = PlayerAgent()
+        self.agent.llm_client = LLMClient({'llm_provider': 'google', 'providers': {
+            'google': {'api_key': '', 'model_name': 'gemini-strong', 'model_routing': ROUTING}}})
+        self.agent._call_ai_with_retry = MagicMock(return_value=PlayerResponse(actions=['A']))
+
+    def _routed_model(self, screen_type):
+        self.agent.analyze_and_decide('/tmp/missing_screenshot.png', {'screen_type': screen_type})
+        return self.agent._call_ai_with_retry.call_args.kwargs['llm_client']._model_name()
+
+    def test_routes_by_screen_and_errors(self):
+        self.assertEqual(self._routed_model('dialogue'), 'gemini-fast')
+        self.assertEqual(self._routed_model('overworld'), 'gemini-strong')
+        self.agent.consecutive_errors = 3
+        self.assertEqual(self._routed_model('dialogue'), 'gemini-strong')
+        metrics = get_model_tier_stats().get_metrics()
+        self.assertEqual((metrics[TIER_FAST]['decisions'], metrics[TIER_STRONG]['decisions']), (1, 2))
+
+    def test_fast_client_reused(self):
+        self._routed_model('dialogue')
+        first = self.agent.last_decision_client
+        self._routed_model('menu')
+        self.assertIs(self.agent.last_decision_client, first)
+        self.assertIsNot(first, self.agent.llm_client)
@@ -0,0 +1,130 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+import threading
+import time
+
+from dashboard.outbound_queue import OutboundQueue, OutboundQueueFull
+from dashboard.io_loop import IOLoop
+from dashboard.mgba_connection import MGBAConnection
+
+
+class OutboundQueueTest(TestCase):
+    """Test coalescing, partial writes and backpressure of the outbound queue"""
+
+    def test_adjacent_messages_coalesced(self):
+        """Test queued messages are written as one batch"""
+        queue = OutboundQueue()
+        queue.put(b"request_screenshot_to||a.png\n")
+        queue.put(b"6,7|2,2\n")
+
+        batch = queue.next_write()
+        self.assertEqual(bytes(batch), b"request_screenshot_to||a.png\n6,7|2,2\n")
+        queue.consume(len(batch))
+
+        self.assertIsNone(queue.next_write())
+        metrics = queue.get_metrics()
+        self.assertEqual(metrics['messages_written'], 2)
+        self.assertEqual(metrics['write_syscalls'], 1)
+
+    def test_partial_write_resumes_from_offset(self):
+        """Test sendall semantics: the unsent tail is returned next"""
+        queue = OutboundQueue()
+        queue.put(b"abcdef")
+        queue.consume(len(queue.next_write()[:2]))
+        queue.put(b"gh")
+
+        self.assertEqual(bytes(queue.next_write()), b"cdef")
+        queue.consume(4)
+        self.assertEqual(bytes(queue.next_write()), b"gh")
+
+    def test_batch_size_limit(self):
+        """Test batches stop at max_batch_bytes but always include one message"""
+        queue = OutboundQueue(max_batch_bytes=4)
+        queue.put(b"123456")
+        queue.put(b"78")
+        self.assertEqual(bytes(queue.next_write()), b"123456")
+
+    def test_backpressure_blocks_until_drained(self):
+        """Test producers wait above high water and resume below low water"""
+        queue = OutboundQueue(high_water=10, low_water=4)
+        queue.put(b"x" * 10)
+
+        released = threading.Event()
+
+        def producer():
+            queue.put(b"y", timeout=2.0)
+            released.set()
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(released.is_set())
+
+        queue.consume(len(queue.next_write()))
+        self.assertTrue(released.wait(1.0))
+        thread.join()
+        self.assertEqual(queue.get_metrics()['backpressure_waits'], 1)
+
+    def test_backpressure_timeout(self):
+        """Test OutboundQueueFull when the emulator never drains"""
+        queue = OutboundQueue(high_water=4, low_water=1)
+        queue.put(b"xxxx")
+        with self.assertRaises(OutboundQueueFull):
+            queue.put(b"y", timeout=0.01)
+
+    def test_close_releases_producers(self):
+        """Test closing the queue rejects further writes"""
+        queue = OutboundQueue()
+        queue.close()
+        with self.assertRaises(ConnectionError):
+            queue.put(b"x")
+
+
+class MGBAConnectionWriterTest(TestCase):
+    """Test MGBAConnection flushes its queue through the event loop"""
+
+    def setUp(self):
+        self.loop = IOLoop()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.connection = MGBAConnection(self.loop, service_side, 'test', MagicMock(), MagicMock())
+
+    def tearDown(self):
+        self.connection.close()
+        self.mgba.close()
+        self.loop.close()
+
+    def test_commands_from_threads_coalesced(self):
+        """Test commands queued from other threads go out in one send"""
+        threads = [threading.Thread(target=self.connection.send_text, args=(f"{i}|2",)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.loop.run_once(0)
+
+        received = self.mgba.recv(1024).decode('utf-8').split('\n')[:-1]
+        self.assertEqual(sorted(received), [f"{i}|2" for i in range(5)])
+        metrics = self.connection.get_metrics()
+        self.assertEqual(metrics['messages_written'], 5)
+        self.assertEqual(metrics['write_syscalls'], 1)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    def test_large_write_completes_when_peer_drains(self):
+        """Test data that does not fit the socket buffer is finished on EVENT_WRITE"""
+        payload = b"x" * (4 * 1024 * 1024)
+        self.connection.outbound.high_water = len(payload) * 2
+        self.loop._thread_id = threading.get_ident()
+        self.connection.write(payload)
+        self.assertGreater(self.connection.pending_bytes(), 0)
+
+        received = 0
+        deadline = time.time() + 5.0
+        while received < len(payload) and time.time() < deadline:
+            received += len(self.mgba.recv(1024 * 1024))
+            self.loop.run_once(0)
+
+        self.assertEqual(received, len(payload))
+        self.assertEqual(self.connection.pending_bytes(), 0)
@@ -0,0 +1,226 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+from concurrent.futures import CancelledError
+import socket
+import threading
+import time
+
+from dashboard.pending_requests import PendingRequests
+from dashboard.frame_store import get_frame_store
+from dashboard.mgba_protocol import MessageDecoder
+from dashboard.ai_game_service import AIGameService
+
+
+class PendingRequestsTest(TestCase):
+    """Test the future registry used to wait for mGBA responses"""
+
+    def test_complete_wakes_waiter(self):
+        """Test a waiting thread receives the result as soon as it is completed"""
+        pending = PendingRequests()
+        pending.register('a.png')
+
+        threading.Timer(0.05, pending.complete, args=('a.png', {'map_id': 3})).start()
+        start = time.time()
+        result = pending.wait('a.png', timeout=2.0)
+
+        self.assertEqual(result, {'map_id': 3})
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(len(pending), 0)
+
+    def test_complete_unknown_key(self):
+        """Test completing a request nobody registered is a no-op"""
+        self.assertFalse(PendingRequests().complete('missing.png'))
+
+    def test_wait_timeout(self):
+        """Test wait raises TimeoutError and forgets the request"""
+        pending = PendingRequests()
+        pending.register('a.png')
+        with self.assertRaises(TimeoutError):
+            pending.wait('a.png', timeout=0.01)
+        self.assertIsNone(pending.get('a.png'))
+
+    def test_fail_raises_error(self):
+        """Test failed requests re-raise the error in the waiter"""
+        pending = PendingRequests()
+        pending.register('a.png')
+        future = pending.get('a.png')
+        pending.fail('a.png', RuntimeError("File not created"))
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=0)
+
+    def test_cancel_all(self):
+        """Test disconnect cancels outstanding requests"""
+        pending = PendingRequests()
+        future = pending.register('a.png')
+        pending.cancel_all()
+        self.assertTrue(future.cancelled())
+        self.assertEqual(len(pending), 0)
+
+    def test_bounded(self):
+        """Test the oldest uncompleted requests are dropped past max_pending"""
+        pending = PendingRequests(max_pending=2)
+        first = pending.register('1.png')
+        pending.register('2.png')
+        pending.register('3.png')
+        self.assertTrue(first.cancelled())
+        self.assertEqual(len(pending), 2)
+
+    def test_wait_after_reply(self):
+        """Test a waiter that arrives after the reply still receives it"""
+        pending = PendingRequests()
+        pending.register(1, 'a.png')
+        pending.complete(1, {'map_id': 3})
+        self.assertEqual(pending.wait(1, timeout=0), {'map_id': 3})
+        self.assertEqual(pending.context(1), 'a.png')
+
+    def test_oldest(self):
+        """Test the oldest outstanding request is used for replies without ids"""
+        pending = PendingRequests()
+        pending.register(1, 'a.png')
+        pending.register(2, 'b.png')
+        self.assertEqual(pending.oldest(), (1, 'a.png'))
+        pending.complete(1)
+        self.assertEqual(pending.oldest(), (2, 'b.png'))
+
+    def test_metrics(self):
+        """Test latency and outcome accounting"""
+        pending = PendingRequests()
+        pending.register(1)
+        pending.register(2)
+        pending.register(3)
+        pending.complete(1)
+        pending.fail(2, RuntimeError("x"))
+        with self.assertRaises(TimeoutError):
+            pending.wait(3, timeout=0.01)
+
+        metrics = pending.get_metrics()
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['completed'], 1)
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertGreaterEqual(metrics['latency_max'], 0.0)
+
+
+
+class ScreenshotReadinessTest(TestCase):
+    """Test AIGameService wakes screenshot waiters from _handle_screenshot_data"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.service._attach_connection(service_side, 'test')
+        self.service._process_ai_decision = MagicMock()
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def test_requester_woken_by_screenshot_with_state(self):
+        """Test _request_screenshot_from_mgba returns once the state message is parsed"""
+        def respond():
+            time.sleep(0.05)
+            self.service._handle_screenshot_data("screenshot_with_state||UP||4||5||1")
+
+        threading.Thread(target=respond).start()
+        start = time.time()
+        path = self.service._request_screenshot_from_mgba(timeout=2.0)
+
+        self.assertTrue(path.endswith("screenshot_ai_000001.png"))
+        self.assertLess(time.time() - start, 1.0)
+        self.assertTrue(get_frame_store().is_ready(path))
+
+    def test_screenshot_error_wakes_requester(self):
+        """Test screenshot_error fails the request instead of waiting for the timeout"""
+        def respond():
+            time.sleep(0.05)
+            self.service._process_mgba_message("screenshot_error||File not created")
+
+        threading.Thread(target=respond).start()
+        start = time.time()
+        path = self.service._request_screenshot_from_mgba(timeout=2.0)
+
+        self.assertEqual(path, "")
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_requester_times_out(self):
+        """Test the requester gives up when mGBA never answers"""
+        self.assertEqual(self.service._request_screenshot_from_mgba(timeout=0.05), "")
+
+
+class RequestMultiplexingTest(TestCase):
+    """Test screenshot replies are matched to their request by correlation id"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.service._attach_connection(service_side, 'test')
+        self.service._process_ai_decision = MagicMock()
+        self.service._send_chat_message = MagicMock()
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def _sent_request_ids(self):
+        self.service.io_loop.run_once(0)
+        return [message.request_id for message in _decode(self.mgba.recv(4096))]
+
+    def test_pipelined_requests_out_of_order(self):
+        """Test two outstanding captures each receive their own reply"""
+        self.service.connection.framing_active = True
+        first = self.service._request_screenshot()
+        second = self.service._request_screenshot()
+        self.assertEqual(self._sent_request_ids(), [first, second])
+
+        self.service._process_mgba_message("screenshot_with_state||UP||2||2||1", request_id=second)
+        self.service._process_mgba_message("screenshot_with_state||DOWN||1||1||1", request_id=first)
+
+        self.assertEqual(self.service.pending_screenshots.wait(first, 0)['direction'], 'DOWN')
+        self.assertEqual(self.service.pending_screenshots.wait(second, 0)['direction'], 'UP')
+        paths = [call.args[0] for call in self.service._process_ai_decision.call_args_list]
+        self.assertTrue(paths[0].endswith("screenshot_ai_000002.png"))
+        self.assertTrue(paths[1].endswith("screenshot_ai_000001.png"))
+
+    def test_late_reply_ignored(self):
+        """Test a reply for a request that already timed out is not attributed to a newer one"""
+        self.service.connection.framing_active = True
+        stale = self.service._request_screenshot()
+        with self.assertRaises(TimeoutError):
+            self.service.pending_screenshots.wait(stale, timeout=0.01)
+        current = self.service._request_screenshot()
+
+        self.service._process_mgba_message("screenshot_with_state||UP||2||2||1", request_id=stale)
+
+        self.service._process_ai_decision.assert_not_called()
+        self.assertIsNotNone(self.service.pending_screenshots.get(current))
+
+    def test_text_mode_replies_in_order(self):
+        """Test replies without ids complete the oldest outstanding request"""
+        first = self.service._request_screenshot()
+        self.service._request_screenshot()
+
+        self.service._process_mgba_message("screenshot_with_state||UP||2||2||1")
+
+        self.assertEqual(self.service.pending_screenshots.wait(first, 0)['direction'], 'UP')
+        self.assertEqual(len(self.service.pending_screenshots), 1)
+
+    def test_error_fails_matching_request(self):
+        """Test screenshot_error wakes only the request it belongs to"""
+        self.service.connection.framing_active = True
+        first = self.service._request_screenshot()
+        second = self.service._request_screenshot()
+
+        self.service._process_mgba_message("screenshot_error||File not created", request_id=second)
+
+        with self.assertRaises(RuntimeError):
+            self.service.pending_screenshots.wait(second, 0)
+        self.assertIsNotNone(self.service.pending_screenshots.get(first))
+
+
+def _decode(data):
+    decoder = MessageDecoder()
+    decoder.feed(data)
+    return list(decoder.messages())
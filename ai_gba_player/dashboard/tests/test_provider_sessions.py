@@ -0,0 +1,77 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+
+from dashboard.provider_sessions import get_provider_session, clear_provider_sessions, ProviderSession
+from dashboard.llm_client import LLMClient
+from dashboard.narration_agent import NarrationAgent
+
+
+class ProviderSessionTest(TestCase):
+    """Test provider sessions are built once per settings version and shared"""
+
+    def setUp(self):
+        clear_provider_sessions()
+        self.connect = patch('dashboard.provider_sessions._connect', side_effect=lambda provider, settings: MagicMock())
+        self.connect.start()
+
+    def tearDown(self):
+        self.connect.stop()
+        clear_provider_sessions()
+
+    def test_shared_until_settings_change(self):
+        session = get_provider_session('google', {'api_key': 'a'})
+        self.assertIs(get_provider_session('google', {'api_key': 'a'}), session)
+        self.assertIsNot(get_provider_session('google', {'api_key': 'b'}), session)
+
+    def test_model_change_keeps_session(self):
+        session = get_provider_session('google', {'api_key': 'a', 'model_name': 'm1'})
+        self.assertIs(get_provider_session('google', {'api_key': 'a', 'model_name': 'm2', 'max_tokens': 10}), session)
+        self.assertIs(get_provider_session('google', {'api_key': 'a', 'model_name': 'm1'}), session)
+
+    def test_variants_share_session(self):
+        client = LLMClient({'llm_provider': 'google', 'providers': {'google': {'api_key': 'a', 'model_name': 'm1'}}})
+        fast = client.variant(model='m2')
+        self.assertIs(fast.provider_session, client.provider_session)
+        self.assertIs(get_provider_session('google', client.providers_config['google']), client.provider_session)
+        client._google_model()
+        fast._google_model()
+        client.variant(model='m2')._google_model()
+        built = [call.args[0] for call in client.google_client.GenerativeModel.call_args_list]
+        self.assertEqual(built, ['m1', 'm2'])
+
+    def test_model_built_once(self):
+        session = get_provider_session('google', {'api_key': 'a'})
+        tools = session.cached('tools', object)
+        first = session.google_model('gemini-2.0-flash-exp', tools=tools)
+        self.assertIs(session.google_model('gemini-2.0-flash-exp', tools=session.cached('tools', object)), first)
+        session.google_model('gemini-2.0-flash-exp', generation_config={'temperature': 0.8})
+        self.assertEqual(session.client.GenerativeModel.call_count, 2)
+        self.assertEqual(session.get_metrics()['models_built'], 2)
+
+    def test_clients_share_session(self):
+        config = {'llm_provider': 'google', 'providers': {'google': {'api_key': 'a'}}}
+        player_client, narration_client = LLMClient(config), LLMClient(config)
+        self.assertIs(player_client.provider_session, narration_client.provider_session)
+        self.assertIs(player_client.google_client, narration_client.google_client)
+
+    def test_decision_model_reused(self):
+        client = LLMClient({'llm_provider': 'google', 'providers': {'google': {'api_key': 'a'}}})
+        self.assertIs(client._google_model(), client._google_model())
+        self.assertEqual(client.google_client.GenerativeModel.call_count, 1)
+        self.assertIn('tools', client.google_client.GenerativeModel.call_args.kwargs)
+
+    def test_narration_uses_session_model(self):
+        agent = NarrationAgent()
+        agent.llm_client = LLMClient({'llm_provider': 'google', 'providers': {'google': {'api_key': 'a'}}})
+        model = agent.llm_client.google_client.GenerativeModel.return_value
+        model.generate_content.return_value.text = "What a move!"
+        self.assertEqual(agent._call_text_llm("narrate"), "What a move!")
+        agent._call_text_llm("narrate again")
+        self.assertEqual(agent.llm_client.google_client.GenerativeModel.call_count, 1)
+
+    def test_missing_api_key(self):
+        self.connect.stop()
+        session = get_provider_session('google', {})
+        self.connect.start()
+        self.assertIsNone(session.client)
+        self.assertIsInstance(session, ProviderSession)
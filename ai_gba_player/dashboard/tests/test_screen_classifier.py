@@ -0,0 +1,97 @@
+from django.test import TestCase
+
+import numpy as np
+
+from dashboard.frame_store import get_frame_store
+from dashboard.screen_classifier import ScreenClassifier
+from dashboard.player_agent import PlayerAgent
+
+GRASS = (136, 208, 96)
+WHITE = (248, 248, 248)
+BORDER = (64, 96, 160)
+TEXT = (40, 40, 40)
+
+
+def make_overworld(width=240, height=160, seed=0):
+    """Field of grass with a few trees and paths"""
+    rng = np.random.default_rng(seed)
+    palette = np.array([GRASS, (56, 128, 72), (200, 176, 120), (112, 160, 80)], dtype=np.uint8)
+    tiles = rng.choice(4, (height // 16, width // 16), p=[0.6, 0.15, 0.15, 0.1])
+    return palette[np.kron(tiles, np.ones((16, 16), dtype=int))]
+
+
+def draw_box(pixels, top, left, bottom, right):
+    """Light box with a 3-pixel border and a few lines of dark text"""
+    pixels[top:bottom, left:right] = BORDER
+    pixels[top + 3:bottom - 3, left + 3:right - 3] = WHITE
+    for row in range(top + 8, bottom - 8, 14):
+        pixels[row:row + 6, left + 10:right - 30:3] = TEXT
+
+
+class ScreenClassifierTest(TestCase):
+    """Test the template-matching screen classifier on synthetic frames"""
+
+    def setUp(self):
+        self.classifier = ScreenClassifier()
+
+    def test_overworld(self):
+        self.assertEqual(self.classifier.classify_pixels(make_overworld()).label, 'overworld')
+
+    def test_dialogue(self):
+        pixels = make_overworld()
+        draw_box(pixels, 112, 0, 160, 240)
+        self.assertEqual(self.classifier.classify_pixels(pixels).label, 'dialogue')
+
+    def test_menu(self):
+        pixels = make_overworld()
+        draw_box(pixels, 0, 168, 128, 240)
+        self.assertEqual(self.classifier.classify_pixels(pixels).label, 'menu')
+
+    def test_battle(self):
+        """Test thin HP bars are detected even over grass-coloured scenery"""
+        pixels = make_overworld()
+        draw_box(pixels, 112, 0, 160, 240)
+        pixels[20:40, 10:110] = WHITE
+        pixels[30:33, 50:98] = (112, 248, 168)
+        pixels[80:100, 130:230] = WHITE
+        pixels[90:93, 170:218] = (248, 88, 56)
+        classification = self.classifier.classify_pixels(pixels)
+        self.assertEqual(classification.label, 'battle')
+        self.assertEqual(classification.features['hp_bars'], 2)
+
+    def test_transition(self):
+        pixels = np.zeros((160, 240, 3), dtype=np.uint8)
+        self.assertEqual(self.classifier.classify_pixels(pixels).label, 'transition')
+
+    def test_game_boy_frame(self):
+        """Test geometry is relative to the frame size"""
+        pixels = make_overworld(160, 144)
+        draw_box(pixels, 96, 0, 144, 160)
+        self.assertEqual(self.classifier.classify_pixels(pixels).label, 'dialogue')
+
+    def test_classify_from_frame_store(self):
+        get_frame_store().clear()
+        pixels = make_overworld()
+        draw_box(pixels, 112, 0, 160, 240)
+        get_frame_store().put_frame('/tmp/screenshot_ai_000001.png', 240, 160, pixels.tobytes())
+        self.assertEqual(self.classifier.classify('/tmp/screenshot_ai_000001.png').label, 'dialogue')
+
+    def test_missing_frame_is_unknown(self):
+        get_frame_store().clear()
+        self.assertEqual(self.classifier.classify('/tmp/does_not_exist.png').label, 'unknown')
+
+
+class PlayerAgentScreenTypeTest(TestCase):
+    """Test PlayerAgent uses the classified screen type"""
+
+    def setUp(self):
+        self.agent = PlayerAgent()
+
+    def test_situation_prefers_screen_type(self):
+        state = {'map_id': 0, 'screen_type': 'battle'}
+        self.assertEqual(self.agent._infer_situation_from_state(state), 'battle')
+        self.assertEqual(self.agent._classify_current_situation(state), 'battle_situation')
+        self.assertEqual(self.agent._classify_current_situation({'map_id': 0}), 'overworld_exploration')
+
+    def test_context_mentions_screen(self):
+        self.assertIn("Screen: dialogue", self.agent._get_enhanced_context({'screen_type': 'dialogue'}))
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import os
+import socket
+import tempfile
+from pathlib import Path
+
+from dashboard.frame_store import get_frame_store
+from dashboard.screenshot_storage import resolve_screenshot_storage, prepare_screenshot_directory, DEFAULT_SCREENSHOT_DIRECTORY
+from dashboard.ai_game_service import AIGameService
+
+
+class ScreenshotStorageTest(TestCase):
+    """Test backend selection and background cleanup of stale screenshots"""
+
+    def test_resolve_backends(self):
+        self.assertEqual(resolve_screenshot_storage(None, 'file').backend, 'disk')
+        self.assertEqual(resolve_screenshot_storage({'backend': 'memory'}, 'socket').backend, 'memory')
+        self.assertEqual(resolve_screenshot_storage({'backend': 'bogus'}, 'file').backend, 'disk')
+
+        with patch('dashboard.screenshot_storage.os.path.isdir', return_value=True):
+            storage = resolve_screenshot_storage({'backend': 'tmpfs', 'tmpfs_dir': '/dev/shm/test'}, 'file')
+            self.assertEqual((storage.backend, storage.directory), ('tmpfs', Path('/dev/shm/test')))
+            # Without socket transfer mGBA has to write files, so memory becomes tmpfs
+            self.assertEqual(resolve_screenshot_storage({'backend': 'memory'}, 'file').backend, 'tmpfs')
+
+    def test_default_disk_dir_in_project_data(self):
+        self.assertEqual(DEFAULT_SCREENSHOT_DIRECTORY, Path(settings.PROJECT_ROOT) / 'data' / 'screenshots')
+        self.assertEqual(resolve_screenshot_storage(None, 'file').directory, DEFAULT_SCREENSHOT_DIRECTORY)
+        self.assertEqual(resolve_screenshot_storage({'disk_dir': '/tmp/shots'}, 'file').directory, Path('/tmp/shots'))
+
+    def test_tmpfs_unavailable(self):
+        with patch('dashboard.screenshot_storage.os.path.isdir', return_value=False):
+            self.assertEqual(resolve_screenshot_storage({'backend': 'tmpfs'}, 'file').backend, 'disk')
+
+    def test_prepare_creates_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp) / 'screenshots'
+            self.assertIsNone(prepare_screenshot_directory(directory))
+            self.assertTrue(directory.is_dir())
+
+    def test_stale_screenshots_removed_in_background(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp) / 'screenshots'
+            directory.mkdir()
+            for index in range(50):
+                (directory / f'screenshot_ai_{index:06d}.png').write_bytes(b'png')
+            (directory / 'notes.txt').write_text('keep')
+
+            thread = prepare_screenshot_directory(directory)
+            # The directory is usable immediately, before the cleanup finishes
+            self.assertTrue(directory.is_dir())
+            thread.join(timeout=5)
+
+            self.assertEqual(sorted(os.listdir(directory)), ['notes.txt'])
+            self.assertEqual(sorted(os.listdir(tmp)), ['screenshots'])
+
+
+class ServiceScreenshotStorageTest(TestCase):
+    """Test the service applies the storage setting when mGBA is ready"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.service._attach_connection(service_side, 'test')
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.service.frame_ring.delete_evicted_files = True
+        self.mgba.close()
+        self.tmp.cleanup()
+
+    def _configure(self, settings, capabilities):
+        self.service._load_config = MagicMock(return_value={'capture_system': {'screenshot_storage': settings}})
+        self.service._configure_screenshot_storage(capabilities)
+
+    def test_directory_sent_to_mgba(self):
+        directory = os.path.join(self.tmp.name, 'shm')
+        with patch('dashboard.screenshot_storage.os.path.isdir', return_value=True):
+            self._configure({'backend': 'tmpfs', 'tmpfs_dir': directory}, ['true', 'screenshot_dir=1'])
+        self.service.io_loop.run_once(0.5)
+
+        self.assertEqual(self.mgba.recv(4096), f"set_screenshot_dir||{directory}\n".encode())
+        self.assertEqual(self.service.screenshot_dir, Path(directory))
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_old_script_stays_on_disk(self):
+        disk = os.path.join(self.tmp.name, 'disk')
+        self._configure({'backend': 'tmpfs', 'disk_dir': disk}, ['true'])
+        self.assertEqual(self.service.screenshot_storage.backend, 'disk')
+        self.assertEqual(self.service.screenshot_dir, Path(disk))
+
+    def test_memory_backend_touches_no_files(self):
+        self.service.frame_transfer_mode = 'socket'
+        directory = os.path.join(self.tmp.name, 'unused')
+        self._configure({'backend': 'memory', 'disk_dir': directory}, ['true', 'screenshot_dir=1'])
+
+        self.assertEqual(self.service.screenshot_storage.backend, 'memory')
+        self.assertFalse(os.path.exists(directory))
+        self.assertFalse(self.service.frame_ring.delete_evicted_files)
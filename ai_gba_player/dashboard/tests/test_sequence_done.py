@@ -0,0 +1,90 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+import threading
+import time
+
+from dashboard.ai_game_service import AIGameService
+from dashboard.player_agent import PlayerAgent
+
+
+class SequenceDoneTest(TestCase):
+    """Test waiting on mGBA's sequence_done instead of multiplier-based delays"""
+
+    def setUp(self):
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.service._attach_connection(service_side, 'test')
+        self.service._send_chat_message = MagicMock()
+        self.service.timing_config['settle_frames'] = 6
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def test_wait_returns_on_sequence_done(self):
+        """Test the waiter wakes on sequence_done and then waits only the settle frames"""
+        self.service.sequence_done_supported = True
+        self.assertTrue(self.service._send_button_sequence(["UP", "UP"], [30, 30]))
+
+        def respond():
+            time.sleep(0.05)
+            self.service._process_mgba_message("sequence_done||100||218||2")
+
+        threading.Thread(target=respond).start()
+        start = time.time()
+        self.assertTrue(self.service._wait_for_sequence_done(["UP", "UP"], [30, 30]))
+
+        elapsed = time.time() - start
+        self.assertGreaterEqual(elapsed, 0.05 + 6 / 60.0 - 0.01)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(self.service.sequence_future.result(), {"start_frame": 100, "end_frame": 218, "button_count": 2})
+
+    def test_unsupported_script_falls_back(self):
+        """Test False is returned without sequence_done support so callers use timing_config delays"""
+        self.service._send_button_sequence(["A"])
+        self.assertIsNone(self.service.sequence_future)
+        self.assertFalse(self.service._wait_for_sequence_done(["A"]))
+
+    def test_wait_on_io_loop_thread_falls_back(self):
+        """Test waiting from the IO loop thread, which completes the future, returns instead of deadlocking"""
+        self.service.sequence_done_supported = True
+        self.service._send_button_sequence(["A"])
+        with patch.object(self.service.io_loop, 'in_loop_thread', return_value=True):
+            start = time.time()
+            self.assertFalse(self.service._wait_for_sequence_done(["A"]))
+        self.assertLess(time.time() - start, 0.5)
+
+    def test_capability_from_ready(self):
+        """Test sequence_done=1 in the ready message enables the notification"""
+        self.service.game_config_sent = True
+        self.service._load_frame_transfer_mode = MagicMock(return_value='file')
+        self.service._handle_ready_message("ready||true||framing=1||act_capture=1||sequence_done=1")
+        self.assertTrue(self.service.sequence_done_supported)
+
+    def test_disconnect_cancels_wait(self):
+        """Test a disconnect releases the waiter instead of leaving it to time out"""
+        self.service.sequence_done_supported = True
+        self.service._send_button_sequence(["A"])
+        self.service._handle_mgba_disconnect(self.service.connection)
+        self.assertTrue(self.service.sequence_future.cancelled())
+
+    def test_sequence_frames(self):
+        """Test the frame count includes the separation between buttons"""
+        self.assertEqual(self.service._sequence_frames([2, 3]), 2 + 3 + AIGameService.BUTTON_SEPARATION_FRAMES)
+        self.assertEqual(self.service._sequence_frames([]), 0)
+
+
+class PlayerAgentSequenceWaitTest(TestCase):
+    """Test PlayerAgent only uses its guessed delay without a sequence waiter"""
+
+    def test_no_waiter(self):
+        self.assertFalse(PlayerAgent()._wait_for_actions(["A"]))
+
+    def test_waiter_used(self):
+        agent = PlayerAgent()
+        waiter = MagicMock(return_value=True)
+        agent.set_sequence_waiter(waiter)
+        self.assertTrue(agent._wait_for_actions(["A"], [2]))
+        waiter.assert_called_once_with(["A"], [2])
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from dashboard.frame_store import get_frame_store
+from dashboard.session_archive import (SessionArchive, SessionArchiveReader, open_session_archive,
+                                       DEFAULT_SESSION_DIRECTORY)
+from dashboard.player_agent import PlayerAgent, PlayerResponse
+
+
+def put_screen(path, value):
+    get_frame_store().put_frame(path, 240, 160, np.full((160, 240, 3), value, dtype=np.uint8).tobytes())
+
+
+class SessionArchiveTest(TestCase):
+    """Test the session archive writer and reader"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 10)
+        put_screen('/tmp/screenshot_ai_000002.png', 10)
+        put_screen('/tmp/screenshot_ai_000003.png', 200)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'session.gbasession')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_session(self, close=True):
+        archive = SessionArchive(self.path, metadata={'game': 'pokemon_red'})
+        for number in range(1, 4):
+            frame_id = archive.add_frame(f'/tmp/screenshot_ai_00000{number}.png')
+            archive.record_cycle({'decision': number, 'frame_id': frame_id, 'response': {'actions': ['UP']}})
+        if close:
+            archive.close()
+        return archive
+
+    def test_identical_frames_stored_once(self):
+        archive = self._write_session()
+        metrics = archive.get_metrics()
+        self.assertEqual((metrics['cycles'], metrics['frames'], metrics['deduplicated_frames']), (3, 2, 1))
+
+    def test_random_access(self):
+        self._write_session()
+        with SessionArchiveReader(self.path) as reader:
+            self.assertTrue(reader.complete)
+            self.assertEqual(reader.metadata['game'], 'pokemon_red')
+            self.assertEqual(len(reader), 3)
+            cycle = reader.cycle(2)
+            self.assertEqual(cycle['decision'], 3)
+            image = Image.open(io.BytesIO(reader.frame(cycle['frame_id'])))
+            self.assertEqual(image.getpixel((0, 0)), (200, 200, 200))
+
+    def test_replay(self):
+        self._write_session()
+        with SessionArchiveReader(self.path) as reader:
+            cycles = list(reader.replay(start=1, with_frames=True))
+        self.assertEqual([cycle['decision'] for cycle in cycles], [2, 3])
+        self.assertTrue(all(cycle['frame'] for cycle in cycles))
+
+    def test_unclosed_archive_is_scanned(self):
+        """Test a crashed run without index (and with a torn last record) is still readable"""
+        archive = self._write_session(close=False)
+        archive._file.write(b'C\xff\x00\x00\x00{"decis')
+        archive._file.flush()
+        with SessionArchiveReader(self.path) as reader:
+            self.assertFalse(reader.complete)
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(len(reader.frame_offsets), 2)
+            self.assertEqual(reader.cycle(0)['decision'], 1)
+        archive.close()
+
+    def test_not_an_archive(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not an archive')
+        with self.assertRaises(ValueError):
+            SessionArchiveReader(self.path)
+
+    def test_open_from_settings(self):
+        self.assertIsNone(open_session_archive({'enabled': False, 'directory': self.directory}))
+        archive = open_session_archive({'enabled': True, 'directory': self.directory})
+        archive.close()
+        self.assertTrue(archive.path.name.endswith('.gbasession'))
+        self.assertTrue(archive.path.exists())
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(open_session_archive())
+        self.assertEqual(DEFAULT_SESSION_DIRECTORY, Path(settings.PROJECT_ROOT) / 'data' / 'sessions')
+
+    def test_old_sessions_pruned(self):
+        for number in range(4):
+            path = os.path.join(self.directory, f'session_{number}.gbasession')
+            open(path, 'wb').close()
+            os.utime(path, (number, number))
+        archive = open_session_archive({'enabled': True, 'directory': self.directory, 'max_sessions': 3})
+        archive.close()
+        remaining = sorted(os.listdir(self.directory))
+        self.assertEqual(remaining, sorted(['session_2.gbasession', 'session_3.gbasession', archive.path.name]))
+
+
+class PlayerAgentArchiveTest(TestCase):
+    """Test PlayerAgent records each decision cycle"""
+
+    def setUp(self):
+        get_frame_store().clear()
+        put_screen('/tmp/screenshot_ai_000001.png', 10)
+        put_screen('/tmp/screenshot_ai_000002.png', 200)
+        self.directory = tempfile.mkdtemp()
+        self.agent = PlayerAgent()
+        self.agent.session_archive = SessionArchive(os.path.join(self.directory, 'session.gbasession'))
+        self.agent.last_context_hash = 'abc'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_archive_cycle(self):
+        response = PlayerResponse(actions=['A'], text="Talk to the nurse")
+        self.agent._archive_cycle('/tmp/screenshot_ai_000002.png', '/tmp/screenshot_ai_000001.png',
+                                  {'map_id': 1}, response, {'decision_ms': 1200.0})
+        self.agent.session_archive.close()
+
+        with SessionArchiveReader(self.agent.session_archive.path) as reader:
+            cycle = reader.cycle(0)
+            self.assertEqual(cycle['response']['actions'], ['A'])
+            self.assertEqual(cycle['context_hash'], 'abc')
+            self.assertEqual(cycle['timings']['decision_ms'], 1200.0)
+            self.assertIsNotNone(reader.frame(cycle['previous_frame_id']))
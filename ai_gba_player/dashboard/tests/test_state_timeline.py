@@ -0,0 +1,96 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+import socket
+
+from dashboard.state_timeline import StateTimeline
+from dashboard.ai_game_service import AIGameService
+
+
+class StateTimelineTest(TestCase):
+    """Test rebuilding full game state from delta-encoded telemetry"""
+
+    def test_deltas_merge_into_full_samples(self):
+        """Test unchanged fields are carried over from the previous sample"""
+        timeline = StateTimeline()
+        timeline.apply_delta(10, x=5, y=2, direction="UP", map_id=3)
+        sample = timeline.apply_delta(30, x=6)
+
+        self.assertEqual(sample.to_dict(), {'frame': 30, 'position': {'x': 6, 'y': 2}, 'direction': "UP", 'map_id': 3})
+        self.assertEqual(len(timeline), 2)
+
+    def test_position_changes_and_transitions(self):
+        """Test movement and map changes are reported with their frames"""
+        timeline = StateTimeline()
+        timeline.apply_delta(0, x=1, y=1, direction="UP", map_id=1)
+        timeline.apply_delta(16, direction="LEFT")
+        timeline.apply_delta(32, x=0)
+        timeline.apply_delta(48, map_id=2, x=9)
+
+        self.assertEqual([s.frame for s in timeline.position_changes_since(0)], [32, 48])
+        self.assertEqual(timeline.map_transitions_since(0), [(48, 1, 2)])
+        self.assertEqual(timeline.map_transitions_since(48), [])
+
+    def test_frames_stationary(self):
+        """Test idle time counts heartbeat samples since the last position change"""
+        timeline = StateTimeline()
+        timeline.apply_delta(0, x=1, y=1, map_id=1)
+        timeline.apply_delta(20, x=2)
+        timeline.apply_delta(80, direction="DOWN")
+        timeline.apply_delta(140)
+        self.assertEqual(timeline.frames_stationary(), 120)
+
+    def test_frame_counter_reset(self):
+        """Test a lower frame number (emulator reset) starts a new timeline"""
+        timeline = StateTimeline()
+        timeline.apply_delta(500, x=1, y=1, map_id=1)
+        timeline.apply_delta(3, x=4)
+        self.assertEqual(len(timeline), 1)
+        self.assertEqual(timeline.current().frame, 3)
+
+    def test_bounded(self):
+        timeline = StateTimeline(max_samples=3)
+        for frame in range(5):
+            timeline.apply_delta(frame, x=frame)
+        self.assertEqual([s.frame for s in timeline.samples_since(-1)], [2, 3, 4])
+
+
+class StateStreamServiceTest(TestCase):
+    """Test AIGameService subscribes to and consumes the state stream"""
+
+    def setUp(self):
+        self.service = AIGameService()
+        service_side, self.mgba = socket.socketpair()
+        self.mgba.settimeout(1.0)
+        self.service._attach_connection(service_side, 'test')
+        self.service._send_chat_message = MagicMock()
+
+    def tearDown(self):
+        self.service._cleanup()
+        self.mgba.close()
+
+    def test_subscribe_after_config_loaded(self):
+        """Test subscribe_state is sent before the first screenshot request when supported"""
+        self.service.state_stream_supported = True
+        self.service._handle_config_loaded_message()
+        self.service.io_loop.run_once(0)
+
+        sent = self.mgba.recv(4096).decode('utf-8').split("\n")
+        self.assertEqual(sent[0], "subscribe_state||1")
+        self.assertTrue(sent[1].startswith("request_screenshot_to||"))
+
+    def test_deltas_feed_movement_analysis(self):
+        """Test streamed deltas show up in the movement analysis between two screenshots"""
+        self.service._process_mgba_message("st||100||x=5||y=5||d=UP||m=1")
+        self.service._update_position_tracking(5, 5, "UP", 1)
+        for frame, x in ((116, 6), (132, 7)):
+            self.service._process_mgba_message(f"st||{frame}||x={x}")
+        self.service._process_mgba_message("st||150||m=2||x=0")
+        self.service._update_position_tracking(0, 5, "UP", 2)
+
+        text = self.service._get_movement_analysis_text()
+        self.assertIn("Moved 3 tiles", text)
+        self.assertIn("Entered map 2 from map 1 at frame 150", text)
+
+    def test_invalid_delta_ignored(self):
+        self.service._process_mgba_message("st||abc||x=1")
+        self.assertIsNone(self.service.state_timeline.current())
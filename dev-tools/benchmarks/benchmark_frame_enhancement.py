@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the frame enhancement backends on a GBA-sized screenshot.
+
+Compares per-frame time of the PIL ImageEnhance chain against the fused NumPy
+path (dashboard/image_enhancement.py), both with and without PNG encoding,
+since the encoded bytes are what actually get sent to the LLM.
+
+Usage: python dev-tools/benchmarks/benchmark_frame_enhancement.py [--frames N] [--image PATH]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'ai_gba_player'))
+
+import numpy as np
+from PIL import Image
+
+from dashboard.image_enhancement import PixelArtEnhancer, enhance_image_pil
+
+
+def make_test_frame(width=240, height=160, tile=8, colours=16, seed=0):
+    """Pixel-art-like frame: 8x8 tiles drawn from a small palette"""
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (colours, 3), dtype=np.uint8)
+    tiles = rng.integers(0, colours, (height // tile, width // tile))
+    return Image.fromarray(palette[np.kron(tiles, np.ones((tile, tile), dtype=int))])
+
+
+def time_per_frame(func, image, frames):
+    func(image)  # Warm up (lookup tables, output buffer)
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(image)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def encode_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--image', help="Screenshot to use instead of a generated frame")
+    args = parser.parse_args()
+
+    image = Image.open(args.image).convert('RGB') if args.image else make_test_frame()
+    numpy_enhancer = PixelArtEnhancer()
+
+    results = {
+        'pil': time_per_frame(enhance_image_pil, image, args.frames),
+        'numpy': time_per_frame(numpy_enhancer, image, args.frames),
+        'numpy (array only)': time_per_frame(lambda img: numpy_enhancer.enhance_array(np.asarray(img)), image, args.frames),
+        'pil + png': time_per_frame(lambda img: encode_png(enhance_image_pil(img)), image, args.frames),
+        'numpy + png': time_per_frame(lambda img: encode_png(numpy_enhancer(img)), image, args.frames),
+    }
+
+    print(f"Frame {image.width}x{image.height}, {args.frames} iterations")
+    for name, ms in results.items():
+        print(f"  {name:<20} {ms:8.2f} ms/frame")
+    print(f"  speedup (enhance)    {results['pil'] / results['numpy']:8.1f}x")
+    print(f"  speedup (with png)   {results['pil + png'] / results['numpy + png']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
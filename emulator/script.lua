@@ -14,6 +14,24 @@ local buttonSeparationFrames = 58  -- Wait frames between button presses
 local separationStartFrame = 0
 local inSeparationPeriod = false
 
+-- act_then_capture: screenshot taken once the button sequence has settled
+local pendingCapture = nil        -- { filename, settleFrames, inBand, requestId }
+local sequenceIdleFrame = nil     -- Frame the sequence was first seen idle
+local maxSettleFrames = 600
+
+-- Reported to the controller in sequence_done when the last button is released
+local sequenceStartFrame = 0
+local sequenceButtonCount = 0
+local sequenceRequestId = 0
+
+-- Game state telemetry (subscribe_state||N): changed fields pushed every N frames
+local stateStreamInterval = 0     -- 0 = not subscribed
+local stateHeartbeatFrames = 60   -- Empty sample so the controller sees time pass while idle
+local lastStreamFrame = 0
+local lastStreamedState = nil     -- { x, y, d, m } as last sent
+local lastStreamSendFrame = 0
+local STATE_FIELDS = { "x", "y", "d", "m" }
+
 -- Video recording variables
 local isRecording = false
 local videoStartFrame = 0
@@ -26,6 +44,11 @@ local postSequenceWaitFrames = 60  -- 1 second wait after last button
 local projectRoot = "/Users/chengwan/Projects/pokemonAI/LLM-Pokemon-Red"  -- Change this to your project path
 -- Legacy hardcoded paths removed - AI service now controls all screenshot naming
 local videoPath = projectRoot .. "/data/videos/video_sequence.mp4"
+local screenshotDir = projectRoot .. "/data/screenshots"
+
+-- Screenshots written by emu:screenshot and not yet reported (checked every frame)
+local pendingScreenshots = {}
+local screenshotTimeoutFrames = 180  -- 3 seconds at 60fps
 
 -- Screenshot session tracking removed - AI service now handles all screenshot timing
 
@@ -35,6 +58,18 @@ local memoryAddresses = {}
 local gameConfig = {}
 local gameConfigReceived = false
 
+-- Framed socket protocol (see docs/SOCKET_PROTOCOL.md)
+-- Header: magic(u8) version(u8) type(u8) reserved(u8) requestId(u32) length(u32), big-endian
+local PROTOCOL_MAGIC = 0xFB
+local PROTOCOL_VERSION = 1
+local PROTOCOL_HEADER_FORMAT = ">BBBxI4I4"
+local PROTOCOL_HEADER_SIZE = 12
+local MSG_HELLO = 0
+local MSG_TEXT = 1
+local MSG_FRAME = 2
+local framingActive = false  -- Switched on when the controller sends a framed hello
+local receiveBuffer = ""     -- Partial messages from the controller
+
 -- Handle game configuration received from Python service
 function handleGameConfig(configString)
     debugBuffer:print("Received game configuration from Python service\n")
@@ -424,9 +459,6 @@ end
 
 -- Video recording functions
 function startVideoRecording(buttonCount)
-    -- Create directory if it doesn't exist
-    os.execute("mkdir -p \"" .. projectRoot .. "/data/videos\"")
-    
     -- Calculate video duration: each button takes ~1 second + 1 second post-wait
     local estimatedDurationSeconds = buttonCount + 1
     
@@ -461,75 +493,166 @@ function stopVideoRecording()
     end
 end
 
--- New controlled screenshot function
-function captureAndSendControlledScreenshot(filename)
-    -- Create directory if it doesn't exist
-    os.execute("mkdir -p \"" .. projectRoot .. "/data/screenshots\"")
-    
+-- New controlled screenshot function (requestId is echoed in framed replies, 0 if none)
+-- Only starts the capture; checkPendingScreenshots reports it once the PNG is on disk,
+-- so the frame callback never blocks waiting for the file
+function captureAndSendControlledScreenshot(filename, requestId)
     -- Use the AI service's controlled filename
-    local controlledPath = projectRoot .. "/data/screenshots/" .. filename
+    local controlledPath = screenshotDir .. "/" .. filename
     
     -- Take the screenshot with the controlled filename
     emu:screenshot(controlledPath)
     
-    -- Wait for screenshot file to be written to disk (up to 3 seconds)
-    local maxWaitTime = 3  -- seconds
-    local waitInterval = 0.1  -- seconds
-    local totalWaited = 0
-    local fileExists = false
-    
-    while totalWaited < maxWaitTime do
-        -- Check if file exists and has reasonable size
-        local file = io.open(controlledPath, "r")
-        if file then
-            file:close()
-            -- Additional check: ensure file has some content (not 0 bytes)
-            local fileSize = 0
-            file = io.open(controlledPath, "rb")
-            if file then
-                file:seek("end")
-                fileSize = file:seek()
-                file:close()
-            end
-            if fileSize > 1000 then  -- Reasonable minimum size for a screenshot
-                fileExists = true
-                break
+    -- Read the game memory now so the state matches the captured frame
+    local memoryData = readGameMemory()
+    
+    table.insert(pendingScreenshots, {
+        filename = filename,
+        path = controlledPath,
+        requestId = requestId,
+        startFrame = emu:currentFrame(),
+        memoryData = memoryData
+    })
+end
+
+-- Size of a file in bytes, or 0 if it does not exist yet
+function getFileSize(path)
+    local file = io.open(path, "rb")
+    if not file then return 0 end
+    local fileSize = file:seek("end") or 0
+    file:close()
+    return fileSize
+end
+
+-- Frame callback: report screenshots whose file has been written, in request order
+function checkPendingScreenshots()
+    while #pendingScreenshots > 0 do
+        local pending = pendingScreenshots[1]
+        local framesWaited = emu:currentFrame() - pending.startFrame
+        
+        if getFileSize(pending.path) > 1000 then  -- Reasonable minimum size for a screenshot
+            table.remove(pendingScreenshots, 1)
+            debugBuffer:print("✅ Screenshot file confirmed: " .. pending.filename .. " (" .. framesWaited .. " frames)\n")
+            
+            -- Send response using new format (no path since it's controlled)
+            -- Format: direction||x||y||mapId (path is omitted since AI service controls it)
+            local memoryData = pending.memoryData
+            local dataString = memoryData.direction.text .. 
+                              "||" .. memoryData.position.x .. 
+                              "||" .. memoryData.position.y .. 
+                              "||" .. memoryData.mapId
+            
+            -- Send controlled screenshot data to Python controller
+            sendMessage("screenshot_with_state", dataString, pending.requestId)
+            
+            debugBuffer:print("Controlled screenshot captured:\n")
+            debugBuffer:print("Filename: " .. pending.filename .. "\n")
+            debugBuffer:print("Path: " .. pending.path .. "\n")
+            debugBuffer:print("Direction: " .. memoryData.direction.text .. "\n")
+            debugBuffer:print("Position: X=" .. memoryData.position.x .. ", Y=" .. memoryData.position.y .. "\n")
+            debugBuffer:print("Map ID: " .. memoryData.mapId .. "\n")
+        elseif framesWaited >= screenshotTimeoutFrames then
+            table.remove(pendingScreenshots, 1)
+            debugBuffer:print("⚠️ Screenshot file not ready after " .. framesWaited .. " frames: " .. pending.filename .. "\n")
+            -- Still send response but with error indication
+            sendMessage("screenshot_error", "File not created: " .. pending.filename, pending.requestId)
+        else
+            -- Keep replies in request order: wait for the oldest capture first
+            return
+        end
+    end
+end
+
+-- Create the screenshot and video directories (once, at startup)
+function createOutputDirectories()
+    os.execute("mkdir -p \"" .. screenshotDir .. "\" \"" .. projectRoot .. "/data/videos\"")
+    debugBuffer:print("Created screenshot directories\n")
+end
+
+-- Pack an mGBA image into raw RGB24 rows (3 bytes per pixel, top-left first)
+function encodeFramePixels(image)
+    local width = image.width
+    local height = image.height
+    local rows = {}
+    local row = {}
+    
+    for y = 0, height - 1 do
+        local n = 0
+        for x = 0, width - 1 do
+            local color = image:getPixel(x, y)  -- 0xAARRGGBB
+            row[n + 1] = (color >> 16) & 0xFF
+            row[n + 2] = (color >> 8) & 0xFF
+            row[n + 3] = color & 0xFF
+            n = n + 3
+        end
+        rows[y + 1] = string.char(table.unpack(row, 1, n))
+    end
+    
+    return table.concat(rows), width, height
+end
+
+-- Send raw bytes, looping until the socket has accepted all of them
+function sendRaw(data)
+    if not statusSocket then return false end
+    local sent = 0
+    local total = #data
+    while sent < total do
+        local result, err = statusSocket:send(string.sub(data, sent + 1))
+        if result == nil then
+            if err ~= socket.ERRORS.AGAIN then
+                debugBuffer:print("Socket send error: " .. tostring(err) .. "\n")
+                return false
             end
+        elseif type(result) == "number" and result > 0 then
+            sent = sent + result
+        else
+            sent = total
         end
-        
-        -- Wait a bit before checking again
-        os.execute("sleep " .. waitInterval)
-        totalWaited = totalWaited + waitInterval
+    end
+    return true
+end
+
+-- In-band screenshot: stream the framebuffer over the socket instead of writing a PNG
+function captureAndSendFrame(filename, requestId)
+    if not emu.screenshotToImage then
+        debugBuffer:print("screenshotToImage unavailable, falling back to PNG on disk\n")
+        captureAndSendControlledScreenshot(filename, requestId)
+        return
     end
     
-    if not fileExists then
-        debugBuffer:print("⚠️ Screenshot file not ready after " .. maxWaitTime .. " seconds: " .. filename .. "\n")
-        -- Still send response but with error indication
-        sendMessage("screenshot_error", "File not created: " .. filename)
+    local image = emu:screenshotToImage()
+    if not image then
+        sendMessage("screenshot_error", "Frame capture failed: " .. filename, requestId)
         return
     end
     
-    debugBuffer:print("✅ Screenshot file confirmed: " .. filename .. "\n")
+    local pixels, width, height = encodeFramePixels(image)
+    local frameMeta = filename .. "||" .. width .. "||" .. height .. "||rgb24"
     
-    -- Read the game memory data
-    local memoryData = readGameMemory()
+    if framingActive then
+        -- FRAME payload: metadata line followed by the raw pixels
+        local metaLine = frameMeta .. "\n"
+        local header = string.pack(PROTOCOL_HEADER_FORMAT, PROTOCOL_MAGIC, PROTOCOL_VERSION, MSG_FRAME, requestId or 0, #metaLine + #pixels)
+        if not sendRaw(header .. metaLine) or not sendRaw(pixels) then
+            return
+        end
+    else
+        -- Header line announces the raw payload that follows it
+        -- Format: frame_data||filename||width||height||format||length
+        sendMessage("frame_data", frameMeta .. "||" .. #pixels)
+        if not sendRaw(pixels) then
+            return
+        end
+    end
     
-    -- Send response using new format (no path since it's controlled)
-    -- Format: direction||x||y||mapId (path is omitted since AI service controls it)
+    local memoryData = readGameMemory()
     local dataString = memoryData.direction.text .. 
                       "||" .. memoryData.position.x .. 
                       "||" .. memoryData.position.y .. 
                       "||" .. memoryData.mapId
+    sendMessage("screenshot_with_state", dataString, requestId)
     
-    -- Send controlled screenshot data to Python controller
-    sendMessage("screenshot_with_state", dataString)
-    
-    debugBuffer:print("Controlled screenshot captured:\n")
-    debugBuffer:print("Filename: " .. filename .. "\n")
-    debugBuffer:print("Path: " .. controlledPath .. "\n")
-    debugBuffer:print("Direction: " .. memoryData.direction.text .. "\n")
-    debugBuffer:print("Position: X=" .. memoryData.position.x .. ", Y=" .. memoryData.position.y .. "\n")
-    debugBuffer:print("Map ID: " .. memoryData.mapId .. "\n")
+    debugBuffer:print("In-band frame sent: " .. filename .. " (" .. #pixels .. " bytes)\n")
 end
 
 -- Legacy screenshot function removed - all screenshots now use controlled naming
@@ -538,7 +661,7 @@ end
 -- Legacy after screenshot function removed - replaced with controlled naming
 -- AI service now manages all screenshot timing and naming
 
-function sendGameState()
+function sendGameState(requestId)
     -- Read the game memory data (no screenshot needed for screen capture mode)
     local memoryData = readGameMemory()
     
@@ -557,7 +680,7 @@ function sendGameState()
                       "||" .. dataPackage.mapId
     
     -- Send game state data to Python controller
-    sendMessage("state", dataString)
+    sendMessage("state", dataString, requestId)
     
     debugBuffer:print("Game state sent for screen capture mode:\n")
     debugBuffer:print("Direction: " .. dataPackage.direction .. "\n")
@@ -627,202 +750,364 @@ function handleKeyPress()
             else
                 -- All buttons processed, video recording will continue for post-sequence wait
                 debugBuffer:print("All buttons processed, waiting for video recording to complete\n")
+                sendMessage("sequence_done", sequenceStartFrame .. "||" .. currentFrame .. "||" .. sequenceButtonCount, sequenceRequestId)
             end
         end
     end
 end
 
 -- Socket management functions
-function sendMessage(messageType, content)
+-- requestId correlates a reply with the controller's command; only framed messages can carry it
+function sendMessage(messageType, content, requestId)
     if statusSocket then
-        statusSocket:send(messageType .. "||" .. content .. "\n")
+        if framingActive then
+            sendFramed(MSG_TEXT, messageType .. "||" .. content, requestId)
+        else
+            statusSocket:send(messageType .. "||" .. content .. "\n")
+        end
+    end
+end
+
+function sendFramed(msgType, payload, requestId)
+    local header = string.pack(PROTOCOL_HEADER_FORMAT, PROTOCOL_MAGIC, PROTOCOL_VERSION, msgType, requestId or 0, #payload)
+    return sendRaw(header .. payload)
+end
+
+-- Pull complete framed messages and text lines out of the receive buffer
+function processReceiveBuffer()
+    while #receiveBuffer > 0 do
+        if string.byte(receiveBuffer, 1) == PROTOCOL_MAGIC then
+            if #receiveBuffer < PROTOCOL_HEADER_SIZE then return end
+            local _, version, msgType, requestId, length = string.unpack(PROTOCOL_HEADER_FORMAT, receiveBuffer)
+            if #receiveBuffer < PROTOCOL_HEADER_SIZE + length then return end
+            
+            local payload = string.sub(receiveBuffer, PROTOCOL_HEADER_SIZE + 1, PROTOCOL_HEADER_SIZE + length)
+            receiveBuffer = string.sub(receiveBuffer, PROTOCOL_HEADER_SIZE + length + 1)
+            
+            if version ~= PROTOCOL_VERSION then
+                debugBuffer:print("Ignoring message with unsupported protocol version " .. version .. "\n")
+            elseif msgType == MSG_HELLO then
+                framingActive = true
+                debugBuffer:print("Framed protocol enabled (version " .. payload .. ")\n")
+            elseif msgType == MSG_TEXT then
+                processCommand(payload, requestId)
+            else
+                debugBuffer:print("Ignoring unknown framed message type " .. msgType .. "\n")
+            end
+        else
+            local newline = string.find(receiveBuffer, "\n", 1, true)
+            if not newline then return end
+            local line = string.sub(receiveBuffer, 1, newline - 1)
+            receiveBuffer = string.sub(receiveBuffer, newline + 1)
+            processCommand(line, 0)
+        end
     end
 end
 
 function socketReceived()
-    local data, err = statusSocket:receive(1024)
+    local data, err = statusSocket:receive(4096)
     
     if data then
-        -- Trim whitespace
-        data = data:gsub("^%s*(.-)%s*$", "%1")
-        debugBuffer:print("Received from AI controller: '" .. data .. "'\n")
+        receiveBuffer = receiveBuffer .. data
+        processReceiveBuffer()
+    elseif err ~= socket.ERRORS.AGAIN then
+        debugBuffer:print("Socket error: " .. err .. "\n")
+        stopSocket()
+    end
+end
+
+function processCommand(data, requestId)
+    -- Trim whitespace
+    data = data:gsub("^%s*(.-)%s*$", "%1")
+    if data == "" then return end
+    debugBuffer:print("Received from AI controller: '" .. data .. "'\n")
+    
+    -- Process different command types
+    if data == "request_screenshot" then
+        debugBuffer:print("Screenshot requested by controller\n")
+        -- Legacy request - redirect to controlled screenshot with default name
+        if gameConfigReceived then
+            -- Generate a temporary filename for legacy requests
+            local legacyFilename = "screenshot_legacy_" .. os.time() .. ".png"
+            captureAndSendControlledScreenshot(legacyFilename)
+        else
+            debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
+        end
+    elseif string.find(data, "request_frame_to||", 1, true) then
+        -- In-band frame transfer: same controlled naming, pixels sent over the socket
+        local filename = string.sub(data, string.len("request_frame_to||") + 1)
+        debugBuffer:print("In-band frame requested: " .. filename .. "\n")
         
-        -- Process different command types
-        if data == "request_screenshot" then
-            debugBuffer:print("Screenshot requested by controller\n")
-            -- Legacy request - redirect to controlled screenshot with default name
-            if gameConfigReceived then
-                -- Generate a temporary filename for legacy requests
-                local legacyFilename = "screenshot_legacy_" .. os.time() .. ".png"
-                captureAndSendControlledScreenshot(legacyFilename)
-            else
-                debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
-            end
-        elseif string.find(data, "request_screenshot_to||") then
-            -- New controlled screenshot naming protocol
-            local parts = {}
-            for part in string.gmatch(data, "([^|]+)") do
-                table.insert(parts, part)
-            end
+        if gameConfigReceived then
+            captureAndSendFrame(filename, requestId)
+        else
+            debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
+        end
+    elseif string.find(data, "request_screenshot_to||") then
+        -- New controlled screenshot naming protocol
+        local parts = {}
+        for part in string.gmatch(data, "([^|]+)") do
+            table.insert(parts, part)
+        end
+        
+        if #parts >= 2 then
+            local command = parts[1]
+            local filename = parts[2]
+            debugBuffer:print("Controlled screenshot requested: " .. filename .. "\n")
             
-            if #parts >= 2 then
-                local command = parts[1]
-                local filename = parts[2]
-                debugBuffer:print("Controlled screenshot requested: " .. filename .. "\n")
-                
-                if gameConfigReceived then
-                    captureAndSendControlledScreenshot(filename)
-                else
-                    debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
-                end
-            else
-                debugBuffer:print("Invalid controlled screenshot command format\n")
-            end
-        elseif data == "request_after_screenshot" then
-            debugBuffer:print("After screenshot requested by controller (legacy)\n")
-            -- Legacy request - redirect to controlled screenshot
             if gameConfigReceived then
-                local afterFilename = "screenshot_after_" .. os.time() .. ".png"
-                captureAndSendControlledScreenshot(afterFilename)
+                captureAndSendControlledScreenshot(filename, requestId)
             else
-                debugBuffer:print("Cannot take after screenshot: Game not configured yet\n")
-            end
-        elseif data == "request_state" then
-            debugBuffer:print("Game state requested by controller (screen capture mode)\n")
-            -- Only send state if we're waiting for a request and game is configured
-            if waitingForRequest and gameConfigReceived then
-                waitingForRequest = false
-                sendGameState()
-            elseif not gameConfigReceived then
-                debugBuffer:print("Cannot send state: Game not configured yet\n")
-            end
-        elseif string.find(data, "game_config||") then
-            -- Handle game configuration from Python service
-            local configStart = string.find(data, "||")
-            if configStart then
-                -- Extract just the config part, stop at any other commands
-                local configString = string.sub(data, configStart + 2)
-                
-                -- Check if there are other commands concatenated (like request_screenshot)
-                local nextCommand = string.find(configString, "request_screenshot")
-                if nextCommand then
-                    configString = string.sub(configString, 1, nextCommand - 1)
-                    debugBuffer:print("Found concatenated message, extracting config only\n")
-                end
-                
-                debugBuffer:print("Received game configuration\n")
-                debugBuffer:print("Config length: " .. string.len(configString) .. " characters\n")
-                
-                if handleGameConfig(configString) then
-                    debugBuffer:print("Game configuration loaded successfully\n")
-                    -- Notify Python that we're ready
-                    sendMessage("config_loaded", "true")
-                else
-                    debugBuffer:print("Failed to load game configuration\n")
-                    sendMessage("config_error", "Failed to parse configuration")
-                end
+                debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
             end
         else
-            -- Assume it's a button command if not a screenshot request
-            -- Handle both single button and comma-separated multiple buttons with optional durations
-            local buttonCodes = {}
-            local buttonDurations = {}
-            
-            -- Check if data contains duration information (format: "buttons|durations")
-            local pipePos = string.find(data, "|")
-            local buttonData = data
-            local durationData = nil
+            debugBuffer:print("Invalid controlled screenshot command format\n")
+        end
+    elseif data == "request_after_screenshot" then
+        debugBuffer:print("After screenshot requested by controller (legacy)\n")
+        -- Legacy request - redirect to controlled screenshot
+        if gameConfigReceived then
+            local afterFilename = "screenshot_after_" .. os.time() .. ".png"
+            captureAndSendControlledScreenshot(afterFilename)
+        else
+            debugBuffer:print("Cannot take after screenshot: Game not configured yet\n")
+        end
+    elseif data == "request_state" then
+        debugBuffer:print("Game state requested by controller (screen capture mode)\n")
+        -- Only send state if we're waiting for a request and game is configured
+        if waitingForRequest and gameConfigReceived then
+            waitingForRequest = false
+            sendGameState(requestId)
+        elseif not gameConfigReceived then
+            debugBuffer:print("Cannot send state: Game not configured yet\n")
+        end
+    elseif string.find(data, "game_config||") then
+        -- Handle game configuration from Python service
+        local configStart = string.find(data, "||")
+        if configStart then
+            -- Extract just the config part, stop at any other commands
+            local configString = string.sub(data, configStart + 2)
             
-            if pipePos then
-                buttonData = string.sub(data, 1, pipePos - 1)
-                durationData = string.sub(data, pipePos + 1)
+            -- Check if there are other commands concatenated (like request_screenshot)
+            local nextCommand = string.find(configString, "request_screenshot")
+            if nextCommand then
+                configString = string.sub(configString, 1, nextCommand - 1)
+                debugBuffer:print("Found concatenated message, extracting config only\n")
             end
             
-            -- Parse button codes
-            if string.find(buttonData, ",") then
-                for buttonStr in string.gmatch(buttonData, "([^,]+)") do
-                    local buttonCode = tonumber(buttonStr)
-                    if buttonCode and buttonCode >= 0 and buttonCode <= 9 then
-                        table.insert(buttonCodes, buttonCode)
-                    end
-                end
+            debugBuffer:print("Received game configuration\n")
+            debugBuffer:print("Config length: " .. string.len(configString) .. " characters\n")
+            
+            if handleGameConfig(configString) then
+                debugBuffer:print("Game configuration loaded successfully\n")
+                -- Notify Python that we're ready
+                sendMessage("config_loaded", "true", requestId)
             else
-                -- Single button
-                local buttonCode = tonumber(buttonData)
-                if buttonCode and buttonCode >= 0 and buttonCode <= 9 then
-                    table.insert(buttonCodes, buttonCode)
-                end
+                debugBuffer:print("Failed to load game configuration\n")
+                sendMessage("config_error", "Failed to parse configuration", requestId)
             end
-            
-            -- Parse duration data if present
-            if durationData then
-                if string.find(durationData, ",") then
-                    for durationStr in string.gmatch(durationData, "([^,]+)") do
-                        local duration = tonumber(durationStr)
-                        if duration and duration >= 1 and duration <= 180 then
-                            table.insert(buttonDurations, duration)
-                        else
-                            table.insert(buttonDurations, defaultKeyPressFrames)
-                        end
-                    end
+        end
+    elseif string.find(data, "set_screenshot_dir||", 1, true) then
+        -- Directory the controller chose for screenshots (e.g. tmpfs); it creates the directory
+        local dir = string.sub(data, string.len("set_screenshot_dir||") + 1)
+        if dir ~= "" then
+            screenshotDir = dir
+            debugBuffer:print("Screenshot directory: " .. screenshotDir .. "\n")
+        end
+    elseif string.find(data, "subscribe_state||", 1, true) then
+        -- Push state deltas every N frames (0 unsubscribes); the next sample carries every field
+        local interval = tonumber(string.sub(data, string.len("subscribe_state||") + 1)) or 0
+        stateStreamInterval = math.max(0, math.min(interval, 600))
+        lastStreamedState = nil
+        lastStreamFrame = 0
+        debugBuffer:print("State stream " .. (stateStreamInterval > 0 and ("every " .. stateStreamInterval .. " frames") or "disabled") .. "\n")
+    elseif string.find(data, "act_then_capture||", 1, true) then
+        -- Buttons plus the follow-up screenshot in one command:
+        -- act_then_capture||filename||settleFrames||file|frame||buttons|durations
+        local filename, settleFrames, capture, buttonData = string.match(data, "^act_then_capture||([^|]+)||(%d+)||(%a+)||(.*)$")
+        
+        if not filename then
+            debugBuffer:print("Invalid act_then_capture command format\n")
+        elseif gameConfigReceived then
+            -- Captured by checkPendingCapture once the sequence has played out and settled
+            pendingCapture = {
+                filename = filename,
+                settleFrames = math.min(tonumber(settleFrames), maxSettleFrames),
+                inBand = capture == "frame",
+                requestId = requestId
+            }
+            sequenceIdleFrame = nil
+            startButtonSequence(buttonData, requestId)
+        else
+            debugBuffer:print("Cannot take screenshot: Game not configured yet\n")
+        end
+    else
+        -- Assume it's a button command if not a screenshot request
+        if not startButtonSequence(data, requestId) then
+            -- Notify we're ready for next input even if this was invalid
+            waitingForRequest = true
+            sendMessage("ready", "true")
+        end
+    end
+end
+
+-- Parse "buttons|durations" and start pressing; returns false if no valid button was found
+function startButtonSequence(data, requestId)
+    -- Handle both single button and comma-separated multiple buttons with optional durations
+    local buttonCodes = {}
+    local buttonDurations = {}
+    
+    -- Check if data contains duration information (format: "buttons|durations")
+    local pipePos = string.find(data, "|")
+    local buttonData = data
+    local durationData = nil
+    
+    if pipePos then
+        buttonData = string.sub(data, 1, pipePos - 1)
+        durationData = string.sub(data, pipePos + 1)
+    end
+    
+    -- Parse button codes
+    if string.find(buttonData, ",") then
+        for buttonStr in string.gmatch(buttonData, "([^,]+)") do
+            local buttonCode = tonumber(buttonStr)
+            if buttonCode and buttonCode >= 0 and buttonCode <= 9 then
+                table.insert(buttonCodes, buttonCode)
+            end
+        end
+    else
+        -- Single button
+        local buttonCode = tonumber(buttonData)
+        if buttonCode and buttonCode >= 0 and buttonCode <= 9 then
+            table.insert(buttonCodes, buttonCode)
+        end
+    end
+    
+    -- Parse duration data if present
+    if durationData then
+        if string.find(durationData, ",") then
+            for durationStr in string.gmatch(durationData, "([^,]+)") do
+                local duration = tonumber(durationStr)
+                if duration and duration >= 1 and duration <= 180 then
+                    table.insert(buttonDurations, duration)
                 else
-                    -- Single duration
-                    local duration = tonumber(durationData)
-                    if duration and duration >= 1 and duration <= 180 then
-                        table.insert(buttonDurations, duration)
-                    else
-                        table.insert(buttonDurations, defaultKeyPressFrames)
-                    end
+                    table.insert(buttonDurations, defaultKeyPressFrames)
                 end
             end
-            
-            if #buttonCodes > 0 then
-                local keyNames = { "A", "B", "SELECT", "START", "RIGHT", "LEFT", "UP", "DOWN", "R", "L" }
-                
-                -- Previous screenshots are now managed by AI service, not mGBA
-                -- This eliminates hardcoded screenshot paths and naming conflicts
-                
-                -- Clear existing key presses and button queue
-                emu:clearKeys(0x3FF)
-                buttonQueue = {}
-                durationQueue = {}
-                
-                -- Start video recording for the button sequence
-                startVideoRecording(#buttonCodes)
-                
-                -- Set up the first button and its duration
-                currentKeyIndex = buttonCodes[1]
-                currentKeyDuration = buttonDurations[1] or defaultKeyPressFrames
-                keyPressStartFrame = emu:currentFrame()
-                
-                -- Add remaining buttons and durations to queues
-                for i = 2, #buttonCodes do
-                    table.insert(buttonQueue, buttonCodes[i])
-                    table.insert(durationQueue, buttonDurations[i] or defaultKeyPressFrames)
-                end
-                
-                -- Press the first key
-                emu:addKey(currentKeyIndex)
-                
-                -- Log what we're doing
-                local buttonNames = {}
-                local durationStrings = {}
-                for i, code in ipairs(buttonCodes) do
-                    table.insert(buttonNames, keyNames[code + 1])
-                    table.insert(durationStrings, tostring(buttonDurations[i] or defaultKeyPressFrames))
-                end
-                debugBuffer:print("AI pressing buttons in sequence: " .. table.concat(buttonNames, ", ") .. 
-                                 " (durations: " .. table.concat(durationStrings, ", ") .. " frames)\n")
+        else
+            -- Single duration
+            local duration = tonumber(durationData)
+            if duration and duration >= 1 and duration <= 180 then
+                table.insert(buttonDurations, duration)
             else
-                debugBuffer:print("Invalid button data received: '" .. data .. "'\n")
-                -- Notify we're ready for next input even if this was invalid
-                waitingForRequest = true
-                sendMessage("ready", "true")
+                table.insert(buttonDurations, defaultKeyPressFrames)
             end
         end
-    elseif err ~= socket.ERRORS.AGAIN then
-        debugBuffer:print("Socket error: " .. err .. "\n")
-        stopSocket()
+    end
+    
+    if #buttonCodes > 0 then
+        local keyNames = { "A", "B", "SELECT", "START", "RIGHT", "LEFT", "UP", "DOWN", "R", "L" }
+        
+        -- Previous screenshots are now managed by AI service, not mGBA
+        -- This eliminates hardcoded screenshot paths and naming conflicts
+        
+        -- Clear existing key presses and button queue
+        emu:clearKeys(0x3FF)
+        buttonQueue = {}
+        durationQueue = {}
+        
+        -- Start video recording for the button sequence
+        startVideoRecording(#buttonCodes)
+        
+        -- Set up the first button and its duration
+        currentKeyIndex = buttonCodes[1]
+        currentKeyDuration = buttonDurations[1] or defaultKeyPressFrames
+        keyPressStartFrame = emu:currentFrame()
+        sequenceStartFrame = keyPressStartFrame
+        sequenceButtonCount = #buttonCodes
+        sequenceRequestId = requestId
+        
+        -- Add remaining buttons and durations to queues
+        for i = 2, #buttonCodes do
+            table.insert(buttonQueue, buttonCodes[i])
+            table.insert(durationQueue, buttonDurations[i] or defaultKeyPressFrames)
+        end
+        
+        -- Press the first key
+        emu:addKey(currentKeyIndex)
+        
+        -- Log what we're doing
+        local buttonNames = {}
+        local durationStrings = {}
+        for i, code in ipairs(buttonCodes) do
+            table.insert(buttonNames, keyNames[code + 1])
+            table.insert(durationStrings, tostring(buttonDurations[i] or defaultKeyPressFrames))
+        end
+        debugBuffer:print("AI pressing buttons in sequence: " .. table.concat(buttonNames, ", ") .. 
+                         " (durations: " .. table.concat(durationStrings, ", ") .. " frames)\n")
+        return true
+    end
+    
+    debugBuffer:print("Invalid button data received: '" .. data .. "'\n")
+    return false
+end
+
+-- Frame callback: push the state fields that changed since the last sample
+-- Format: st||frame||x=12||y=7||d=UP||m=3 (unchanged fields omitted)
+function pushStateTelemetry()
+    if stateStreamInterval <= 0 or not gameConfigReceived or not memoryAddresses.playerX then return end
+    
+    local currentFrame = emu:currentFrame()
+    if currentFrame - lastStreamFrame < stateStreamInterval then return end
+    lastStreamFrame = currentFrame
+    
+    local memoryData = readGameMemory()
+    local state = {
+        x = memoryData.position.x,
+        y = memoryData.position.y,
+        d = memoryData.direction.text,
+        m = memoryData.mapId
+    }
+    
+    local fields = {}
+    for _, key in ipairs(STATE_FIELDS) do
+        if lastStreamedState == nil or lastStreamedState[key] ~= state[key] then
+            table.insert(fields, key .. "=" .. state[key])
+        end
+    end
+    lastStreamedState = state
+    
+    if #fields > 0 or currentFrame - lastStreamSendFrame >= stateHeartbeatFrames then
+        lastStreamSendFrame = currentFrame
+        sendMessage("st", currentFrame .. (#fields > 0 and "||" .. table.concat(fields, "||") or ""))
+    end
+end
+
+-- Take the act_then_capture screenshot once all buttons are released and the game has settled
+function checkPendingCapture()
+    if not pendingCapture then return end
+    
+    if currentKeyIndex ~= nil or inSeparationPeriod or #buttonQueue > 0 then
+        sequenceIdleFrame = nil
+        return
+    end
+    
+    local currentFrame = emu:currentFrame()
+    if sequenceIdleFrame == nil then
+        sequenceIdleFrame = currentFrame
+    end
+    
+    if currentFrame - sequenceIdleFrame >= pendingCapture.settleFrames then
+        local capture = pendingCapture
+        pendingCapture = nil
+        sequenceIdleFrame = nil
+        debugBuffer:print("Sequence settled after " .. capture.settleFrames .. " frames, capturing " .. capture.filename .. "\n")
+        
+        if capture.inBand then
+            captureAndSendFrame(capture.filename, capture.requestId)
+        else
+            captureAndSendControlledScreenshot(capture.filename, capture.requestId)
+        end
     end
 end
 
@@ -854,8 +1139,13 @@ function startSocket()
     -- Connect to the controller
     if statusSocket:connect("127.0.0.1", 8888) then
         debugBuffer:print("Successfully connected to controller\n")
-        -- Notify controller we're ready for first instruction
-        sendMessage("ready", "true")
+        -- Notify controller we're ready for first instruction and advertise framing support
+        framingActive = false
+        receiveBuffer = ""
+        pendingCapture = nil
+        pendingScreenshots = {}
+        stateStreamInterval = 0
+        sendMessage("ready", "true||framing=" .. PROTOCOL_VERSION .. "||act_capture=1||sequence_done=1||state_stream=1||screenshot_dir=1")
         waitingForRequest = true
     else
         debugBuffer:print("Failed to connect to controller\n")
@@ -865,9 +1155,13 @@ end
 
 -- Add callbacks to run our functions
 callbacks:add("start", setupBuffer)
+callbacks:add("start", createOutputDirectories)
 callbacks:add("start", waitForGameConfig)  -- Wait for game config from Python
 callbacks:add("start", startSocket)
 callbacks:add("frame", handleKeyPress)
+callbacks:add("frame", checkPendingCapture)
+callbacks:add("frame", checkPendingScreenshots)
+callbacks:add("frame", pushStateTelemetry)
 
 -- Initialize on script load
 if emu then
@@ -875,7 +1169,6 @@ if emu then
     waitForGameConfig()  -- Wait for configuration from Python service
     startSocket()
     
-    -- Create directory on startup
-    os.execute("mkdir -p \"" .. projectRoot .. "/data/screenshots\"")
-    debugBuffer:print("Created screenshot directories\n")
+    -- Create directories once on startup, never per capture
+    createOutputDirectories()
 end
\ No newline at end of file